@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de sesiones, usuarios y perfiles para el camino rápido de autenticación
+
+Cada request autenticado validaba la sesión, el usuario y el perfil contra
+MongoDB. Esta caché en memoria del proceso guarda esos documentos por unos
+segundos y se invalida explícitamente al cerrar sesiones, invalidar tokens y
+actualizar usuarios o perfiles. Entre procesos (workers) la vigencia queda
+acotada por el TTL.
+
+Configuración (settings.NEURAUDIT_SETTINGS):
+    AUTH_CACHE_TTL_SEGUNDOS: vigencia de cada entrada (0 desactiva la caché)
+    AUTH_CACHE_MAX_ENTRADAS: entradas máximas por tipo
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+TTL_POR_DEFECTO = 30
+MAX_ENTRADAS_POR_DEFECTO = 10000
+
+# Campos del usuario que no deben quedar en memoria
+CAMPOS_USUARIO_EXCLUIDOS = ('password_hash',)
+
+
+def _configuracion(clave: str, defecto: int) -> int:
+    return int(getattr(settings, 'NEURAUDIT_SETTINGS', {}).get(clave, defecto))
+
+
+def hash_token(token: str) -> str:
+    """Huella SHA-256 del token (la caché nunca guarda el token en claro)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class CacheTTL:
+    """
+    Diccionario con expiración por entrada, seguro entre hilos.
+    Al llenarse descarta primero las entradas vencidas y luego las más antiguas.
+    """
+
+    def __init__(self, ttl: int, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave) -> Optional[Any]:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        valor, vence = entrada
+        if vence <= time.monotonic():
+            with self._lock:
+                if self._datos.get(clave) is entrada:
+                    del self._datos[clave]
+            return None
+        return valor
+
+    def set(self, clave, valor, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if clave not in self._datos and len(self._datos) >= self.max_entradas:
+                self._liberar()
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def delete_donde(self, condicion: Callable[[Any], bool]) -> int:
+        """Elimina las entradas cuyo valor cumple la condición"""
+        with self._lock:
+            claves = [clave for clave, (valor, _) in self._datos.items() if condicion(valor)]
+            for clave in claves:
+                del self._datos[clave]
+        return len(claves)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def _liberar(self):
+        ahora = time.monotonic()
+        vencidas = [clave for clave, (_, vence) in self._datos.items() if vence <= ahora]
+        for clave in vencidas:
+            del self._datos[clave]
+        if len(self._datos) >= self.max_entradas:
+            # dict conserva el orden de inserción: se descarta el 10% más antiguo
+            for clave in list(self._datos)[:max(1, self.max_entradas // 10)]:
+                del self._datos[clave]
+
+
+class CacheAutenticacion:
+    """Sesiones (por hash de token), usuarios (por id) y perfiles (por id, documento y compilado)"""
+
+    def __init__(self):
+        ttl = _configuracion('AUTH_CACHE_TTL_SEGUNDOS', TTL_POR_DEFECTO)
+        max_entradas = _configuracion('AUTH_CACHE_MAX_ENTRADAS', MAX_ENTRADAS_POR_DEFECTO)
+        self.sesiones = CacheTTL(ttl, max_entradas)
+        self.usuarios = CacheTTL(ttl, max_entradas)
+        self.perfiles = CacheTTL(ttl, max_entradas)
+        self.perfiles_compilados = CacheTTL(ttl, max_entradas)
+
+    # Sesiones
+
+    def obtener_sesion(self, token: str) -> Optional[Dict]:
+        return self.sesiones.get(hash_token(token))
+
+    def guardar_sesion(self, token: str, sesion: Dict):
+        """Solo sesiones activas; la entrada no sobrevive a la expiración de la sesión"""
+        restante = (sesion['fecha_expiracion'] - datetime.utcnow()).total_seconds()
+        self.sesiones.set(hash_token(token), {
+            'usuario_id': str(sesion['usuario_id']),
+            'ip_address': sesion.get('ip_address', ''),
+            'fecha_expiracion': sesion['fecha_expiracion'],
+        }, ttl=restante)
+
+    def invalidar_sesion(self, token: str):
+        self.sesiones.delete(hash_token(token))
+
+    def invalidar_sesiones_usuario(self, usuario_id):
+        usuario_id = str(usuario_id)
+        self.sesiones.delete_donde(lambda sesion: sesion['usuario_id'] == usuario_id)
+
+    # Usuarios
+
+    def obtener_usuario(self, usuario_id) -> Optional[Dict]:
+        return self.usuarios.get(str(usuario_id))
+
+    def guardar_usuario(self, usuario: Dict):
+        self.usuarios.set(str(usuario['_id']), {
+            campo: valor for campo, valor in usuario.items()
+            if campo not in CAMPOS_USUARIO_EXCLUIDOS
+        })
+
+    def invalidar_usuario(self, usuario_id):
+        self.usuarios.delete(str(usuario_id))
+
+    # Perfiles
+
+    def obtener_perfil(self, perfil_id: str) -> Optional[Dict]:
+        return self.perfiles.get(perfil_id)
+
+    def guardar_perfil(self, perfil: Dict):
+        self.perfiles.set(perfil['_id'], perfil)
+
+    def obtener_perfil_compilado(self, perfil_id: str):
+        return self.perfiles_compilados.get(perfil_id)
+
+    def guardar_perfil_compilado(self, compilado):
+        self.perfiles_compilados.set(compilado.perfil_id, compilado)
+
+    def invalidar_perfil(self, perfil_id: Optional[str] = None):
+        """Sin perfil_id invalida todos los perfiles"""
+        if perfil_id is None:
+            self.perfiles.clear()
+            self.perfiles_compilados.clear()
+        else:
+            self.perfiles.delete(perfil_id)
+            self.perfiles_compilados.delete(perfil_id)
+
+    def limpiar(self):
+        self.sesiones.clear()
+        self.usuarios.clear()
+        self.perfiles.clear()
+        self.perfiles_compilados.clear()
+
+
+cache_autenticacion = CacheAutenticacion()
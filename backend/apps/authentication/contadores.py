@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén de contadores de seguridad (rate limiting, bloqueos, métricas)
+
+Incrementos atómicos con expiración, ventana deslizante y marcas con TTL,
+compartidos entre workers cuando hay Redis. Sin Redis (o si no responde al
+iniciar) se usa un almacén en memoria del proceso con la misma interfaz; si
+Redis deja de responder en ejecución, las operaciones pasan temporalmente a
+memoria en lugar de fallar la autenticación.
+
+Configuración (settings.NEURAUDIT_SETTINGS):
+    CONTADORES_SEGURIDAD_BACKEND: 'redis' o 'memoria' (por defecto redis si hay URL)
+    CONTADORES_SEGURIDAD_URL: URL de Redis (por defecto env SECURITY_REDIS_URL)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_REDIS = 'neuraudit:seguridad:'
+
+
+def _estimar_ventana(actual: int, previo: int, ventana: int, ahora: float) -> int:
+    """
+    Ventana deslizante aproximada: el bloque anterior pondera por la fracción
+    de la ventana que aún se solapa con el instante actual
+    """
+    transcurrido = (ahora % ventana) / ventana
+    return int(previo * (1 - transcurrido)) + actual
+
+
+class ContadoresBase:
+    """Interfaz común de los backends de contadores"""
+
+    def incrementar(self, clave: str, ttl: int, cantidad: int = 1) -> int:
+        """Incremento atómico; la expiración se fija al crear la clave"""
+        raise NotImplementedError
+
+    def valor(self, clave: str) -> int:
+        raise NotImplementedError
+
+    def ventana_deslizante(self, clave: str, ventana: int) -> int:
+        """Registra un evento y retorna los eventos de los últimos `ventana` segundos"""
+        raise NotImplementedError
+
+    def marcar(self, clave: str, ttl: int, datos: Any = True, solo_si_no_existe: bool = False) -> bool:
+        """Guarda una marca con TTL (bloqueos, listas negras). False si ya existía y solo_si_no_existe"""
+        raise NotImplementedError
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def eliminar(self, clave: str):
+        raise NotImplementedError
+
+    def agregar_miembro(self, clave: str, miembro: str, ttl: int) -> int:
+        """Agrega a un conjunto con TTL y retorna su tamaño"""
+        raise NotImplementedError
+
+    def claves(self, prefijo: str) -> List[str]:
+        """Claves vigentes con el prefijo (monitoreo)"""
+        raise NotImplementedError
+
+    def permitir(self, clave: str, limite: int, ventana: int) -> bool:
+        """Rate limit: registra el request y indica si sigue dentro del límite"""
+        return self.ventana_deslizante(clave, ventana) <= limite
+
+
+class ContadoresMemoria(ContadoresBase):
+    """Backend en memoria del proceso (desarrollo o sin Redis)"""
+
+    PURGA_CADA = 1000
+
+    def __init__(self):
+        self._datos = {}
+        self._lock = threading.Lock()
+        self._operaciones = 0
+
+    def _vigente(self, clave: str, ahora: float):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        if entrada[1] <= ahora:
+            del self._datos[clave]
+            return None
+        return entrada
+
+    def _purgar(self, ahora: float):
+        self._operaciones += 1
+        if self._operaciones % self.PURGA_CADA == 0:
+            for clave in [c for c, (_, vence) in self._datos.items() if vence <= ahora]:
+                del self._datos[clave]
+
+    def incrementar(self, clave: str, ttl: int, cantidad: int = 1) -> int:
+        ahora = time.time()
+        with self._lock:
+            self._purgar(ahora)
+            entrada = self._vigente(clave, ahora)
+            valor = (entrada[0] if entrada else 0) + cantidad
+            self._datos[clave] = (valor, entrada[1] if entrada else ahora + ttl)
+            return valor
+
+    def valor(self, clave: str) -> int:
+        with self._lock:
+            entrada = self._vigente(clave, time.time())
+            return entrada[0] if entrada else 0
+
+    def ventana_deslizante(self, clave: str, ventana: int) -> int:
+        ahora = time.time()
+        bloque = int(ahora // ventana)
+        with self._lock:
+            self._purgar(ahora)
+            llave = f'{clave}:{bloque}'
+            entrada = self._vigente(llave, ahora)
+            actual = (entrada[0] if entrada else 0) + 1
+            self._datos[llave] = (actual, entrada[1] if entrada else (bloque + 2) * ventana)
+            previo = self._vigente(f'{clave}:{bloque - 1}', ahora)
+        return _estimar_ventana(actual, previo[0] if previo else 0, ventana, ahora)
+
+    def marcar(self, clave: str, ttl: int, datos: Any = True, solo_si_no_existe: bool = False) -> bool:
+        if ttl <= 0:
+            return True
+        ahora = time.time()
+        with self._lock:
+            if solo_si_no_existe and self._vigente(clave, ahora):
+                return False
+            self._datos[clave] = (datos, ahora + ttl)
+            return True
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._vigente(clave, time.time())
+            return entrada[0] if entrada else None
+
+    def eliminar(self, clave: str):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def agregar_miembro(self, clave: str, miembro: str, ttl: int) -> int:
+        ahora = time.time()
+        with self._lock:
+            entrada = self._vigente(clave, ahora)
+            miembros = set(entrada[0]) if entrada else set()
+            miembros.add(miembro)
+            self._datos[clave] = (frozenset(miembros), entrada[1] if entrada else ahora + ttl)
+            return len(miembros)
+
+    def claves(self, prefijo: str) -> List[str]:
+        ahora = time.time()
+        with self._lock:
+            return [c for c, (_, vence) in self._datos.items() if c.startswith(prefijo) and vence > ahora]
+
+
+class ContadoresRedis(ContadoresBase):
+    """
+    Backend Redis compartido entre workers (operaciones atómicas con Lua)
+    Ante errores de conexión usa memoria del proceso durante REINTENTO_SEGUNDOS
+    """
+
+    REINTENTO_SEGUNDOS = 30
+
+    _SCRIPT_INCREMENTAR = """
+        local valor = redis.call('INCRBY', KEYS[1], ARGV[2])
+        if valor == tonumber(ARGV[2]) then redis.call('EXPIRE', KEYS[1], ARGV[1]) end
+        return valor
+    """
+
+    _SCRIPT_VENTANA = """
+        local actual = redis.call('INCR', KEYS[1])
+        if actual == 1 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end
+        local previo = tonumber(redis.call('GET', KEYS[2]) or '0')
+        return {actual, previo}
+    """
+
+    _SCRIPT_MIEMBRO = """
+        redis.call('SADD', KEYS[1], ARGV[1])
+        if redis.call('TTL', KEYS[1]) < 0 then redis.call('EXPIRE', KEYS[1], ARGV[2]) end
+        return redis.call('SCARD', KEYS[1])
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.redis.ping()
+        self._errores_conexion = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+        self._respaldo = ContadoresMemoria()
+        self._sin_redis_hasta = 0.0
+        self._incrementar = self.redis.register_script(self._SCRIPT_INCREMENTAR)
+        self._ventana = self.redis.register_script(self._SCRIPT_VENTANA)
+        self._miembro = self.redis.register_script(self._SCRIPT_MIEMBRO)
+
+    @staticmethod
+    def _llave(clave: str) -> str:
+        return PREFIJO_REDIS + clave
+
+    def _ejecutar(self, operacion, respaldo):
+        """Ejecuta en Redis; si no responde, en memoria (el request no se rechaza)"""
+        if time.time() < self._sin_redis_hasta:
+            return respaldo()
+        try:
+            return operacion()
+        except self._errores_conexion as e:
+            self._sin_redis_hasta = time.time() + self.REINTENTO_SEGUNDOS
+            logger.warning(
+                f"Redis de contadores no responde ({str(e)}); memoria del proceso por {self.REINTENTO_SEGUNDOS}s"
+            )
+            return respaldo()
+
+    def incrementar(self, clave: str, ttl: int, cantidad: int = 1) -> int:
+        return self._ejecutar(
+            lambda: int(self._incrementar(keys=[self._llave(clave)], args=[int(ttl), cantidad])),
+            lambda: self._respaldo.incrementar(clave, ttl, cantidad)
+        )
+
+    def valor(self, clave: str) -> int:
+        return self._ejecutar(
+            lambda: int(self.redis.get(self._llave(clave)) or 0),
+            lambda: self._respaldo.valor(clave)
+        )
+
+    def ventana_deslizante(self, clave: str, ventana: int) -> int:
+        def operacion():
+            ahora = time.time()
+            bloque = int(ahora // ventana)
+            actual, previo = self._ventana(
+                keys=[self._llave(f'{clave}:{bloque}'), self._llave(f'{clave}:{bloque - 1}')],
+                args=[ventana * 2]
+            )
+            return _estimar_ventana(int(actual), int(previo), ventana, ahora)
+
+        return self._ejecutar(operacion, lambda: self._respaldo.ventana_deslizante(clave, ventana))
+
+    def marcar(self, clave: str, ttl: int, datos: Any = True, solo_si_no_existe: bool = False) -> bool:
+        if ttl <= 0:
+            return True
+        return self._ejecutar(
+            lambda: bool(self.redis.set(self._llave(clave), json.dumps(datos), ex=int(ttl), nx=solo_si_no_existe)),
+            lambda: self._respaldo.marcar(clave, ttl, datos, solo_si_no_existe)
+        )
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        def operacion():
+            valor = self.redis.get(self._llave(clave))
+            return json.loads(valor) if valor is not None else None
+
+        return self._ejecutar(operacion, lambda: self._respaldo.obtener(clave))
+
+    def eliminar(self, clave: str):
+        self._ejecutar(lambda: self.redis.delete(self._llave(clave)), lambda: self._respaldo.eliminar(clave))
+
+    def agregar_miembro(self, clave: str, miembro: str, ttl: int) -> int:
+        return self._ejecutar(
+            lambda: int(self._miembro(keys=[self._llave(clave)], args=[miembro, int(ttl)])),
+            lambda: self._respaldo.agregar_miembro(clave, miembro, ttl)
+        )
+
+    def claves(self, prefijo: str) -> List[str]:
+        inicio = len(PREFIJO_REDIS)
+        return self._ejecutar(
+            lambda: [
+                llave.decode()[inicio:]
+                for llave in self.redis.scan_iter(match=self._llave(prefijo) + '*', count=1000)
+            ],
+            lambda: self._respaldo.claves(prefijo)
+        )
+
+
+_contadores = None
+_contadores_lock = threading.Lock()
+
+
+def _crear_backend() -> ContadoresBase:
+    configuracion = getattr(settings, 'NEURAUDIT_SETTINGS', {})
+    url = configuracion.get('CONTADORES_SEGURIDAD_URL') or os.getenv('SECURITY_REDIS_URL')
+    backend = configuracion.get('CONTADORES_SEGURIDAD_BACKEND', 'redis' if url else 'memoria')
+
+    if backend == 'redis':
+        try:
+            return ContadoresRedis(url)
+        except Exception as e:
+            logger.warning(f"Contadores de seguridad sin Redis ({str(e)}); usando memoria del proceso")
+    return ContadoresMemoria()
+
+
+def get_contadores() -> ContadoresBase:
+    """Backend de contadores compartido por el proceso"""
+    global _contadores
+    if _contadores is None:
+        with _contadores_lock:
+            if _contadores is None:
+                _contadores = _crear_backend()
+    return _contadores
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Hashing de contraseñas (bcrypt) en un ejecutor dedicado y acotado
+
+bcrypt libera el GIL, así que un pool de hilos propio limita cuántos hashes
+corren a la vez sin ocupar todos los núcleos, y la cola acotada rechaza el
+exceso en lugar de acumular workers esperando (picos de login al inicio de
+turno). El request sigue esperando su resultado, pero nunca más de
+HASHING_ESPERA_MAXIMA_SEGUNDOS por un cupo.
+
+Configuración (settings.NEURAUDIT_SETTINGS):
+    BCRYPT_ROUNDS: factor de costo para hashes nuevos (los existentes se rehashean al login)
+    HASHING_HILOS: hashes simultáneos
+    HASHING_COLA_MAXIMA: hashes en espera antes de rechazar
+    HASHING_ESPERA_MAXIMA_SEGUNDOS: espera por un cupo antes de rechazar
+    PASSWORD_HISTORIAL_VERIFICAR: contraseñas anteriores comparadas al cambiarla
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable
+
+import bcrypt
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _configuracion(clave: str, defecto):
+    return getattr(settings, 'NEURAUDIT_SETTINGS', {}).get(clave, defecto)
+
+
+class HashingSaturado(Exception):
+    """No hay cupo en el ejecutor de hashing dentro del tiempo de espera"""
+    pass
+
+
+class EjecutorHashing:
+    """ThreadPoolExecutor con cupos acotados (en ejecución + en cola) y métricas"""
+
+    def __init__(self, hilos: int, cola_maxima: int, espera_maxima: float):
+        self.hilos = hilos
+        self.cola_maxima = cola_maxima
+        self.espera_maxima = espera_maxima
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='bcrypt')
+        self._cupos = threading.BoundedSemaphore(hilos + cola_maxima)
+        self._lock = threading.Lock()
+        self.metricas = {
+            'en_cola': 0, 'en_ejecucion': 0, 'completados': 0, 'rechazados': 0,
+            'espera_total_ms': 0.0, 'espera_maxima_ms': 0.0, 'ejecucion_total_ms': 0.0,
+        }
+
+    def enviar(self, funcion: Callable, *args) -> Future:
+        """Encola la tarea; HashingSaturado si no hay cupo tras la espera máxima"""
+        if not self._cupos.acquire(timeout=self.espera_maxima):
+            with self._lock:
+                self.metricas['rechazados'] += 1
+            raise HashingSaturado('Servicio de autenticación ocupado')
+
+        encolado = time.monotonic()
+        with self._lock:
+            self.metricas['en_cola'] += 1
+
+        def tarea():
+            inicio = time.monotonic()
+            espera_ms = (inicio - encolado) * 1000
+            with self._lock:
+                self.metricas['en_cola'] -= 1
+                self.metricas['en_ejecucion'] += 1
+                self.metricas['espera_total_ms'] += espera_ms
+                self.metricas['espera_maxima_ms'] = max(self.metricas['espera_maxima_ms'], espera_ms)
+            try:
+                return funcion(*args)
+            finally:
+                with self._lock:
+                    self.metricas['en_ejecucion'] -= 1
+                    self.metricas['completados'] += 1
+                    self.metricas['ejecucion_total_ms'] += (time.monotonic() - inicio) * 1000
+                self._cupos.release()
+
+        try:
+            futuro = self._executor.submit(tarea)
+        except Exception:
+            self._liberar_sin_ejecutar()
+            raise
+        futuro.add_done_callback(lambda f: f.cancelled() and self._liberar_sin_ejecutar())
+        return futuro
+
+    def _liberar_sin_ejecutar(self):
+        # Tarea rechazada por el pool o cancelada antes de empezar
+        with self._lock:
+            self.metricas['en_cola'] -= 1
+        self._cupos.release()
+
+    def ejecutar(self, funcion: Callable, *args):
+        """Ejecuta en el pool y espera el resultado"""
+        return self.enviar(funcion, *args).result()
+
+    def estado(self) -> Dict:
+        with self._lock:
+            metricas = dict(self.metricas)
+        completados = metricas['completados'] or 1
+        return {
+            'hilos': self.hilos,
+            'cola_maxima': self.cola_maxima,
+            'en_cola': metricas['en_cola'],
+            'en_ejecucion': metricas['en_ejecucion'],
+            'completados': metricas['completados'],
+            'rechazados': metricas['rechazados'],
+            'espera_promedio_ms': round(metricas['espera_total_ms'] / completados, 1),
+            'espera_maxima_ms': round(metricas['espera_maxima_ms'], 1),
+            'ejecucion_promedio_ms': round(metricas['ejecucion_total_ms'] / completados, 1),
+        }
+
+
+_ejecutor = None
+_ejecutor_pid = None
+_ejecutor_lock = threading.Lock()
+
+
+def get_ejecutor_hashing() -> EjecutorHashing:
+    """Ejecutor por proceso (se recrea tras un fork)"""
+    global _ejecutor, _ejecutor_pid
+    if _ejecutor_pid != os.getpid():
+        with _ejecutor_lock:
+            if _ejecutor_pid != os.getpid():
+                _ejecutor = EjecutorHashing(
+                    hilos=int(_configuracion('HASHING_HILOS', max(1, (os.cpu_count() or 2) // 2))),
+                    cola_maxima=int(_configuracion('HASHING_COLA_MAXIMA', 32)),
+                    espera_maxima=float(_configuracion('HASHING_ESPERA_MAXIMA_SEGUNDOS', 5))
+                )
+                _ejecutor_pid = os.getpid()
+    return _ejecutor
+
+
+# =======================================
+# OPERACIONES
+# =======================================
+
+def rondas_configuradas() -> int:
+    return int(_configuracion('BCRYPT_ROUNDS', 12))
+
+
+def _a_bytes(valor) -> bytes:
+    return valor.encode('utf-8') if isinstance(valor, str) else bytes(valor)
+
+
+def generar_hash(password: str, rondas: int = None) -> bytes:
+    rondas = rondas or rondas_configuradas()
+    return get_ejecutor_hashing().ejecutar(
+        lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rondas))
+    )
+
+
+def verificar_password(password: str, password_hash) -> bool:
+    return get_ejecutor_hashing().ejecutar(
+        lambda: bcrypt.checkpw(password.encode('utf-8'), _a_bytes(password_hash))
+    )
+
+
+def rondas_de_hash(password_hash) -> int:
+    """Factor de costo de un hash bcrypt ($2b$12$...)"""
+    try:
+        return int(_a_bytes(password_hash).split(b'$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def necesita_rehash(password_hash, rondas: int = None) -> bool:
+    return rondas_de_hash(password_hash) != (rondas or rondas_configuradas())
+
+
+def coincide_con_historial(password: str, hashes_anteriores: Iterable, maximo: int = None) -> bool:
+    """
+    Compara contra las `maximo` contraseñas más recientes del historial,
+    en paralelo dentro del ejecutor; no revisa más allá de ese límite
+    """
+    maximo = maximo if maximo is not None else int(_configuracion('PASSWORD_HISTORIAL_VERIFICAR', 3))
+    recientes = list(hashes_anteriores)[-maximo:] if maximo > 0 else []
+    ejecutor = get_ejecutor_hashing()
+    futuros = [
+        ejecutor.enviar(lambda h=h: bcrypt.checkpw(password.encode('utf-8'), _a_bytes(h)))
+        for h in reversed(recientes)
+    ]
+    coincide = False
+    for futuro in futuros:
+        if futuro.result():
+            coincide = True
+            break
+    for futuro in futuros:
+        futuro.cancel()
+    return coincide
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# apps/authentication/management/commands/migrar_indices_autenticacion.py
+
+"""
+Migración única de índices de autenticación (sesiones con hash del token)
+
+Elimina los índices reemplazados y crea el índice del token en claro que
+usan las sesiones previas al hash durante la transición. Ejecutar una vez
+en el despliegue, antes de iniciar la nueva versión: el índice único
+token_1 rechaza las sesiones nuevas, que ya no guardan el token en claro.
+
+Uso:
+    python manage.py migrar_indices_autenticacion
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+# (colección, índice reemplazado)
+INDICES_REEMPLAZADOS = [
+    ('sesiones_activas', 'token_1'),
+    ('sesiones_activas', 'usuario_id_1_activa_1'),
+    ('tokens_refresh', 'token_1'),
+    ('intentos_login', 'username_1_timestamp_-1'),
+]
+
+# Transición: se retira cuando expiren los documentos previos al hash
+# (ver AuthenticationServiceNoSQL._filtro_token)
+COLECCIONES_TOKEN_LEGADO = ['sesiones_activas', 'tokens_refresh']
+
+
+class Command(BaseCommand):
+    help = 'Elimina los índices de autenticación reemplazados y crea los de transición (una sola vez)'
+
+    def handle(self, *args, **options):
+        client = MongoClient(settings.MONGODB_URI)
+        db = client[settings.MONGODB_DATABASE]
+
+        try:
+            for coleccion, nombre in INDICES_REEMPLAZADOS:
+                try:
+                    db[coleccion].drop_index(nombre)
+                    self.stdout.write(f'   🗑️  {coleccion}.{nombre} eliminado')
+                except OperationFailure:
+                    self.stdout.write(f'   ✓ {coleccion}.{nombre} no existe')
+
+            for coleccion in COLECCIONES_TOKEN_LEGADO:
+                db[coleccion].create_index(
+                    [('token', ASCENDING)],
+                    name='token_legado_1',
+                    partialFilterExpression={'token': {'$exists': True}}
+                )
+                self.stdout.write(f'   ✓ {coleccion}.token_legado_1')
+        finally:
+            client.close()
+
+        self.stdout.write(self.style.SUCCESS('✅ Índices de autenticación migrados'))
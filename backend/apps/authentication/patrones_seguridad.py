@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Matchers precompilados para el middleware de seguridad
+
+- PatronesLiterales: todas las firmas en una sola expresión regular
+  compilada al iniciar (una pasada sobre el texto por request)
+- TriePrefijos: rutas por segmentos para verificar prefijos en O(segmentos)
+"""
+
+import re
+from typing import Iterable, Optional
+
+
+class PatronesLiterales:
+    """Búsqueda de subcadenas literales (sin distinguir mayúsculas) en una pasada"""
+
+    def __init__(self, patrones: Iterable[str]):
+        # Sin duplicados y las más largas primero: la alternancia reporta la firma más específica
+        self.patrones = sorted({p.lower() for p in patrones if p}, key=lambda p: (-len(p), p))
+        self._regex = (
+            re.compile('|'.join(re.escape(p) for p in self.patrones))
+            if self.patrones else None
+        )
+
+    def buscar(self, texto: str) -> Optional[str]:
+        """Primera firma encontrada en el texto, o None"""
+        if self._regex is None or not texto:
+            return None
+        coincidencia = self._regex.search(texto.lower())
+        return coincidencia.group(0) if coincidencia else None
+
+    def __contains__(self, texto: str) -> bool:
+        return self.buscar(texto) is not None
+
+    def __len__(self):
+        return len(self.patrones)
+
+
+class TriePrefijos:
+    """Trie de rutas por segmento: '/api/auth/' cubre '/api/auth' y todo lo que cuelga de ella"""
+
+    _FIN = object()
+
+    def __init__(self, rutas: Iterable[str]):
+        self._raiz = {}
+        for ruta in rutas:
+            nodo = self._raiz
+            for segmento in self._segmentos(ruta):
+                nodo = nodo.setdefault(segmento, {})
+            nodo[self._FIN] = ruta
+
+    @staticmethod
+    def _segmentos(ruta: str):
+        return [segmento for segmento in ruta.split('/') if segmento]
+
+    def prefijo(self, ruta: str) -> Optional[str]:
+        """Ruta configurada que es prefijo de `ruta`, o None"""
+        nodo = self._raiz
+        if self._FIN in nodo:
+            return nodo[self._FIN]
+        for segmento in self._segmentos(ruta):
+            nodo = nodo.get(segmento)
+            if nodo is None:
+                return None
+            if self._FIN in nodo:
+                return nodo[self._FIN]
+        return None
+
+    def __contains__(self, ruta: str) -> bool:
+        return self.prefijo(ruta) is not None
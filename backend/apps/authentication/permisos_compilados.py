@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Perfiles de permisos compilados
+
+Cada documento de perfiles_permisos se compila una vez por versión (huella
+de su contenido) en un objeto inmutable con frozensets de permisos y módulos
+y un bitset de permisos. Las verificaciones quedan en O(1) y la de varios
+permisos a la vez en una operación de bits.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Dict, Iterable, Tuple
+
+COMODIN = '*'
+
+# Registro de bits por permiso (por proceso; crece a medida que aparecen permisos)
+_bits_permisos: Dict[str, int] = {}
+_bits_lock = threading.Lock()
+
+# Perfiles compilados por (perfil_id, version)
+_compilados: Dict[Tuple[str, str], 'PerfilCompilado'] = {}
+
+
+def bit_permiso(permiso: str) -> int:
+    bit = _bits_permisos.get(permiso)
+    if bit is None:
+        with _bits_lock:
+            bit = _bits_permisos.setdefault(permiso, 1 << len(_bits_permisos))
+    return bit
+
+
+def mascara_permisos(permisos: Iterable[str]) -> int:
+    """Bitset de un conjunto de permisos (precalcular en la vista, fuera del ciclo)"""
+    mascara = 0
+    for permiso in permisos:
+        mascara |= bit_permiso(permiso)
+    return mascara
+
+
+def version_perfil(perfil: Dict) -> str:
+    """Huella del contenido que afecta permisos: cambia cuando el perfil cambia"""
+    contenido = json.dumps([
+        sorted(perfil.get('permisos', [])),
+        sorted(perfil.get('modulos', [])),
+        perfil.get('nivel_acceso', 0),
+    ])
+    return hashlib.sha1(contenido.encode()).hexdigest()[:12]
+
+
+class PerfilCompilado:
+    """Permisos y módulos efectivos de un perfil (inmutable)"""
+
+    __slots__ = ('perfil_id', 'version', 'permisos', 'modulos', 'nivel_acceso',
+                 'todos_permisos', 'todos_modulos', 'bits')
+
+    def __init__(self, perfil: Dict, version: str):
+        permisos = frozenset(perfil.get('permisos', []))
+        modulos = frozenset(perfil.get('modulos', []))
+        asignar = object.__setattr__
+        asignar(self, 'perfil_id', perfil['_id'])
+        asignar(self, 'version', version)
+        asignar(self, 'permisos', permisos)
+        asignar(self, 'modulos', modulos)
+        asignar(self, 'nivel_acceso', perfil.get('nivel_acceso', 0))
+        asignar(self, 'todos_permisos', COMODIN in permisos)
+        asignar(self, 'todos_modulos', COMODIN in modulos)
+        asignar(self, 'bits', mascara_permisos(permisos - {COMODIN}))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('PerfilCompilado es inmutable')
+
+    def tiene_permiso(self, permiso: str) -> bool:
+        return self.todos_permisos or permiso in self.permisos
+
+    def tiene_modulo(self, modulo: str) -> bool:
+        return self.todos_modulos or modulo in self.modulos
+
+    def tiene_todos(self, mascara: int) -> bool:
+        """Todos los permisos de la máscara (ver mascara_permisos)"""
+        return self.todos_permisos or self.bits & mascara == mascara
+
+    def tiene_alguno(self, mascara: int) -> bool:
+        return self.todos_permisos or bool(self.bits & mascara)
+
+    def __repr__(self):
+        return f"<PerfilCompilado {self.perfil_id}@{self.version}>"
+
+
+def compilar_perfil(perfil: Dict) -> PerfilCompilado:
+    """Compila (o reutiliza) el perfil para su versión actual"""
+    clave = (perfil['_id'], version_perfil(perfil))
+    compilado = _compilados.get(clave)
+    if compilado is None:
+        compilado = PerfilCompilado(perfil, clave[1])
+        with _bits_lock:
+            # Solo se conserva la versión vigente de cada perfil
+            for anterior in [c for c in _compilados if c[0] == clave[0]]:
+                _compilados.pop(anterior, None)
+            _compilados[clave] = compilado
+    return compilado
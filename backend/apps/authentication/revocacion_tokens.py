@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Revocación de JWT para el modo de verificación sin estado
+
+Con NEURAUDIT_SETTINGS['AUTH_JWT_SIN_ESTADO'] el token se acepta por firma y
+`exp` sin consultar `sesiones`. La revocación se verifica en memoria:
+- jti revocados en un filtro de Bloom (un positivo se confirma en MongoDB)
+- cortes por usuario (cerrar todas las sesiones, cambio de contraseña):
+  se rechazan los tokens emitidos antes del corte. `iat` y el corte se
+  comparan con resolución de microsegundos (marca_tiempo)
+
+Ambos se sincronizan de la colección tokens_revocados cada pocos segundos
+(AUTH_REVOCACIONES_SYNC_SEGUNDOS), así una invalidación toma efecto en todos
+los workers dentro de ese intervalo. Las revocaciones se registran siempre,
+esté o no activo el modo sin estado.
+"""
+
+import calendar
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+COLECCION_REVOCACIONES = 'tokens_revocados'
+
+
+def _configuracion(clave: str, defecto):
+    return getattr(settings, 'NEURAUDIT_SETTINGS', {}).get(clave, defecto)
+
+
+def modo_sin_estado() -> bool:
+    return bool(_configuracion('AUTH_JWT_SIN_ESTADO', False))
+
+
+def marca_tiempo(fecha: datetime) -> float:
+    """Segundos desde epoch (UTC) con microsegundos; se usa para `iat` y los cortes"""
+    return calendar.timegm(fecha.utctimetuple()) + fecha.microsecond / 1e6
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre un bytearray con doble hashing (SHA-256)"""
+
+    def __init__(self, capacidad: int, tasa_falsos_positivos: float = 0.001):
+        capacidad = max(capacidad, 1)
+        self.capacidad = capacidad
+        self.bits = max(64, int(-capacidad * math.log(tasa_falsos_positivos) / (math.log(2) ** 2)))
+        self.funciones = max(1, round(self.bits / capacidad * math.log(2)))
+        self._arreglo = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, valor: str):
+        resumen = hashlib.sha256(valor.encode()).digest()
+        h1 = int.from_bytes(resumen[:8], 'big')
+        h2 = int.from_bytes(resumen[8:16], 'big') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.funciones))
+
+    def agregar(self, valor: str):
+        nuevo = False
+        for posicion in self._posiciones(valor):
+            byte, bit = posicion >> 3, 1 << (posicion & 7)
+            if not self._arreglo[byte] & bit:
+                self._arreglo[byte] |= bit
+                nuevo = True
+        if nuevo:
+            self.elementos += 1
+
+    def __contains__(self, valor: str) -> bool:
+        return all(self._arreglo[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+    @property
+    def saturado(self) -> bool:
+        return self.elementos > self.capacidad
+
+
+class RevocacionesJWT:
+    """Registro de revocaciones en MongoDB + réplica en memoria por proceso"""
+
+    CAPACIDAD_INICIAL = 10000
+    # Reconstrucción completa periódica: descarta jti ya expirados del filtro
+    RECONSTRUIR_CADA_SEGUNDOS = 600
+    # Solape al leer incrementalmente (escrituras concurrentes con la misma marca de tiempo)
+    SOLAPE = timedelta(seconds=1)
+
+    def __init__(self, db):
+        self.coleccion = db[COLECCION_REVOCACIONES]
+        self.intervalo = float(_configuracion('AUTH_REVOCACIONES_SYNC_SEGUNDOS', 5))
+        self._lock = threading.Lock()
+        self._filtro = FiltroBloom(self.CAPACIDAD_INICIAL)
+        self._cortes: Dict[str, float] = {}
+        self._ultima_revocacion: Optional[datetime] = None
+        self._sincronizado_en = 0.0
+        self._reconstruido_en = 0.0
+        self._indices_creados = False
+
+    def _asegurar_indices(self):
+        if self._indices_creados:
+            return
+        self.coleccion.create_index([("fecha_revocacion", ASCENDING)])
+        self.coleccion.create_index([("jti", ASCENDING)], sparse=True)
+        self.coleccion.create_index("fecha_expiracion", expireAfterSeconds=0)
+        self._indices_creados = True
+
+    # =======================================
+    # REGISTRO
+    # =======================================
+
+    def revocar_jti(self, jti: str, usuario_id, expira: datetime, razon: str = ""):
+        """Revoca un token puntual hasta su expiración"""
+        self._asegurar_indices()
+        ahora = datetime.utcnow()
+        self.coleccion.insert_one({
+            "tipo": "JTI",
+            "jti": jti,
+            "usuario_id": str(usuario_id),
+            "razon": razon,
+            "fecha_revocacion": ahora,
+            "fecha_expiracion": max(expira, ahora)
+        })
+        with self._lock:
+            self._filtro.agregar(jti)
+
+    def revocar_jtis(self, tokens: Iterable[Tuple[str, datetime]], usuario_id, razon: str = ""):
+        """Revoca en lote tokens puntuales: pares (jti, expiración)"""
+        self._asegurar_indices()
+        ahora = datetime.utcnow()
+        documentos = [{
+            "tipo": "JTI",
+            "jti": jti,
+            "usuario_id": str(usuario_id),
+            "razon": razon,
+            "fecha_revocacion": ahora,
+            "fecha_expiracion": max(expira, ahora)
+        } for jti, expira in tokens]
+        if not documentos:
+            return
+        self.coleccion.insert_many(documentos, ordered=False)
+        with self._lock:
+            for documento in documentos:
+                self._filtro.agregar(documento["jti"])
+
+    def revocar_usuario(self, usuario_id, vigencia_maxima: timedelta, razon: str = ""):
+        """Revoca todos los tokens del usuario emitidos hasta ahora"""
+        self._asegurar_indices()
+        ahora = datetime.utcnow()
+        corte = marca_tiempo(ahora)
+        self.coleccion.insert_one({
+            "tipo": "USUARIO",
+            "usuario_id": str(usuario_id),
+            "razon": razon,
+            # MongoDB guarda las fechas en milisegundos: el corte exacto va aparte
+            "corte": corte,
+            "fecha_revocacion": ahora,
+            "fecha_expiracion": ahora + vigencia_maxima
+        })
+        with self._lock:
+            self._registrar_corte(str(usuario_id), corte)
+
+    def _registrar_corte(self, usuario_id: str, corte: float):
+        self._cortes[usuario_id] = max(corte, self._cortes.get(usuario_id, 0))
+
+    # =======================================
+    # VERIFICACIÓN
+    # =======================================
+
+    def esta_revocado(self, payload: Dict) -> bool:
+        self.sincronizar()
+
+        corte = self._cortes.get(str(payload.get("user_id")))
+        if corte is not None and float(payload.get("iat", 0)) < corte:
+            return True
+
+        jti = payload.get("jti")
+        if not jti or jti not in self._filtro:
+            return False
+        # Posible falso positivo del filtro: confirmar
+        return self.coleccion.find_one({"tipo": "JTI", "jti": jti}, {"_id": 1}) is not None
+
+    def sincronizar(self, forzar: bool = False):
+        """Lee revocaciones nuevas (o reconstruye todo) si venció el intervalo"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._sincronizado_en < self.intervalo:
+            return
+        if not self._lock.acquire(blocking=forzar):
+            return  # Otro hilo está sincronizando
+        try:
+            reconstruir = (
+                forzar or self._ultima_revocacion is None or self._filtro.saturado
+                or ahora - self._reconstruido_en > self.RECONSTRUIR_CADA_SEGUNDOS
+            )
+            if reconstruir:
+                self._reconstruir()
+                self._reconstruido_en = ahora
+            else:
+                self._leer_desde(self._ultima_revocacion - self.SOLAPE, self._filtro, self._cortes)
+            self._sincronizado_en = ahora
+        except Exception as e:
+            logger.error(f"Error sincronizando revocaciones de tokens: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def _reconstruir(self):
+        revocados = self.coleccion.count_documents({"tipo": "JTI"})
+        filtro = FiltroBloom(max(self.CAPACIDAD_INICIAL, revocados * 2))
+        cortes: Dict[str, float] = {}
+        self._ultima_revocacion = None
+        self._leer_desde(None, filtro, cortes)
+        self._filtro = filtro
+        self._cortes = cortes
+
+    def _leer_desde(self, desde: Optional[datetime], filtro: FiltroBloom, cortes: Dict[str, float]):
+        consulta = {"fecha_expiracion": {"$gt": datetime.utcnow()}}
+        if desde is not None:
+            consulta["fecha_revocacion"] = {"$gte": desde}
+        proyeccion = {"tipo": 1, "jti": 1, "usuario_id": 1, "corte": 1, "fecha_revocacion": 1, "_id": 0}
+
+        for doc in self.coleccion.find(consulta, proyeccion).sort("fecha_revocacion", ASCENDING):
+            if doc["tipo"] == "JTI":
+                filtro.agregar(doc["jti"])
+            else:
+                corte = doc.get("corte") or marca_tiempo(doc["fecha_revocacion"])
+                cortes[doc["usuario_id"]] = max(corte, cortes.get(doc["usuario_id"], 0))
+            self._ultima_revocacion = doc["fecha_revocacion"]
+
+        if self._ultima_revocacion is None:
+            self._ultima_revocacion = datetime.utcnow()
+
+
+_revocaciones = None
+_revocaciones_lock = threading.Lock()
+
+
+def get_revocaciones(db) -> RevocacionesJWT:
+    """Registro de revocaciones compartido por el proceso"""
+    global _revocaciones
+    if _revocaciones is None:
+        with _revocaciones_lock:
+            if _revocaciones is None:
+                _revocaciones = RevocacionesJWT(db)
+    return _revocaciones
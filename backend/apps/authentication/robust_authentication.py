@@ -6,13 +6,13 @@ Integración completa con AuthenticationServiceNoSQL
 
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
-from django.core.cache import cache
 from datetime import datetime, timedelta
 import logging
 import hashlib
 import json
 
-from .services_auth_nosql import AuthenticationServiceNoSQL
+from .services_auth_nosql import get_auth_service
+from .contadores import get_contadores
 from .robust_user import RobustNeurAuditUser
 
 logger = logging.getLogger(__name__)
@@ -32,7 +32,8 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
     """
     
     def __init__(self):
-        self.auth_service = AuthenticationServiceNoSQL()
+        self.auth_service = get_auth_service()
+        self.contadores = get_contadores()
         
         # Configuración de seguridad
         self.RATE_LIMIT_REQUESTS = 100  # Requests por ventana
@@ -58,8 +59,8 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
                 self._log_security_event('RATE_LIMIT_EXCEEDED', request_context)
                 raise AuthenticationFailed('Rate limit excedido')
             
-            # 4. Validar token con servicio NoSQL
-            es_valido, payload = self.auth_service.validar_token(token)
+            # 4. Validar token con servicio NoSQL (sesión en caché de corta duración)
+            es_valido, payload, sesion = self.auth_service.validar_token_con_sesion(token)
             
             if not es_valido or not payload:
                 self._handle_invalid_token(token, request_context)
@@ -74,7 +75,8 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
             user = RobustNeurAuditUser(
                 self.auth_service, 
                 payload, 
-                request_context
+                request_context,
+                sesion=sesion
             )
             
             if not user.is_authenticated:
@@ -150,24 +152,19 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
         """Rate limiting robusto por IP y usuario"""
         ip_address = context['ip_address']
         
-        # Rate limit por IP
+        # Rate limit por IP (ventana deslizante, atómico y compartido entre workers)
         ip_key = f"rate_limit:ip:{ip_address}"
-        ip_requests = cache.get(ip_key, 0)
-        
-        if ip_requests >= self.RATE_LIMIT_REQUESTS:
+        if not self.contadores.permitir(ip_key, self.RATE_LIMIT_REQUESTS, self.RATE_LIMIT_WINDOW):
             # Bloquear IP temporalmente
             self._block_ip_temporarily(ip_address, context)
             return False
         
-        # Incrementar contador
-        cache.set(ip_key, ip_requests + 1, self.RATE_LIMIT_WINDOW)
-        
         return True
     
     def _block_ip_temporarily(self, ip_address, context):
         """Bloquea IP temporalmente por rate limiting"""
         block_key = f"blocked_ip:{ip_address}"
-        cache.set(block_key, True, 3600)  # 1 hora
+        self.contadores.marcar(block_key, 3600)  # 1 hora
         
         # Registrar en audit trail
         self._log_security_event('IP_BLOCKED_RATE_LIMIT', context, 
@@ -178,7 +175,7 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
         try:
             # Verificar que el token no esté en blacklist
             token_hash = hashlib.sha256(token.encode()).hexdigest()
-            if cache.get(f"blacklist_token:{token_hash}"):
+            if self.contadores.obtener(f"blacklist_token:{token_hash}"):
                 return False
             
             # Verificar campos requeridos
@@ -191,14 +188,12 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
             jti = payload.get('jti', '')
             jti_key = f"token_jti:{jti}"
             
-            if cache.get(jti_key):
-                # Posible replay attack
-                return False
-            
-            # Marcar JTI como usado (hasta expiración)
+            # Marcar JTI como usado (hasta expiración); falla si ya estaba marcado
             exp_timestamp = payload.get('exp', 0)
             ttl = max(0, exp_timestamp - datetime.utcnow().timestamp())
-            cache.set(jti_key, True, int(ttl))
+            if not self.contadores.marcar(jti_key, int(ttl), solo_si_no_existe=True):
+                # Posible replay attack
+                return False
             
             return True
             
@@ -214,8 +209,7 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
         # Incrementar contador de intentos fallidos por IP
         ip_address = context['ip_address']
         failed_key = f"failed_attempts:ip:{ip_address}"
-        failed_count = cache.get(failed_key, 0) + 1
-        cache.set(failed_key, failed_count, 3600)  # 1 hora
+        failed_count = self.contadores.incrementar(failed_key, 3600)  # 1 hora
         
         if failed_count >= self.MAX_FAILED_ATTEMPTS:
             self._block_ip_temporarily(ip_address, context)
@@ -233,14 +227,9 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
             
             # 1. Múltiples IPs en poco tiempo
             ip_key = f"user_ips:{user.id}"
-            user_ips = cache.get(ip_key, set())
-            current_ip = context['ip_address']
-            
-            if isinstance(user_ips, set):
-                user_ips.add(current_ip)
-                if len(user_ips) > 3:  # Más de 3 IPs en ventana de tiempo
-                    anomalies.append('MULTIPLE_IPS')
-                cache.set(ip_key, user_ips, 1800)  # 30 minutos
+            total_ips = self.contadores.agregar_miembro(ip_key, context['ip_address'], 1800)  # 30 minutos
+            if total_ips > 3:  # Más de 3 IPs en ventana de tiempo
+                anomalies.append('MULTIPLE_IPS')
             
             # 2. Actividad fuera de horario normal (configurable)
             current_hour = datetime.utcnow().hour
@@ -249,8 +238,7 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
             
             # 3. Múltiples requests en muy poco tiempo
             burst_key = f"request_burst:{user.id}"
-            burst_count = cache.get(burst_key, 0) + 1
-            cache.set(burst_key, burst_count, 60)  # 1 minuto
+            burst_count = self.contadores.ventana_deslizante(burst_key, 60)  # 1 minuto
             
             if burst_count > 50:  # Más de 50 requests por minuto
                 anomalies.append('REQUEST_BURST')
@@ -271,15 +259,15 @@ class RobustNeurAuditAuthentication(BaseAuthentication):
             
             # Por usuario
             user_metric_key = f"metrics:user:{user.id}:{date_key}"
-            cache.set(user_metric_key, cache.get(user_metric_key, 0) + 1, 86400)
+            self.contadores.incrementar(user_metric_key, 86400)
             
             # Por IP
             ip_metric_key = f"metrics:ip:{context['ip_address']}:{date_key}"
-            cache.set(ip_metric_key, cache.get(ip_metric_key, 0) + 1, 86400)
+            self.contadores.incrementar(ip_metric_key, 86400)
             
             # Por perfil
             profile_metric_key = f"metrics:profile:{user.perfil}:{date_key}"
-            cache.set(profile_metric_key, cache.get(profile_metric_key, 0) + 1, 86400)
+            self.contadores.incrementar(profile_metric_key, 86400)
             
         except Exception as e:
             logger.error(f"Error actualizando métricas de seguridad: {str(e)}")
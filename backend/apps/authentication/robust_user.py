@@ -7,6 +7,9 @@ from bson import ObjectId
 from datetime import datetime, timedelta
 import logging
 
+from .cache_sesiones import cache_autenticacion
+from .permisos_compilados import mascara_permisos
+
 logger = logging.getLogger(__name__)
 
 class RobustNeurAuditUser:
@@ -15,16 +18,18 @@ class RobustNeurAuditUser:
     Implementa verificaciones de seguridad completas
     """
     
-    def __init__(self, auth_service, token_payload, request_context=None):
+    def __init__(self, auth_service, token_payload, request_context=None, sesion=None):
         self.auth_service = auth_service
         self._token_payload = token_payload
         self._request_context = request_context or {}
+        self._sesion = sesion
         
         # Datos base del token
         self.id = token_payload.get('user_id')
         self.username = token_payload.get('username', '')
         self._last_sync = None
         self._cached_user_data = None
+        self._perfil_compilado = None
         
         # Estado de autenticación
         self.is_authenticated = True
@@ -38,10 +43,11 @@ class RobustNeurAuditUser:
             if not self.id:
                 raise ValueError("Usuario sin ID válido")
             
-            # Obtener datos actualizados de MongoDB
-            usuario_actual = self.auth_service.usuarios.find_one({
-                "_id": ObjectId(self.id)
-            })
+            # Obtener datos del usuario (caché de corta duración, invalidada al actualizarlo)
+            usuario_actual = cache_autenticacion.obtener_usuario(self.id)
+            desde_cache = usuario_actual is not None
+            if not desde_cache:
+                usuario_actual = self.auth_service.obtener_usuario(self.id)
             
             if not usuario_actual:
                 logger.warning(f"Usuario {self.username} no encontrado en MongoDB")
@@ -62,13 +68,14 @@ class RobustNeurAuditUser:
                 self.is_authenticated = False
                 return False
             
-            # Verificar sesión activa
-            token_actual = self._token_payload.get('jti', '')
-            sesion_activa = self.auth_service.sesiones.find_one({
-                "usuario_id": ObjectId(self.id),
-                "activa": True,
-                "fecha_expiracion": {"$gt": datetime.utcnow()}
-            })
+            # Verificar sesión activa (ya validada por token en la autenticación)
+            sesion_activa = self._sesion
+            if not sesion_activa:
+                sesion_activa = self.auth_service.sesiones.find_one({
+                    "usuario_id": ObjectId(self.id),
+                    "activa": True,
+                    "fecha_expiracion": {"$gt": datetime.utcnow()}
+                })
             
             if not sesion_activa:
                 logger.warning(f"Sesión inválida para usuario {self.username}")
@@ -107,11 +114,12 @@ class RobustNeurAuditUser:
             self.is_superuser = self.perfil == 'SUPERADMIN'
             self.is_active = estado == 'ACTIVO'
             
-            # Actualizar último acceso
-            self.auth_service.usuarios.update_one(
-                {"_id": ObjectId(self.id)},
-                {"$set": {"metadata.ultimo_acceso": datetime.utcnow()}}
-            )
+            # Actualizar último acceso (una vez por vigencia de la caché)
+            if not desde_cache:
+                self.auth_service.usuarios.update_one(
+                    {"_id": ObjectId(self.id)},
+                    {"$set": {"metadata.ultimo_acceso": datetime.utcnow()}}
+                )
             
             return True
             
@@ -120,55 +128,58 @@ class RobustNeurAuditUser:
             self.is_authenticated = False
             return False
     
-    def get_permissions(self):
-        """Obtiene permisos actualizados desde MongoDB"""
-        try:
+    def get_compiled_profile(self):
+        """Perfil compilado (frozensets + bitset); se conserva durante el request"""
+        if self._perfil_compilado is None:
             if not self._cached_user_data:
                 self._sync_with_database()
             
             if not self._cached_user_data:
-                return []
-            
-            # Obtener permisos del perfil
-            perfil_id = self._cached_user_data.get('perfil')
-            perfil = self.auth_service.perfiles_permisos.find_one({"_id": perfil_id})
+                return None
             
-            return perfil.get('permisos', []) if perfil else []
+            self._perfil_compilado = self.auth_service.obtener_perfil_compilado(
+                self._cached_user_data.get('perfil')
+            )
+        return self._perfil_compilado
+    
+    def get_permissions(self):
+        """Obtiene permisos actualizados desde MongoDB"""
+        try:
+            perfil = self.get_compiled_profile()
+            return sorted(perfil.permisos) if perfil else []
             
         except Exception as e:
             logger.error(f"Error obteniendo permisos para {self.username}: {str(e)}")
             return []
     
     def has_perm(self, permiso):
-        """Verifica permisos en tiempo real contra MongoDB"""
+        """Verifica permisos contra el perfil compilado (O(1))"""
         try:
-            permisos = self.get_permissions()
-            
             # Superadmin tiene todos los permisos
             if self.is_superuser:
                 return True
-                
+            
+            perfil = self.get_compiled_profile()
+            
             # Verificar permiso específico o comodín
-            return permiso in permisos or '*' in permisos
+            return bool(perfil) and perfil.tiene_permiso(permiso)
             
         except Exception as e:
             logger.error(f"Error verificando permiso {permiso} para {self.username}: {str(e)}")
             return False
     
+    def has_perms(self, perm_list, obj=None):
+        """Todos los permisos de la lista (firma de Django), con una operación de bits"""
+        if getattr(self, 'is_superuser', False):
+            return True
+        perfil = self.get_compiled_profile()
+        return bool(perfil) and perfil.tiene_todos(mascara_permisos(perm_list))
+    
     def has_module_access(self, modulo):
         """Verifica acceso a módulos específicos"""
         try:
-            if not self._cached_user_data:
-                self._sync_with_database()
-            
-            perfil_id = self._cached_user_data.get('perfil')
-            perfil = self.auth_service.perfiles_permisos.find_one({"_id": perfil_id})
-            
-            if not perfil:
-                return False
-            
-            modulos_permitidos = perfil.get('modulos', [])
-            return modulo in modulos_permitidos or '*' in modulos_permitidos
+            perfil = self.get_compiled_profile()
+            return bool(perfil) and perfil.tiene_modulo(modulo)
             
         except Exception as e:
             logger.error(f"Error verificando acceso al módulo {modulo}: {str(e)}")
@@ -193,6 +204,7 @@ class RobustNeurAuditUser:
                     }
                 }
             )
+            cache_autenticacion.invalidar_sesiones_usuario(self.id)
             
             # Registrar en audit trail
             self.auth_service._registrar_log_auditoria(
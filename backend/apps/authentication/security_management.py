@@ -13,6 +13,9 @@ from datetime import datetime, timedelta
 import json
 
 from .services_auth_nosql import AuthenticationServiceNoSQL
+from .contadores import get_contadores
+from .sumidero_auditoria import get_sumidero_auditoria
+from .hashing_passwords import get_ejecutor_hashing
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -37,10 +40,12 @@ def security_dashboard_view(request):
         ahora = datetime.utcnow()
         hace_24h = ahora.strftime("%Y-%m-%d")
         
+        contadores = get_contadores()
+        
         # Rate limiting stats
         rate_limit_stats = {
-            'ips_bloqueadas': len([k for k in cache._cache.keys() if k.startswith('blocked_ip:')]),
-            'rate_limits_activos': len([k for k in cache._cache.keys() if k.startswith('rate_limit:')]),
+            'ips_bloqueadas': len(contadores.claves('blocked_ip:')),
+            'rate_limits_activos': len(contadores.claves('rate_limit:')),
         }
         
         # Amenazas de seguridad recientes
@@ -54,21 +59,19 @@ def security_dashboard_view(request):
         
         # Top IPs con más actividad
         ip_metrics = {}
-        for key in cache._cache.keys():
-            if key.startswith(f'metrics:ip:') and hace_24h in key:
-                ip = key.split(':')[2]
-                count = cache.get(key, 0)
-                ip_metrics[ip] = count
+        for key in contadores.claves('metrics:ip:'):
+            if key.endswith(f':{hace_24h}'):
+                ip = key[len('metrics:ip:'):-len(hace_24h) - 1]
+                ip_metrics[ip] = contadores.valor(key)
         
         top_ips = sorted(ip_metrics.items(), key=lambda x: x[1], reverse=True)[:10]
         
         # Usuarios más activos
         user_metrics = {}
-        for key in cache._cache.keys():
-            if key.startswith(f'metrics:user:') and hace_24h in key:
+        for key in contadores.claves('metrics:user:'):
+            if key.endswith(f':{hace_24h}'):
                 user_id = key.split(':')[2]
-                count = cache.get(key, 0)
-                user_metrics[user_id] = count
+                user_metrics[user_id] = contadores.valor(key)
         
         top_users = sorted(user_metrics.items(), key=lambda x: x[1], reverse=True)[:10]
         
@@ -76,6 +79,8 @@ def security_dashboard_view(request):
             'timestamp': ahora.isoformat(),
             'estadisticas_generales': stats,
             'rate_limiting': rate_limit_stats,
+            'auditoria_requests': get_sumidero_auditoria().estado(),
+            'hashing_passwords': get_ejecutor_hashing().estado(),
             'amenazas_recientes': recent_threats,
             'top_ips_activas': [{'ip': ip, 'requests': count} for ip, count in top_ips],
             'usuarios_activos': [{'user_id': uid, 'requests': count} for uid, count in top_users],
@@ -112,12 +117,12 @@ def block_ip_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Bloquear IP
-        cache.set(f"blocked_ip:{ip_address}", {
+        get_contadores().marcar(f"blocked_ip:{ip_address}", duration_hours * 3600, {
             'timestamp': datetime.utcnow().isoformat(),
             'reason': reason,
             'blocked_by': request.user.username,
             'manual_block': True
-        }, duration_hours * 3600)
+        })
         
         # Registrar evento
         auth_service = AuthenticationServiceNoSQL()
@@ -161,7 +166,7 @@ def unblock_ip_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Desbloquear IP
-        cache.delete(f"blocked_ip:{ip_address}")
+        get_contadores().eliminar(f"blocked_ip:{ip_address}")
         
         # Registrar evento
         auth_service = AuthenticationServiceNoSQL()
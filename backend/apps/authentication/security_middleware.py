@@ -5,14 +5,17 @@ Implementa capas adicionales de protección y audit trail
 """
 
 import time
-import hashlib
-import json
 import logging
 from datetime import datetime
+from django.conf import settings
 from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from .contadores import get_contadores
+from .sumidero_auditoria import get_sumidero_auditoria, limitar_parametros, limitar_texto
+from .patrones_seguridad import PatronesLiterales, TriePrefijos
+
 logger = logging.getLogger(__name__)
 
 class NeurAuditSecurityMiddleware(MiddlewareMixin):
@@ -29,6 +32,8 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.contadores = get_contadores()
+        self.sumidero_auditoria = get_sumidero_auditoria()
         
         # Patrones sospechosos
         self.suspicious_patterns = [
@@ -60,6 +65,22 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
             '/api/contratacion/'
         ]
         
+        # User-Agents a registrar y bots conocidos permitidos
+        self.suspicious_agents = ['bot', 'crawler', 'scanner', 'curl', 'wget']
+        self.allowed_agents = ['googlebot', 'bingbot']
+        
+        # Firmas adicionales desde settings.NEURAUDIT_SETTINGS
+        config = getattr(settings, 'NEURAUDIT_SETTINGS', {})
+        self.suspicious_patterns += config.get('SEGURIDAD_PATRONES_SOSPECHOSOS', [])
+        self.critical_paths += config.get('SEGURIDAD_RUTAS_CRITICAS', [])
+        self.suspicious_agents += config.get('SEGURIDAD_AGENTES_SOSPECHOSOS', [])
+        
+        # Matchers compilados una sola vez: costo por request independiente del número de firmas
+        self.patterns_matcher = PatronesLiterales(self.suspicious_patterns)
+        self.agents_matcher = PatronesLiterales(self.suspicious_agents)
+        self.allowed_agents_matcher = PatronesLiterales(self.allowed_agents)
+        self.critical_paths_trie = TriePrefijos(self.critical_paths)
+        
     def __call__(self, request):
         # Registrar inicio del request
         start_time = time.time()
@@ -94,22 +115,21 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
                 return {'allowed': True}
             
             # 1. Verificar IP bloqueada
-            if cache.get(f"blocked_ip:{ip_address}"):
+            if self.contadores.obtener(f"blocked_ip:{ip_address}"):
                 return {
                     'allowed': False,
                     'code': 'IP_BLOCKED'
                 }
             
             # 2. Detectar patrones de ataque en URL
-            full_path = request.get_full_path().lower()
-            for pattern in self.suspicious_patterns:
-                if pattern in full_path:
-                    self.log_security_threat(request, 'SUSPICIOUS_URL', 
-                                           f'Patrón sospechoso en URL: {pattern}')
-                    return {
-                        'allowed': False,
-                        'code': 'SUSPICIOUS_PATTERN'
-                    }
+            pattern = self.patterns_matcher.buscar(request.get_full_path())
+            if pattern:
+                self.log_security_threat(request, 'SUSPICIOUS_URL', 
+                                       f'Patrón sospechoso en URL: {pattern}')
+                return {
+                    'allowed': False,
+                    'code': 'SUSPICIOUS_PATTERN'
+                }
             
             # 3. Verificar tamaño de request
             content_length = int(request.META.get('CONTENT_LENGTH', 0))
@@ -121,26 +141,21 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
             
             # 4. Verificar User-Agent sospechoso
             user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-            suspicious_agents = ['bot', 'crawler', 'scanner', 'curl', 'wget']
             
             # Permitir algunos bots conocidos pero registrar
-            if any(agent in user_agent for agent in suspicious_agents):
-                if not any(allowed in user_agent for allowed in ['googlebot', 'bingbot']):
+            if user_agent in self.agents_matcher:
+                if user_agent not in self.allowed_agents_matcher:
                     self.log_security_threat(request, 'SUSPICIOUS_USER_AGENT', 
                                            f'User-Agent: {user_agent}')
             
-            # 5. Rate limiting por IP más granular
+            # 5. Rate limiting por IP más granular (ventana deslizante de 1 minuto)
             minute_key = f"requests_per_minute:{ip_address}"
-            minute_count = cache.get(minute_key, 0)
-            
-            if minute_count > 60:  # Máximo 60 requests por minuto
+            if not self.contadores.permitir(minute_key, 60, 60):  # Máximo 60 requests por minuto
                 return {
                     'allowed': False,
                     'code': 'RATE_LIMIT_MINUTE'
                 }
             
-            cache.set(minute_key, minute_count + 1, 60)
-            
             return {'allowed': True}
             
         except Exception as e:
@@ -154,7 +169,7 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
             response_time = time.time() - start_time
             
             # Audit trail para rutas críticas
-            if any(path in request.path for path in self.critical_paths):
+            if request.path in self.critical_paths_trie:
                 self.log_request_audit(request, response, response_time)
             
             # Detectar respuestas anómalas
@@ -177,24 +192,27 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
     def log_request_audit(self, request, response, response_time):
         """Registra audit trail completo del request"""
         try:
+            # Tamaño desde el header: el cuerpo nunca se materializa (respuestas streaming)
+            content_length = response.get('Content-Length')
+            
             audit_data = {
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': datetime.utcnow(),
                 'ip_address': self.get_client_ip(request),
-                'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
+                'user_agent': limitar_texto(request.META.get('HTTP_USER_AGENT', '')),
                 'method': request.method,
-                'path': request.path,
-                'query_params': dict(request.GET),
+                'path': limitar_texto(request.path),
+                'query_params': limitar_parametros(request.GET),
                 'status_code': response.status_code,
                 'response_time': round(response_time, 3),
-                'content_length': len(response.content) if hasattr(response, 'content') else 0,
-                'referer': request.META.get('HTTP_REFERER', ''),
-                'user_id': getattr(request.user, 'id', None) if hasattr(request, 'user') else None,
-                'username': getattr(request.user, 'username', None) if hasattr(request, 'user') else None
+                'content_length': int(content_length) if content_length else None,
+                'streaming': getattr(response, 'streaming', False),
+                'referer': limitar_texto(request.META.get('HTTP_REFERER', '')),
+                'user_id': limitar_texto(getattr(request.user, 'id', None), 64) if hasattr(request, 'user') else None,
+                'username': limitar_texto(getattr(request.user, 'username', None), 150) if hasattr(request, 'user') else None
             }
             
-            # Registrar en cache para análisis posterior
-            audit_key = f"audit_trail:{datetime.utcnow().strftime('%Y%m%d%H%M')}:{hashlib.md5(json.dumps(audit_data).encode()).hexdigest()[:8]}"
-            cache.set(audit_key, audit_data, 86400)  # 24 horas
+            # Encolar para escritura por lotes en MongoDB (no bloquea el request)
+            self.sumidero_auditoria.registrar(audit_data)
             
             # Log estructurado
             logger.info(f"AUDIT: {request.method} {request.path} | "
@@ -233,8 +251,7 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
             
             # Incrementar contador de amenazas por IP
             threat_count_key = f"threat_count:{ip_address}"
-            threat_count = cache.get(threat_count_key, 0) + 1
-            cache.set(threat_count_key, threat_count, 3600)  # 1 hora
+            threat_count = self.contadores.incrementar(threat_count_key, 3600)  # 1 hora
             
             # Auto-bloqueo por múltiples amenazas
             if threat_count >= 5:
@@ -250,8 +267,7 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
             
             # Incrementar contador de intentos no autorizados
             unauth_key = f"unauthorized_attempts:{ip_address}"
-            unauth_count = cache.get(unauth_key, 0) + 1
-            cache.set(unauth_key, unauth_count, 3600)  # 1 hora
+            unauth_count = self.contadores.incrementar(unauth_key, 3600)  # 1 hora
             
             # Bloqueo temporal por múltiples intentos
             if unauth_count >= 10:
@@ -267,11 +283,11 @@ class NeurAuditSecurityMiddleware(MiddlewareMixin):
         """Bloqueo automático de IP por amenazas"""
         try:
             # Bloquear por 1 hora
-            cache.set(f"blocked_ip:{ip_address}", {
+            self.contadores.marcar(f"blocked_ip:{ip_address}", 3600, {
                 'timestamp': datetime.utcnow().isoformat(),
                 'reason': reason,
                 'auto_blocked': True
-            }, 3600)
+            })
             
             logger.error(f"IP AUTO-BLOQUEADA: {ip_address} | Razón: {reason}")
             
@@ -5,7 +5,7 @@ Sistema robusto de seguridad con MongoDB nativo según mejores prácticas
 
 ARQUITECTURA DE SEGURIDAD:
 - Autenticación multi-factor (credenciales + Google OAuth)
-- Passwords con bcrypt (factor de costo 12)
+- Passwords con bcrypt (factor de costo 12) en ejecutor acotado
 - Tokens JWT con refresh tokens
 - Rate limiting y bloqueo de cuentas
 - Auditoría completa de accesos
@@ -26,6 +26,15 @@ import logging
 from functools import wraps
 import time
 import re
+import threading
+
+from .cache_sesiones import cache_autenticacion, hash_token
+from .permisos_compilados import PerfilCompilado, compilar_perfil
+from .revocacion_tokens import get_revocaciones, marca_tiempo, modo_sin_estado
+from .hashing_passwords import (
+    HashingSaturado, coincide_con_historial, generar_hash, get_ejecutor_hashing,
+    necesita_rehash, rondas_configuradas, verificar_password
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +61,11 @@ class AuthenticationServiceNoSQL:
         self.MAX_LOGIN_ATTEMPTS = 5
         self.LOCKOUT_DURATION_MINUTES = 30
         self.PASSWORD_MIN_LENGTH = 8
-        self.BCRYPT_ROUNDS = 12
+        self.BCRYPT_ROUNDS = rondas_configuradas()
+        
+        # Modo sin estado: JWT verificado por firma/exp + revocaciones en memoria
+        self.JWT_SIN_ESTADO = modo_sin_estado()
+        self.revocaciones = get_revocaciones(self.db)
         
         # Inicializar índices
         self._init_indexes()
@@ -74,14 +87,36 @@ class AuthenticationServiceNoSQL:
             ("estado", ASCENDING)
         ])
         
-        # Índices para sesiones
-        self.sesiones.create_index([("token", ASCENDING)], unique=True)
-        self.sesiones.create_index([("usuario_id", ASCENDING), ("activa", ASCENDING)])
+        # Los índices reemplazados (token_1, usuario_id_1_activa_1, username_1_timestamp_-1)
+        # se eliminan una sola vez con: python manage.py migrar_indices_autenticacion
+        
+        # Índices para sesiones (solo se guarda el hash SHA-256 del token)
+        self.sesiones.create_index(
+            [("token_hash", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"token_hash": {"$exists": True}}
+        )
+        # obtener_sesiones_activas / cerrar_todas_sesiones
+        self.sesiones.create_index([
+            ("usuario_id", ASCENDING),
+            ("activa", ASCENDING),
+            ("fecha_expiracion", DESCENDING)
+        ])
         self.sesiones.create_index("fecha_expiracion", expireAfterSeconds=0)
         
-        # Índices para seguridad
+        # Índices para refresh tokens (renovar_token busca por hash; expiran solos)
+        self.tokens_refresh.create_index(
+            [("token_hash", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"token_hash": {"$exists": True}}
+        )
+        self.tokens_refresh.create_index([("usuario_id", ASCENDING), ("usado", ASCENDING)])
+        self.tokens_refresh.create_index("fecha_expiracion", expireAfterSeconds=0)
+        
+        # Índices para seguridad (_cuenta_bloqueada: username + exitoso + rango de timestamp)
         self.intentos_login.create_index([
             ("username", ASCENDING),
+            ("exitoso", ASCENDING),
             ("timestamp", DESCENDING)
         ])
         self.intentos_login.create_index("timestamp", expireAfterSeconds=86400)  # 24h
@@ -93,6 +128,20 @@ class AuthenticationServiceNoSQL:
         ])
         self.logs_auditoria.create_index("timestamp", expireAfterSeconds=2592000)  # 30 días
     
+    @staticmethod
+    def _filtro_token(token: str) -> Dict:
+        """
+        Filtro de sesión / refresh token por su hash SHA-256.
+        
+        Transición: los documentos creados antes del hash guardan el token
+        en claro en `token` y se siguen aceptando hasta que expiren por TTL
+        (sesiones: ACCESS_TOKEN_EXPIRE_MINUTES; refresh tokens:
+        REFRESH_TOKEN_EXPIRE_DAYS). Pasado ese plazo desde el despliegue se
+        pueden retirar este $or y el índice token_legado_1
+        (migrar_indices_autenticacion).
+        """
+        return {"$or": [{"token_hash": hash_token(token)}, {"token": token}]}
+    
     def _init_base_profiles(self):
         """Inicializa perfiles base del sistema"""
         perfiles_base = [
@@ -224,6 +273,8 @@ class AuthenticationServiceNoSQL:
                 {"$set": perfil},
                 upsert=True
             )
+        
+        cache_autenticacion.invalidar_perfil()
     
     # =====================================
     # REGISTRO Y CREACIÓN DE USUARIOS
@@ -290,7 +341,7 @@ class AuthenticationServiceNoSQL:
                     return False, "Razón social es requerida para usuarios PSS/PTS", None
             
             # 5. Hash de contraseña
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.BCRYPT_ROUNDS))
+            password_hash = generar_hash(password, self.BCRYPT_ROUNDS)
             
             # 6. Crear documento usuario
             usuario_doc = {
@@ -427,10 +478,14 @@ class AuthenticationServiceNoSQL:
                 return False, f"Cuenta {usuario['estado'].lower()}", None
             
             # 4. Verificar contraseña
-            if not bcrypt.checkpw(password.encode('utf-8'), usuario["password_hash"]):
+            if not verificar_password(password, usuario["password_hash"]):
                 self._registrar_intento_fallido(username, ip_address)
                 return False, "Credenciales inválidas", None
             
+            # Rehash transparente si cambió el factor de costo configurado
+            if necesita_rehash(usuario["password_hash"], self.BCRYPT_ROUNDS):
+                self._rehash_password(usuario["_id"], password, usuario["password_hash"])
+            
             # 5. Login exitoso - resetear intentos
             self.usuarios.update_one(
                 {"_id": usuario["_id"]},
@@ -459,6 +514,9 @@ class AuthenticationServiceNoSQL:
             
             return True, "Login exitoso", sesion
             
+        except HashingSaturado:
+            logger.warning(f"Login rechazado por saturación de hashing: {get_ejecutor_hashing().estado()}")
+            return False, "Servicio de autenticación ocupado, intente nuevamente", None
         except Exception as e:
             logger.error(f"Error en autenticación: {str(e)}")
             return False, "Error interno en autenticación", None
@@ -469,6 +527,24 @@ class AuthenticationServiceNoSQL:
         # Por ahora retornamos error
         return False, "Autenticación Google no implementada aún", None
     
+    def _rehash_password(self, usuario_id: ObjectId, password: str, hash_actual: bytes):
+        """Recalcula el hash con el costo actual en segundo plano (no retrasa el login)"""
+        def rehash():
+            nuevo_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.BCRYPT_ROUNDS))
+            # Solo si la contraseña no cambió mientras tanto
+            self.usuarios.update_one(
+                {"_id": usuario_id, "password_hash": hash_actual},
+                {"$set": {"password_hash": nuevo_hash}}
+            )
+        
+        try:
+            futuro = get_ejecutor_hashing().enviar(rehash)
+            futuro.add_done_callback(
+                lambda f: f.exception() and logger.error(f"Error en rehash de contraseña: {f.exception()}")
+            )
+        except HashingSaturado:
+            pass  # Se reintentará en el próximo login
+    
     def _cuenta_bloqueada(self, username: str) -> bool:
         """Verifica si la cuenta está bloqueada por intentos fallidos"""
         # Contar intentos en los últimos 30 minutos
@@ -477,7 +553,7 @@ class AuthenticationServiceNoSQL:
             "username": username,
             "exitoso": False,
             "timestamp": {"$gte": tiempo_limite}
-        })
+        }, limit=self.MAX_LOGIN_ATTEMPTS)
         
         return intentos >= self.MAX_LOGIN_ATTEMPTS
     
@@ -508,7 +584,7 @@ class AuthenticationServiceNoSQL:
             "token_type": "access",  # Requerido por Simple JWT
             "user_id": str(usuario["_id"]),
             "jti": secrets.token_hex(16),  # JWT ID único requerido por Simple JWT
-            "iat": ahora,
+            "iat": marca_tiempo(ahora),  # Con microsegundos: se compara con los cortes de revocación
             "exp": ahora + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES),
             # Campos personalizados
             "username": usuario["username"],
@@ -524,8 +600,9 @@ class AuthenticationServiceNoSQL:
         # Guardar sesión
         sesion_doc = {
             "usuario_id": usuario["_id"],
-            "token": access_token,
-            "refresh_token": refresh_token,
+            "token_hash": hash_token(access_token),
+            "jti": payload["jti"],  # Permite revocar este access token al cerrar la sesión
+            "refresh_token_hash": hash_token(refresh_token),
             "ip_address": ip_address,
             "user_agent": user_agent,
             "fecha_creacion": ahora,
@@ -539,7 +616,7 @@ class AuthenticationServiceNoSQL:
         
         # Guardar refresh token
         self.tokens_refresh.insert_one({
-            "token": refresh_token,
+            "token_hash": hash_token(refresh_token),
             "usuario_id": usuario["_id"],
             "fecha_creacion": ahora,
             "fecha_expiracion": ahora + timedelta(days=self.REFRESH_TOKEN_EXPIRE_DAYS),
@@ -577,7 +654,7 @@ class AuthenticationServiceNoSQL:
             "token_type": "access",
             "user_id": str(usuario["_id"]),
             "jti": secrets.token_hex(16),
-            "iat": ahora,
+            "iat": marca_tiempo(ahora),  # Con microsegundos: se compara con los cortes de revocación
             "exp": ahora + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES),
             # Campos personalizados
             "username": usuario["username"],
@@ -594,8 +671,9 @@ class AuthenticationServiceNoSQL:
         # Guardar sesión
         sesion_doc = {
             "usuario_id": usuario["_id"],
-            "token": access_token,
-            "refresh_token": refresh_token,
+            "token_hash": hash_token(access_token),
+            "jti": payload["jti"],  # Permite revocar este access token al cerrar la sesión
+            "refresh_token_hash": hash_token(refresh_token),
             "ip_address": ip_address,
             "user_agent": user_agent,
             "fecha_creacion": ahora,
@@ -610,7 +688,7 @@ class AuthenticationServiceNoSQL:
         
         # Guardar refresh token
         self.tokens_refresh.insert_one({
-            "token": refresh_token,
+            "token_hash": hash_token(refresh_token),
             "usuario_id": usuario["_id"],
             "fecha_creacion": ahora,
             "fecha_expiracion": ahora + timedelta(days=self.REFRESH_TOKEN_EXPIRE_DAYS),
@@ -660,25 +738,61 @@ class AuthenticationServiceNoSQL:
         Returns:
             (válido, payload)
         """
+        es_valido, payload, _ = self.validar_token_con_sesion(token)
+        return es_valido, payload
+    
+    def validar_token_con_sesion(self, token: str) -> Tuple[bool, Optional[Dict], Optional[Dict]]:
+        """
+        Valida token JWT y retorna también la sesión activa asociada
+        
+        Returns:
+            (válido, payload, sesion)
+        """
         try:
             payload = jwt.decode(token, self.JWT_SECRET, algorithms=[self.JWT_ALGORITHM])
             
+            if self.JWT_SIN_ESTADO:
+                # Sin consulta a sesiones: basta la firma, exp y no estar revocado
+                if self.revocaciones.esta_revocado(payload):
+                    return False, None, None
+                return True, payload, {
+                    "usuario_id": str(payload.get("user_id")),
+                    "ip_address": "",
+                    "fecha_expiracion": datetime.utcfromtimestamp(payload["exp"])
+                }
+            
             # Verificar si la sesión está activa
-            sesion = self.sesiones.find_one({
-                "token": token,
-                "activa": True,
-                "fecha_expiracion": {"$gt": datetime.utcnow()}
-            })
+            sesion = self.obtener_sesion_activa(token)
             
             if not sesion:
-                return False, None
+                return False, None, None
                 
-            return True, payload
+            return True, payload, sesion
             
         except jwt.ExpiredSignatureError:
-            return False, None
+            return False, None, None
         except jwt.InvalidTokenError:
-            return False, None
+            return False, None, None
+    
+    def obtener_sesion_activa(self, token: str) -> Optional[Dict]:
+        """Sesión activa del token (caché de corta duración)"""
+        sesion = cache_autenticacion.obtener_sesion(token)
+        if sesion and sesion["fecha_expiracion"] > datetime.utcnow():
+            return sesion
+        
+        sesion = self.sesiones.find_one(
+            {
+                **self._filtro_token(token),
+                "activa": True,
+                "fecha_expiracion": {"$gt": datetime.utcnow()}
+            },
+            {"usuario_id": 1, "ip_address": 1, "fecha_expiracion": 1}
+        )
+        if not sesion:
+            return None
+        
+        cache_autenticacion.guardar_sesion(token, sesion)
+        return cache_autenticacion.obtener_sesion(token) or sesion
     
     def renovar_token(self, refresh_token: str) -> Tuple[bool, str, Optional[Dict]]:
         """
@@ -690,7 +804,7 @@ class AuthenticationServiceNoSQL:
         try:
             # Buscar refresh token
             token_doc = self.tokens_refresh.find_one({
-                "token": refresh_token,
+                **self._filtro_token(refresh_token),
                 "usado": False,
                 "fecha_expiracion": {"$gt": datetime.utcnow()}
             })
@@ -722,22 +836,54 @@ class AuthenticationServiceNoSQL:
     # GESTIÓN DE PERFILES Y PERMISOS
     # =====================================
     
+    def obtener_usuario(self, usuario_id) -> Optional[Dict]:
+        """Usuario por id sin password_hash (caché de corta duración)"""
+        usuario = cache_autenticacion.obtener_usuario(usuario_id)
+        if usuario is None:
+            usuario = self.usuarios.find_one({"_id": ObjectId(usuario_id)}, {"password_hash": 0})
+            if usuario:
+                cache_autenticacion.guardar_usuario(usuario)
+        return usuario
+    
+    def obtener_perfil(self, perfil_id: str) -> Optional[Dict]:
+        """Perfil de permisos por id (caché de corta duración)"""
+        perfil = cache_autenticacion.obtener_perfil(perfil_id)
+        if perfil is None:
+            perfil = self.perfiles_permisos.find_one({"_id": perfil_id})
+            if perfil:
+                cache_autenticacion.guardar_perfil(perfil)
+        return perfil
+    
+    def obtener_perfil_compilado(self, perfil_id: str) -> Optional[PerfilCompilado]:
+        """Permisos y módulos efectivos del perfil como frozensets/bitset"""
+        compilado = cache_autenticacion.obtener_perfil_compilado(perfil_id)
+        if compilado is None:
+            perfil = self.obtener_perfil(perfil_id)
+            if not perfil:
+                return None
+            compilado = compilar_perfil(perfil)
+            cache_autenticacion.guardar_perfil_compilado(compilado)
+        return compilado
+    
+    def actualizar_perfil_permisos(self, perfil_id: str, datos: Dict) -> bool:
+        """Actualiza un perfil de permisos e invalida su caché"""
+        resultado = self.perfiles_permisos.update_one({"_id": perfil_id}, {"$set": datos})
+        cache_autenticacion.invalidar_perfil(perfil_id)
+        return resultado.matched_count > 0
+    
     def verificar_permiso(self, usuario_id: ObjectId, permiso: str) -> bool:
         """Verifica si un usuario tiene un permiso específico"""
         try:
-            usuario = self.usuarios.find_one({"_id": usuario_id})
+            usuario = self.obtener_usuario(usuario_id)
             if not usuario:
                 return False
             
-            perfil = self.perfiles_permisos.find_one({"_id": usuario["perfil"]})
+            perfil = self.obtener_perfil_compilado(usuario["perfil"])
             if not perfil:
                 return False
             
-            # Superadmin tiene todos los permisos
-            if "*" in perfil.get("permisos", []):
-                return True
-            
-            return permiso in perfil.get("permisos", [])
+            # Superadmin ('*') tiene todos los permisos
+            return perfil.tiene_permiso(permiso)
             
         except Exception as e:
             logger.error(f"Error verificando permiso: {str(e)}")
@@ -746,19 +892,16 @@ class AuthenticationServiceNoSQL:
     def verificar_acceso_modulo(self, usuario_id: ObjectId, modulo: str) -> bool:
         """Verifica si un usuario tiene acceso a un módulo"""
         try:
-            usuario = self.usuarios.find_one({"_id": usuario_id})
+            usuario = self.obtener_usuario(usuario_id)
             if not usuario:
                 return False
             
-            perfil = self.perfiles_permisos.find_one({"_id": usuario["perfil"]})
+            perfil = self.obtener_perfil_compilado(usuario["perfil"])
             if not perfil:
                 return False
             
-            # Superadmin tiene acceso a todos los módulos
-            if "*" in perfil.get("modulos", []):
-                return True
-            
-            return modulo in perfil.get("modulos", [])
+            # Superadmin ('*') tiene acceso a todos los módulos
+            return perfil.tiene_modulo(modulo)
             
         except Exception as e:
             logger.error(f"Error verificando acceso a módulo: {str(e)}")
@@ -773,9 +916,11 @@ class AuthenticationServiceNoSQL:
         try:
             # Invalidar sesión
             self.sesiones.update_one(
-                {"token": token},
+                self._filtro_token(token),
                 {"$set": {"activa": False, "fecha_cierre": datetime.utcnow()}}
             )
+            cache_autenticacion.invalidar_sesion(token)
+            self._revocar_token(token, "LOGOUT")
             
             # Registrar auditoría
             self._registrar_evento_auditoria(
@@ -794,21 +939,92 @@ class AuthenticationServiceNoSQL:
     def cerrar_todas_sesiones(self, usuario_id: ObjectId, excepto_token: str = None) -> int:
         """Cierra todas las sesiones de un usuario"""
         try:
+            ahora = datetime.utcnow()
             query = {"usuario_id": usuario_id, "activa": True}
             if excepto_token:
-                query["token"] = {"$ne": excepto_token}
+                query["$nor"] = [self._filtro_token(excepto_token)]
+                # Sin corte por usuario: los access tokens cerrados se revocan por jti
+                cerradas = list(self.sesiones.find(
+                    {**query, "fecha_expiracion": {"$gt": ahora}},
+                    {"jti": 1, "fecha_expiracion": 1}
+                ))
             
             resultado = self.sesiones.update_many(
                 query,
-                {"$set": {"activa": False, "fecha_cierre": datetime.utcnow()}}
+                {"$set": {"activa": False, "fecha_cierre": ahora}}
+            )
+            
+            # Revocar también los refresh tokens pendientes (salvo el de la sesión conservada)
+            refresh_query = {"usuario_id": usuario_id, "usado": False}
+            if excepto_token:
+                sesion_conservada = self.sesiones.find_one(
+                    self._filtro_token(excepto_token), {"refresh_token_hash": 1, "refresh_token": 1}
+                )
+                if sesion_conservada and sesion_conservada.get("refresh_token_hash"):
+                    refresh_query["token_hash"] = {"$ne": sesion_conservada["refresh_token_hash"]}
+                elif sesion_conservada and sesion_conservada.get("refresh_token"):
+                    # Sesión previa al hash (transición, ver _filtro_token)
+                    refresh_query["token"] = {"$ne": sesion_conservada["refresh_token"]}
+            self.tokens_refresh.update_many(
+                refresh_query,
+                {"$set": {"usado": True, "fecha_uso": datetime.utcnow(), "revocado": True}}
             )
             
+            # Con excepto_token la sesión conservada debe seguir válida: no hay corte por usuario
+            if excepto_token:
+                self.revocaciones.revocar_jtis(
+                    [(sesion["jti"], sesion["fecha_expiracion"]) for sesion in cerradas if sesion.get("jti")],
+                    usuario_id, "CERRAR_OTRAS_SESIONES"
+                )
+            else:
+                self.revocaciones.revocar_usuario(
+                    usuario_id, timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES), "CERRAR_TODAS_SESIONES"
+                )
+            
+            cache_autenticacion.invalidar_sesiones_usuario(usuario_id)
+            
             return resultado.modified_count
             
         except Exception as e:
             logger.error(f"Error cerrando sesiones: {str(e)}")
             return 0
     
+    def invalidar_todas_sesiones_usuario(self, usuario_id, razon: str = "Invalidación manual") -> int:
+        """Invalida todas las sesiones activas de un usuario (administración de seguridad)"""
+        try:
+            resultado = self.sesiones.update_many(
+                {"usuario_id": ObjectId(usuario_id), "activa": True},
+                {"$set": {
+                    "activa": False,
+                    "fecha_cierre": datetime.utcnow(),
+                    "razon_cierre": f"SEGURIDAD: {razon}"
+                }}
+            )
+            cache_autenticacion.invalidar_sesiones_usuario(usuario_id)
+            self.revocaciones.revocar_usuario(
+                usuario_id, timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES), f"SEGURIDAD: {razon}"
+            )
+            
+            return resultado.modified_count
+            
+        except Exception as e:
+            logger.error(f"Error invalidando sesiones del usuario: {str(e)}")
+            return 0
+    
+    def _revocar_token(self, token: str, razon: str):
+        """Registra el jti del token como revocado (modo sin estado)"""
+        try:
+            payload = jwt.decode(
+                token, self.JWT_SECRET, algorithms=[self.JWT_ALGORITHM],
+                options={"verify_exp": False}
+            )
+        except jwt.InvalidTokenError:
+            return
+        if payload.get("jti") and payload.get("exp"):
+            self.revocaciones.revocar_jti(
+                payload["jti"], payload.get("user_id"), datetime.utcfromtimestamp(payload["exp"]), razon
+            )
+    
     def obtener_sesiones_activas(self, usuario_id: ObjectId) -> List[Dict]:
         """Obtiene lista de sesiones activas del usuario"""
         try:
@@ -842,21 +1058,22 @@ class AuthenticationServiceNoSQL:
             if not usuario:
                 return False, "Usuario no encontrado"
             
-            # Verificar contraseña actual
-            if not bcrypt.checkpw(password_actual.encode('utf-8'), usuario["password_hash"]):
-                return False, "Contraseña actual incorrecta"
-            
-            # Validar nueva contraseña
+            # Validar nueva contraseña (antes de cualquier hash)
             if len(password_nuevo) < self.PASSWORD_MIN_LENGTH:
                 return False, f"La contraseña debe tener al menos {self.PASSWORD_MIN_LENGTH} caracteres"
             
-            # Verificar que no sea una contraseña anterior
-            for old_hash in usuario["seguridad"].get("passwords_anteriores", []):
-                if bcrypt.checkpw(password_nuevo.encode('utf-8'), old_hash):
-                    return False, "No puede reutilizar contraseñas anteriores"
+            # Verificar contraseña actual
+            if not verificar_password(password_actual, usuario["password_hash"]):
+                return False, "Contraseña actual incorrecta"
+            
+            # Verificar que no sea la actual ni una de las anteriores más recientes
+            if password_nuevo == password_actual or coincide_con_historial(
+                password_nuevo, usuario["seguridad"].get("passwords_anteriores", [])
+            ):
+                return False, "No puede reutilizar contraseñas anteriores"
             
             # Crear nuevo hash
-            nuevo_hash = bcrypt.hashpw(password_nuevo.encode('utf-8'), bcrypt.gensalt(self.BCRYPT_ROUNDS))
+            nuevo_hash = generar_hash(password_nuevo, self.BCRYPT_ROUNDS)
             
             # Actualizar
             passwords_anteriores = usuario["seguridad"].get("passwords_anteriores", [])
@@ -875,6 +1092,7 @@ class AuthenticationServiceNoSQL:
                     }
                 }
             )
+            cache_autenticacion.invalidar_usuario(usuario_id)
             
             # Cerrar todas las sesiones
             self.cerrar_todas_sesiones(usuario_id)
@@ -889,6 +1107,8 @@ class AuthenticationServiceNoSQL:
             
             return True, "Contraseña cambiada exitosamente"
             
+        except HashingSaturado:
+            return False, "Servicio de autenticación ocupado, intente nuevamente"
         except Exception as e:
             logger.error(f"Error cambiando contraseña: {str(e)}")
             return False, "Error interno"
@@ -921,6 +1141,7 @@ class AuthenticationServiceNoSQL:
                 {"_id": usuario_id},
                 {"$set": actualizacion}
             )
+            cache_autenticacion.invalidar_usuario(usuario_id)
             
             return True, "Perfil actualizado exitosamente"
             
@@ -1076,10 +1297,10 @@ class AuthenticationServiceNoSQL:
             if not usuario_id or not jti:
                 return False
             
-            # Marcar sesión como inactiva
+            # Marcar como inactiva la sesión de este token
             resultado = self.sesiones.update_one(
                 {
-                    "usuario_id": ObjectId(usuario_id),
+                    **self._filtro_token(token),
                     "activa": True
                 },
                 {
@@ -1091,6 +1312,11 @@ class AuthenticationServiceNoSQL:
                     }
                 }
             )
+            cache_autenticacion.invalidar_sesion(token)
+            cache_autenticacion.invalidar_sesiones_usuario(usuario_id)
+            self.revocaciones.revocar_jti(
+                jti, usuario_id, datetime.utcfromtimestamp(payload["exp"]), f"SEGURIDAD: {razon}"
+            )
             
             # Registrar en audit trail
             if resultado.modified_count > 0:
@@ -1108,6 +1334,21 @@ class AuthenticationServiceNoSQL:
             logger.error(f"Error invalidando token por seguridad: {str(e)}")
             return False
 
+_servicio_compartido = None
+_servicio_lock = threading.Lock()
+
+def get_auth_service() -> AuthenticationServiceNoSQL:
+    """
+    Instancia compartida del servicio por proceso.
+    Evita crear cliente, índices y perfiles base en cada request.
+    """
+    global _servicio_compartido
+    if _servicio_compartido is None:
+        with _servicio_lock:
+            if _servicio_compartido is None:
+                _servicio_compartido = AuthenticationServiceNoSQL()
+    return _servicio_compartido
+
 # Funciones helper para decoradores
 def verificar_autenticacion(f):
     """Decorador para verificar autenticación en vistas"""
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Sumidero asíncrono del audit trail de requests
+
+El middleware encola cada registro en memoria (sin bloquear el request) y un
+hilo del proceso los escribe por lotes con insert_many en una colección
+time-series de MongoDB (capped si el servidor no soporta time-series).
+Con la cola llena los registros se descartan y se contabilizan: la
+auditoría nunca frena ni tumba el tráfico.
+
+Configuración (settings.NEURAUDIT_SETTINGS):
+    AUDITORIA_COLA_MAXIMA: registros pendientes máximos en memoria
+    AUDITORIA_LOTE: registros por insert_many
+    AUDITORIA_INTERVALO_SEGUNDOS: espera máxima para completar un lote
+    AUDITORIA_RETENCION_DIAS: expiración de la colección time-series
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from apps.core.mongodb_config import get_mongodb
+
+logger = logging.getLogger(__name__)
+
+COLECCION_AUDITORIA = 'auditoria_requests'
+
+# Límites de tamaño por registro
+LONGITUD_MAXIMA_TEXTO = 500
+PARAMETROS_MAXIMOS = 20
+LONGITUD_MAXIMA_PARAMETRO = 200
+TAMANO_CAPPED_BYTES = 512 * 1024 * 1024
+
+
+def _configuracion(clave: str, defecto):
+    return getattr(settings, 'NEURAUDIT_SETTINGS', {}).get(clave, defecto)
+
+
+def limitar_texto(valor, longitud: int = LONGITUD_MAXIMA_TEXTO) -> Optional[str]:
+    if valor is None:
+        return None
+    return str(valor)[:longitud]
+
+
+def limitar_parametros(query_dict) -> Dict[str, str]:
+    """Query params acotados en cantidad y longitud"""
+    parametros = {}
+    for clave in list(query_dict.keys())[:PARAMETROS_MAXIMOS]:
+        valores = query_dict.getlist(clave) if hasattr(query_dict, 'getlist') else [query_dict[clave]]
+        parametros[limitar_texto(clave, 100)] = limitar_texto(','.join(map(str, valores)), LONGITUD_MAXIMA_PARAMETRO)
+    return parametros
+
+
+class SumideroAuditoria:
+    """Cola acotada + hilo escritor por proceso"""
+
+    def __init__(self, nombre_coleccion: str = COLECCION_AUDITORIA):
+        self.nombre_coleccion = nombre_coleccion
+        self.lote = int(_configuracion('AUDITORIA_LOTE', 500))
+        self.intervalo = float(_configuracion('AUDITORIA_INTERVALO_SEGUNDOS', 2))
+        self.retencion_dias = int(_configuracion('AUDITORIA_RETENCION_DIAS', 30))
+        self._cola = queue.Queue(maxsize=int(_configuracion('AUDITORIA_COLA_MAXIMA', 10000)))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._vaciado_registrado = False
+        self._coleccion = None
+        # Los hilos de request y el escritor actualizan las métricas: siempre bajo _lock_metricas
+        self._lock_metricas = threading.Lock()
+        self.metricas = {'encolados': 0, 'escritos': 0, 'descartados': 0, 'errores': 0}
+
+    # =======================================
+    # PRODUCTOR (hilo del request)
+    # =======================================
+
+    def registrar(self, registro: Dict) -> bool:
+        """Encola sin bloquear; False si la cola está llena y el registro se descarta"""
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            descartados = self._contar('descartados')
+            if descartados % 1000 == 1:
+                logger.warning(f"Cola de auditoría llena: {descartados} registros descartados")
+            return False
+        self._contar('encolados')
+        return True
+
+    def estado(self) -> Dict:
+        with self._lock_metricas:
+            metricas = dict(self.metricas)
+        return dict(metricas, pendientes=self._cola.qsize(), capacidad=self._cola.maxsize)
+
+    def _contar(self, metrica: str, cantidad: int = 1) -> int:
+        with self._lock_metricas:
+            self.metricas[metrica] += cantidad
+            return self.metricas[metrica]
+
+    def _asegurar_hilo(self):
+        # Un hilo por proceso: tras un fork (gunicorn) el hilo del padre no existe
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._cola = queue.Queue(maxsize=self._cola.maxsize)
+            # Un lock tomado por otro hilo al momento del fork quedaría bloqueado en el hijo
+            self._lock_metricas = threading.Lock()
+            threading.Thread(target=self._trabajar, name='sumidero-auditoria', daemon=True).start()
+            if not self._vaciado_registrado:
+                # Los procesos hijos heredan el registro de atexit del padre
+                atexit.register(self.vaciar)
+                self._vaciado_registrado = True
+            self._pid = os.getpid()
+
+    # =======================================
+    # ESCRITOR (hilo de fondo)
+    # =======================================
+
+    def _trabajar(self):
+        while True:
+            lote = self._tomar_lote(self.intervalo)
+            if lote:
+                self._escribir(lote)
+
+    def _tomar_lote(self, espera: float) -> List[Dict]:
+        """Espera el primer registro y completa el lote hasta `lote` o hasta `espera` segundos"""
+        try:
+            lote = [self._cola.get(timeout=espera)]
+        except queue.Empty:
+            return []
+
+        limite = time.monotonic() + espera
+        while len(lote) < self.lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote: List[Dict]):
+        try:
+            self._obtener_coleccion().insert_many(lote, ordered=False)
+            self._contar('escritos', len(lote))
+        except Exception as e:
+            self._contar('errores', len(lote))
+            logger.error(f"Error escribiendo {len(lote)} registros de auditoría: {str(e)}")
+
+    def vaciar(self, tiempo_maximo: float = 5.0):
+        """Escribe lo pendiente (al terminar el proceso)"""
+        limite = time.monotonic() + tiempo_maximo
+        while not self._cola.empty() and time.monotonic() < limite:
+            lote = []
+            while len(lote) < self.lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            if lote:
+                self._escribir(lote)
+
+    def _obtener_coleccion(self):
+        if self._coleccion is None:
+            db = get_mongodb().db
+            try:
+                db.create_collection(
+                    self.nombre_coleccion,
+                    timeseries={'timeField': 'timestamp', 'granularity': 'seconds'},
+                    expireAfterSeconds=self.retencion_dias * 86400
+                )
+            except CollectionInvalid:
+                pass  # Ya existe
+            except OperationFailure:
+                # Servidor sin time-series: colección capped de tamaño fijo
+                try:
+                    db.create_collection(self.nombre_coleccion, capped=True, size=TAMANO_CAPPED_BYTES)
+                except CollectionInvalid:
+                    pass
+            self._coleccion = db[self.nombre_coleccion]
+        return self._coleccion
+
+
+_sumidero = None
+_sumidero_lock = threading.Lock()
+
+
+def get_sumidero_auditoria() -> SumideroAuditoria:
+    """Sumidero compartido por el proceso"""
+    global _sumidero
+    if _sumidero is None:
+        with _sumidero_lock:
+            if _sumidero is None:
+                _sumidero = SumideroAuditoria()
+    return _sumidero
@@ -0,0 +1,699 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/extraccion_tarifarios.py
+
+"""
+Extracción de códigos de los manuales tarifarios ISS 2001 y SOAT 2025
+Patrones precompilados + máquina de estados de una sola pasada por línea.
+El texto se procesa por rangos de páginas en paralelo: una pasada liviana
+calcula el contexto (capítulo / sección / tabla) al inicio de cada rango
+y cada proceso extrae sus registros partiendo de ese contexto.
+"""
+
+import csv
+import os
+import re
+import shutil
+import subprocess
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# =======================================
+# PATRONES PRECOMPILADOS
+# =======================================
+
+_NUMERICO = re.compile(r'^[\d.]+$')
+_MONETARIO = re.compile(r'^[\d$.,]+$')
+_DECIMAL_COMA = re.compile(r'^\d+,\d+$')
+
+# ISS 2001
+_ISS_REF_QUIRURGICO = re.compile(r'^[0-9M]\d{4,5}$')
+_ISS_CODIGO_QUIRURGICO = re.compile(r'^\d{6}$')
+_ISS_REF_DIAGNOSTICO = re.compile(r'^[A-Z]?\d{6,7}$')
+_ISS_CODIGO_DIAGNOSTICO = re.compile(r'^[A-Z]?\d{5,6}$')
+_ISS_CODIGO_S = re.compile(r'^S\d{5}$')
+_ISS_CODIGO_CONJUNTO = re.compile(r'^(?:S\d{5}|\d{5})$')
+_ISS_CONSULTA = re.compile(r'CONSULTA.*(?:PRIMERA VEZ|CONTROL|SEGUIMIENTO)|(?:PRIMERA VEZ|CONTROL|SEGUIMIENTO).*CONSULTA')
+_ISS_CONJUNTO_DESCRIPCION = re.compile(r'CONJUNTO|PARTO|CIRUGIA')
+
+# SOAT 2025
+_SOAT_SECCION = re.compile(r'^(\d+)\.\s+([A-Z].*)')
+_SOAT_TABLA = re.compile(r'TABLA\s+(\d+(?:\.\d+)*)')
+_SOAT_FIN_TABLA = re.compile(r'^\d+\.\d+')
+_SOAT_CODIGO = re.compile(r'^\d{4,6}$')
+_SOAT_CODIGO_TIPO_1 = re.compile(r'^\d{4,5}$')
+_SOAT_GRUPO = re.compile(r'^\d{1,2}$')
+_SOAT_ESTANCIA = re.compile(r'^38\d{3}$')
+_SOAT_ENCABEZADO_MAYUSCULAS = re.compile(r'^[A-Z\s]+$')
+
+# Líneas que puede recorrer un registro antes de descartarse
+VENTANA_REGISTRO = 14
+
+CATEGORIAS_ISS = [
+    'procedimientos_quirurgicos', 'examenes_diagnosticos', 'consultas', 'internacion',
+    'servicios_profesionales', 'derechos_sala', 'conjuntos_integrales', 'otros_servicios'
+]
+CATEGORIAS_SOAT = [
+    'procedimientos_quirurgicos', 'examenes_diagnosticos', 'consultas', 'estancias',
+    'servicios_profesionales', 'derechos_sala', 'materiales', 'laboratorio_clinico',
+    'conjuntos_integrales', 'otros_servicios'
+]
+
+# Columnas del archivo columnar (nombres que lee importar_tarifarios_oficiales)
+COLUMNAS_ISS = [
+    'categoria', 'codigo', 'ref', 'descripcion', 'tipo', 'uvr', 'valor', 'seccion', 'pagina'
+]
+COLUMNAS_SOAT = [
+    'categoria', 'codigo', 'descripcion', 'grupo_quirurgico', 'uvb', 'valor_2023_uvt',
+    'valor_2024_uvt', 'valor_2025_uvb', 'tabla_origen', 'seccion', 'estructura_tabla', 'pagina'
+]
+
+
+def limpiar_numero(valor: str) -> Optional[float]:
+    """Convierte '$ 1.234.567,50' / '1.234' a float (None si no es numérico)"""
+    if not valor:
+        return None
+    limpio = valor.replace('$', '').replace('.', '').replace(' ', '').replace(',', '.')
+    try:
+        return float(limpio)
+    except ValueError:
+        return None
+
+
+# =======================================
+# ISS 2001
+# =======================================
+
+class ContextoISS:
+    """Capítulo vigente del manual ISS (estado que cruza páginas)"""
+
+    def __init__(self):
+        self.seccion = None
+        self.linea_anterior_internacion = False
+        self.indice = -1
+        self.ultimo_codigo = None  # (indice, codigo): las consultas toman el código previo
+
+    def actualizar(self, linea: str):
+        self.indice += 1
+        if _ISS_CODIGO_QUIRURGICO.match(linea):
+            self.ultimo_codigo = (self.indice, linea)
+
+        # Mismo orden de prioridad que la extracción original
+        if 'LISTADO DE INTERVENCIONES' in linea:
+            self.seccion = 'quirurgico'
+        elif 'EXAMENES DE DIAGNOSTICO' in linea:
+            self.seccion = 'diagnostico'
+        elif 'CAPITULO III' in linea:
+            self.seccion = 'estancia_servicios'
+        elif 'CAPITULO IV' in linea or 'CONJUNTOS' in linea:
+            self.seccion = 'conjuntos'
+        elif self.linea_anterior_internacion and 'GENERAL' in linea:
+            self.seccion = 'internacion'
+        elif 'CONSULTA' in linea and 'POR' in linea:
+            self.seccion = 'consultas'
+        elif 'DERECHOS DE SALA' in linea:
+            self.seccion = 'derechos_sala'
+        elif 'SERVICIOS PROFESIONALES' in linea:
+            self.seccion = 'servicios_prof'
+        self.linea_anterior_internacion = 'INTERNACION' in linea
+
+
+class ExtractorISS:
+    """
+    Máquina de estados ISS 2001. Un registro pendiente avanza con cada línea
+    (REF -> código -> descripción -> valor) en vez de re-escanear la ventana.
+    """
+
+    def __init__(self, contexto: ContextoISS):
+        self.contexto = contexto
+        self.pendiente = None
+        self.registros = []
+
+    def procesar(self, lineas: List[Tuple[int, str]], fin_emision: int):
+        """
+        lineas: [(indice_global, texto)]. Solo se inician registros antes de
+        fin_emision; las líneas siguientes solo completan pendientes.
+        """
+        for indice, linea in lineas:
+            if indice >= fin_emision and self.pendiente is None:
+                break
+
+            if indice < fin_emision:
+                self.contexto.actualizar(linea)
+
+            if self.pendiente is not None:
+                if self._avanzar(indice, linea):
+                    continue
+
+            if indice < fin_emision:
+                self._iniciar(indice, linea)
+
+    def _iniciar(self, indice: int, linea: str):
+        seccion = self.contexto.seccion
+
+        if seccion == 'quirurgico' and _ISS_REF_QUIRURGICO.match(linea):
+            self.pendiente = {'tipo': 'quirurgico', 'ref': linea, 'inicio': indice}
+        elif seccion == 'diagnostico' and _ISS_REF_DIAGNOSTICO.match(linea):
+            self.pendiente = {'tipo': 'diagnostico', 'ref': linea, 'inicio': indice}
+        elif seccion == 'internacion' and _ISS_CODIGO_S.match(linea):
+            self.pendiente = {'tipo': 'internacion', 'codigo': linea, 'inicio': indice}
+        elif seccion == 'conjuntos' and _ISS_CODIGO_CONJUNTO.match(linea):
+            self.pendiente = {'tipo': 'conjunto_integral', 'codigo': linea, 'inicio': indice}
+        elif seccion == 'consultas' and _ISS_CONSULTA.search(linea):
+            ultimo = self.contexto.ultimo_codigo
+            if ultimo and 0 < self.contexto.indice - ultimo[0] < 10:
+                self.pendiente = {
+                    'tipo': 'consulta', 'codigo': ultimo[1],
+                    'descripcion': linea, 'inicio': indice
+                }
+
+    def _avanzar(self, indice: int, linea: str) -> bool:
+        """Consume la línea en el registro pendiente. True si la línea fue usada."""
+        registro = self.pendiente
+        if indice - registro['inicio'] > VENTANA_REGISTRO:
+            self.pendiente = None
+            return False
+
+        tipo = registro['tipo']
+        if tipo in ('quirurgico', 'diagnostico'):
+            patron_codigo = _ISS_CODIGO_QUIRURGICO if tipo == 'quirurgico' else _ISS_CODIGO_DIAGNOSTICO
+            if 'codigo' not in registro:
+                if patron_codigo.match(linea) and linea != 'PB':
+                    registro['codigo'] = linea
+                    return True
+            elif 'descripcion' not in registro:
+                if linea and linea != 'PB' and not _NUMERICO.match(linea):
+                    registro['descripcion'] = linea
+                    return True
+            elif tipo == 'quirurgico':
+                if _NUMERICO.match(linea):
+                    registro['uvr'] = limpiar_numero(linea)
+                    self._emitir('procedimientos_quirurgicos', registro)
+                    return True
+            else:
+                valor = limpiar_numero(linea)
+                if valor is not None:
+                    registro['valor'] = int(valor)
+                    self._emitir('examenes_diagnosticos', registro)
+                    return True
+            return False
+
+        if tipo == 'internacion':
+            if 'descripcion' not in registro:
+                if 'HABITACION' in linea or 'CAMA' in linea:
+                    registro['descripcion'] = linea
+                    registro['inicio_valor'] = indice
+                    return True
+            elif indice - registro['inicio_valor'] <= 4:
+                valor = limpiar_numero(linea)
+                if valor:
+                    registro['valor'] = int(valor)
+                    self._emitir('internacion', registro)
+                    return True
+            else:
+                self.pendiente = None
+            return False
+
+        if tipo == 'conjunto_integral':
+            if 'descripcion' not in registro:
+                if linea and linea != 'PB' and not _NUMERICO.match(linea) \
+                        and _ISS_CONJUNTO_DESCRIPCION.search(linea):
+                    registro['descripcion'] = linea
+                    return True
+            else:
+                valor = limpiar_numero(linea)
+                if valor:
+                    registro['valor'] = int(valor)
+                    self._emitir('conjuntos_integrales', registro)
+                    return True
+            return False
+
+        # consulta: descripción ya tomada, falta el valor
+        valor = limpiar_numero(linea)
+        if valor:
+            registro['valor'] = int(valor)
+            self._emitir('consultas', registro)
+            return True
+        return False
+
+    def _emitir(self, categoria: str, registro: Dict):
+        self.pendiente = None
+        if not registro.get('codigo') or not registro.get('descripcion'):
+            return
+        self.registros.append({
+            'categoria': categoria,
+            'codigo': registro['codigo'],
+            'ref': registro.get('ref'),
+            'descripcion': registro['descripcion'],
+            'tipo': registro['tipo'],
+            'uvr': registro.get('uvr'),
+            'valor': registro.get('valor'),
+            'seccion': self.contexto.seccion,
+            'inicio': registro['inicio'],
+        })
+
+
+# =======================================
+# SOAT 2025
+# =======================================
+
+def _categoria_soat(linea: str, nombre_seccion: str) -> str:
+    nombre = nombre_seccion.upper()
+    if any(x in nombre for x in ('NEUROCIRUGÍA', 'CIRUGÍA', 'ORTOPEDIA', 'UROLOGÍA')):
+        return 'procedimientos_quirurgicos'
+    if 'LABORATORIO' in nombre:
+        return 'laboratorio_clinico'
+    if any(x in nombre for x in ('DIAGNÓSTICO', 'IMAGENOLOGÍA', 'RAYOS')):
+        return 'examenes_diagnosticos'
+    if 'CONSULTA' in nombre:
+        return 'consultas'
+    if 'ESTANCIA' in linea.upper():
+        return 'estancias'
+    if 'CONJUNTOS' in nombre:
+        return 'conjuntos_integrales'
+    return 'otros_servicios'
+
+
+class ContextoSOAT:
+    """
+    Sección, categoría y tabla vigentes del manual SOAT. La estructura de la
+    tabla se decide con las líneas de encabezado que siguen a 'TABLA'.
+    """
+
+    LINEAS_ENCABEZADO = 10
+    LINEAS_SALTO_ENCABEZADO = 3
+
+    def __init__(self):
+        self.seccion = None
+        self.categoria = None
+        self.tabla = None
+        self.lineas_desde_tabla = None
+        self.estructura = None
+        self.en_tabla = False
+
+    def actualizar(self, linea: str):
+        coincidencia = _SOAT_SECCION.match(linea)
+        if coincidencia:
+            self.seccion = f'{coincidencia.group(1)}. {coincidencia.group(2)}'
+            self.categoria = _categoria_soat(linea, coincidencia.group(2))
+
+        if self.lineas_desde_tabla is not None:
+            self.lineas_desde_tabla += 1
+            desplazamiento = self.lineas_desde_tabla
+
+            if desplazamiento == 1 and linea and len(linea) > 10 \
+                    and not _SOAT_ENCABEZADO_MAYUSCULAS.match(linea):
+                self.tabla = f'{self.tabla} - {linea}'
+
+            if desplazamiento < self.LINEAS_ENCABEZADO:
+                mayusculas = linea.upper()
+                if 'GRUPO QUIRUR' in mayusculas:
+                    self.estructura = 'tipo_1_grupo_quirurgico'
+                elif 'UVB' in mayusculas and 'CÓDIGO' in mayusculas and self.estructura is None:
+                    self.estructura = 'tipo_2_uvb_columna'
+
+            if desplazamiento == self.LINEAS_SALTO_ENCABEZADO:
+                # Los registros empiezan después de los encabezados
+                self.en_tabla = bool(linea) and not _SOAT_FIN_TABLA.match(linea)
+            if desplazamiento >= self.LINEAS_ENCABEZADO:
+                self.lineas_desde_tabla = None
+        elif self.en_tabla and (not linea or _SOAT_FIN_TABLA.match(linea)):
+            self.en_tabla = False
+
+        if 'TABLA' in linea:
+            coincidencia = _SOAT_TABLA.search(linea)
+            if coincidencia:
+                self.tabla = f'TABLA {coincidencia.group(1)}'
+                self.lineas_desde_tabla = 0
+                self.estructura = None
+            self.en_tabla = False
+
+
+class ExtractorSOAT:
+    """
+    Máquina de estados SOAT 2025. Un solo registro pendiente recorre
+    código -> descripción -> (grupo | UVB) -> valores $ y la estructura
+    de la tabla decide qué valor corresponde a cada vigencia.
+    """
+
+    def __init__(self, contexto: ContextoSOAT):
+        self.contexto = contexto
+        self.pendiente = None
+        self.estancia = None
+        self.registros = []
+
+    def procesar(self, lineas: List[Tuple[int, str]], fin_emision: int):
+        for indice, linea in lineas:
+            if indice >= fin_emision and self.pendiente is None and self.estancia is None:
+                break
+
+            iniciar = indice < fin_emision
+            if iniciar:
+                self.contexto.actualizar(linea)
+
+            usada = False
+            if self.pendiente is not None:
+                usada = self._avanzar_tabla(indice, linea)
+            if self.estancia is not None:
+                self._avanzar_estancia(indice, linea)
+
+            if iniciar:
+                if not usada:
+                    self._iniciar(indice, linea)
+                if self.estancia is None and _SOAT_ESTANCIA.match(linea):
+                    self.estancia = {
+                        'codigo': linea, 'inicio': indice, 'valores': [],
+                        'tabla': self.contexto.tabla, 'seccion': self.contexto.seccion,
+                    }
+
+        # Fin de rango: lo que quedó completo se emite
+        if self.pendiente is not None:
+            self._cerrar_tabla()
+        if self.estancia is not None:
+            self._cerrar_estancia()
+
+    def _iniciar(self, indice: int, linea: str):
+        contexto = self.contexto
+        if contexto.en_tabla and contexto.categoria and _SOAT_CODIGO.match(linea):
+            if contexto.estructura != 'tipo_1_grupo_quirurgico' or _SOAT_CODIGO_TIPO_1.match(linea):
+                self.pendiente = {
+                    'codigo': linea, 'inicio': indice, 'valores': [],
+                    'categoria': contexto.categoria, 'tabla': contexto.tabla,
+                    'seccion': contexto.seccion, 'estructura': contexto.estructura,
+                }
+
+    # ---------- tablas tipo 1/2/3 ----------
+
+    def _avanzar_tabla(self, indice: int, linea: str) -> bool:
+        registro = self.pendiente
+        if indice - registro['inicio'] > VENTANA_REGISTRO:
+            self._cerrar_tabla()
+            return False
+
+        # Nuevo código: cierra el registro anterior (si quedó incompleto se descarta)
+        if _SOAT_CODIGO.match(linea) and ('descripcion' not in registro or registro['valores']):
+            self._cerrar_tabla()
+            return False
+
+        if 'descripcion' not in registro:
+            if linea and not _MONETARIO.match(linea) and len(linea) > 5:
+                registro['descripcion'] = linea
+                registro['linea_descripcion'] = indice
+            return True
+
+        if registro['estructura'] == 'tipo_1_grupo_quirurgico':
+            if 'grupo_quirurgico' not in registro:
+                if _SOAT_GRUPO.match(linea):
+                    registro['grupo_quirurgico'] = int(linea)
+                return True
+        elif 'uvb' not in registro and _DECIMAL_COMA.match(linea):
+            registro['uvb'] = limpiar_numero(linea)
+            registro['uvb_contiguo'] = indice == registro['linea_descripcion'] + 1
+            return True
+
+        if '$' in linea:
+            valor = limpiar_numero(linea)
+            if valor:
+                registro['valores'].append(valor)
+                if len(registro['valores']) >= self._valores_requeridos(registro):
+                    self._cerrar_tabla()
+            return True
+        return False
+
+    @staticmethod
+    def _estructura(registro: Dict) -> str:
+        if registro['estructura']:
+            return registro['estructura']
+        # Sin encabezado reconocible: UVB pegado a la descripción => tipo 3
+        if registro.get('uvb_contiguo'):
+            return 'tipo_3_uvb_integrado'
+        return 'tipo_2_uvb_columna'
+
+    def _valores_requeridos(self, registro: Dict) -> int:
+        return 6 if self._estructura(registro) == 'tipo_3_uvb_integrado' else 3
+
+    def _cerrar_tabla(self):
+        registro, self.pendiente = self.pendiente, None
+        estructura = self._estructura(registro)
+        valores = registro['valores']
+
+        if estructura == 'tipo_3_uvb_integrado':
+            # Pares de valores por vigencia: 2023, 2024, 2025
+            vigencias = valores[0::2]
+        else:
+            vigencias = valores
+
+        if not registro.get('descripcion') or len(vigencias) < 3:
+            return
+
+        self.registros.append({
+            'categoria': registro['categoria'],
+            'codigo': registro['codigo'],
+            'descripcion': registro['descripcion'],
+            'grupo_quirurgico': registro.get('grupo_quirurgico'),
+            'uvb': registro.get('uvb'),
+            'valor_2023_uvt': vigencias[0],
+            'valor_2024_uvt': vigencias[1],
+            'valor_2025_uvb': vigencias[2],
+            'tabla_origen': registro['tabla'],
+            'seccion': registro['seccion'],
+            'estructura_tabla': estructura,
+            'inicio': registro['inicio'],
+        })
+
+    # ---------- estancias 38XXX ----------
+
+    def _avanzar_estancia(self, indice: int, linea: str):
+        registro = self.estancia
+        if 'descripcion' not in registro:
+            if indice - registro['inicio'] > 9:
+                self.estancia = None
+            elif 'habitación' in linea.lower():
+                registro['descripcion'] = linea
+                registro['linea_descripcion'] = indice
+            return
+
+        desplazamiento = indice - registro['linea_descripcion']
+        if desplazamiento > 9:
+            self._cerrar_estancia()
+            return
+        if desplazamiento == 1:
+            registro['uvb_en_columna'] = '$' not in linea
+        if '$' in linea or _DECIMAL_COMA.match(linea):
+            valor = limpiar_numero(linea)
+            if valor:
+                registro['valores'].append(valor)
+
+    def _cerrar_estancia(self):
+        registro, self.estancia = self.estancia, None
+        valores = registro['valores']
+        if not registro.get('descripcion') or len(valores) < 4:
+            return
+        self.registros.append({
+            'categoria': 'estancias',
+            'codigo': registro['codigo'],
+            'descripcion': registro['descripcion'],
+            'grupo_quirurgico': None,
+            'uvb': valores[0] if registro.get('uvb_en_columna') else None,
+            'valor_2023_uvt': valores[1],
+            'valor_2024_uvt': valores[2],
+            'valor_2025_uvb': valores[3],
+            'tabla_origen': registro['tabla'],
+            'seccion': registro['seccion'] or '46. TARIFAS DE ESTANCIA',
+            'estructura_tabla': 'estancia',
+            'inicio': registro['inicio'],
+        })
+
+
+MANUALES = {
+    'iss': (ContextoISS, ExtractorISS, CATEGORIAS_ISS, COLUMNAS_ISS),
+    'soat': (ContextoSOAT, ExtractorSOAT, CATEGORIAS_SOAT, COLUMNAS_SOAT),
+}
+
+
+# =======================================
+# TEXTO POR PÁGINAS
+# =======================================
+
+def leer_paginas_texto(ruta: str) -> List[str]:
+    """Texto pre-extraído; pdftotext separa páginas con salto de página (\\f)"""
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        return archivo.read().split('\f')
+
+
+def _pdftotext_rango(args: Tuple[str, int, int]) -> List[str]:
+    ruta, primera, ultima = args
+    salida = subprocess.run(
+        ['pdftotext', '-f', str(primera), '-l', str(ultima), '-enc', 'UTF-8', ruta, '-'],
+        check=True, capture_output=True
+    ).stdout.decode('utf-8', errors='replace')
+    paginas = salida.split('\f')
+    # pdftotext termina cada página con \f: el último fragmento queda vacío
+    return paginas[:ultima - primera + 1]
+
+
+def leer_paginas_pdf(ruta: str, paginas_por_lote: int, procesos: int) -> List[str]:
+    """Extrae el texto del PDF por rangos de páginas en paralelo (poppler pdftotext)"""
+    if not shutil.which('pdftotext') or not shutil.which('pdfinfo'):
+        raise RuntimeError('Extracción desde PDF requiere poppler-utils (pdftotext, pdfinfo)')
+
+    info = subprocess.run(['pdfinfo', ruta], check=True, capture_output=True).stdout.decode('utf-8', 'replace')
+    total = int(re.search(r'^Pages:\s+(\d+)', info, re.MULTILINE).group(1))
+    rangos = [
+        (ruta, inicio, min(inicio + paginas_por_lote - 1, total))
+        for inicio in range(1, total + 1, paginas_por_lote)
+    ]
+
+    paginas = []
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for lote in pool.map(_pdftotext_rango, rangos):
+            paginas.extend(lote)
+    return paginas
+
+
+# =======================================
+# EXTRACCIÓN PARALELA
+# =======================================
+
+def _procesar_rango(args) -> List[Dict[str, Any]]:
+    """Trabajo de un proceso: extrae los registros que inician en su rango"""
+    manual, lineas, fin_emision, contexto = args
+    extractor = MANUALES[manual][1](contexto)
+    extractor.procesar(lineas, fin_emision)
+    return extractor.registros
+
+
+def _rangos(paginas: List[str], paginas_por_lote: int):
+    """
+    Líneas numeradas de cada rango de páginas (más la página siguiente,
+    para completar registros partidos entre páginas)
+    """
+    lineas_por_pagina = []
+    indice = 0
+    for pagina in paginas:
+        lineas = [(indice + i, linea.strip()) for i, linea in enumerate(pagina.split('\n'))]
+        indice += len(lineas)
+        lineas_por_pagina.append(lineas)
+
+    for inicio in range(0, len(paginas), paginas_por_lote):
+        fin = inicio + paginas_por_lote
+        propias = [linea for pagina in lineas_por_pagina[inicio:fin] for linea in pagina]
+        siguiente = [linea for pagina in lineas_por_pagina[fin:fin + 1] for linea in pagina]
+        fin_emision = propias[-1][0] + 1 if propias else 0
+        yield propias, siguiente, fin_emision
+
+
+def extraer_manual(manual: str, paginas: List[str], paginas_por_lote: int = 20,
+                   procesos: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Extrae un manual completo. Devuelve {categoria: [registros]} sin duplicados,
+    en el orden en que aparecen en el documento.
+    """
+    clase_contexto, _, categorias, _ = MANUALES[manual]
+
+    # Pasada liviana: solo el contexto, para conocer el estado al inicio de cada rango
+    contexto = clase_contexto()
+    trabajos = []
+    for propias, siguiente, fin_emision in _rangos(paginas, paginas_por_lote):
+        trabajos.append((manual, propias + siguiente, fin_emision, deepcopy(contexto)))
+        for _, linea in propias:
+            contexto.actualizar(linea)
+
+    if procesos == 1 or len(trabajos) <= 1:
+        lotes = map(_procesar_rango, trabajos)
+        return _consolidar(manual, lotes, categorias)
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return _consolidar(manual, pool.map(_procesar_rango, trabajos), categorias)
+
+
+def _consolidar(manual: str, lotes: Iterable[List[Dict]], categorias: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Une los rangos y elimina duplicados por categoría + código
+    (ISS: también descripción)
+    """
+    resultado = {categoria: [] for categoria in categorias}
+    vistos = set()
+    for registros in lotes:
+        for registro in sorted(registros, key=lambda r: r['inicio']):
+            clave = (registro['categoria'], registro['codigo'])
+            if manual == 'iss':
+                clave += (registro['descripcion'],)
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            resultado.setdefault(registro['categoria'], []).append(registro)
+    return resultado
+
+
+def pagina_de_linea(paginas: List[str]):
+    """Función índice de línea -> número de página (1-based)"""
+    limites = []
+    acumulado = 0
+    for pagina in paginas:
+        acumulado += len(pagina.split('\n'))
+        limites.append(acumulado)
+
+    def pagina(indice: int) -> int:
+        return bisect_right(limites, indice) + 1
+
+    return pagina
+
+
+# =======================================
+# SALIDA COLUMNAR
+# =======================================
+
+def escribir_columnar(manual: str, resultado: Dict[str, List[Dict]], ruta: str,
+                      paginas: Optional[List[str]] = None) -> int:
+    """
+    Escribe un archivo plano con una fila por código: Parquet si la ruta
+    termina en .parquet (requiere pyarrow, ImportError si no está
+    instalado), CSV en otro caso
+    """
+    columnas = MANUALES[manual][3]
+    pagina = pagina_de_linea(paginas) if paginas else None
+
+    filas = []
+    for registros in resultado.values():
+        for registro in registros:
+            fila = {columna: registro.get(columna) for columna in columnas}
+            if pagina:
+                fila['pagina'] = pagina(registro['inicio'])
+            filas.append(fila)
+
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+
+    if ruta.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        tabla = pa.table({columna: [fila[columna] for fila in filas] for columna in columnas})
+        pq.write_table(tabla, ruta)
+    else:
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=columnas)
+            escritor.writeheader()
+            escritor.writerows(filas)
+
+    return len(filas)
+
+
+def leer_columnar(ruta: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Lee un archivo columnar (Parquet/CSV) y lo agrupa por categoría"""
+    if ruta.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        filas = pq.read_table(ruta).to_pylist()
+    else:
+        with open(ruta, 'r', encoding='utf-8', newline='') as archivo:
+            filas = [
+                {clave: (valor if valor != '' else None) for clave, valor in fila.items()}
+                for fila in csv.DictReader(archivo)
+            ]
+
+    resultado: Dict[str, List[Dict[str, Any]]] = {}
+    for fila in filas:
+        resultado.setdefault(fila.pop('categoria') or 'otros_servicios', []).append(fila)
+    return resultado
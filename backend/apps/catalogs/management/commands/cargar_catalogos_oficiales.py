@@ -23,6 +23,7 @@ from apps.catalogs.models import (
     CatalogoIUMOficial,
     CatalogoDispositivosOficial
 )
+from apps.catalogs.services_busqueda_catalogos import BusquedaCatalogosService
 
 logger = logging.getLogger(__name__)
 
@@ -118,6 +119,11 @@ class Command(BaseCommand):
             procesador = procesadores[tipo]
             procesador(archivo_path, encoding, separador, chunk_size, limpiar, dry_run)
             
+            if not dry_run:
+                # bulk_create no pasa por save(): construir claves de autocompletar
+                actualizados = BusquedaCatalogosService(tipo).indexar(solo_pendientes=not limpiar)
+                self.stdout.write(f'🔎 Claves de búsqueda: {actualizados:,} registros indexados')
+            
         except Exception as e:
             logger.error(f'Error procesando catálogo {tipo}: {str(e)}')
             raise CommandError(f'❌ Error: {str(e)}')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/management/commands/extraer_tarifarios_oficiales.py
+
+"""
+Extrae los códigos de un manual tarifario oficial (ISS 2001 / SOAT 2025)
+desde el PDF o su texto pre-extraído y genera un archivo columnar
+(Parquet o CSV) que importar_tarifarios_oficiales carga directamente.
+
+Uso:
+    python manage.py extraer_tarifarios_oficiales soat --archivo "MANUAL TARIFARIO SOAT.pdf"
+    python manage.py importar_tarifarios_oficiales --solo-soat --archivo-soat scripts/output/soat_2025_<fecha>.parquet
+"""
+
+import importlib.util
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalogs.extraccion_tarifarios import (
+    escribir_columnar, extraer_manual, leer_paginas_pdf, leer_paginas_texto
+)
+
+PREFIJOS_SALIDA = {
+    'iss': 'iss_2001',
+    'soat': 'soat_2025',
+}
+
+
+class Command(BaseCommand):
+    help = 'Extrae un manual tarifario oficial a un archivo columnar para importar_tarifarios_oficiales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'manual',
+            choices=list(PREFIJOS_SALIDA),
+            help='Manual a extraer'
+        )
+        parser.add_argument(
+            '--archivo',
+            required=True,
+            help='PDF del manual o texto pre-extraído (páginas separadas por \\f, como pdftotext)'
+        )
+        parser.add_argument(
+            '--salida',
+            help='Archivo de salida (.parquet o .csv). Por defecto scripts/output/<manual>_<fecha>.<formato>'
+        )
+        parser.add_argument(
+            '--formato',
+            choices=['parquet', 'csv'],
+            default='parquet',
+            help='Formato de salida si no se indica --salida (parquet requiere pyarrow)'
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos en paralelo (1 = sin pool)'
+        )
+        parser.add_argument(
+            '--paginas-por-lote',
+            type=int,
+            default=20,
+            help='Páginas por rango asignado a cada proceso'
+        )
+
+    def handle(self, *args, **options):
+        manual = options['manual']
+        archivo = options['archivo']
+        procesos = max(1, options['procesos'])
+        paginas_por_lote = max(1, options['paginas_por_lote'])
+
+        if not os.path.exists(archivo):
+            raise CommandError(f'Archivo no encontrado: {archivo}')
+
+        salida = options['salida'] or os.path.join(
+            'scripts', 'output',
+            f'{PREFIJOS_SALIDA[manual]}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{options["formato"]}'
+        )
+        if salida.endswith('.parquet') and importlib.util.find_spec('pyarrow') is None:
+            raise CommandError('Salida Parquet requiere pyarrow; usar --formato csv')
+
+        self.stdout.write(self.style.SUCCESS(f'📄 EXTRACCIÓN {PREFIJOS_SALIDA[manual].upper()}'))
+        inicio = time.monotonic()
+
+        try:
+            if archivo.lower().endswith('.pdf'):
+                paginas = leer_paginas_pdf(archivo, paginas_por_lote, procesos)
+            else:
+                paginas = leer_paginas_texto(archivo)
+        except Exception as e:
+            raise CommandError(f'Error leyendo {archivo}: {str(e)}')
+
+        self.stdout.write(f'   📑 {len(paginas):,} páginas leídas ({time.monotonic() - inicio:.1f}s)')
+
+        resultado = extraer_manual(manual, paginas, paginas_por_lote, procesos)
+        total = escribir_columnar(manual, resultado, salida, paginas)
+
+        for categoria, registros in resultado.items():
+            if registros:
+                self.stdout.write(f'   ✓ {categoria.replace("_", " ").title()}: {len(registros):,} registros')
+
+        self.stdout.write(f'   💾 {salida}: {total:,} registros ({time.monotonic() - inicio:.1f}s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Cargar con: python manage.py importar_tarifarios_oficiales '
+            f'--solo-{manual} --archivo-{manual} {salida}'
+        ))
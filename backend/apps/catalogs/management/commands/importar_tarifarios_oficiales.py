@@ -7,21 +7,24 @@ from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from django.core.management.base import BaseCommand, CommandError
 from apps.catalogs.models import TarifarioISS2001, TarifarioSOAT2025
+from apps.catalogs.extraccion_tarifarios import leer_columnar
+from apps.catalogs.services_agregaciones_tarifarios import AgregacionesContractualesService
+from apps.catalogs.services_equivalencias_tarifarios import EquivalenciasTarifariosService
 
 class Command(BaseCommand):
-    help = 'Importar tarifarios oficiales ISS 2001 y SOAT 2025 desde archivos JSON extraídos'
+    help = 'Importar tarifarios oficiales ISS 2001 y SOAT 2025 desde archivos extraídos (JSON, Parquet o CSV)'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--archivo-iss',
             type=str,
-            help='Ruta al archivo JSON de ISS 2001',
+            help='Ruta al archivo de ISS 2001 (JSON por categoría, o .parquet/.csv de extraer_tarifarios_oficiales)',
             default='scripts/output/iss_2001_completo_20250826_171708.json'
         )
         parser.add_argument(
             '--archivo-soat', 
             type=str,
-            help='Ruta al archivo JSON de SOAT 2025',
+            help='Ruta al archivo de SOAT 2025 (JSON por categoría, o .parquet/.csv de extraer_tarifarios_oficiales)',
             default='scripts/output/soat_2025_completo_20250826_172855.json'
         )
         parser.add_argument(
@@ -58,6 +61,9 @@ class Command(BaseCommand):
         # Calcular agregaciones contractuales
         self._calcular_agregaciones_contractuales()
         
+        # Índice de equivalencias ISS -> SOAT
+        self._construir_indice_equivalencias()
+        
         self.stdout.write(self.style.SUCCESS('✅ IMPORTACIÓN COMPLETADA EXITOSAMENTE'))
 
     def _limpiar_tarifarios(self, options):
@@ -72,6 +78,14 @@ class Command(BaseCommand):
             count_soat = TarifarioSOAT2025.objects.all().delete()[0]
             self.stdout.write(f'   - SOAT 2025: {count_soat} registros eliminados')
 
+    def _cargar_archivo(self, archivo_path):
+        """{categoria: [registros]} desde JSON o desde el archivo columnar del extractor"""
+        if archivo_path.endswith(('.parquet', '.csv')):
+            return leer_columnar(archivo_path)
+        
+        with open(archivo_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     def _importar_iss_2001(self, archivo_path):
         """Importar tarifario ISS 2001"""
         self.stdout.write('📋 Importando ISS 2001...')
@@ -81,8 +95,7 @@ class Command(BaseCommand):
             raise CommandError(f'Archivo ISS 2001 no encontrado: {archivo_path}')
         
         # Cargar datos
-        with open(archivo_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = self._cargar_archivo(archivo_path)
         
         # Contadores
         total_procesados = 0
@@ -158,8 +171,7 @@ class Command(BaseCommand):
             raise CommandError(f'Archivo SOAT 2025 no encontrado: {archivo_path}')
         
         # Cargar datos
-        with open(archivo_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = self._cargar_archivo(archivo_path)
         
         # Contadores
         total_procesados = 0
@@ -224,26 +236,33 @@ class Command(BaseCommand):
         """Calcular campos agregados con lookups a contratos"""
         self.stdout.write('🔗 Calculando agregaciones contractuales...')
         
-        # TODO: Implementar agregaciones MongoDB cuando existan contratos
-        # Aquí se ejecutarían pipelines como:
-        # db.tarifario_iss_2001.aggregate([
-        #   {
-        #     $lookup: {
-        #       from: "contratos", 
-        #       localField: "codigo",
-        #       foreignField: "tarifas_negociadas.codigo_oficial",
-        #       as: "contratos"
-        #     }
-        #   },
-        #   {
-        #     $addFields: {
-        #       contratos_activos: { $size: "$contratos" },
-        #       uso_frecuente: { $gte: [{ $size: "$contratos" }, 5] }
-        #     }
-        #   }
-        # ])
+        try:
+            resultado = AgregacionesContractualesService().recalcular()
+        except Exception as e:
+            self.stdout.write(
+                self.style.WARNING(f'   ⚠️  Agregaciones contractuales no calculadas: {str(e)}')
+            )
+            return
+        
+        for coleccion, conteos in resultado.items():
+            self.stdout.write(
+                f'   📊 {coleccion}: {conteos["actualizados"]} códigos con contratos, '
+                f'{conteos["reiniciados"]} reiniciados'
+            )
+
+    def _construir_indice_equivalencias(self):
+        """Reconstruir índice BM25 de descripciones ISS/SOAT"""
+        self.stdout.write('🔎 Construyendo índice de equivalencias ISS -> SOAT...')
+        
+        try:
+            conteos = EquivalenciasTarifariosService().construir_indice()
+        except Exception as e:
+            self.stdout.write(
+                self.style.WARNING(f'   ⚠️  Índice de equivalencias no construido: {str(e)}')
+            )
+            return
         
-        self.stdout.write('   📊 Agregaciones contractuales pendientes (requieren contratos existentes)')
+        self.stdout.write(f'   📚 ISS: {conteos["ISS"]} descripciones, SOAT: {conteos["SOAT"]} descripciones')
 
     def _mapear_tipo_iss(self, categoria):
         """Mapear categoría ISS a tipo del modelo"""
@@ -286,4 +305,4 @@ class Command(BaseCommand):
             
             return Decimal(str(valor))
         except (InvalidOperation, ValueError, TypeError):
-            return None
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/management/commands/indexar_busqueda_catalogos.py
+
+"""
+Construye las claves normalizadas de búsqueda (palabras_busqueda / prefijos_busqueda)
+y los índices de autocompletar de los catálogos oficiales
+
+Uso: python manage.py indexar_busqueda_catalogos --catalogo cups [--solo-pendientes]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalogs.services_busqueda_catalogos import CATALOGOS_BUSQUEDA, BusquedaCatalogosService
+
+
+class Command(BaseCommand):
+    help = 'Indexa las claves de búsqueda por prefijo de los catálogos oficiales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--catalogo',
+            choices=list(CATALOGOS_BUSQUEDA) + ['todos'],
+            default='todos',
+            help='Catálogo a indexar (por defecto todos)'
+        )
+        parser.add_argument(
+            '--solo-pendientes',
+            action='store_true',
+            help='Solo registros sin claves de búsqueda'
+        )
+
+    def handle(self, *args, **options):
+        catalogo = options['catalogo']
+        catalogos = list(CATALOGOS_BUSQUEDA) if catalogo == 'todos' else [catalogo]
+
+        for nombre in catalogos:
+            self.stdout.write(f'🔎 Indexando catálogo {nombre.upper()}...')
+            try:
+                actualizados = BusquedaCatalogosService(nombre).indexar(
+                    solo_pendientes=options['solo_pendientes']
+                )
+            except Exception as e:
+                raise CommandError(f'Error indexando {nombre}: {str(e)}')
+
+            self.stdout.write(f'   📊 {actualizados:,} registros actualizados')
+
+        self.stdout.write(self.style.SUCCESS('✅ Claves de búsqueda actualizadas'))
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/management/commands/recalcular_agregaciones_contractuales.py
+
+"""
+Recalcula contratos_activos, valor_promedio_negociado y uso_frecuente
+de los tarifarios oficiales ISS 2001 / SOAT 2025 a partir de tarifarios_cups
+
+Uso: python manage.py recalcular_agregaciones_contractuales [--codigos 890201 890301]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalogs.services_agregaciones_tarifarios import AgregacionesContractualesService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las agregaciones contractuales de los tarifarios oficiales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--codigos',
+            nargs='+',
+            help='Recalcular solo estos códigos (por defecto todo el catálogo)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔗 Recalculando agregaciones contractuales...')
+
+        try:
+            resultado = AgregacionesContractualesService().recalcular(options.get('codigos'))
+        except Exception as e:
+            raise CommandError(f'Error recalculando agregaciones: {str(e)}')
+
+        for coleccion, conteos in resultado.items():
+            self.stdout.write(
+                f'   📊 {coleccion}: {conteos["actualizados"]} códigos con contratos, '
+                f'{conteos["reiniciados"]} reiniciados'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Agregaciones contractuales actualizadas'))
@@ -5,6 +5,8 @@ from django.db import models
 from django_mongodb_backend.fields import ObjectIdAutoField
 from datetime import datetime
 
+from .utils import claves_busqueda
+
 class CatalogoCUPSOficial(models.Model):
     """
     Catálogo oficial CUPS (Clasificación Única de Procedimientos en Salud)
@@ -41,6 +43,10 @@ class CatalogoCUPSOficial(models.Model):
     fecha_actualizacion = models.DateTimeField()
     is_public_private = models.CharField(max_length=10, blank=True, null=True)
     
+    # Claves de búsqueda normalizadas (autocompletar por prefijos)
+    palabras_busqueda = models.JSONField(default=list, blank=True)
+    prefijos_busqueda = models.JSONField(default=list, blank=True)
+    
     # Campos de control
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -54,6 +60,12 @@ class CatalogoCUPSOficial(models.Model):
             models.Index(fields=['cobertura']),
         ]
     
+    def save(self, *args, **kwargs):
+        claves = claves_busqueda([self.nombre, self.descripcion])
+        self.palabras_busqueda = claves['palabras_busqueda']
+        self.prefijos_busqueda = claves['prefijos_busqueda']
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.codigo} - {self.nombre[:50]}"
 
@@ -93,6 +105,10 @@ class CatalogoCUMOficial(models.Model):
     fecha_actualizacion = models.DateTimeField()
     is_public_private = models.CharField(max_length=10, blank=True, null=True)
     
+    # Claves de búsqueda normalizadas (autocompletar por prefijos)
+    palabras_busqueda = models.JSONField(default=list, blank=True)
+    prefijos_busqueda = models.JSONField(default=list, blank=True)
+    
     # Campos de control
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -107,6 +123,12 @@ class CatalogoCUMOficial(models.Model):
             models.Index(fields=['via_administracion']),
         ]
     
+    def save(self, *args, **kwargs):
+        claves = claves_busqueda([self.nombre, self.principio_activo])
+        self.palabras_busqueda = claves['palabras_busqueda']
+        self.prefijos_busqueda = claves['prefijos_busqueda']
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.codigo} - {self.nombre[:50]}"
 
@@ -147,6 +169,10 @@ class CatalogoIUMOficial(models.Model):
     fecha_actualizacion = models.DateTimeField()
     is_public_private = models.CharField(max_length=10, blank=True, null=True)
     
+    # Claves de búsqueda normalizadas (autocompletar por prefijos)
+    palabras_busqueda = models.JSONField(default=list, blank=True)
+    prefijos_busqueda = models.JSONField(default=list, blank=True)
+    
     # Campos de control
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -161,6 +187,12 @@ class CatalogoIUMOficial(models.Model):
             models.Index(fields=['codigo_forma_farmaceutica']),
         ]
     
+    def save(self, *args, **kwargs):
+        claves = claves_busqueda([self.nombre, self.principio_activo])
+        self.palabras_busqueda = claves['palabras_busqueda']
+        self.prefijos_busqueda = claves['prefijos_busqueda']
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.codigo} - {self.principio_activo or 'N/A'}"
 
@@ -191,6 +223,10 @@ class CatalogoDispositivosOficial(models.Model):
     fecha_actualizacion = models.DateTimeField()
     is_public_private = models.CharField(max_length=10, blank=True, null=True)
     
+    # Claves de búsqueda normalizadas (autocompletar por prefijos)
+    palabras_busqueda = models.JSONField(default=list, blank=True)
+    prefijos_busqueda = models.JSONField(default=list, blank=True)
+    
     # Campos de control
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -203,6 +239,12 @@ class CatalogoDispositivosOficial(models.Model):
             models.Index(fields=['version_mipres']),
         ]
     
+    def save(self, *args, **kwargs):
+        claves = claves_busqueda([self.nombre, self.descripcion])
+        self.palabras_busqueda = claves['palabras_busqueda']
+        self.prefijos_busqueda = claves['prefijos_busqueda']
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.codigo} - {self.nombre[:50]}"
 
@@ -561,6 +603,7 @@ class TarifarioISS2001(models.Model):
     contratos_activos = models.IntegerField(default=0)  # Cantidad de contratos que usan este código
     valor_promedio_negociado = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)  # Promedio en contratos
     uso_frecuente = models.BooleanField(default=False, db_index=True)  # Si es usado en >5 contratos
+    fecha_agregacion_contractual = models.DateTimeField(null=True, blank=True)  # Último recálculo ($merge)
     
     # CONTROL DE VERSIONES
     manual_version = models.CharField(max_length=20, default='2001')
@@ -672,6 +715,7 @@ class TarifarioSOAT2025(models.Model):
     contratos_activos = models.IntegerField(default=0)  # Cantidad de contratos que usan este código
     valor_promedio_negociado = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)  # Promedio en contratos
     uso_frecuente = models.BooleanField(default=False, db_index=True)  # Si es usado en >5 contratos
+    fecha_agregacion_contractual = models.DateTimeField(null=True, blank=True)  # Último recálculo ($merge)
     
     # CONTROL DE VERSIONES
     manual_version = models.CharField(max_length=20, default='2025')
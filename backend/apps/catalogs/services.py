@@ -7,6 +7,7 @@ Servicios especializados para CUPS, CUM, IUM, Dispositivos y BDUA
 """
 
 from apps.core.services.mongodb_service import mongodb_service
+from .services_busqueda_catalogos import BusquedaCatalogosService
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import logging
@@ -27,18 +28,10 @@ class CatalogsService:
     
     def buscar_cups_avanzado(self, termino: str, filtros: Dict = None) -> List[Dict]:
         """
-        Búsqueda avanzada de códigos CUPS con filtros
+        Búsqueda avanzada de códigos CUPS con filtros (prefijos indexados)
         """
         try:
-            query = {"habilitado": True}
-            
-            # Búsqueda por código o descripción
-            if termino:
-                query["$or"] = [
-                    {"codigo": {"$regex": termino, "$options": "i"}},
-                    {"nombre": {"$regex": termino, "$options": "i"}},
-                    {"descripcion": {"$regex": termino, "$options": "i"}}
-                ]
+            query = {}
             
             # Aplicar filtros adicionales
             if filtros:
@@ -49,7 +42,16 @@ class CatalogsService:
                 if filtros.get('ambito'):
                     query["ambito"] = {"$in": [filtros['ambito'], 'Z']}  # Z = ambos ámbitos
             
-            resultados = list(self.mongodb.db.catalogo_cups_oficial.find(query).limit(100))
+            # Búsqueda por código o descripción
+            if termino:
+                resultados = BusquedaCatalogosService('cups').buscar(
+                    termino, limite=100, filtro=query, documento_completo=True
+                )
+            else:
+                query["habilitado"] = True
+                resultados = list(self.mongodb.db.catalogo_cups_oficial.find(
+                    query, {"palabras_busqueda": 0, "prefijos_busqueda": 0}
+                ).limit(100))
             
             # Convertir ObjectId a string
             for resultado in resultados:
@@ -114,45 +116,25 @@ class CatalogsService:
     
     def buscar_medicamento_unificado(self, termino: str, tipo: str = "AMBOS") -> List[Dict]:
         """
-        Búsqueda unificada en CUM e IUM con scoring
+        Búsqueda unificada en CUM e IUM con scoring (prefijos indexados)
         """
         try:
             resultados = []
             
-            # Búsqueda en CUM
+            catalogos = []
             if tipo in ["CUM", "AMBOS"]:
-                query_cum = {
-                    "habilitado": True,
-                    "$or": [
-                        {"codigo": {"$regex": termino, "$options": "i"}},
-                        {"nombre": {"$regex": termino, "$options": "i"}},
-                        {"principio_activo": {"$regex": termino, "$options": "i"}}
-                    ]
-                }
-                
-                medicamentos_cum = list(self.mongodb.db.catalogo_cum_oficial.find(query_cum).limit(50))
-                for med in medicamentos_cum:
-                    med['_id'] = str(med['_id'])
-                    med['tipo_catalogo'] = 'CUM'
-                    med['score'] = self._calcular_score_busqueda(termino, med)
-                    resultados.append(med)
-            
-            # Búsqueda en IUM
+                catalogos.append(("cum", "CUM"))
             if tipo in ["IUM", "AMBOS"]:
-                query_ium = {
-                    "habilitado": True,
-                    "$or": [
-                        {"codigo": {"$regex": termino, "$options": "i"}},
-                        {"nombre": {"$regex": termino, "$options": "i"}},
-                        {"principio_activo": {"$regex": termino, "$options": "i"}}
-                    ]
-                }
-                
-                medicamentos_ium = list(self.mongodb.db.catalogo_ium_oficial.find(query_ium).limit(50))
-                for med in medicamentos_ium:
+                catalogos.append(("ium", "IUM"))
+            
+            for catalogo, tipo_catalogo in catalogos:
+                medicamentos = BusquedaCatalogosService(catalogo).buscar(
+                    termino, limite=50, documento_completo=True
+                )
+                for med in medicamentos:
                     med['_id'] = str(med['_id'])
-                    med['tipo_catalogo'] = 'IUM'
-                    med['score'] = self._calcular_score_busqueda(termino, med)
+                    med['tipo_catalogo'] = tipo_catalogo
+                    med.setdefault('score', 0)
                     resultados.append(med)
             
             # Ordenar por score descendente
@@ -164,29 +146,6 @@ class CatalogsService:
             logger.error(f"Error búsqueda medicamento unificada: {e}")
             return []
     
-    def _calcular_score_busqueda(self, termino: str, medicamento: Dict) -> float:
-        """
-        Calcula score de relevancia para búsquedas
-        """
-        score = 0.0
-        termino_lower = termino.lower()
-        
-        # Score por coincidencia exacta en código (máxima prioridad)
-        if medicamento.get('codigo', '').lower() == termino_lower:
-            score += 100
-        elif termino_lower in medicamento.get('codigo', '').lower():
-            score += 50
-        
-        # Score por coincidencia en nombre
-        if termino_lower in medicamento.get('nombre', '').lower():
-            score += 30
-        
-        # Score por coincidencia en principio activo
-        if termino_lower in medicamento.get('principio_activo', '').lower():
-            score += 20
-        
-        return score
-    
     def validar_medicamento_pos_nopos(self, codigo_cum: str, tipo_usuario: str = "C") -> Dict:
         """
         Validación POS/No POS según tipo de usuario
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/services_agregaciones_tarifarios.py
+
+"""
+Agregaciones Contractuales - Tarifarios Oficiales ISS 2001 / SOAT 2025
+Mantiene precalculados contratos_activos, valor_promedio_negociado y uso_frecuente
+con pipelines $lookup/$group/$merge sobre tarifarios_cups
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from django.utils import timezone
+
+from apps.core.mongodb_config import get_mongodb
+
+logger = logging.getLogger(__name__)
+
+
+class AgregacionesContractualesService:
+    """
+    Servicio que precalcula los campos contractuales de los tarifarios oficiales.
+
+    Recorre tarifarios_cups (tarifas ACTIVAS de contratos vigentes), agrupa por
+    código y hace $merge sobre tarifario_iss_2001 y tarifario_soat_2025. Las
+    pantallas de consulta y estadísticas leen los campos ya calculados.
+    """
+
+    COLECCION_TARIFAS = 'tarifarios_cups'
+    COLECCION_CONTRATOS = 'contratacion_contratos'
+    COLECCIONES_OFICIALES = ('tarifario_iss_2001', 'tarifario_soat_2025')
+
+    # Estados de contrato que cuentan como activos para las agregaciones
+    ESTADOS_CONTRATO_ACTIVO = ['VIGENTE', 'POR_VENCER', 'EN_RENOVACION']
+
+    # Un código es de uso frecuente si aparece en más de N contratos
+    UMBRAL_USO_FRECUENTE = 5
+
+    def __init__(self):
+        self.db = get_mongodb().db
+
+    def recalcular(self, codigos: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Recalcula las agregaciones contractuales.
+
+        Sin códigos se recalcula el catálogo completo; con códigos solo se
+        tocan esos documentos (modo incremental).
+        """
+        if codigos is not None:
+            codigos = sorted({c for c in codigos if c})
+            if not codigos:
+                return {}
+
+        # MongoDB guarda fechas con precisión de milisegundos
+        ejecucion = timezone.now()
+        ejecucion = ejecucion.replace(microsecond=ejecucion.microsecond // 1000 * 1000)
+
+        resultado = {}
+        for coleccion in self.COLECCIONES_OFICIALES:
+            self.db[self.COLECCION_TARIFAS].aggregate(
+                self._pipeline_agregacion(coleccion, ejecucion, codigos)
+            )
+            reiniciados = self._reiniciar_sin_contratos(coleccion, ejecucion, codigos)
+            resultado[coleccion] = {
+                'actualizados': self.db[coleccion].count_documents(
+                    {'fecha_agregacion_contractual': ejecucion, 'contratos_activos': {'$gt': 0}}
+                ),
+                'reiniciados': reiniciados,
+            }
+
+        logger.info(f'Agregaciones contractuales recalculadas ({len(codigos) if codigos else "todos"} códigos): {resultado}')
+        return resultado
+
+    def _pipeline_agregacion(self, coleccion_destino: str, ejecucion, codigos=None) -> list:
+        """Pipeline tarifarios_cups -> contratos -> $group por código -> $merge"""
+        match = {'estado': 'ACTIVO'}
+        if codigos:
+            match['codigo_cups'] = {'$in': codigos}
+
+        return [
+            {'$match': match},
+
+            # Solo tarifas de contratos activos
+            {
+                '$lookup': {
+                    'from': self.COLECCION_CONTRATOS,
+                    'localField': 'contrato_numero',
+                    'foreignField': 'numero_contrato',
+                    'pipeline': [
+                        {'$match': {'estado': {'$in': self.ESTADOS_CONTRATO_ACTIVO}}},
+                        {'$project': {'_id': 1}}
+                    ],
+                    'as': 'contrato'
+                }
+            },
+            {'$match': {'contrato.0': {'$exists': True}}},
+
+            # Un contrato cuenta una sola vez por código
+            {
+                '$group': {
+                    '_id': '$codigo_cups',
+                    'contratos': {'$addToSet': '$contrato_numero'},
+                    'valor_promedio': {'$avg': '$valor_unitario'}
+                }
+            },
+            {
+                '$project': {
+                    '_id': 0,
+                    'codigo': '$_id',
+                    'contratos_activos': {'$size': '$contratos'},
+                    'valor_promedio_negociado': {'$round': ['$valor_promedio', 2]},
+                    'uso_frecuente': {'$gt': [{'$size': '$contratos'}, self.UMBRAL_USO_FRECUENTE]},
+                    'fecha_agregacion_contractual': ejecucion
+                }
+            },
+
+            # Solo actualiza códigos existentes en el tarifario oficial
+            {
+                '$merge': {
+                    'into': coleccion_destino,
+                    'on': 'codigo',
+                    'whenMatched': 'merge',
+                    'whenNotMatched': 'discard'
+                }
+            }
+        ]
+
+    def _reiniciar_sin_contratos(self, coleccion: str, ejecucion, codigos=None) -> int:
+        """Pone en cero los códigos que ya no tienen tarifas en contratos activos"""
+        filtro = {
+            'contratos_activos': {'$gt': 0},
+            'fecha_agregacion_contractual': {'$ne': ejecucion}
+        }
+        if codigos:
+            filtro['codigo'] = {'$in': codigos}
+
+        resultado = self.db[coleccion].update_many(filtro, {
+            '$set': {
+                'contratos_activos': 0,
+                'valor_promedio_negociado': None,
+                'uso_frecuente': False,
+                'fecha_agregacion_contractual': ejecucion
+            }
+        })
+        return resultado.modified_count
+
+
+# =======================================
+# RECÁLCULO INCREMENTAL
+# =======================================
+
+_estado_diferido = threading.local()
+
+
+def recalcular_codigos(codigos: Iterable[str]) -> None:
+    """
+    Recalcula las agregaciones de los códigos modificados.
+
+    Dentro de agregaciones_diferidas() los códigos se acumulan y se recalculan
+    en una sola pasada al salir del bloque.
+    """
+    codigos = set(codigos)
+    pendientes = getattr(_estado_diferido, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.update(codigos)
+        return
+
+    try:
+        AgregacionesContractualesService().recalcular(codigos)
+    except Exception as e:
+        logger.error(f'Error recalculando agregaciones contractuales {sorted(codigos)}: {str(e)}')
+
+
+@contextmanager
+def agregaciones_diferidas():
+    """
+    Acumula los códigos tocados por una carga masiva de tarifas y recalcula
+    una sola vez al final
+    """
+    if getattr(_estado_diferido, 'pendientes', None) is not None:
+        # Bloque anidado: el bloque externo hace el recálculo
+        yield
+        return
+
+    _estado_diferido.pendientes = set()
+    try:
+        yield
+    finally:
+        pendientes = _estado_diferido.pendientes
+        _estado_diferido.pendientes = None
+        if pendientes:
+            recalcular_codigos(pendientes)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/services_busqueda_catalogos.py
+
+"""
+Búsqueda indexada en catálogos oficiales (CUPS, CUM, IUM, Dispositivos)
+Claves normalizadas precalculadas al importar + prefijos en índice multikey,
+para autocompletar sin $regex sin anclar
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from apps.core.mongodb_config import get_collection
+from .utils import claves_busqueda, patron_prefijo_palabra, terminos_consulta
+
+logger = logging.getLogger(__name__)
+
+
+CATALOGOS_BUSQUEDA = {
+    'cups': {
+        'coleccion': 'catalogo_cups_oficial',
+        'campos': ['nombre', 'descripcion'],
+        'proyeccion': ['codigo', 'nombre', 'descripcion', 'es_quirurgico', 'sexo', 'ambito'],
+    },
+    'cum': {
+        'coleccion': 'catalogo_cum_oficial',
+        'campos': ['nombre', 'principio_activo'],
+        'proyeccion': ['codigo', 'nombre', 'principio_activo', 'via_administracion', 'registro_sanitario'],
+    },
+    'ium': {
+        'coleccion': 'catalogo_ium_oficial',
+        'campos': ['nombre', 'principio_activo'],
+        'proyeccion': ['codigo', 'nombre', 'principio_activo', 'forma_farmaceutica'],
+    },
+    'dispositivos': {
+        'coleccion': 'catalogo_dispositivos_oficial',
+        'campos': ['nombre', 'descripcion'],
+        'proyeccion': ['codigo', 'nombre', 'descripcion'],
+    },
+}
+
+INDICE_PREFIJOS = 'prefijos_busqueda_habilitado'
+
+_PATRON_CODIGO = re.compile(r'[0-9A-Za-z.\-]+')
+
+# Colecciones con claves de búsqueda ya construidas (caché por proceso)
+_colecciones_indexadas: Dict[str, tuple] = {}
+TTL_VERIFICACION_INDEXADO = 60
+
+
+class BusquedaCatalogosService:
+    """
+    Búsqueda por prefijos sobre claves normalizadas de un catálogo
+    """
+
+    LOTE_INDEXACION = 1000
+
+    def __init__(self, catalogo: str, coleccion: str = None):
+        if catalogo not in CATALOGOS_BUSQUEDA:
+            raise ValueError(f'Catálogo no soportado: {catalogo}')
+        self.catalogo = catalogo
+        self.config = CATALOGOS_BUSQUEDA[catalogo]
+        self.nombre_coleccion = coleccion or self.config['coleccion']
+        self.collection = get_collection(self.nombre_coleccion)
+
+    # =======================================
+    # INDEXACIÓN (al importar)
+    # =======================================
+
+    def claves(self, documento: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Claves de búsqueda para un documento del catálogo"""
+        return claves_busqueda(documento.get(campo) or '' for campo in self.config['campos'])
+
+    def indexar(self, solo_pendientes: bool = False) -> int:
+        """
+        Calcula palabras_busqueda / prefijos_busqueda para el catálogo
+        en lotes de bulk_write y asegura los índices
+        """
+        filtro = {}
+        if solo_pendientes:
+            # bulk_create no pasa por save(): quedan sin claves o con la lista vacía
+            filtro = {'$or': [
+                {'prefijos_busqueda': {'$exists': False}},
+                {'prefijos_busqueda': {'$size': 0}}
+            ]}
+        proyeccion = {campo: 1 for campo in self.config['campos']}
+
+        operaciones = []
+        total = 0
+        for documento in self.collection.find(filtro, proyeccion).batch_size(self.LOTE_INDEXACION):
+            operaciones.append(UpdateOne({'_id': documento['_id']}, {'$set': self.claves(documento)}))
+            if len(operaciones) >= self.LOTE_INDEXACION:
+                total += self.collection.bulk_write(operaciones, ordered=False).modified_count
+                operaciones = []
+
+        if operaciones:
+            total += self.collection.bulk_write(operaciones, ordered=False).modified_count
+
+        self.asegurar_indices()
+        logger.info(f'Claves de búsqueda {self.nombre_coleccion}: {total} documentos actualizados')
+        return total
+
+    def asegurar_indices(self):
+        """Índice multikey de prefijos (la búsqueda no usa $text)"""
+        self.collection.create_index(
+            [('prefijos_busqueda', 1), ('habilitado', 1)],
+            name=INDICE_PREFIJOS
+        )
+        _colecciones_indexadas[self.nombre_coleccion] = (True, time.monotonic())
+
+    def esta_indexado(self) -> bool:
+        """True si la colección ya tiene el índice de prefijos"""
+        indexado, verificado_en = _colecciones_indexadas.get(self.nombre_coleccion, (False, None))
+        if indexado or (verificado_en is not None and time.monotonic() - verificado_en < TTL_VERIFICACION_INDEXADO):
+            return indexado
+
+        indexado = INDICE_PREFIJOS in self.collection.index_information()
+        _colecciones_indexadas[self.nombre_coleccion] = (indexado, time.monotonic())
+        if not indexado:
+            logger.warning(
+                f'{self.nombre_coleccion} sin claves de búsqueda; '
+                f'ejecutar: python manage.py indexar_busqueda_catalogos --catalogo {self.catalogo}'
+            )
+        return indexado
+
+    # =======================================
+    # BÚSQUEDA
+    # =======================================
+
+    def buscar(self, texto: str, limite: int = 20, filtro: Optional[Dict] = None,
+               proyeccion: Optional[List[str]] = None, documento_completo: bool = False,
+               campos: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Autocompletar: cada término de la consulta debe ser prefijo de alguna
+        palabra del registro. Los códigos se buscan por prefijo anclado.
+        Resultados ordenados por relevancia (campo score).
+        documento_completo devuelve todos los campos salvo las claves de búsqueda.
+        campos restringe la coincidencia a esos campos (sin búsqueda por código).
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return []
+
+        if documento_completo:
+            proyeccion_final = {'palabras_busqueda': 0, 'prefijos_busqueda': 0}
+        else:
+            proyeccion_final = dict({campo: 1 for campo in proyeccion or self.config['proyeccion']}, score=1)
+
+        if not self.esta_indexado():
+            return self._buscar_sin_indice(texto, limite, filtro, proyeccion_final, campos)
+
+        terminos = terminos_consulta(texto)
+        codigo = texto.upper() if not campos and self._parece_codigo(texto) else None
+
+        condiciones = []
+        if terminos:
+            condiciones.append({'prefijos_busqueda': {'$all': terminos}})
+        if codigo:
+            condiciones.append({'codigo': {'$regex': f'^{re.escape(codigo)}'}})
+        if not condiciones:
+            return []
+
+        match = {'habilitado': True}
+        match.update(filtro or {})
+        if len(condiciones) == 1:
+            match.update(condiciones[0])
+        else:
+            match['$or'] = condiciones
+        if campos:
+            # Los prefijos mezclan todos los campos: el índice acota y cada
+            # término debe iniciar una palabra de alguno de los campos pedidos
+            match.setdefault('$and', []).extend(
+                {'$or': [
+                    {campo: {'$regex': patron_prefijo_palabra(termino), '$options': 'i'}}
+                    for campo in campos
+                ]}
+                for termino in terminos
+            )
+
+        # Se puntúan todos los candidatos antes de cortar: $sort + $limit
+        # conserva solo los `limite` mejores en memoria
+        pipeline = [
+            {'$match': match},
+            {'$addFields': {'score': self._expresion_relevancia(terminos, codigo)}},
+            {'$sort': {'score': -1, 'codigo': 1}},
+            {'$limit': limite},
+            {'$project': proyeccion_final}
+        ]
+        return list(self.collection.aggregate(pipeline))
+
+    def buscar_codigos(self, texto: str, limite: int = 50, filtro: Optional[Dict] = None,
+                       campos: Optional[List[str]] = None) -> List[str]:
+        """Códigos ordenados por relevancia (para vistas que devuelven modelos Django)"""
+        return [doc['codigo'] for doc in self.buscar(texto, limite, filtro, proyeccion=['codigo'], campos=campos)]
+
+    @staticmethod
+    def _parece_codigo(texto: str) -> bool:
+        return bool(_PATRON_CODIGO.fullmatch(texto)) and any(c.isdigit() for c in texto)
+
+    @staticmethod
+    def _expresion_relevancia(terminos: List[str], codigo: Optional[str]) -> Dict:
+        """
+        Puntaje: código exacto (100) > prefijo de código (50) > palabras completas
+        (10 c/u) > primera palabra coincide (5); penaliza descripciones largas
+        """
+        componentes = []
+        if codigo:
+            componentes.append({'$cond': [{'$eq': ['$codigo', codigo]}, 100, 0]})
+            componentes.append({'$cond': [
+                {'$eq': [{'$indexOfBytes': [{'$ifNull': ['$codigo', '']}, codigo]}, 0]}, 50, 0
+            ]})
+        if terminos:
+            componentes.append({'$multiply': [10, {'$size': {'$setIntersection': [
+                {'$ifNull': ['$palabras_busqueda', []]}, terminos
+            ]}}]})
+            componentes.append({'$cond': [
+                {'$eq': [{'$indexOfBytes': [
+                    {'$ifNull': [{'$arrayElemAt': ['$palabras_busqueda', 0]}, '']}, terminos[0]
+                ]}, 0]}, 5, 0
+            ]})
+        componentes.append({'$multiply': [-0.1, {'$size': {'$ifNull': ['$palabras_busqueda', []]}}]})
+        return {'$add': componentes}
+
+    def _buscar_sin_indice(self, texto: str, limite: int, filtro: Optional[Dict],
+                           proyeccion: Dict, campos: Optional[List[str]] = None) -> List[Dict]:
+        """Búsqueda previa con $regex mientras el catálogo no esté indexado"""
+        patron = re.escape(texto)
+        match = {'habilitado': True}
+        match.update(filtro or {})
+        match['$or'] = ([] if campos else [{'codigo': {'$regex': patron}}]) + [
+            {campo: {'$regex': patron, '$options': 'i'}} for campo in campos or self.config['campos']
+        ]
+        return list(self.collection.find(match, proyeccion).limit(limite))
+
+
+def ordenar_por_codigos(objetos, codigos: List[str]) -> list:
+    """Reordena instancias de modelo según el orden de relevancia de la búsqueda"""
+    posicion = {codigo: i for i, codigo in enumerate(codigos)}
+    return sorted(objetos, key=lambda obj: posicion.get(obj.codigo, len(posicion)))
+
@@ -17,6 +17,7 @@ from .models import (
     CatalogoCUPSOficial, CatalogoCUMOficial, CatalogoIUMOficial,
     CatalogoDispositivosOficial, BDUAAfiliados, Prestadores, Contratos
 )
+from .services_busqueda_catalogos import BusquedaCatalogosService, ordenar_por_codigos
 
 logger = logging.getLogger(__name__)
 
@@ -129,16 +130,12 @@ class CatalogoCUPSService:
     @staticmethod
     def buscar_cups_por_texto(texto_busqueda: str, limite: int = 50) -> List[CatalogoCUPSOficial]:
         """
-        Búsqueda de códigos CUPS usando filter() con Q objects
+        Búsqueda de códigos CUPS por prefijos indexados, ordenada por relevancia
         """
-        return list(
-            CatalogoCUPSOficial.objects.filter(
-                Q(habilitado=True) & (
-                    Q(nombre__icontains=texto_busqueda) |
-                    Q(descripcion__icontains=texto_busqueda) |
-                    Q(codigo__icontains=texto_busqueda)
-                )
-            )[:limite]
+        codigos = BusquedaCatalogosService('cups').buscar_codigos(texto_busqueda, limite=limite)
+        return ordenar_por_codigos(
+            CatalogoCUPSOficial.objects.filter(codigo__in=codigos, habilitado=True),
+            codigos
         )
     
     @staticmethod
@@ -189,6 +186,9 @@ class CatalogoCUPSService:
                     ignore_conflicts=True  # Ignorar duplicados
                 )
                 
+                # Claves de búsqueda para los registros nuevos
+                BusquedaCatalogosService('cups').indexar(solo_pendientes=True)
+                
                 return {
                     'exito': True,
                     'registros_insertados': len(cups_creados),
@@ -296,13 +296,14 @@ class CatalogoCUMService:
     @staticmethod
     def buscar_medicamentos_por_principio_activo(principio_activo: str, limite: int = 50) -> List[CatalogoCUMOficial]:
         """
-        Búsqueda por principio activo usando filter()
+        Búsqueda por principio activo (prefijos indexados), ordenada por relevancia
         """
-        return list(
-            CatalogoCUMOficial.objects.filter(
-                Q(habilitado=True) &
-                Q(principio_activo__icontains=principio_activo)
-            )[:limite]
+        codigos = BusquedaCatalogosService('cum').buscar_codigos(
+            principio_activo, limite=limite, campos=['principio_activo']
+        )
+        return ordenar_por_codigos(
+            CatalogoCUMOficial.objects.filter(codigo__in=codigos, habilitado=True),
+            codigos
         )
 
 
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/services_equivalencias_tarifarios.py
+
+"""
+Equivalencias ISS 2001 -> SOAT 2025
+Índice invertido BM25 sobre descripciones normalizadas (sin acentos, raíces ligeras).
+Se construye al importar los tarifarios en la colección indice_equivalencias_tarifarios
+y cada proceso lo mantiene en memoria.
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import Decimal128, ObjectId
+
+from apps.core.mongodb_config import get_mongodb
+from .utils import raiz_termino, tokenizar
+
+logger = logging.getLogger(__name__)
+
+COLECCION_INDICE = 'indice_equivalencias_tarifarios'
+
+COLECCIONES_MANUALES = {
+    'ISS': 'tarifario_iss_2001',
+    'SOAT': 'tarifario_soat_2025',
+}
+
+# Tipo ISS -> tipo SOAT equivalente (desempate a favor de la misma categoría)
+MAPEO_TIPO_ISS_SOAT = {
+    'quirurgico': 'procedimientos_quirurgicos',
+    'diagnostico': 'examenes_diagnosticos',
+    'consulta': 'consultas',
+    'internacion': 'estancias',
+    'conjunto_integral': 'conjuntos_integrales',
+    'servicio_profesional': 'otros_servicios',
+    'derecho_sala': 'otros_servicios',
+    'otro_servicio': 'otros_servicios',
+}
+
+# Cada cuánto un proceso verifica si el índice persistido cambió (segundos)
+TTL_VERIFICACION_INDICE = 300
+
+
+def terminos_busqueda(descripcion: str) -> List[str]:
+    """Raíces normalizadas usadas como términos del índice"""
+    return [raiz_termino(palabra) for palabra in tokenizar(descripcion)]
+
+
+class IndiceBM25:
+    """
+    Índice invertido en memoria con puntuación Okapi BM25
+    """
+
+    K1 = 1.2
+    B = 0.75
+    BONO_MISMO_TIPO = 1.1
+
+    def __init__(self, documentos: List[Dict]):
+        self.documentos = documentos
+        self.por_codigo = {doc['codigo']: i for i, doc in enumerate(documentos)}
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.longitudes = []
+
+        for i, doc in enumerate(documentos):
+            terminos = doc.get('terminos') or []
+            self.longitudes.append(len(terminos))
+            for termino, frecuencia in Counter(terminos).items():
+                self.postings[termino].append((i, frecuencia))
+
+        total = len(documentos)
+        self.longitud_promedio = (sum(self.longitudes) / total) if total else 1.0
+        self.idf = {
+            termino: math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+            for termino, lista in self.postings.items()
+        }
+
+    def buscar(self, terminos: Iterable[str], limite: int = 10,
+               tipo_preferido: Optional[str] = None) -> List[Tuple[Dict, float]]:
+        """
+        Devuelve [(documento, similitud)] ordenado por relevancia.
+        La similitud se normaliza contra el puntaje máximo alcanzable por la consulta.
+        """
+        terminos = set(terminos)
+        puntajes: Dict[int, float] = defaultdict(float)
+        puntaje_maximo = 0.0
+
+        for termino in terminos:
+            idf = self.idf.get(termino)
+            if not idf:
+                continue
+            puntaje_maximo += idf * (self.K1 + 1)
+            for i, frecuencia in self.postings[termino]:
+                normalizacion = self.K1 * (1 - self.B + self.B * self.longitudes[i] / self.longitud_promedio)
+                puntajes[i] += idf * frecuencia * (self.K1 + 1) / (frecuencia + normalizacion)
+
+        if not puntajes:
+            return []
+
+        if tipo_preferido:
+            for i in puntajes:
+                if self.documentos[i].get('tipo') == tipo_preferido:
+                    puntajes[i] *= self.BONO_MISMO_TIPO
+
+        # Orden determinístico: mayor puntaje, luego código
+        mejores = heapq.nsmallest(
+            limite, puntajes.items(),
+            key=lambda item: (-item[1], self.documentos[item[0]]['codigo'])
+        )
+        return [
+            (self.documentos[i], round(min(puntaje / puntaje_maximo, 1.0), 4))
+            for i, puntaje in mejores
+        ]
+
+
+class EquivalenciasTarifariosService:
+    """
+    Construcción del índice persistido y búsqueda de equivalencias ISS -> SOAT
+    """
+
+    def __init__(self):
+        self.db = get_mongodb().db
+
+    # =======================================
+    # CONSTRUCCIÓN (al importar tarifarios)
+    # =======================================
+
+    def construir_indice(self) -> Dict[str, int]:
+        """
+        Reconstruye indice_equivalencias_tarifarios desde los tarifarios oficiales.
+        Se escribe en una colección temporal y se renombra (reemplazo atómico).
+        """
+        version = str(ObjectId())
+        temporal = self.db[f'{COLECCION_INDICE}_tmp']
+        temporal.drop()
+
+        conteos = {}
+        for manual in COLECCIONES_MANUALES:
+            documentos = self._documentos_desde_tarifario(manual)
+            for doc in documentos:
+                doc['version'] = version
+            if documentos:
+                temporal.insert_many(documentos, ordered=False)
+            conteos[manual] = len(documentos)
+
+        temporal.create_index([('manual', 1), ('codigo', 1)], unique=True)
+        temporal.rename(COLECCION_INDICE, dropTarget=True)
+
+        _invalidar_cache()
+        logger.info(f'Índice de equivalencias construido (versión {version}): {conteos}')
+        return conteos
+
+    def _documentos_desde_tarifario(self, manual: str) -> List[Dict]:
+        """Documentos del índice con términos precalculados y valor de referencia"""
+        cursor = self.db[COLECCIONES_MANUALES[manual]].find(
+            {},
+            {'_id': 0, 'codigo': 1, 'descripcion': 1, 'tipo': 1,
+             'uvr': 1, 'valor_2025_uvb': 1, 'valor_calculado': 1}
+        )
+
+        documentos = []
+        for registro in cursor:
+            descripcion = registro.get('descripcion') or ''
+            documentos.append({
+                'manual': manual,
+                'codigo': registro['codigo'],
+                'descripcion': descripcion,
+                'tipo': registro.get('tipo'),
+                'valor_referencia': self._valor_referencia(manual, registro),
+                'terminos': terminos_busqueda(descripcion),
+            })
+        return documentos
+
+    @staticmethod
+    def _valor_referencia(manual: str, registro: Dict) -> float:
+        """Mismo cálculo que valor_referencia_actual de los modelos"""
+        def a_float(valor):
+            if isinstance(valor, Decimal128):
+                valor = valor.to_decimal()
+            return float(valor) if valor is not None else None
+
+        if manual == 'ISS' and a_float(registro.get('uvr')):
+            return a_float(registro['uvr']) * 1270
+        if manual == 'SOAT' and a_float(registro.get('valor_2025_uvb')):
+            return a_float(registro['valor_2025_uvb'])
+        return a_float(registro.get('valor_calculado')) or 0.0
+
+    # =======================================
+    # CARGA EN MEMORIA
+    # =======================================
+
+    def cargar_indices(self) -> Tuple[Optional[str], Dict[str, IndiceBM25]]:
+        """
+        Carga el índice persistido. Si aún no se ha construido, se arma en memoria
+        directamente desde los tarifarios.
+        """
+        coleccion = self.db[COLECCION_INDICE]
+        documentos_por_manual = {manual: [] for manual in COLECCIONES_MANUALES}
+        version = None
+
+        for doc in coleccion.find({}, {'_id': 0}):
+            version = doc.get('version')
+            documentos_por_manual.setdefault(doc['manual'], []).append(doc)
+
+        if version is None:
+            logger.warning('Índice de equivalencias no construido, generando en memoria desde tarifarios')
+            documentos_por_manual = {
+                manual: self._documentos_desde_tarifario(manual) for manual in COLECCIONES_MANUALES
+            }
+
+        return version, {
+            manual: IndiceBM25(documentos) for manual, documentos in documentos_por_manual.items()
+        }
+
+    def version_persistida(self) -> Optional[str]:
+        doc = self.db[COLECCION_INDICE].find_one({}, {'_id': 0, 'version': 1})
+        return doc.get('version') if doc else None
+
+    # =======================================
+    # BÚSQUEDA
+    # =======================================
+
+    def buscar_equivalentes_soat(self, descripcion: str = None, codigo_iss: str = None,
+                                 limite: int = 10) -> Dict:
+        """
+        Candidatos SOAT para un código ISS o una descripción libre.
+        Retorna None en 'iss' si el código ISS no existe en el índice.
+        """
+        indices = obtener_indices()
+        iss = None
+        tipo_preferido = None
+
+        if codigo_iss:
+            indice_iss = indices['ISS']
+            posicion = indice_iss.por_codigo.get(codigo_iss)
+            if posicion is not None:
+                iss = indice_iss.documentos[posicion]
+                tipo_preferido = MAPEO_TIPO_ISS_SOAT.get(iss.get('tipo'))
+                if not descripcion:
+                    descripcion = iss['descripcion']
+
+        terminos = terminos_busqueda(descripcion or '')
+        candidatos = indices['SOAT'].buscar(terminos, limite=limite, tipo_preferido=tipo_preferido)
+
+        return {
+            'iss': iss,
+            'descripcion': descripcion,
+            'palabras_clave': tokenizar(descripcion or ''),
+            'candidatos': candidatos,
+        }
+
+    def mapear_codigos_iss(self, codigos: List[str], limite: int = 1,
+                           similitud_minima: float = 0.0) -> Dict:
+        """
+        Mapeo masivo ISS -> SOAT para migraciones de contratos.
+        Todo se resuelve en memoria; no hay consultas por código.
+        """
+        indices = obtener_indices()
+        indice_iss, indice_soat = indices['ISS'], indices['SOAT']
+
+        equivalencias = []
+        no_encontrados = []
+        sin_equivalente = []
+
+        for codigo in dict.fromkeys(codigos):  # sin duplicados, conserva orden
+            posicion = indice_iss.por_codigo.get(codigo)
+            if posicion is None:
+                no_encontrados.append(codigo)
+                continue
+
+            iss = indice_iss.documentos[posicion]
+            candidatos = [
+                {
+                    'codigo_soat': soat['codigo'],
+                    'descripcion': soat['descripcion'],
+                    'tipo': soat.get('tipo'),
+                    'valor_referencia': soat.get('valor_referencia'),
+                    'similitud': similitud,
+                }
+                for soat, similitud in indice_soat.buscar(
+                    iss.get('terminos') or [],
+                    limite=limite,
+                    tipo_preferido=MAPEO_TIPO_ISS_SOAT.get(iss.get('tipo'))
+                )
+                if similitud >= similitud_minima
+            ]
+
+            if not candidatos:
+                sin_equivalente.append(codigo)
+
+            equivalencias.append({
+                'codigo_iss': codigo,
+                'descripcion_iss': iss['descripcion'],
+                'valor_referencia_iss': iss.get('valor_referencia'),
+                'candidatos': candidatos,
+            })
+
+        return {
+            'total_solicitados': len(codigos),
+            'total_mapeados': len(equivalencias) - len(sin_equivalente),
+            'no_encontrados': no_encontrados,
+            'sin_equivalente': sin_equivalente,
+            'equivalencias': equivalencias,
+        }
+
+
+# =======================================
+# CACHÉ POR PROCESO
+# =======================================
+
+_cache_indices = {'version': None, 'indices': None, 'verificado_en': 0.0}
+_lock_indices = threading.Lock()
+
+
+def _invalidar_cache():
+    with _lock_indices:
+        _cache_indices.update({'version': None, 'indices': None, 'verificado_en': 0.0})
+
+
+def obtener_indices() -> Dict[str, IndiceBM25]:
+    """
+    Índices BM25 del proceso. Se recargan cuando cambia la versión persistida
+    (verificada como máximo cada TTL_VERIFICACION_INDICE segundos).
+    """
+    ahora = time.monotonic()
+    if _cache_indices['indices'] is not None and ahora - _cache_indices['verificado_en'] < TTL_VERIFICACION_INDICE:
+        return _cache_indices['indices']
+
+    with _lock_indices:
+        if _cache_indices['indices'] is not None and ahora - _cache_indices['verificado_en'] < TTL_VERIFICACION_INDICE:
+            return _cache_indices['indices']
+
+        servicio = EquivalenciasTarifariosService()
+        version = servicio.version_persistida()
+        if _cache_indices['indices'] is None or version is None or version != _cache_indices['version']:
+            version, indices = servicio.cargar_indices()
+            _cache_indices['indices'] = indices
+            _cache_indices['version'] = version
+
+        _cache_indices['verificado_en'] = time.monotonic()
+        return _cache_indices['indices']
@@ -13,6 +13,8 @@ from pymongo.errors import BulkWriteError, DuplicateKeyError
 import logging
 
 from apps.core.mongodb_config import get_collection
+from .services_busqueda_catalogos import BusquedaCatalogosService
+from .utils import claves_busqueda
 
 logger = logging.getLogger(__name__)
 
@@ -138,37 +140,14 @@ class CatalogosCUPSService:
     
     def buscar_cups_por_texto(self, texto_busqueda: str, limite: int = 50) -> List[Dict]:
         """
-        Búsqueda de códigos CUPS por texto en nombre o descripción
+        Búsqueda de códigos CUPS por prefijos de nombre/descripción o código
+        (índice multikey sobre claves normalizadas)
         """
-        pipeline = [
-            {
-                '$match': {
-                    '$and': [
-                        {'habilitado': True},
-                        {
-                            '$or': [
-                                {'nombre': {'$regex': texto_busqueda, '$options': 'i'}},
-                                {'descripcion': {'$regex': texto_busqueda, '$options': 'i'}},
-                                {'codigo': {'$regex': texto_busqueda}}
-                            ]
-                        }
-                    ]
-                }
-            },
-            {
-                '$project': {
-                    'codigo': 1,
-                    'nombre': 1,
-                    'descripcion': 1,
-                    'es_quirurgico': 1,
-                    'sexo': 1,
-                    'ambito': 1
-                }
-            },
-            {'$limit': limite}
-        ]
-        
-        return list(self.collection.aggregate(pipeline))
+        return BusquedaCatalogosService('cups', coleccion='catalogos_cups').buscar(
+            texto_busqueda,
+            limite=limite,
+            proyeccion=['codigo', 'nombre', 'descripcion', 'es_quirurgico', 'sexo', 'ambito']
+        )
     
     def cargar_masivo_cups(self, datos_cups: List[Dict]) -> Dict[str, Any]:
         """
@@ -211,6 +190,7 @@ class CatalogosCUPSService:
                         'created_at': datetime.now(),
                         'updated_at': datetime.now()
                     }
+                    documento.update(claves_busqueda([documento['nombre'], documento['descripcion']]))
                     
                     documentos.append(documento)
                     
@@ -223,6 +203,7 @@ class CatalogosCUPSService:
             
             if documentos:
                 resultado_bulk = self.collection.insert_many(documentos, ordered=False)
+                BusquedaCatalogosService('cups', coleccion='catalogos_cups').asegurar_indices()
                 
                 return {
                     'exito': True,
@@ -382,6 +363,7 @@ class CatalogosCUMService:
                         'created_at': datetime.now(),
                         'updated_at': datetime.now()
                     }
+                    documento.update(claves_busqueda([documento['nombre'], documento.get('principio_activo')]))
                     
                     documentos.append(documento)
                     
@@ -394,6 +376,7 @@ class CatalogosCUMService:
             
             if documentos:
                 resultado_bulk = self.collection.insert_many(documentos, ordered=False)
+                BusquedaCatalogosService('cum', coleccion='catalogos_cum').asegurar_indices()
                 
                 return {
                     'exito': True,
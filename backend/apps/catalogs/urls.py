@@ -14,6 +14,7 @@ router.register(r'bdua', views.BDUAAfiliadosViewSet, basename='bdua')
 router.register(r'prestadores', views.PrestadoresViewSet, basename='prestadores')
 router.register(r'contratos', views.ContratosViewSet, basename='contratos')
 router.register(r'validation', views.ValidationEngineViewSet, basename='validation')
+router.register(r'busqueda', views.BusquedaCatalogosViewSet, basename='busqueda')
 
 app_name = 'catalogs'
 
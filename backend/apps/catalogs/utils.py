@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# apps/catalogs/utils.py
+
+"""
+Utilidades de normalización de texto para búsquedas en catálogos y tarifarios
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List
+
+# Palabras a ignorar (stop words médicas)
+STOP_WORDS = {
+    'de', 'la', 'el', 'con', 'por', 'para', 'en', 'y', 'o', 'del', 'al',
+    'los', 'las', 'un', 'una', 'sin', 'se', 'su', 'sus', 'que', 'a', 'e', 'u'
+}
+
+_PATRON_PALABRA = re.compile(r'[a-z0-9]+')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Remueve acentos y pasa a minúsculas"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('utf-8')
+    return texto.lower()
+
+
+def raiz_termino(palabra: str) -> str:
+    """
+    Raíz ligera para español: quita plurales y recorta a 7 caracteres,
+    suficiente para que 'resecciones' y 'reseccion' coincidan
+    """
+    if len(palabra) > 4 and palabra.endswith('es'):
+        palabra = palabra[:-2]
+    elif len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    return palabra[:7]
+
+
+def tokenizar(texto: str, longitud_minima: int = 3) -> List[str]:
+    """Tokens normalizados (sin acentos, minúsculas, sin stop words)"""
+    return [
+        palabra for palabra in _PATRON_PALABRA.findall(normalizar_texto(texto))
+        if len(palabra) >= longitud_minima and palabra not in STOP_WORDS
+    ]
+
+
+# Longitudes de prefijo indexadas para autocompletar
+LONGITUD_MINIMA_PREFIJO = 2
+LONGITUD_MAXIMA_PREFIJO = 12
+
+
+def claves_busqueda(textos: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Claves de búsqueda precalculadas para un registro de catálogo:
+    - palabras_busqueda: palabras completas normalizadas
+    - prefijos_busqueda: prefijos de cada palabra (índice multikey)
+    """
+    palabras = []
+    for texto in textos:
+        for palabra in tokenizar(texto, longitud_minima=LONGITUD_MINIMA_PREFIJO):
+            if palabra not in palabras:
+                palabras.append(palabra)
+
+    prefijos = set()
+    for palabra in palabras:
+        for longitud in range(LONGITUD_MINIMA_PREFIJO, min(len(palabra), LONGITUD_MAXIMA_PREFIJO) + 1):
+            prefijos.add(palabra[:longitud])
+
+    return {
+        'palabras_busqueda': palabras,
+        'prefijos_busqueda': sorted(prefijos),
+    }
+
+
+def terminos_consulta(texto: str) -> List[str]:
+    """Términos de una consulta de autocompletar, recortados al prefijo indexado"""
+    terminos = []
+    for palabra in tokenizar(texto, longitud_minima=LONGITUD_MINIMA_PREFIJO):
+        palabra = palabra[:LONGITUD_MAXIMA_PREFIJO]
+        if palabra not in terminos:
+            terminos.append(palabra)
+    return terminos
+
+
+# Letras que normalizar_texto reduce a su forma sin acento
+_VARIANTES_LETRA = {
+    'a': 'aáàäâÁÀÄÂ', 'e': 'eéèëêÉÈËÊ', 'i': 'iíìïîÍÌÏÎ', 'o': 'oóòöôÓÒÖÔ',
+    'u': 'uúùüûÚÙÜÛ', 'n': 'nñÑ', 'c': 'cçÇ'
+}
+
+
+def patron_prefijo_palabra(termino: str) -> str:
+    """
+    $regex (con $options 'i') que encuentra el término normalizado al inicio
+    de una palabra del texto original, con o sin acentos
+    """
+    letras = ''.join(
+        f'[{_VARIANTES_LETRA[letra]}]' if letra in _VARIANTES_LETRA else re.escape(letra)
+        for letra in termino
+    )
+    return f'(^|[^0-9a-zA-ZÀ-ÿ]){letras}'
@@ -36,6 +36,9 @@ from .serializers import (
 
 # Services
 from .services import catalogs_service
+from .services_busqueda_catalogos import (
+    CATALOGOS_BUSQUEDA, BusquedaCatalogosService, ordenar_por_codigos
+)
 from apps.core.services.mongodb_service import mongodb_service
 
 logger = logging.getLogger(__name__)
@@ -199,10 +202,12 @@ class CatalogoCUMOficialViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        medicamentos = CatalogoCUMOficial.objects.filter(
-            principio_activo__icontains=principio,
-            habilitado=True
-        )[:50]  # Limitar a 50 resultados
+        # Prefijos indexados, ordenados por relevancia
+        codigos = BusquedaCatalogosService('cum').buscar_codigos(principio, limite=50, campos=['principio_activo'])
+        medicamentos = ordenar_por_codigos(
+            CatalogoCUMOficial.objects.filter(codigo__in=codigos, habilitado=True),
+            codigos
+        )
         
         serializer = self.get_serializer(medicamentos, many=True)
         return Response(serializer.data)
@@ -567,4 +572,57 @@ class ValidationEngineViewSet(viewsets.ViewSet):
             return Response(
                 {'error': f'Error obteniendo estadísticas: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class BusquedaCatalogosViewSet(viewsets.ViewSet):
+    """
+    ViewSet de autocompletar sobre catálogos oficiales
+    Usa las claves de prefijo precalculadas (índice multikey)
+    """
+    
+    LIMITE_MAXIMO = 50
+    
+    @action(detail=False, methods=['get'])
+    def autocompletar(self, request):
+        """
+        Autocompletar por código o descripción
+        Parámetros: catalogo (cups|cum|ium|dispositivos), q, limite
+        """
+        catalogo = request.query_params.get('catalogo', 'cups')
+        texto = request.query_params.get('q', '').strip()
+        
+        if catalogo not in CATALOGOS_BUSQUEDA:
+            return Response(
+                {'error': f'Catálogo no soportado. Opciones: {", ".join(CATALOGOS_BUSQUEDA)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(texto) < 2:
+            return Response(
+                {'error': 'El parámetro q debe tener al menos 2 caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limite = min(max(int(request.query_params.get('limite', 20)), 1), self.LIMITE_MAXIMO)
+        except ValueError:
+            limite = 20
+        
+        try:
+            resultados = BusquedaCatalogosService(catalogo).buscar(texto, limite=limite)
+            for resultado in resultados:
+                resultado['_id'] = str(resultado['_id'])
+            
+            return Response({
+                'catalogo': catalogo,
+                'consulta': texto,
+                'total': len(resultados),
+                'resultados': resultados
+            })
+            
+        except Exception as e:
+            logger.error(f"Error autocompletar {catalogo}: {str(e)}")
+            return Response(
+                {'error': f'Error en búsqueda: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -6,9 +6,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.db.models import Q, Count, Avg
-from django.http import HttpResponse
-import csv
-import json
 
 from .models import TarifarioISS2001, TarifarioSOAT2025
 from .serializers_tarifarios import (
@@ -16,8 +13,68 @@ from .serializers_tarifarios import (
     TarifarioISS2001ListSerializer, TarifarioSOAT2025ListSerializer
 )
 from .renderers import MongoJSONRenderer
+from .services_equivalencias_tarifarios import EquivalenciasTarifariosService
+from apps.core.exportacion import (
+    LOTE_EXPORTACION, ExportacionNoDisponible, en_lotes, respuesta_exportacion, solicita_gzip,
+    tipos_modelo
+)
+
+
+class ExportacionTarifarioMixin:
+    """
+    Exportación en streaming de tarifarios oficiales
+    Formatos: csv (default), json, parquet, arrow. ?comprimir=gzip comprime al vuelo.
+    El cursor se recorre por lotes y solo con los campos exportados.
+    """
+    nombre_exportacion = None
+    columnas_csv = []  # [(campo, encabezado)]
+    export_serializer_class = None
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exportar tarifario oficial"""
+        formato = request.query_params.get('formato', 'csv')
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        try:
+            if formato == 'csv':
+                campos = [campo for campo, _ in self.columnas_csv]
+                return respuesta_exportacion(
+                    formato, self.nombre_exportacion, self.columnas_csv,
+                    filas=queryset.values_list(*campos).iterator(chunk_size=LOTE_EXPORTACION),
+                    comprimir=solicita_gzip(request)
+                )
+            
+            if formato == 'json':
+                return respuesta_exportacion(
+                    formato, self.nombre_exportacion, [],
+                    documentos=self._documentos_serializados(queryset),
+                    comprimir=solicita_gzip(request)
+                )
+            
+            # Parquet / Arrow: valores numéricos nativos para análisis
+            campos = [
+                campo for campo in self.export_serializer_class.Meta.fields
+                if campo != 'valor_referencia_actual'
+            ]
+            return respuesta_exportacion(
+                formato, self.nombre_exportacion, [(campo, campo) for campo in campos],
+                documentos=queryset.values(*campos).iterator(chunk_size=LOTE_EXPORTACION),
+                comprimir=solicita_gzip(request),
+                tipos=tipos_modelo(queryset.model, campos)
+            )
+            
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ExportacionNoDisponible as e:
+            return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    
+    def _documentos_serializados(self, queryset):
+        """Misma representación que el listado, serializada por lotes"""
+        for lote in en_lotes(queryset.iterator(chunk_size=LOTE_EXPORTACION)):
+            yield from self.export_serializer_class(lote, many=True).data
 
-class TarifarioISS2001ViewSet(viewsets.ReadOnlyModelViewSet):
+class TarifarioISS2001ViewSet(ExportacionTarifarioMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para tarifarios oficiales ISS 2001
     Solo lectura - datos oficiales inmutables
@@ -27,6 +84,19 @@ class TarifarioISS2001ViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]  # Datos públicos oficiales
     renderer_classes = [MongoJSONRenderer]  # Handle ObjectId serialization
     
+    # Tope del mapeo masivo ISS -> SOAT
+    MAXIMO_CODIGOS_EQUIVALENCIAS = 10000
+    
+    # Exportación
+    nombre_exportacion = 'tarifario_iss_2001'
+    export_serializer_class = TarifarioISS2001ListSerializer
+    columnas_csv = [
+        ('codigo', 'Código'), ('descripcion', 'Descripción'), ('tipo', 'Tipo'),
+        ('uvr', 'UVR'), ('valor_uvr_2001', 'Valor UVR 2001'),
+        ('valor_calculado', 'Valor Calculado'), ('contratos_activos', 'Contratos Activos'),
+        ('uso_frecuente', 'Uso Frecuente')
+    ]
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return TarifarioISS2001ListSerializer
@@ -110,152 +180,76 @@ class TarifarioISS2001ViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def buscar_similares(self, request):
-        """Buscar tarifa similar en SOAT por descripción ISS"""
+        """Buscar tarifa similar en SOAT por descripción ISS (índice BM25)"""
         codigo_iss = request.query_params.get('codigo_iss', None)
         descripcion = request.query_params.get('descripcion', None)
         
         if not codigo_iss and not descripcion:
             return Response({'error': 'Debe proporcionar código ISS o descripción'}, status=400)
         
-        # Si se proporciona código ISS, buscar su descripción
-        if codigo_iss and not descripcion:
+        busqueda = EquivalenciasTarifariosService().buscar_equivalentes_soat(
+            descripcion=descripcion, codigo_iss=codigo_iss, limite=10
+        )
+        
+        # Código ISS fuera del índice: confirmar contra la colección
+        if codigo_iss and busqueda['iss'] is None and not descripcion:
             try:
                 iss_item = TarifarioISS2001.objects.get(codigo=codigo_iss)
-                descripcion = iss_item.descripcion
             except TarifarioISS2001.DoesNotExist:
                 return Response({'error': 'Código ISS no encontrado'}, status=404)
+            busqueda = EquivalenciasTarifariosService().buscar_equivalentes_soat(
+                descripcion=iss_item.descripcion, limite=10
+            )
         
-        # Normalizar descripción para búsqueda
-        import re
-        import unicodedata
-        
-        # Remover acentos y normalizar texto
-        def normalizar_texto(texto):
-            texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('utf-8')
-            return texto.lower()
-        
-        descripcion_normalizada = normalizar_texto(descripcion)
-        
-        # Palabras a ignorar (stop words médicas)
-        stop_words = {'de', 'la', 'el', 'con', 'por', 'para', 'en', 'y', 'o', 'del', 'al', 'los', 'las', 'un', 'una'}
-        
-        # Extraer palabras clave relevantes
-        palabras = re.findall(r'\b\w+\b', descripcion_normalizada)
-        palabras_importantes = [p for p in palabras if len(p) > 3 and p not in stop_words]
-        
-        # Identificar términos médicos clave (ej: resección, extracción, consulta, etc)
-        terminos_medicos_clave = []
-        terminos_medicos = ['reseccion', 'extraccion', 'extirpacion', 'consulta', 'cirugia', 'procedimiento', 
-                           'intervencion', 'operacion', 'tratamiento', 'examen', 'estudio', 'biopsia',
-                           'endoscopia', 'ecografia', 'radiografia', 'tomografia', 'resonancia']
-        
-        for palabra in palabras_importantes:
-            if any(termino in palabra for termino in terminos_medicos):
-                terminos_medicos_clave.append(palabra)
-        
-        # Buscar en SOAT por similitud de descripción
-        from django.db.models import Value, F, Case, When, IntegerField
-        from django.db.models.functions import Lower
-        
-        # Empezar con todos los registros SOAT
-        queryset = TarifarioSOAT2025.objects.all()
-        
-        # Crear query Q para buscar palabras clave
-        q_filter = Q()
-        
-        # Priorizar términos médicos clave
-        if terminos_medicos_clave:
-            for termino in terminos_medicos_clave:
-                q_filter |= Q(descripcion__icontains=termino)
-        
-        # Luego agregar otras palabras importantes
-        for palabra in palabras_importantes[:8]:  # Limitar a 8 palabras más importantes
-            if palabra not in terminos_medicos_clave:
-                q_filter |= Q(descripcion__icontains=palabra)
-        
-        # Aplicar filtro
-        if q_filter:
-            resultados = queryset.filter(q_filter)
-            
-            # Calcular relevancia basada en coincidencias
-            # Contar cuántas palabras clave coinciden
-            relevancia_annotations = {}
-            for i, palabra in enumerate(palabras_importantes[:5]):
-                relevancia_annotations[f'match_{i}'] = Case(
-                    When(descripcion__icontains=palabra, then=1),
-                    default=0,
-                    output_field=IntegerField()
-                )
-            
-            if relevancia_annotations:
-                resultados = resultados.annotate(**relevancia_annotations)
-                # Ordenar por suma de coincidencias
-                order_by_expr = sum(F(f'match_{i}') for i in range(len(palabras_importantes[:5])))
-                resultados = resultados.annotate(relevancia=order_by_expr).order_by('-relevancia')
-            
-            resultados = resultados.distinct()[:10]
-        else:
-            resultados = queryset.none()
-        
-        # Serializar resultados
-        from .serializers_tarifarios import TarifarioSOAT2025Serializer
-        serializer = TarifarioSOAT2025Serializer(resultados, many=True)
+        # Serializar resultados en el orden de relevancia
+        similitudes = {doc['codigo']: similitud for doc, similitud in busqueda['candidatos']}
+        registros = {
+            obj.codigo: obj
+            for obj in TarifarioSOAT2025.objects.filter(codigo__in=list(similitudes))
+        }
+        resultados = []
+        for codigo, similitud in similitudes.items():
+            if codigo in registros:
+                data = TarifarioSOAT2025Serializer(registros[codigo]).data
+                data['similitud'] = similitud
+                resultados.append(data)
         
         return Response({
-            'descripcion_buscada': descripcion,
-            'palabras_clave': palabras_importantes,
-            'resultados': serializer.data
+            'descripcion_buscada': busqueda['descripcion'],
+            'palabras_clave': busqueda['palabras_clave'],
+            'resultados': resultados
         })
     
-    @action(detail=False, methods=['get'])
-    def export(self, request):
-        """Exportar tarifarios ISS 2001"""
-        formato = request.query_params.get('formato', 'csv')
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        if formato == 'csv':
-            return self._export_csv(queryset, 'tarifario_iss_2001')
-        elif formato == 'json':
-            return self._export_json(queryset, 'tarifario_iss_2001')
-        else:
+    @action(detail=False, methods=['post'])
+    def equivalencias_soat(self, request):
+        """
+        Mapeo masivo ISS -> SOAT para migración de contratos
+        Body: {"codigos": [...], "limite": 1, "similitud_minima": 0.0}
+        """
+        codigos = request.data.get('codigos') or []
+        if not isinstance(codigos, list) or not codigos:
+            return Response({'error': 'Debe proporcionar una lista de códigos ISS'}, status=400)
+        
+        if len(codigos) > self.MAXIMO_CODIGOS_EQUIVALENCIAS:
             return Response(
-                {'error': 'Formato no soportado'}, 
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': f'Máximo {self.MAXIMO_CODIGOS_EQUIVALENCIAS} códigos por solicitud'},
+                status=400
             )
-    
-    def _export_csv(self, queryset, filename):
-        """Exportar a CSV"""
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Descripción', 'Tipo', 'UVR', 'Valor UVR 2001', 
-            'Valor Calculado', 'Contratos Activos', 'Uso Frecuente'
-        ])
-        
-        for obj in queryset:
-            writer.writerow([
-                obj.codigo, obj.descripcion, obj.tipo, obj.uvr,
-                obj.valor_uvr_2001, obj.valor_calculado,
-                obj.contratos_activos, obj.uso_frecuente
-            ])
-        
-        return response
-    
-    def _export_json(self, queryset, filename):
-        """Exportar a JSON"""
-        serializer = TarifarioISS2001ListSerializer(queryset, many=True)
         
-        response = HttpResponse(
-            json.dumps(serializer.data, indent=2, ensure_ascii=False),
-            content_type='application/json'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}.json"'
+        try:
+            limite = min(max(int(request.data.get('limite', 1)), 1), 5)
+            similitud_minima = float(request.data.get('similitud_minima', 0.0))
+        except (TypeError, ValueError):
+            return Response({'error': 'limite y similitud_minima deben ser numéricos'}, status=400)
         
-        return response
-
-class TarifarioSOAT2025ViewSet(viewsets.ReadOnlyModelViewSet):
+        resultado = EquivalenciasTarifariosService().mapear_codigos_iss(
+            [str(codigo).strip() for codigo in codigos],
+            limite=limite,
+            similitud_minima=similitud_minima
+        )
+        return Response(resultado)
+    
+class TarifarioSOAT2025ViewSet(ExportacionTarifarioMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para tarifarios oficiales SOAT 2025  
     Solo lectura - datos oficiales inmutables
@@ -265,6 +259,16 @@ class TarifarioSOAT2025ViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]  # Datos públicos oficiales
     renderer_classes = [MongoJSONRenderer]  # Handle ObjectId serialization
     
+    # Exportación
+    nombre_exportacion = 'tarifario_soat_2025'
+    export_serializer_class = TarifarioSOAT2025ListSerializer
+    columnas_csv = [
+        ('codigo', 'Código'), ('descripcion', 'Descripción'), ('tipo', 'Tipo'),
+        ('grupo_quirurgico', 'Grupo Q.'), ('uvb', 'UVB'), ('valor_2025_uvb', 'Valor 2025 UVB'),
+        ('valor_calculado', 'Valor Calculado'), ('seccion_manual', 'Sección'),
+        ('contratos_activos', 'Contratos Activos'), ('uso_frecuente', 'Uso Frecuente')
+    ]
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return TarifarioSOAT2025ListSerializer
@@ -351,51 +355,3 @@ class TarifarioSOAT2025ViewSet(viewsets.ReadOnlyModelViewSet):
             'uso_frecuente': queryset.filter(uso_frecuente=True).count(),
             'distribucion_por_tipo': list(stats_por_tipo)
         }
-    
-    @action(detail=False, methods=['get'])
-    def export(self, request):
-        """Exportar tarifarios SOAT 2025"""
-        formato = request.query_params.get('formato', 'csv')
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        if formato == 'csv':
-            return self._export_csv(queryset, 'tarifario_soat_2025')
-        elif formato == 'json':
-            return self._export_json(queryset, 'tarifario_soat_2025')
-        else:
-            return Response(
-                {'error': 'Formato no soportado'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    
-    def _export_csv(self, queryset, filename):
-        """Exportar a CSV"""
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Descripción', 'Tipo', 'Grupo Q.', 'UVB', 'Valor 2025 UVB',
-            'Valor Calculado', 'Sección', 'Contratos Activos', 'Uso Frecuente'
-        ])
-        
-        for obj in queryset:
-            writer.writerow([
-                obj.codigo, obj.descripcion, obj.tipo, obj.grupo_quirurgico,
-                obj.uvb, obj.valor_2025_uvb, obj.valor_calculado, 
-                obj.seccion_manual, obj.contratos_activos, obj.uso_frecuente
-            ])
-        
-        return response
-    
-    def _export_json(self, queryset, filename):
-        """Exportar a JSON"""
-        serializer = TarifarioSOAT2025ListSerializer(queryset, many=True)
-        
-        response = HttpResponse(
-            json.dumps(serializer.data, indent=2, ensure_ascii=False),
-            content_type='application/json'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}.json"'
-        
-        return response
\ No newline at end of file
@@ -101,6 +101,7 @@ class CasoConciliacion(models.Model):
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_creacion']),
             models.Index(fields=['fecha_limite_respuesta']),
+            models.Index(fields=['fecha_ultima_actualizacion']),
         ]
     
     def __str__(self):
@@ -7,4 +7,8 @@ from django.apps import AppConfig
 class ContratacionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.contratacion'
-    verbose_name = 'Contratación'
\ No newline at end of file
+    verbose_name = 'Contratación'
+
+    def ready(self):
+        """Registrar signals de agregaciones contractuales"""
+        import apps.contratacion.signals  # noqa: F401
@@ -10,7 +10,7 @@ from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson import ObjectId
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 import logging
 
 from apps.core.mongodb_config import get_mongodb, get_collection
@@ -457,25 +457,45 @@ class ServiciosCUPSContractualesNoSQL:
             logger.error(f"Error obteniendo estadísticas: {str(e)}")
             return {}
     
+    def iterar_tarifario_contractual(self, contrato_id: str, campos: Optional[List[str]] = None,
+                                     lote: int = 2000) -> Iterator[Dict]:
+        """
+        Recorre el tarifario de un contrato con cursor por lotes (para exportación en streaming).
+        campos limita la proyección; por defecto todos salvo _id.
+        """
+        proyeccion = {campo: 1 for campo in campos} if campos else {}
+        proyeccion['_id'] = 0
+
+        cursor = self.tarifarios_cups.find(
+            {'contrato_id': ObjectId(contrato_id), 'estado': 'ACTIVO'},
+            proyeccion
+        ).sort('codigo_cups', 1).batch_size(lote)
+
+        for tarifa in cursor:
+            # Convertir ObjectId y Decimals para serialización
+            if 'contrato_id' in tarifa:
+                tarifa['contrato_id'] = str(tarifa['contrato_id'])
+            for campo in ('valor_negociado', 'valor_referencia'):
+                if campo in tarifa:
+                    tarifa[campo] = float(str(tarifa[campo] or 0))
+            for campo in ('vigencia_desde', 'vigencia_hasta'):
+                if tarifa.get(campo) is not None:
+                    tarifa[campo] = tarifa[campo].isoformat()
+            yield tarifa
+
+    def tiene_tarifas_contractuales(self, contrato_id: str) -> bool:
+        """True si el contrato tiene al menos una tarifa activa"""
+        return self.tarifarios_cups.find_one(
+            {'contrato_id': ObjectId(contrato_id), 'estado': 'ACTIVO'},
+            {'_id': 1}
+        ) is not None
+
     def exportar_tarifario_contractual(self, contrato_id: str) -> List[Dict]:
         """
         Exportar tarifario completo de un contrato para revisión/Excel
         """
         try:
-            tarifas = list(self.tarifarios_cups.find(
-                {'contrato_id': ObjectId(contrato_id), 'estado': 'ACTIVO'},
-                {'_id': 0}  # Excluir _id para exportación
-            ).sort('codigo_cups', 1))
-            
-            # Convertir ObjectId y Decimals para serialización
-            for tarifa in tarifas:
-                tarifa['contrato_id'] = str(tarifa['contrato_id'])
-                tarifa['valor_negociado'] = float(tarifa['valor_negociado'])
-                tarifa['valor_referencia'] = float(tarifa.get('valor_referencia', 0))
-                tarifa['vigencia_desde'] = tarifa['vigencia_desde'].isoformat()
-                tarifa['vigencia_hasta'] = tarifa['vigencia_hasta'].isoformat()
-            
-            return tarifas
+            return list(self.iterar_tarifario_contractual(contrato_id))
             
         except Exception as e:
             logger.error(f"Error exportando tarifario: {str(e)}")
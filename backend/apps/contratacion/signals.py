@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# apps/contratacion/signals.py
+
+"""
+Signals de contratación
+Mantiene las agregaciones contractuales de los tarifarios oficiales
+cuando cambian las tarifas CUPS de un contrato o el estado / vigencia
+del contrato
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.catalogs.services_agregaciones_tarifarios import recalcular_codigos
+from .models import Contrato, TarifariosCUPS
+
+# Campos del contrato que deciden si sus tarifas cuentan en las agregaciones
+CAMPOS_CONTRATO_AGREGACIONES = ('numero_contrato', 'estado', 'fecha_inicio', 'fecha_fin')
+
+
+def _codigos_contratos(numeros_contrato):
+    return set(
+        TarifariosCUPS.objects.filter(contrato_numero__in=list(numeros_contrato))
+        .values_list('codigo_cups', flat=True)
+    )
+
+
+# =======================================
+# TARIFAS CUPS
+# =======================================
+
+@receiver(post_init, sender=TarifariosCUPS)
+def tarifa_cups_cargada(sender, instance, **kwargs):
+    """Código con el que se cargó la tarifa (sin consultar campos diferidos)"""
+    instance._codigo_cups_original = instance.__dict__.get('codigo_cups')
+
+
+@receiver(post_save, sender=TarifariosCUPS)
+def tarifa_cups_guardada(sender, instance, **kwargs):
+    """
+    Recalcula contratos_activos / valor_promedio_negociado del código;
+    si el código cambió, también el anterior, que pierde este contrato
+    """
+    codigos = {instance.codigo_cups, getattr(instance, '_codigo_cups_original', None)}
+    recalcular_codigos(codigos)
+    instance._codigo_cups_original = instance.codigo_cups
+
+
+@receiver(post_delete, sender=TarifariosCUPS)
+def tarifa_cups_eliminada(sender, instance, **kwargs):
+    """Al eliminar una tarifa el código puede quedar sin contratos"""
+    recalcular_codigos([instance.codigo_cups])
+
+
+# =======================================
+# CONTRATOS
+# =======================================
+
+@receiver(post_init, sender=Contrato)
+def contrato_cargado(sender, instance, **kwargs):
+    instance._agregaciones_original = {
+        campo: instance.__dict__.get(campo) for campo in CAMPOS_CONTRATO_AGREGACIONES
+    }
+
+
+@receiver(post_save, sender=Contrato)
+def contrato_guardado(sender, instance, created, **kwargs):
+    """
+    Un contrato nuevo, o un cambio de número, estado o vigencia, cambia qué
+    tarifas cuentan como activas: recalcula los códigos de sus tarifas
+    """
+    original = getattr(instance, '_agregaciones_original', {})
+    actual = {campo: getattr(instance, campo) for campo in CAMPOS_CONTRATO_AGREGACIONES}
+    if created or actual != original:
+        numeros = {instance.numero_contrato, original.get('numero_contrato')} - {None}
+        recalcular_codigos(_codigos_contratos(numeros))
+    instance._agregaciones_original = actual
+
+
+@receiver(post_delete, sender=Contrato)
+def contrato_eliminado(sender, instance, **kwargs):
+    """Las tarifas del contrato eliminado dejan de contar"""
+    recalcular_codigos(_codigos_contratos([instance.numero_contrato]))
@@ -16,6 +16,7 @@ from decimal import Decimal
 
 # Utilidades locales
 from .utils import buscar_prestador_por_nit, normalizar_nit
+from apps.catalogs.services_agregaciones_tarifarios import agregaciones_diferidas
 
 # Custom renderer for MongoDB ObjectId handling
 from .renderers import MongoJSONRenderer
@@ -162,10 +163,11 @@ class TarifariosCUPSViewSet(viewsets.ModelViewSet):
             # Leer Excel
             df = pd.read_excel(temp_file, sheet_name=hoja, skiprows=skip_rows)
             
-            # Procesar importación
-            exitosos, errores, detalles_errores = self._procesar_importacion_cups(
-                df, prestador, request.user
-            )
+            # Procesar importación (agregaciones contractuales en una sola pasada)
+            with agregaciones_diferidas():
+                exitosos, errores, detalles_errores = self._procesar_importacion_cups(
+                    df, prestador, request.user
+                )
             
             # Limpiar archivo temporal
             os.remove(temp_file)
@@ -10,13 +10,19 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import JSONParser, MultiPartParser
-from django.http import HttpResponse
+from django.http import FileResponse
 from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Font, PatternFill, Side
 import pandas as pd
-import io
+import tempfile
 
 from .services_mongodb_cups import servicio_cups_contractual
 from .renderers import MongoJSONRenderer
+from apps.core.exportacion import (
+    LOTE_EXPORTACION, ExportacionNoDisponible, respuesta_exportacion, solicita_gzip, valor_plano
+)
 
 import logging
 logger = logging.getLogger('neuraudit.contratacion')
@@ -294,78 +300,111 @@ class ImportarServiciosCUPSAPIView(APIView):
 
 class ExportarTarifarioAPIView(APIView):
     """
-    API para exportar tarifario contractual a Excel
+    API para exportar tarifario contractual
+    Formatos: xlsx (default), csv, json, parquet, arrow. ?comprimir=gzip comprime al vuelo.
     """
     permission_classes = [AllowAny]
     
+    # Columnas de exportación en orden
+    COLUMNAS = [
+        ('codigo_cups', 'codigo_cups'), ('descripcion', 'descripcion'),
+        ('valor_negociado', 'valor_negociado'), ('valor_referencia', 'valor_referencia'),
+        ('porcentaje_variacion', 'porcentaje_variacion'), ('manual_referencia', 'manual_referencia'),
+        ('requiere_autorizacion', 'requiere_autorizacion'), ('aplica_copago', 'aplica_copago'),
+        ('aplica_cuota_moderadora', 'aplica_cuota_moderadora'), ('restricciones', 'restricciones'),
+        ('vigencia_desde', 'vigencia_desde'), ('vigencia_hasta', 'vigencia_hasta')
+    ]
+    # Tipos Parquet/Arrow (la colección no tiene modelo Django; el resto como texto)
+    TIPOS_COLUMNAS = {
+        'valor_negociado': 'float64', 'valor_referencia': 'float64', 'porcentaje_variacion': 'float64',
+        'requiere_autorizacion': 'bool', 'aplica_copago': 'bool', 'aplica_cuota_moderadora': 'bool',
+        'vigencia_desde': 'timestamp', 'vigencia_hasta': 'timestamp'
+    }
+    
     def get(self, request, contrato_id):
         """
         GET /api/contratacion/mongodb/exportar-tarifario/{contrato_id}/
         """
+        formato = request.query_params.get('formato', 'xlsx')
+        
         try:
-            # Obtener tarifas
-            tarifas = servicio_cups_contractual.exportar_tarifario_contractual(contrato_id)
-            
-            if not tarifas:
+            if not servicio_cups_contractual.tiene_tarifas_contractuales(contrato_id):
                 return Response({
                     'success': False,
                     'error': 'No se encontraron tarifas para este contrato'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Crear DataFrame
-            df = pd.DataFrame(tarifas)
+            nombre_archivo = f'tarifario_contrato_{contrato_id}'
+            campos = [campo for campo, _ in self.COLUMNAS]
             
-            # Reordenar columnas
-            columnas_orden = [
-                'codigo_cups', 'descripcion', 'valor_negociado', 
-                'valor_referencia', 'porcentaje_variacion',
-                'manual_referencia', 'requiere_autorizacion',
-                'aplica_copago', 'aplica_cuota_moderadora',
-                'restricciones', 'vigencia_desde', 'vigencia_hasta'
-            ]
-            
-            # Filtrar solo columnas que existen
-            columnas_existentes = [col for col in columnas_orden if col in df.columns]
-            df = df[columnas_existentes]
-            
-            # Crear archivo Excel en memoria
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name='Tarifario CUPS', index=False)
-                
-                # Obtener worksheet
-                worksheet = writer.sheets['Tarifario CUPS']
-                
-                # Formato para encabezados
-                header_format = writer.book.add_format({
-                    'bold': True,
-                    'bg_color': '#4472C4',
-                    'font_color': 'white',
-                    'border': 1
-                })
-                
-                # Aplicar formato a encabezados
-                for col_num, value in enumerate(df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-                
-                # Ajustar ancho de columnas
-                worksheet.set_column('A:A', 12)  # Código CUPS
-                worksheet.set_column('B:B', 60)  # Descripción
-                worksheet.set_column('C:E', 15)  # Valores
+            if formato == 'xlsx':
+                return self._exportar_excel(contrato_id, campos, nombre_archivo)
             
-            # Preparar respuesta
-            output.seek(0)
-            response = HttpResponse(
-                output.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            tarifas = servicio_cups_contractual.iterar_tarifario_contractual(
+                contrato_id,
+                campos=None if formato == 'json' else campos,
+                lote=LOTE_EXPORTACION
+            )
+            return respuesta_exportacion(
+                formato, nombre_archivo, self.COLUMNAS,
+                documentos=tarifas,
+                comprimir=solicita_gzip(request),
+                tipos=self.TIPOS_COLUMNAS
             )
-            response['Content-Disposition'] = f'attachment; filename=tarifario_contrato_{contrato_id}.xlsx'
-            
-            return response
             
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ExportacionNoDisponible as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
         except Exception as e:
             logger.error(f"Error exportando tarifario: {str(e)}")
             return Response({
                 'success': False,
                 'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _exportar_excel(self, contrato_id, campos, nombre_archivo):
+        """
+        Excel en modo write-only: las filas se escriben desde el cursor a un
+        archivo temporal y se envía por bloques
+        """
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet('Tarifario CUPS')
+        
+        # Ajustar ancho de columnas
+        hoja.column_dimensions['A'].width = 12  # Código CUPS
+        hoja.column_dimensions['B'].width = 60  # Descripción
+        for columna in ('C', 'D', 'E'):
+            hoja.column_dimensions[columna].width = 15  # Valores
+        
+        # Formato para encabezados
+        encabezados = []
+        for campo in campos:
+            celda = WriteOnlyCell(hoja, value=campo)
+            celda.font = Font(bold=True, color='FFFFFF')
+            celda.fill = PatternFill('solid', fgColor='4472C4')
+            celda.border = Border(*(Side(style='thin'),) * 4)
+            encabezados.append(celda)
+        hoja.append(encabezados)
+        
+        for tarifa in servicio_cups_contractual.iterar_tarifario_contractual(
+            contrato_id, campos=campos, lote=LOTE_EXPORTACION
+        ):
+            hoja.append([valor_plano(tarifa.get(campo)) for campo in campos])
+        
+        archivo = tempfile.TemporaryFile()
+        libro.save(archivo)
+        archivo.seek(0)
+        
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=f'{nombre_archivo}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
\ No newline at end of file
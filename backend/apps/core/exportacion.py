@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+# apps/core/exportacion.py
+
+"""
+Exportación en streaming (CSV, JSON, NDJSON, Parquet, Arrow)
+Los generadores consumen iteradores de registros por lotes y emiten bytes
+a medida que se producen, sin armar el archivo completo en memoria.
+Opcionalmente comprimen con gzip al vuelo.
+"""
+
+import csv
+import json
+import textwrap
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from bson import Decimal128, ObjectId
+from django.core.exceptions import FieldDoesNotExist
+from django.http import StreamingHttpResponse
+
+from .encoders import MongoJSONEncoder
+
+# Registros por lote (cursor del servidor y bloques emitidos)
+LOTE_EXPORTACION = 2000
+
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+# Tipo de columna Parquet/Arrow según el tipo interno del campo Django (texto por defecto)
+TIPOS_ARROW_CAMPO = {
+    'IntegerField': 'int64', 'BigIntegerField': 'int64', 'SmallIntegerField': 'int64',
+    'PositiveIntegerField': 'int64', 'PositiveSmallIntegerField': 'int64',
+    'PositiveBigIntegerField': 'int64',
+    'FloatField': 'float64', 'DecimalField': 'float64',
+    'BooleanField': 'bool',
+    'DateTimeField': 'timestamp', 'DateField': 'date',
+}
+
+
+class ExportacionNoDisponible(Exception):
+    """Formato solicitado requiere una dependencia opcional no instalada"""
+    pass
+
+
+def en_lotes(registros: Iterable, tamano: int = LOTE_EXPORTACION) -> Iterator[List]:
+    """Agrupa un iterador en listas de hasta `tamano` elementos"""
+    iterador = iter(registros)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def tipos_modelo(modelo, campos: Sequence[str]) -> Dict[str, str]:
+    """Tipos Parquet/Arrow de los campos exportados de un modelo Django"""
+    tipos = {}
+    for campo in campos:
+        try:
+            tipo_interno = modelo._meta.get_field(campo).get_internal_type()
+        except FieldDoesNotExist:
+            continue
+        tipos[campo] = TIPOS_ARROW_CAMPO.get(tipo_interno, 'string')
+    return tipos
+
+
+def valor_plano(valor: Any) -> Any:
+    """Convierte tipos BSON / Python a valores escalares exportables"""
+    if isinstance(valor, Decimal128):
+        return float(valor.to_decimal())
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, cls=MongoJSONEncoder, ensure_ascii=False)
+    return valor
+
+
+# =======================================
+# GENERADORES POR FORMATO
+# =======================================
+
+class _Eco:
+    """Pseudo-archivo: csv.writer devuelve la línea en lugar de escribirla"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(filas: Iterable[Sequence], encabezados: Sequence[str],
+                lote: int = LOTE_EXPORTACION) -> Iterator[bytes]:
+    """CSV por bloques de `lote` filas"""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(encabezados).encode('utf-8')
+    for bloque in en_lotes(filas, lote):
+        yield ''.join(escritor.writerow(fila) for fila in bloque).encode('utf-8')
+
+
+def generar_json(documentos: Iterable[Dict], lote: int = LOTE_EXPORTACION,
+                 indent: Optional[int] = 2) -> Iterator[bytes]:
+    """
+    Arreglo JSON por bloques. Con indent produce la misma salida que
+    json.dumps(lista, indent=indent)
+    """
+    prefijo = ' ' * indent if indent else ''
+    separador = ',\n' if indent else ','
+    primero = True
+
+    yield b'[\n' if indent else b'['
+    for bloque in en_lotes(documentos, lote):
+        texto = separador.join(
+            textwrap.indent(
+                json.dumps(doc, cls=MongoJSONEncoder, ensure_ascii=False, indent=indent),
+                prefijo
+            )
+            for doc in bloque
+        )
+        yield ((separador if not primero else '') + texto).encode('utf-8')
+        primero = False
+    if primero:
+        yield b']'
+    else:
+        yield b'\n]' if indent else b']'
+
+
+def generar_ndjson(documentos: Iterable[Dict], lote: int = LOTE_EXPORTACION) -> Iterator[bytes]:
+    """Un documento JSON por línea (NDJSON), emitido por bloques"""
+    for bloque in en_lotes(documentos, lote):
+        yield ''.join(
+            json.dumps(doc, cls=MongoJSONEncoder, ensure_ascii=False) + '\n' for doc in bloque
+        ).encode('utf-8')
+
+
+class _SumideroBytes:
+    """Archivo de solo escritura que se vacía después de cada lote"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self.partes.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def vaciar(self) -> bytes:
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportacionNoDisponible(
+            'Exportación Parquet/Arrow requiere pyarrow (pip install pyarrow)'
+        )
+    return pyarrow
+
+
+def _escritor_arrow(pa, sumidero, esquema, formato: str):
+    if formato == 'parquet':
+        return pa.parquet.ParquetWriter(sumidero, esquema)
+    return pa.ipc.new_stream(sumidero, esquema)
+
+
+def _tipo_arrow(pa, tipo: str):
+    return {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'date': pa.date32(),
+    }.get(tipo, pa.string())
+
+
+def valor_arrow(valor: Any, tipo: str) -> Any:
+    """
+    Valor convertido al tipo de su columna; lo que no convierte queda nulo
+    para que un documento irregular no rompa el esquema a mitad de la descarga
+    """
+    if valor is None:
+        return None
+    if tipo in ('timestamp', 'date'):
+        if isinstance(valor, str):
+            try:
+                valor = datetime.fromisoformat(valor)
+            except ValueError:
+                return None
+        if tipo == 'date' and isinstance(valor, datetime):
+            return valor.date()
+        if tipo == 'timestamp' and isinstance(valor, date) and not isinstance(valor, datetime):
+            return datetime(valor.year, valor.month, valor.day)
+        return valor if isinstance(valor, (datetime, date)) else None
+
+    valor = valor_plano(valor)
+    if tipo == 'string':
+        return str(valor)
+    try:
+        if tipo == 'int64':
+            return int(valor)
+        if tipo == 'float64':
+            return float(valor)
+        if tipo == 'bool':
+            return bool(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor
+
+
+def generar_arrow(documentos: Iterable[Dict], columnas: Sequence[str], formato: str = 'parquet',
+                  lote: int = LOTE_EXPORTACION, tipos: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    """
+    Parquet (un row group por lote) o Arrow IPC stream.
+    El esquema se arma antes del primer lote con `tipos` ({columna: 'int64' |
+    'float64' | 'bool' | 'timestamp' | 'date' | 'string'}); columnas sin tipo
+    quedan como texto.
+    """
+    pa = _importar_pyarrow()
+    tipos = {columna: (tipos or {}).get(columna, 'string') for columna in columnas}
+    esquema = pa.schema([pa.field(columna, _tipo_arrow(pa, tipos[columna])) for columna in columnas])
+    sumidero = _SumideroBytes()
+    escritor = _escritor_arrow(pa, sumidero, esquema, formato)
+
+    for bloque in en_lotes(documentos, lote):
+        datos = {
+            columna: [valor_arrow(doc.get(columna), tipos[columna]) for doc in bloque]
+            for columna in columnas
+        }
+        escritor.write_table(pa.table(datos, schema=esquema))
+        datos_lote = sumidero.vaciar()
+        if datos_lote:
+            yield datos_lote
+
+    escritor.close()
+    yield sumidero.vaciar()
+
+
+def comprimir_gzip(bloques: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresión gzip al vuelo"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+# =======================================
+# RESPUESTA HTTP
+# =======================================
+
+def respuesta_exportacion(
+    formato: str,
+    nombre_archivo: str,
+    columnas: Sequence[Tuple[str, str]],
+    filas: Optional[Iterable[Sequence]] = None,
+    documentos: Optional[Iterable[Dict]] = None,
+    comprimir: bool = False,
+    lote: int = LOTE_EXPORTACION,
+    tipos: Optional[Dict[str, str]] = None
+) -> StreamingHttpResponse:
+    """
+    StreamingHttpResponse para el formato pedido.
+
+    columnas: [(campo, encabezado)] en orden de exportación.
+    filas: tuplas en el orden de columnas (CSV).
+    documentos: diccionarios (JSON, NDJSON, Parquet, Arrow; CSV si no hay filas).
+    tipos: tipos de columna Parquet/Arrow (ver tipos_modelo); el resto como texto.
+    Lanza ValueError si el formato no existe y ExportacionNoDisponible si
+    falta la dependencia opcional.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f'Formato no soportado. Opciones: {", ".join(FORMATOS_EXPORTACION)}')
+
+    campos = [campo for campo, _ in columnas]
+    if formato == 'csv':
+        if filas is None:
+            filas = ([valor_plano(doc.get(campo)) for campo in campos] for doc in documentos)
+        bloques = generar_csv(filas, [encabezado for _, encabezado in columnas], lote)
+    elif formato == 'json':
+        bloques = generar_json(documentos, lote)
+    elif formato == 'ndjson':
+        bloques = generar_ndjson(documentos, lote)
+    else:
+        _importar_pyarrow()
+        bloques = generar_arrow(documentos, campos, formato, lote, tipos)
+
+    content_type, extension = FORMATOS_EXPORTACION[formato]
+    nombre = f'{nombre_archivo}.{extension}'
+    if comprimir:
+        bloques = comprimir_gzip(bloques)
+        content_type = 'application/gzip'
+        nombre += '.gz'
+
+    response = StreamingHttpResponse(bloques, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
+def solicita_gzip(request) -> bool:
+    """?comprimir=gzip (o gzip=true) en la query"""
+    return (
+        request.query_params.get('comprimir', '').lower() == 'gzip'
+        or request.query_params.get('gzip', '').lower() in ('1', 'true')
+    )
@@ -46,10 +46,13 @@ class Command(BaseCommand):
             # 3. Crear índices MongoDB específicos
             self._crear_indices_mongodb()
             
-            # 4. Crear auditores de prueba
+            # 4. Sembrar contadores de carga desde las asignaciones existentes
+            self._sembrar_contadores_carga()
+            
+            # 5. Crear auditores de prueba
             self._crear_datos_prueba(options['reset_data'])
             
-            # 5. Verificar integridad del sistema
+            # 6. Verificar integridad del sistema
             self._verificar_sistema()
             
             self.stdout.write('=' * 60)
@@ -124,6 +127,19 @@ class Command(BaseCommand):
             db.asignaciones_auditoria.create_index([("auditor_username", 1), ("estado", 1)])
             db.asignaciones_auditoria.create_index([("fecha_asignacion", -1)])
             db.asignaciones_auditoria.create_index([("tipo_auditoria", 1), ("prioridad", 1)])
+            db.asignaciones_auditoria.create_index(
+                [("propuesta_id", 1), ("radicacion_id", 1)],
+                unique=True,
+                partialFilterExpression={"propuesta_id": {"$exists": True}},
+                name="propuesta_radicacion_unica"
+            )
+            # Columnas del tablero Kanban (estado + orden por fecha), con filtro por auditor o prestador
+            for prefijo in ([], [("auditor_username", 1)], [("prestador_nit", 1)]):
+                db.asignaciones_auditoria.create_index(
+                    prefijo + [("estado", 1), ("fecha_asignacion", -1), ("_id", -1)]
+                )
+            # Barrido de asignaciones vencidas (reasignar_pre_glosas_vencidas)
+            db.asignaciones_auditoria.create_index([("estado", 1), ("fecha_limite_auditoria", 1)])
             
             # Índices para trazabilidad
             db.trazabilidad_asignaciones.create_index([("timestamp", -1)])
@@ -137,6 +153,23 @@ class Command(BaseCommand):
             self.stderr.write(f'   ❌ Error creando índices: {str(e)}')
             raise
 
+    def _sembrar_contadores_carga(self):
+        """Reconstruir carga_auditores (un despliegue existente no tiene contadores)"""
+        self.stdout.write('📊 Sembrando contadores de carga por auditor...')
+        
+        try:
+            from apps.core.services.carga_auditores import get_contadores_carga
+            
+            reporte = get_contadores_carga().reconciliar(aplicar=True)
+            self.stdout.write(
+                f"   ✅ Contadores de {reporte['auditores_revisados']} auditores "
+                f"({reporte['auditores_con_deriva']} actualizados)"
+            )
+            
+        except Exception as e:
+            self.stderr.write(f'   ❌ Error sembrando contadores de carga: {str(e)}')
+            raise
+
     def _crear_datos_prueba(self, reset_data):
         """Crear datos de prueba para el sistema"""
         self.stdout.write('👥 Configurando datos de prueba...')
@@ -202,6 +235,7 @@ class Command(BaseCommand):
         self.stdout.write('\n⚡ COMANDOS ÚTILES:')
         self.stdout.write('   Crear más auditores: python manage.py create_test_auditores')
         self.stdout.write('   Reset completo:      python manage.py setup_asignacion_system --reset-data')
+        self.stdout.write('   Contadores de carga: python manage.py reconciliar_carga_auditores')
         
         self.stdout.write('\n🔧 CONFIGURACIÓN ALGORITMO:')
         self.stdout.write('   Las configuraciones se pueden ajustar desde ConfiguracionAlgoritmo')
@@ -12,16 +12,55 @@ FLUJO CRÍTICO:
 4. Asignaciones → Módulo de Auditoría
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timedelta
+import base64
+import json
 from typing import Dict, List, Any, Optional, Tuple
 from django.conf import settings
+from .carga_auditores import ContadoresCargaAuditores
+from apps.shared.dias_habiles import restar_dias_habiles, sumar_dias_habiles
+import heapq
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Días hábiles para auditar una radicación asignada
+DIAS_HABILES_AUDITORIA = 10
+
+# Tamaño de los lotes de escritura al aprobar propuestas
+LOTE_APROBACION = 500
+
+# Tablero Kanban: columnas por estado (la columna None agrupa los demás estados)
+COLUMNAS_KANBAN = {
+    'pendientes': None,
+    'asignadas': 'ASIGNADA',
+    'en_proceso': 'EN_PROCESO',
+    'completadas': 'COMPLETADA'
+}
+KANBAN_LIMITE_POR_DEFECTO = 20
+KANBAN_LIMITE_MAXIMO = 100
+# Campos que necesita la tarjeta del tablero
+PROYECCION_KANBAN = {
+    'radicacion_id': 1, 'propuesta_id': 1, 'numero_radicado': 1, 'auditor_username': 1,
+    'auditor_perfil': 1, 'tipo_auditoria': 1, 'estado': 1, 'prioridad': 1,
+    'fecha_asignacion': 1, 'fecha_limite': 1, 'fecha_limite_auditoria': 1,
+    'valor_auditoria': 1, 'valor_total_asignado': 1, 'total_pre_glosas': 1, 'prestador_nit': 1
+}
+
+
+class CursorKanbanInvalido(ValueError):
+    """El cursor de paginación del tablero no es válido"""
+    pass
+
+
 class AsignacionService:
+    # Índice de idempotencia (propuesta, radicación) creado una vez por proceso
+    _indices_asignaciones_creados = False
+
     def __init__(self):
         """Inicializar conexión MongoDB pura (NoSQL)"""
         self.client = MongoClient(settings.MONGODB_URI)
@@ -36,6 +75,12 @@ class AsignacionService:
         self.radicaciones = self.db.radicaciones_cuentas_medicas  # Colección correcta
         self.contratos = self.db.contratos
         self.usuarios_eps = self.db.usuarios_eps
+        
+        # Contadores de carga por auditor (carga_auditores, mantenidos con $inc)
+        self.carga_auditores = ContadoresCargaAuditores(self.db)
+        
+        # Reporte de la última aprobación masiva procesada por esta instancia
+        self.ultimo_reporte_aprobacion = None
 
     # =====================================
     # 1. ALGORITMO DE ASIGNACIÓN AUTOMÁTICA
@@ -121,65 +166,49 @@ class AsignacionService:
         - Dentro de plazos legales
         """
         try:
-            # Pipeline de agregación MongoDB
-            pipeline = [
-                # 1. Filtrar radicaciones validadas no asignadas
-                {
-                    "$match": {
-                        "estado": {"$in": ["RADICADA", "VALIDADO"]},  # Estados pendientes
-                        "asignacion_auditoria": {"$exists": False},
-                        "fecha_radicacion": {
-                            "$gte": datetime.now() - timedelta(days=22)  # Dentro de plazos legales
-                        }
-                    }
-                },
-                # 2. Lookup para validar contratos vigentes
+            ahora = datetime.now()
+            
+            # NITs con contrato vigente: se resuelven una vez por ejecución
+            nits_vigentes = self._obtener_nits_contrato_vigente(ahora)
+            if not nits_vigentes:
+                logger.warning("No hay prestadores con contrato vigente")
+                return []
+            
+            # Ventana legal en días hábiles (festivos incluidos)
+            dias_radicacion = settings.NEURAUDIT_SETTINGS.get('MAX_RADICACION_DAYS', 22)
+            fecha_desde = restar_dias_habiles(ahora, dias_radicacion)
+            
+            radicaciones = list(self.radicaciones.find(
                 {
-                    "$lookup": {
-                        "from": "contratos",
-                        "let": {"prestador_nit": "$prestador_nit"},
-                        "pipeline": [
-                            {
-                                "$match": {
-                                    "$expr": {
-                                        "$and": [
-                                            {"$eq": ["$prestador.nit", "$$prestador_nit"]},
-                                            {"$eq": ["$estado", "VIGENTE"]},
-                                            {"$lte": ["$fecha_inicio", datetime.now()]},
-                                            {"$gte": ["$fecha_fin", datetime.now()]}
-                                        ]
-                                    }
-                                }
-                            }
-                        ],
-                        "as": "contrato_vigente"
-                    }
+                    "estado": {"$in": ["RADICADA", "VALIDADO"]},  # Estados pendientes
+                    "asignacion_auditoria": {"$exists": False},
+                    "fecha_radicacion": {"$gte": fecha_desde},  # Dentro de plazos legales
+                    "prestador_nit": {"$in": sorted(nits_vigentes)}  # Solo prestadores con contrato vigente
                 },
-                # 3. Solo radicaciones con contrato vigente
-                {"$match": {"contrato_vigente": {"$ne": []}}},
-                # 4. Proyectar campos necesarios
                 {
-                    "$project": {
-                        "numero_radicado": 1,
-                        "numero_factura": 1,
-                        "prestador_nit": 1,
-                        "prestador_info": {
-                            "nit": "$prestador_nit",
-                            "razon_social": "$prestador_razon_social",
-                            "codigo_habilitacion": "$prestador_codigo_habilitacion"
-                        },
-                        "valor_factura": 1,
-                        "fecha_radicacion": 1,
-                        "estadisticas_transaccion": 1,
-                        "usuarios": 1,
-                        "fecha_limite_auditoria": {
-                            "$add": ["$fecha_radicacion", {"$multiply": [10, 24, 60, 60, 1000]}]  # 10 días hábiles
-                        }
-                    }
+                    "numero_radicado": 1,
+                    "numero_factura": 1,
+                    "prestador_nit": 1,
+                    "prestador_razon_social": 1,
+                    "prestador_codigo_habilitacion": 1,
+                    "valor_factura": 1,
+                    "fecha_radicacion": 1,
+                    "estadisticas_transaccion": 1,
+                    "usuarios": 1
                 }
-            ]
+            ))
+            
+            for radicacion in radicaciones:
+                radicacion["prestador_info"] = {
+                    "nit": radicacion.get("prestador_nit"),
+                    "razon_social": radicacion.pop("prestador_razon_social", None),
+                    "codigo_habilitacion": radicacion.pop("prestador_codigo_habilitacion", None)
+                }
+                fecha_radicacion = radicacion.get("fecha_radicacion")
+                radicacion["fecha_limite_auditoria"] = (
+                    sumar_dias_habiles(fecha_radicacion, DIAS_HABILES_AUDITORIA) if fecha_radicacion else None
+                )
             
-            radicaciones = list(self.radicaciones.aggregate(pipeline))
             logger.info(f"Encontradas {len(radicaciones)} radicaciones pendientes de asignación")
             return radicaciones
             
@@ -187,6 +216,14 @@ class AsignacionService:
             logger.error(f"Error obteniendo radicaciones pendientes: {str(e)}")
             return []
 
+    def _obtener_nits_contrato_vigente(self, fecha: datetime) -> set:
+        """NITs de prestadores con contrato VIGENTE que cubre la fecha (una consulta)"""
+        return set(self.contratos.distinct("prestador.nit", {
+            "estado": "VIGENTE",
+            "fecha_inicio": {"$lte": fecha},
+            "fecha_fin": {"$gte": fecha}
+        })) - {None, ""}
+
     def _clasificar_radicaciones_por_tipo(self, radicaciones: List[Dict]) -> Dict[str, List[Dict]]:
         """
         Clasifica radicaciones por tipo de auditoría según servicios RIPS
@@ -270,9 +307,10 @@ class AsignacionService:
                 "disponibilidad.vacaciones": False
             }))
             
-            # Actualizar carga actual de cada auditor
+            # Actualizar carga actual de cada auditor (una lectura de contadores para todos)
+            contadores = self.carga_auditores.obtener([auditor["username"] for auditor in auditores])
             for auditor in auditores:
-                carga_actual = self._calcular_carga_actual(auditor["username"])
+                carga_actual = self.carga_auditores.carga_actual(contadores.get(auditor["username"]))
                 auditor["carga_actual"] = carga_actual
                 auditor["capacidad_disponible"] = auditor["capacidad_maxima_dia"] - carga_actual["total_asignadas"]
                 auditor["porcentaje_carga"] = (carga_actual["total_asignadas"] / auditor["capacidad_maxima_dia"]) * 100
@@ -291,18 +329,9 @@ class AsignacionService:
         """Calcula la carga de trabajo actual de un auditor"""
         
         try:
-            # Contar asignaciones activas del auditor
-            asignaciones_activas = self.db.asignaciones_auditoria.count_documents({
-                "auditor_username": auditor_username,
-                "estado": {"$in": ["ASIGNADA", "EN_PROCESO"]},
-                "fecha_asignacion": {"$gte": datetime.now().replace(hour=0, minute=0, second=0)}
-            })
-            
-            return {
-                "total_asignadas": asignaciones_activas,
-                "en_proceso": asignaciones_activas,  # Simplificado por ahora
-                "completadas_hoy": 0  # TODO: Calcular completadas hoy
-            }
+            # Lectura del documento de contadores del auditor
+            contador = self.carga_auditores.obtener([auditor_username]).get(auditor_username)
+            return self.carga_auditores.carga_actual(contador)
             
         except Exception as e:
             logger.error(f"Error calculando carga de {auditor_username}: {str(e)}")
@@ -358,10 +387,21 @@ class AsignacionService:
         # Ordenar radicaciones por prioridad
         radicaciones.sort(key=lambda x: self._peso_prioridad(x["prioridad"]), reverse=True)
         
-        # Distribuir round-robin equitativo
-        for i, radicacion in enumerate(radicaciones):
-            # Seleccionar auditor con menor carga
-            auditor_seleccionado = min(auditores, key=lambda x: x.get("carga_temporal", x["porcentaje_carga"]))
+        # Una cola de prioridad por perfil (MEDICO / ADMINISTRATIVO) con entradas
+        # (carga, posición en la lista, auditor): a igual carga gana el primero de la lista
+        colas_por_perfil = {}
+        for posicion, auditor in enumerate(auditores):
+            carga = auditor.get("carga_temporal", auditor["porcentaje_carga"])
+            colas_por_perfil.setdefault(auditor["perfil"], []).append((carga, posicion, auditor))
+        colas = list(colas_por_perfil.values())
+        for cola in colas:
+            heapq.heapify(cola)
+        
+        # Distribuir round-robin equitativo: O(log m) por radicación
+        for radicacion in radicaciones:
+            # Seleccionar auditor con menor carga (tope de las colas de cada perfil)
+            cola = min(colas, key=lambda c: (c[0][0], c[0][1]))
+            carga, posicion, auditor_seleccionado = cola[0]
             
             asignacion = {
                 "radicacion_id": radicacion["_id"],
@@ -381,8 +421,9 @@ class AsignacionService:
             
             asignaciones.append(asignacion)
             
-            # Actualizar carga temporal del auditor
-            auditor_seleccionado["carga_temporal"] = auditor_seleccionado.get("carga_temporal", auditor_seleccionado["porcentaje_carga"]) + asignacion["peso_asignacion"]
+            # Actualizar carga temporal del auditor y reubicarlo en su cola
+            auditor_seleccionado["carga_temporal"] = carga + asignacion["peso_asignacion"]
+            heapq.heapreplace(cola, (auditor_seleccionado["carga_temporal"], posicion, auditor_seleccionado))
         
         return asignaciones
 
@@ -405,12 +446,14 @@ class AsignacionService:
     def _actualizar_carga_temporal(self, auditores: List[Dict], asignaciones: List[Dict]):
         """Actualiza carga temporal de auditores después de asignaciones"""
         
+        # Una sola pasada sobre las asignaciones
+        carga_adicional = {}
+        for asig in asignaciones:
+            username = asig["auditor_asignado"]
+            carga_adicional[username] = carga_adicional.get(username, 0) + asig["peso_asignacion"]
+        
         for auditor in auditores:
-            carga_adicional = sum(
-                asig["peso_asignacion"] for asig in asignaciones 
-                if asig["auditor_asignado"] == auditor["username"]
-            )
-            auditor["carga_temporal"] = auditor["porcentaje_carga"] + carga_adicional
+            auditor["carga_temporal"] = auditor["porcentaje_carga"] + carga_adicional.get(auditor["username"], 0)
 
     def _calcular_metricas_propuesta(self, asignaciones: List[Dict], auditores: List[Dict]) -> Dict:
         """Calcula métricas de calidad de la propuesta de asignación"""
@@ -496,14 +539,36 @@ class AsignacionService:
             return False
 
     def _aprobar_masivo(self, propuesta_id: ObjectId, coordinador_username: str, timestamp: datetime) -> bool:
-        """Aprueba masivamente todas las asignaciones de la propuesta"""
+        """
+        Aprueba masivamente todas las asignaciones de la propuesta
+        
+        Escritura por lotes ordenados (bulk_write) con upsert por (propuesta, radicación):
+        re-ejecutar una aprobación interrumpida completa lo pendiente sin duplicar.
+        El reporte (self.ultimo_reporte_aprobacion) detalla cada ítem exitoso y fallido.
+        """
         
         try:
-            # 1. Marcar propuesta como aprobada
+            propuesta = self.asignaciones_automaticas.find_one({"_id": propuesta_id})
+            if not propuesta:
+                logger.error(f"Propuesta {propuesta_id} no encontrada")
+                return False
+            
+            # 1. Crear asignaciones y actualizar radicaciones por lotes
+            reporte = self._materializar_asignaciones(propuesta, coordinador_username, timestamp)
+            self.ultimo_reporte_aprobacion = reporte
+            
+            # 2. Marcar propuesta como aprobada (parcial si hubo ítems fallidos)
             self.asignaciones_automaticas.update_one(
                 {"_id": propuesta_id},
                 {
-                    "$set": {"estado": "APROBADA", "fecha_aprobacion": timestamp},
+                    "$set": {
+                        "estado": "APROBADA_PARCIAL" if reporte["fallidas"] else "APROBADA",
+                        "fecha_aprobacion": timestamp,
+                        "reporte_aprobacion": {
+                            "resumen": reporte["resumen"],
+                            "fallidas": reporte["fallidas"]
+                        }
+                    },
                     "$push": {
                         "decisiones_coordinador": {
                             "timestamp": timestamp,
@@ -515,64 +580,403 @@ class AsignacionService:
                 }
             )
             
-            # 2. Crear asignaciones individuales en colección de auditoría
-            propuesta = self.asignaciones_automaticas.find_one({"_id": propuesta_id})
-            asignaciones_creadas = []
-            
-            for asignacion in propuesta["asignaciones_individuales"]:
-                doc_asignacion = {
-                    "propuesta_id": propuesta_id,
-                    "radicacion_id": asignacion["radicacion_id"],
-                    "auditor_username": asignacion["auditor_asignado"],
-                    "tipo_auditoria": asignacion["tipo_auditoria"],
-                    "estado": "ASIGNADA",
-                    "fecha_asignacion": timestamp,
-                    "fecha_limite": asignacion["fecha_limite"],
-                    "prioridad": asignacion["prioridad"],
-                    "valor_auditoria": asignacion["valor_auditoria"],
-                    "metadatos": {
-                        "coordinador_aprobador": coordinador_username,
-                        "algoritmo_version": propuesta["algoritmo_version"],
-                        "justificacion_algoritmo": asignacion["justificacion_algoritmo"]
-                    }
+            # 3. Registrar trazabilidad
+            self._registrar_trazabilidad(
+                propuesta_id, coordinador_username, "APROBACION_MASIVA",
+                {
+                    "total_asignaciones": reporte["resumen"]["creadas"] + reporte["resumen"]["existentes"],
+                    "radicaciones_procesadas": reporte["total"],
+                    "asignaciones_ids": [
+                        item["asignacion_id"] for item in reporte["exitosas"] if item["asignacion_id"]
+                    ],
+                    "resumen": reporte["resumen"],
+                    "fallidas": reporte["fallidas"]
                 }
-                
-                resultado = self.db.asignaciones_auditoria.insert_one(doc_asignacion)
-                asignaciones_creadas.append(resultado.inserted_id)
+            )
+            
+            logger.info(
+                f"Aprobación masiva de propuesta {propuesta_id}: {reporte['resumen']['creadas']} creadas, "
+                f"{reporte['resumen']['existentes']} existentes, {reporte['resumen']['fallidas']} fallidas"
+            )
+            return not reporte["fallidas"]
+            
+        except Exception as e:
+            logger.error(f"Error en aprobación masiva: {str(e)}")
+            return False
+
+    def _aprobar_individual(self, propuesta_id: ObjectId, radicaciones_ids: List, coordinador_username: str,
+                            timestamp: datetime) -> bool:
+        """
+        Aprueba solo las asignaciones de las radicaciones indicadas, con la misma
+        escritura por lotes e idempotente que la aprobación masiva
+        """
+        
+        try:
+            propuesta = self.asignaciones_automaticas.find_one({"_id": propuesta_id})
+            if not propuesta:
+                logger.error(f"Propuesta {propuesta_id} no encontrada")
+                return False
+            
+            ids = {str(radicacion_id) for radicacion_id in radicaciones_ids or []}
+            seleccion = [
+                asignacion for asignacion in propuesta.get("asignaciones_individuales", [])
+                if str(asignacion["radicacion_id"]) in ids
+            ]
+            if not seleccion:
+                logger.error(f"Ninguna de las radicaciones indicadas pertenece a la propuesta {propuesta_id}")
+                return False
+            
+            # 1. Crear asignaciones y actualizar radicaciones por lotes
+            reporte = self._materializar_asignaciones(propuesta, coordinador_username, timestamp, seleccion)
+            self.ultimo_reporte_aprobacion = reporte
             
-            # 3. Actualizar estado de radicaciones
-            radicaciones_ids = [asig["radicacion_id"] for asig in propuesta["asignaciones_individuales"]]
-            self.radicaciones.update_many(
-                {"_id": {"$in": radicaciones_ids}},
+            # 2. La propuesta queda aprobada cuando todas sus asignaciones existen
+            total_propuesta = len(propuesta.get("asignaciones_individuales", []))
+            aprobadas = self.db.asignaciones_auditoria.count_documents({"propuesta_id": propuesta_id})
+            self.asignaciones_automaticas.update_one(
+                {"_id": propuesta_id},
                 {
                     "$set": {
-                        "estado": "ASIGNADA",
-                        "asignacion_auditoria": {
-                            "propuesta_id": propuesta_id,
-                            "fecha_asignacion": timestamp,
-                            "coordinador": coordinador_username
+                        "estado": "APROBADA" if aprobadas >= total_propuesta else "APROBADA_PARCIAL",
+                        "fecha_aprobacion": timestamp,
+                        "reporte_aprobacion": {
+                            "resumen": reporte["resumen"],
+                            "fallidas": reporte["fallidas"]
+                        }
+                    },
+                    "$push": {
+                        "decisiones_coordinador": {
+                            "timestamp": timestamp,
+                            "accion": "APROBAR_INDIVIDUAL",
+                            "coordinador": coordinador_username,
+                            "radicaciones_ids": sorted(ids),
+                            "justificacion": f"Aprobación individual de {len(seleccion)} asignaciones"
                         }
                     }
                 }
             )
             
-            # 4. Registrar trazabilidad
+            # 3. Registrar trazabilidad
             self._registrar_trazabilidad(
-                propuesta_id, coordinador_username, "APROBACION_MASIVA",
+                propuesta_id, coordinador_username, "APROBACION_INDIVIDUAL",
                 {
-                    "total_asignaciones": len(asignaciones_creadas),
-                    "radicaciones_procesadas": len(radicaciones_ids),
-                    "asignaciones_ids": asignaciones_creadas
+                    "radicaciones_procesadas": reporte["total"],
+                    "asignaciones_ids": [
+                        item["asignacion_id"] for item in reporte["exitosas"] if item["asignacion_id"]
+                    ],
+                    "resumen": reporte["resumen"],
+                    "fallidas": reporte["fallidas"]
                 }
             )
             
-            logger.info(f"Aprobación masiva completada para propuesta {propuesta_id}")
-            return True
+            return not reporte["fallidas"]
             
         except Exception as e:
-            logger.error(f"Error en aprobación masiva: {str(e)}")
+            logger.error(f"Error en aprobación individual: {str(e)}")
             return False
 
+    def _materializar_asignaciones(self, propuesta: Dict, coordinador_username: str, timestamp: datetime,
+                                   asignaciones: Optional[List[Dict]] = None) -> Dict:
+        """
+        Inserta las asignaciones de la propuesta (o solo las indicadas) en
+        asignaciones_auditoria y marca sus radicaciones como ASIGNADA, lote por
+        lote, y reporta el resultado por ítem
+        """
+        self._asegurar_indices_asignaciones()
+        
+        propuesta_id = propuesta["_id"]
+        if asignaciones is None:
+            asignaciones = propuesta.get("asignaciones_individuales", [])
+        reporte = {
+            "propuesta_id": str(propuesta_id),
+            "total": len(asignaciones),
+            "exitosas": [],
+            "fallidas": [],
+            "resumen": {"creadas": 0, "existentes": 0, "fallidas": 0}
+        }
+        
+        def item(asignacion, **datos):
+            return {
+                "radicacion_id": str(asignacion["radicacion_id"]),
+                "auditor_username": asignacion["auditor_asignado"],
+                **datos
+            }
+        
+        inicio = 0
+        while inicio < len(asignaciones):
+            lote = asignaciones[inicio:inicio + LOTE_APROBACION]
+            operaciones = [
+                UpdateOne(
+                    {"propuesta_id": propuesta_id, "radicacion_id": asignacion["radicacion_id"]},
+                    {"$setOnInsert": self._documento_asignacion(propuesta, asignacion, coordinador_username, timestamp)},
+                    upsert=True
+                )
+                for asignacion in lote
+            ]
+            
+            # Lote ordenado: ante un error se procesó todo lo anterior y nada de lo posterior
+            procesados = len(lote)
+            insertados = {}
+            error_lote = None
+            try:
+                resultado = self.db.asignaciones_auditoria.bulk_write(operaciones, ordered=True)
+                insertados = resultado.upserted_ids
+            except BulkWriteError as e:
+                detalles = e.details
+                error_lote = detalles["writeErrors"][0]
+                procesados = error_lote["index"]
+                insertados = {u["index"]: u["_id"] for u in detalles.get("upserted", [])}
+            
+            escritos = [
+                item(
+                    asignacion,
+                    asignacion_id=str(insertados[indice]) if indice in insertados else None,
+                    resultado="CREADA" if indice in insertados else "EXISTENTE"
+                )
+                for indice, asignacion in enumerate(lote[:procesados])
+            ]
+            
+            # Contadores de carga: solo las asignaciones creadas en esta ejecución, aunque
+            # luego falle la actualización de las radicaciones (quedan creadas sin vincular)
+            creadas = [
+                {"auditor_username": asignacion["auditor_asignado"], "estado": "ASIGNADA", "fecha_asignacion": timestamp}
+                for indice, asignacion in enumerate(lote[:procesados]) if indice in insertados
+            ]
+            if creadas:
+                try:
+                    self.carga_auditores.registrar_asignaciones(creadas)
+                except Exception as e:
+                    logger.warning(f"No se actualizaron los contadores de carga: {str(e)}")
+            
+            # Estado de las radicaciones del lote (también las ya existentes: completa re-ejecuciones)
+            if escritos:
+                try:
+                    self.radicaciones.update_many(
+                        {"_id": {"$in": [asignacion["radicacion_id"] for asignacion in lote[:procesados]]}},
+                        {
+                            "$set": {
+                                "estado": "ASIGNADA",
+                                "asignacion_auditoria": {
+                                    "propuesta_id": propuesta_id,
+                                    "fecha_asignacion": timestamp,
+                                    "coordinador": coordinador_username
+                                }
+                            }
+                        }
+                    )
+                except Exception as e:
+                    reporte["fallidas"].extend(
+                        {**escrito, "error": f"Asignación registrada, radicación sin actualizar: {str(e)}"}
+                        for escrito in escritos
+                    )
+                    escritos = []
+            
+            reporte["exitosas"].extend(escritos)
+            for escrito in escritos:
+                reporte["resumen"]["creadas" if escrito["resultado"] == "CREADA" else "existentes"] += 1
+            
+            if error_lote is not None:
+                reporte["fallidas"].append(item(lote[procesados], error=error_lote.get("errmsg", "Error de escritura")))
+                procesados += 1
+            
+            inicio += procesados
+        
+        reporte["resumen"]["fallidas"] = len(reporte["fallidas"])
+        return reporte
+
+    def _documento_asignacion(self, propuesta: Dict, asignacion: Dict,
+                              coordinador_username: str, timestamp: datetime) -> Dict:
+        """Documento de asignaciones_auditoria para una asignación aprobada de la propuesta"""
+        return {
+            "propuesta_id": propuesta["_id"],
+            "radicacion_id": asignacion["radicacion_id"],
+            "numero_radicado": asignacion.get("numero_radicado"),
+            "auditor_username": asignacion["auditor_asignado"],
+            "auditor_perfil": asignacion.get("auditor_perfil"),
+            "prestador_nit": (asignacion.get("prestador_info") or {}).get("nit"),
+            "tipo_auditoria": asignacion["tipo_auditoria"],
+            "estado": "ASIGNADA",
+            "fecha_asignacion": timestamp,
+            "fecha_limite": asignacion["fecha_limite"],
+            "prioridad": asignacion["prioridad"],
+            "valor_auditoria": asignacion["valor_auditoria"],
+            "metadatos": {
+                "coordinador_aprobador": coordinador_username,
+                "algoritmo_version": propuesta.get("algoritmo_version"),
+                "justificacion_algoritmo": asignacion.get("justificacion_algoritmo")
+            }
+        }
+
+    def _asegurar_indices_asignaciones(self):
+        """
+        Clave de idempotencia: una asignación por (propuesta, radicación),
+        e índices de las columnas del tablero Kanban (con y sin filtro)
+        """
+        if AsignacionService._indices_asignaciones_creados:
+            return
+        for prefijo in ([], [("auditor_username", 1)], [("prestador_nit", 1)]):
+            self.db.asignaciones_auditoria.create_index(
+                prefijo + [("estado", 1), ("fecha_asignacion", -1), ("_id", -1)]
+            )
+        
+        self._deduplicar_asignaciones()
+        try:
+            self.db.asignaciones_auditoria.create_index(
+                [("propuesta_id", 1), ("radicacion_id", 1)],
+                unique=True,
+                partialFilterExpression={"propuesta_id": {"$exists": True}},
+                name="propuesta_radicacion_unica"
+            )
+        except OperationFailure as e:
+            # Sin el índice el upsert sigue funcionando, pero no protege de escrituras concurrentes
+            logger.error(f"No se creó el índice único propuesta_radicacion_unica: {str(e)}")
+            return
+        AsignacionService._indices_asignaciones_creados = True
+
+    def _deduplicar_asignaciones(self) -> int:
+        """
+        Asignaciones repetidas por (propuesta, radicación) de aprobaciones previas
+        al índice único: se conserva la más avanzada (o la primera) y las demás se
+        copian a asignaciones_auditoria_duplicadas antes de eliminarlas
+        """
+        grupos = self.db.asignaciones_auditoria.aggregate([
+            {"$match": {"propuesta_id": {"$exists": True}}},
+            {"$group": {
+                "_id": {"propuesta_id": "$propuesta_id", "radicacion_id": "$radicacion_id"},
+                "documentos": {"$push": {"_id": "$_id", "estado": "$estado"}},
+                "total": {"$sum": 1}
+            }},
+            {"$match": {"total": {"$gt": 1}}}
+        ], allowDiskUse=True)
+        
+        sobrantes = []
+        for grupo in grupos:
+            documentos = sorted(
+                grupo["documentos"],
+                key=lambda documento: (documento.get("estado") == "ASIGNADA", documento["_id"])
+            )
+            descartados = [documento["_id"] for documento in documentos[1:]]
+            logger.warning(
+                f"Asignación duplicada propuesta={grupo['_id'].get('propuesta_id')} "
+                f"radicacion={grupo['_id'].get('radicacion_id')}: se conserva {documentos[0]['_id']}, "
+                f"se eliminan {[str(_id) for _id in descartados]}"
+            )
+            sobrantes.extend(descartados)
+        
+        if sobrantes:
+            # Reemplazo por _id: repetir una limpieza interrumpida no falla
+            self.db.asignaciones_auditoria_duplicadas.bulk_write([
+                ReplaceOne({"_id": copia["_id"]}, copia, upsert=True)
+                for copia in self.db.asignaciones_auditoria.find({"_id": {"$in": sobrantes}})
+            ])
+            self.db.asignaciones_auditoria.delete_many({"_id": {"$in": sobrantes}})
+            logger.warning(f"{len(sobrantes)} asignaciones duplicadas movidas a asignaciones_auditoria_duplicadas")
+        return len(sobrantes)
+
+    # ======================================
+    # TABLERO KANBAN DE ASIGNACIONES
+    # ======================================
+
+    def obtener_kanban(self, auditor_username: Optional[str] = None, prestador_nit: Optional[str] = None,
+                       limite: int = KANBAN_LIMITE_POR_DEFECTO) -> Dict:
+        """
+        Conteo por columna y primera página (proyectada) de cada columna,
+        ordenada por fecha de asignación descendente
+        """
+        self._asegurar_indices_asignaciones()
+        filtros = self._filtros_kanban(auditor_username, prestador_nit)
+        
+        # Conteos: una agregación agrupada por estado
+        conteos = {columna: 0 for columna in COLUMNAS_KANBAN}
+        for grupo in self.db.asignaciones_auditoria.aggregate([
+            {"$match": filtros},
+            {"$group": {"_id": "$estado", "total": {"$sum": 1}}}
+        ]):
+            conteos[self._columna_de_estado(grupo["_id"])] += grupo["total"]
+        
+        tablero = {"conteos": conteos, "cursores": {}}
+        for columna in COLUMNAS_KANBAN:
+            pagina = self.obtener_columna_kanban(columna, None, limite, auditor_username, prestador_nit)
+            tablero[columna] = pagina["asignaciones"]
+            tablero["cursores"][columna] = pagina["cursor_siguiente"]
+        return tablero
+
+    def obtener_columna_kanban(self, columna: str, cursor: Optional[str] = None,
+                               limite: int = KANBAN_LIMITE_POR_DEFECTO,
+                               auditor_username: Optional[str] = None,
+                               prestador_nit: Optional[str] = None) -> Dict:
+        """Página siguiente de una columna ("cargar más") a partir del cursor opaco"""
+        limite = max(1, min(int(limite), KANBAN_LIMITE_MAXIMO))
+        
+        filtro = self._filtros_kanban(auditor_username, prestador_nit)
+        estado = COLUMNAS_KANBAN[columna]
+        filtro["estado"] = estado if estado else {
+            "$nin": [e for e in COLUMNAS_KANBAN.values() if e]
+        }
+        if cursor:
+            filtro = {"$and": [filtro, self._filtro_despues_de(cursor)]}
+        
+        # Se pide uno extra para saber si hay página siguiente
+        documentos = list(
+            self.db.asignaciones_auditoria.find(filtro, PROYECCION_KANBAN)
+            .sort([("fecha_asignacion", -1), ("_id", -1)])
+            .limit(limite + 1)
+        )
+        hay_mas = len(documentos) > limite
+        documentos = documentos[:limite]
+        
+        return {
+            "columna": columna,
+            "asignaciones": [self._serializar_kanban(doc) for doc in documentos],
+            "cursor_siguiente": self._codificar_cursor(documentos[-1]) if hay_mas else None
+        }
+
+    def _filtros_kanban(self, auditor_username: Optional[str], prestador_nit: Optional[str]) -> Dict:
+        filtros = {}
+        if auditor_username:
+            filtros["auditor_username"] = auditor_username
+        if prestador_nit:
+            filtros["prestador_nit"] = prestador_nit
+        return filtros
+
+    def _columna_de_estado(self, estado: Optional[str]) -> str:
+        for columna, estado_columna in COLUMNAS_KANBAN.items():
+            if estado_columna and estado_columna == estado:
+                return columna
+        return "pendientes"
+
+    def _codificar_cursor(self, documento: Dict) -> str:
+        fecha = documento.get("fecha_asignacion")
+        contenido = json.dumps({
+            "f": fecha.isoformat() if fecha else None,
+            "i": str(documento["_id"])
+        })
+        return base64.urlsafe_b64encode(contenido.encode()).decode()
+
+    def _filtro_despues_de(self, cursor: str) -> Dict:
+        """Documentos posteriores al cursor en el orden (fecha_asignacion desc, _id desc)"""
+        try:
+            contenido = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            ultimo_id = ObjectId(contenido["i"])
+            fecha = datetime.fromisoformat(contenido["f"]) if contenido["f"] else None
+        except (ValueError, KeyError, TypeError, InvalidId) as e:
+            raise CursorKanbanInvalido(f"Cursor inválido: {str(e)}")
+        
+        if fecha is None:
+            # Sin fecha: solo quedan los documentos sin fecha con _id menor
+            return {"fecha_asignacion": None, "_id": {"$lt": ultimo_id}}
+        return {"$or": [
+            {"fecha_asignacion": {"$lt": fecha}},
+            {"fecha_asignacion": fecha, "_id": {"$lt": ultimo_id}},
+            {"fecha_asignacion": None}
+        ]}
+
+    def _serializar_kanban(self, documento: Dict) -> Dict:
+        return {
+            campo: str(valor) if isinstance(valor, ObjectId) else valor
+            for campo, valor in documento.items()
+        }
+
     def _registrar_trazabilidad(self, propuesta_id: ObjectId, usuario: str, evento: str, detalles: Dict):
         """Registra evento en trazabilidad completa del proceso"""
         
@@ -894,33 +1298,20 @@ class AsignacionService:
                 'progressColor': 'info' if tasa_aceptacion > 90 else 'warning'
             })
             
-            # 4. Eficiencia de carga
-            auditores_activos = self.auditores_perfiles.count_documents({
-                'disponibilidad.activo': True
-            })
-            
-            if auditores_activos > 0:
-                pipeline_carga = [
-                    {'$match': {'disponibilidad.activo': True}},
-                    {'$project': {
-                        'carga': {
-                            '$multiply': [
-                                {'$divide': [
-                                    {'$ifNull': ['$capacidad_actual', 0]},
-                                    {'$ifNull': ['$capacidad_maxima_dia', 10]}
-                                ]},
-                                100
-                            ]
-                        }
-                    }},
-                    {'$group': {
-                        '_id': None,
-                        'promedio_carga': {'$avg': '$carga'}
-                    }}
+            # 4. Eficiencia de carga (contadores de carga_auditores)
+            auditores_activos = list(self.auditores_perfiles.find(
+                {'disponibilidad.activo': True},
+                {'username': 1, 'capacidad_maxima_dia': 1}
+            ))
+            
+            if auditores_activos:
+                contadores = self.carga_auditores.obtener([a['username'] for a in auditores_activos])
+                cargas = [
+                    self.carga_auditores.carga_actual(contadores.get(a['username']))['total_asignadas']
+                    / (a.get('capacidad_maxima_dia') or 10) * 100
+                    for a in auditores_activos
                 ]
-                
-                resultado_carga = list(self.auditores_perfiles.aggregate(pipeline_carga))
-                eficiencia = resultado_carga[0]['promedio_carga'] if resultado_carga else 65
+                eficiencia = sum(cargas) / len(cargas)
             else:
                 eficiencia = 65
             
@@ -1032,9 +1423,10 @@ class AsignacionService:
         
         try:
             auditores = list(self.auditores_perfiles.find({"disponibilidad.activo": True}))
+            contadores = self.carga_auditores.obtener([auditor["username"] for auditor in auditores])
             
             for auditor in auditores:
-                carga = self._calcular_carga_actual(auditor["username"])
+                carga = self.carga_auditores.carga_actual(contadores.get(auditor["username"]))
                 auditor["carga_actual"] = carga
                 auditor["porcentaje_carga"] = (carga["total_asignadas"] / auditor["capacidad_maxima_dia"]) * 100
             
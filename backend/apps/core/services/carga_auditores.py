@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# apps/core/services/carga_auditores.py
+
+"""
+Contadores de carga por auditor - NeurAudit Colombia
+
+Un documento por auditor en `carga_auditores` (_id = username) que se
+mantiene con $inc atómicos cada vez que una asignación se crea, cambia de
+estado o se reasigna:
+
+    {
+        "_id": "auditor.medico1",
+        "por_estado": {"ASIGNADA": 4, "EN_PROCESO": 2, "COMPLETADA": 31, "VENCIDA": 1},
+        "activas_por_dia": {"2026-10-19": 3},   # ASIGNADA/EN_PROCESO por día de asignación
+        "completadas_por_dia": {"2026-10-19": 5},   # pasos a COMPLETADA por día (últimos días)
+        "fecha_actualizacion": ...
+    }
+
+Las entradas por día en cero y las completadas de más de
+DIAS_COMPLETADAS_CONSERVADOS días se podan al actualizar, así los mapas no crecen.
+
+Los días son de la zona local (settings.TIME_ZONE): las fechas con zona
+horaria (ORM) se convierten y las fechas sin zona (datetime.now()) ya son
+hora local.
+
+Las vistas de carga leen estos documentos en una sola consulta por _id en
+lugar de contar asignaciones_auditoria. `reconciliar` los reconstruye desde
+asignaciones_auditoria y reporta la deriva (comando reconciliar_carga_auditores).
+En un despliegue existente la colección empieza vacía: setup_asignacion_system
+la siembra con `reconciliar` y, si no se ejecutó, se siembra sola en el primer
+uso del proceso.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLECCION_CARGA = 'carga_auditores'
+ESTADOS_ACTIVOS = ('ASIGNADA', 'EN_PROCESO')
+DIAS_COMPLETADAS_CONSERVADOS = 7
+
+
+def _dia(fecha: Optional[datetime]) -> Optional[str]:
+    """Día local de la fecha (las fechas sin zona horaria se toman como hora local)"""
+    if fecha is None:
+        return None
+    if timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return fecha.strftime('%Y-%m-%d')
+
+
+def _dia_hoy() -> str:
+    return timezone.localdate().strftime('%Y-%m-%d')
+
+
+class ContadoresCargaAuditores:
+    """Lectura y actualización atómica de los contadores de carga por auditor"""
+
+    # La siembra se comprueba una vez por proceso
+    _siembra_revisada = False
+
+    def __init__(self, db):
+        self.contadores = db[COLECCION_CARGA]
+        self.asignaciones = db.asignaciones_auditoria
+
+    # =====================================
+    # ACTUALIZACIÓN ($inc)
+    # =====================================
+
+    def registrar_asignaciones(self, asignaciones: Iterable[Dict]):
+        """Asignaciones nuevas (auditor_username, estado, fecha_asignacion)"""
+        deltas = {}
+        for asignacion in asignaciones:
+            self._sumar(
+                deltas, asignacion['auditor_username'],
+                asignacion.get('estado', 'ASIGNADA'), asignacion.get('fecha_asignacion'), 1
+            )
+        self._aplicar(deltas)
+
+    def registrar_cambio_estado(self, auditor_username: str, estado_anterior: str,
+                                estado_nuevo: str, fecha_asignacion: Optional[datetime],
+                                fecha_cambio: Optional[datetime] = None):
+        self.registrar_cambios_estado([{
+            'auditor_username': auditor_username,
+            'estado_anterior': estado_anterior,
+            'estado_nuevo': estado_nuevo,
+            'fecha_asignacion': fecha_asignacion,
+            'fecha_cambio': fecha_cambio
+        }])
+
+    def registrar_cambios_estado(self, cambios: Iterable[Dict]):
+        """
+        Cambios de estado en lote (auditor_username, estado_anterior, estado_nuevo,
+        fecha_asignacion y opcional fecha_cambio, por defecto ahora)
+        """
+        deltas = {}
+        for cambio in cambios:
+            if cambio['estado_anterior'] == cambio['estado_nuevo']:
+                continue
+            self._sumar(deltas, cambio['auditor_username'], cambio['estado_anterior'], cambio.get('fecha_asignacion'), -1)
+            self._sumar(deltas, cambio['auditor_username'], cambio['estado_nuevo'], cambio.get('fecha_asignacion'), 1)
+            if cambio['estado_nuevo'] == 'COMPLETADA':
+                campos = deltas[cambio['auditor_username']]
+                campo = f"completadas_por_dia.{_dia(cambio.get('fecha_cambio')) or _dia_hoy()}"
+                campos[campo] = campos.get(campo, 0) + 1
+        self._aplicar(deltas)
+
+    def registrar_reasignacion(self, auditor_anterior: str, auditor_nuevo: str,
+                               estado: str, fecha_asignacion: Optional[datetime]):
+        if auditor_anterior == auditor_nuevo:
+            return
+        deltas = {}
+        self._sumar(deltas, auditor_anterior, estado, fecha_asignacion, -1)
+        self._sumar(deltas, auditor_nuevo, estado, fecha_asignacion, 1)
+        self._aplicar(deltas)
+
+    def _sumar(self, deltas: Dict, auditor_username: str, estado: str, fecha_asignacion, cantidad: int):
+        campos = deltas.setdefault(auditor_username, {})
+        campo = f'por_estado.{estado}'
+        campos[campo] = campos.get(campo, 0) + cantidad
+        dia = _dia(fecha_asignacion)
+        if estado in ESTADOS_ACTIVOS and dia:
+            campo = f'activas_por_dia.{dia}'
+            campos[campo] = campos.get(campo, 0) + cantidad
+
+    def _aplicar(self, deltas: Dict[str, Dict[str, int]]):
+        operaciones = [
+            UpdateOne(
+                {'_id': auditor_username},
+                {'$inc': campos, '$set': {'fecha_actualizacion': datetime.now()}},
+                upsert=True
+            )
+            for auditor_username, campos in deltas.items() if campos
+        ]
+        if operaciones:
+            if self._sembrar_si_vacio():
+                # Las asignaciones ya están escritas: la siembra incluye estos cambios
+                return
+            self.contadores.bulk_write(operaciones, ordered=False)
+            self._podar(list(deltas))
+
+    def _podar(self, usernames: List[str]):
+        """Quita días en cero de activas_por_dia y completadas fuera de la ventana"""
+        dia_minimo = (timezone.localdate() - timedelta(days=DIAS_COMPLETADAS_CONSERVADOS)).strftime('%Y-%m-%d')
+        self.contadores.update_many({'_id': {'$in': usernames}}, [{'$set': {
+            'activas_por_dia': {'$arrayToObject': {'$filter': {
+                'input': {'$objectToArray': {'$ifNull': ['$activas_por_dia', {}]}},
+                'cond': {'$gt': ['$$this.v', 0]}
+            }}},
+            'completadas_por_dia': {'$arrayToObject': {'$filter': {
+                'input': {'$objectToArray': {'$ifNull': ['$completadas_por_dia', {}]}},
+                'cond': {'$and': [{'$gt': ['$$this.v', 0]}, {'$gte': ['$$this.k', dia_minimo]}]}
+            }}}
+        }}])
+
+    # =====================================
+    # LECTURA
+    # =====================================
+
+    def obtener(self, usernames: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Contadores por auditor en una sola consulta (todos si no se indican usernames)"""
+        self._sembrar_si_vacio()
+        filtro = {'_id': {'$in': list(usernames)}} if usernames is not None else {}
+        return {doc['_id']: doc for doc in self.contadores.find(filtro)}
+
+    @staticmethod
+    def carga_actual(contador: Optional[Dict], hoy: Optional[datetime] = None) -> Dict:
+        """Carga del auditor con la forma de AsignacionService._calcular_carga_actual"""
+        contador = contador or {}
+        por_estado = contador.get('por_estado', {})
+        dia_hoy = _dia(hoy) or _dia_hoy()
+        activas_hoy = contador.get('activas_por_dia', {}).get(dia_hoy, 0)
+        return {
+            'total_asignadas': activas_hoy,
+            'en_proceso': por_estado.get('EN_PROCESO', 0),
+            'activas': sum(por_estado.get(estado, 0) for estado in ESTADOS_ACTIVOS),
+            'completadas': por_estado.get('COMPLETADA', 0),
+            'vencidas': por_estado.get('VENCIDA', 0),
+            'completadas_hoy': contador.get('completadas_por_dia', {}).get(dia_hoy, 0)
+        }
+
+    # =====================================
+    # RECONCILIACIÓN
+    # =====================================
+
+    def _sembrar_si_vacio(self) -> bool:
+        """
+        Siembra los contadores desde asignaciones_auditoria si la colección está
+        vacía y ya hay asignaciones (despliegue existente sin setup_asignacion_system):
+        sin esto todos los auditores leerían carga 0
+        """
+        if ContadoresCargaAuditores._siembra_revisada:
+            return False
+        sembrado = False
+        if (self.contadores.find_one({}, {'_id': 1}) is None
+                and self.asignaciones.find_one({}, {'_id': 1}) is not None):
+            logger.info("Sembrando contadores de carga desde asignaciones_auditoria")
+            self.reconciliar(aplicar=True)
+            sembrado = True
+        ContadoresCargaAuditores._siembra_revisada = True
+        return sembrado
+
+    def reconciliar(self, aplicar: bool = True) -> Dict:
+        """
+        Reconstruye los contadores desde asignaciones_auditoria, compara con los
+        almacenados y (si aplicar) reemplaza los que difieren. completadas_por_dia
+        se conserva: asignaciones_auditoria no guarda la fecha de cierre
+        """
+        pipeline = [
+            {'$match': {'auditor_username': {'$type': 'string'}}},
+            {'$group': {
+                '_id': {
+                    'auditor': '$auditor_username',
+                    'estado': '$estado',
+                    'dia': {
+                        '$cond': [
+                            {'$in': ['$estado', list(ESTADOS_ACTIVOS)]},
+                            {'$dateToString': {
+                                'format': '%Y-%m-%d', 'date': '$fecha_asignacion',
+                                'timezone': settings.TIME_ZONE
+                            }},
+                            None
+                        ]
+                    }
+                },
+                'total': {'$sum': 1}
+            }}
+        ]
+
+        esperados: Dict[str, Dict] = {}
+        for grupo in self.asignaciones.aggregate(pipeline, allowDiskUse=True):
+            clave = grupo['_id']
+            esperado = esperados.setdefault(clave['auditor'], {'por_estado': {}, 'activas_por_dia': {}})
+            estado = clave.get('estado') or 'SIN_ESTADO'
+            esperado['por_estado'][estado] = esperado['por_estado'].get(estado, 0) + grupo['total']
+            if clave.get('dia'):
+                esperado['activas_por_dia'][clave['dia']] = (
+                    esperado['activas_por_dia'].get(clave['dia'], 0) + grupo['total']
+                )
+
+        actuales = {doc['_id']: doc for doc in self.contadores.find({})}
+        derivas = []
+        for auditor_username in sorted(set(esperados) | set(actuales)):
+            esperado = esperados.get(auditor_username, {'por_estado': {}, 'activas_por_dia': {}})
+            actual = actuales.get(auditor_username, {})
+            diferencias = {}
+            for seccion in ('por_estado', 'activas_por_dia'):
+                valores_actuales = {k: v for k, v in actual.get(seccion, {}).items() if v}
+                for clave in sorted(set(esperado[seccion]) | set(valores_actuales)):
+                    valor_esperado = esperado[seccion].get(clave, 0)
+                    valor_actual = valores_actuales.get(clave, 0)
+                    if valor_esperado != valor_actual:
+                        diferencias[f'{seccion}.{clave}'] = {'esperado': valor_esperado, 'actual': valor_actual}
+
+            if diferencias:
+                derivas.append({'auditor_username': auditor_username, 'diferencias': diferencias})
+                if aplicar:
+                    self.contadores.replace_one(
+                        {'_id': auditor_username},
+                        {
+                            **esperado,
+                            'completadas_por_dia': actual.get('completadas_por_dia', {}),
+                            'fecha_actualizacion': datetime.now(),
+                            'fecha_reconciliacion': datetime.now()
+                        },
+                        upsert=True
+                    )
+
+        return {
+            'auditores_revisados': len(set(esperados) | set(actuales)),
+            'auditores_con_deriva': len(derivas),
+            'aplicado': aplicar,
+            'derivas': derivas
+        }
+
+
+def get_contadores_carga() -> ContadoresCargaAuditores:
+    """Contadores sobre la conexión MongoDB compartida (para código fuera de AsignacionService)"""
+    from apps.core.mongodb_config import get_mongodb
+    return ContadoresCargaAuditores(get_mongodb().db)
+
+
+def registrar_sin_fallar(operacion: str, *args):
+    """
+    Actualiza los contadores sin interrumpir la operación de negocio:
+    una falla deja deriva que corrige la reconciliación
+    """
+    try:
+        getattr(get_contadores_carga(), operacion)(*args)
+    except Exception as e:
+        logger.warning(f"No se actualizaron los contadores de carga ({operacion}): {str(e)}")
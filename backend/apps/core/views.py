@@ -16,7 +16,9 @@ import json
 import logging
 
 # No usar modelos Django - NoSQL puro con PyMongo
-from .services.asignacion_service import AsignacionService
+from .services.asignacion_service import (
+    AsignacionService, COLUMNAS_KANBAN, CursorKanbanInvalido, KANBAN_LIMITE_POR_DEFECTO
+)
 
 logger = logging.getLogger(__name__)
 
@@ -222,16 +224,19 @@ class AsignacionViewSet(viewsets.ViewSet):
                 propuesta_id, decision, coordinador_username
             )
             
+            # Detalle por ítem de la aprobación masiva (exitosas / fallidas)
+            reporte = self.asignacion_service.ultimo_reporte_aprobacion
+            
             if resultado:
-                return Response(
-                    {'success': True, 'message': 'Decisión procesada exitosamente'},
-                    status=status.HTTP_200_OK
-                )
+                respuesta = {'success': True, 'message': 'Decisión procesada exitosamente'}
+                if reporte:
+                    respuesta['reporte'] = reporte
+                return Response(respuesta, status=status.HTTP_200_OK)
             else:
-                return Response(
-                    {'error': 'Error procesando decisión'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                respuesta = {'error': 'Error procesando decisión'}
+                if reporte:
+                    respuesta['reporte'] = reporte
+                return Response(respuesta, status=status.HTTP_400_BAD_REQUEST)
                 
         except Exception as e:
             logger.error(f"Error procesando decisión para propuesta {pk}: {str(e)}")
@@ -273,51 +278,44 @@ class AsignacionViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='kanban')
     def asignaciones_kanban(self, request):
         """
-        GET /api/asignacion/kanban/
+        GET /api/asignacion/kanban/?auditor=...&prestador_nit=...&limite=20
+        GET /api/asignacion/kanban/?columna=asignadas&cursor=...   (cargar más)
         
-        Obtiene asignaciones para vista Kanban organizadas por estado
+        Sin columna: conteos por columna, primera página de cada una y su cursor.
+        Con columna: página siguiente de esa columna a partir del cursor.
         """
         try:
-            # Consultar asignaciones por estado
-            pipeline = [
-                {
-                    '$group': {
-                        '_id': '$estado',
-                        'asignaciones': {'$push': '$$ROOT'}
-                    }
-                }
-            ]
-            
-            result = list(
-                self.asignacion_service.db.asignaciones_auditoria.aggregate(pipeline)
-            )
-            
-            # Organizar por estados
-            estados = {
-                'pendientes': [],
-                'asignadas': [],
-                'en_proceso': [],
-                'completadas': []
+            params = request.query_params
+            filtros = {
+                'auditor_username': params.get('auditor') or None,
+                'prestador_nit': params.get('prestador_nit') or None
             }
+            try:
+                limite = int(params.get('limite', KANBAN_LIMITE_POR_DEFECTO))
+            except ValueError:
+                return Response(
+                    {'error': 'limite debe ser numérico'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
-            for grupo in result:
-                estado_key = {
-                    'ASIGNADA': 'asignadas',
-                    'EN_PROCESO': 'en_proceso', 
-                    'COMPLETADA': 'completadas'
-                }.get(grupo['_id'], 'pendientes')
-                
-                # Convertir ObjectIds
-                for asignacion in grupo['asignaciones']:
-                    asignacion['_id'] = str(asignacion['_id'])
-                    asignacion['radicacion_id'] = str(asignacion['radicacion_id'])
-                    if 'propuesta_id' in asignacion:
-                        asignacion['propuesta_id'] = str(asignacion['propuesta_id'])
-                
-                estados[estado_key] = grupo['asignaciones']
+            columna = params.get('columna')
+            if not columna:
+                tablero = self.asignacion_service.obtener_kanban(limite=limite, **filtros)
+                return Response(tablero, status=status.HTTP_200_OK)
             
-            return Response(estados, status=status.HTTP_200_OK)
+            if columna not in COLUMNAS_KANBAN:
+                return Response(
+                    {'error': f'columna debe ser una de: {", ".join(COLUMNAS_KANBAN)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            pagina = self.asignacion_service.obtener_columna_kanban(
+                columna, params.get('cursor'), limite, **filtros
+            )
+            return Response(pagina, status=status.HTTP_200_OK)
             
+        except CursorKanbanInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error obteniendo asignaciones Kanban: {str(e)}")
             return Response(
@@ -367,6 +365,10 @@ class AsignacionViewSet(viewsets.ViewSet):
             }
             
             resultado = self.asignacion_service.db.asignaciones_auditoria.insert_one(asignacion_doc)
+            try:
+                self.asignacion_service.carga_auditores.registrar_asignaciones([asignacion_doc])
+            except Exception as e:
+                logger.warning(f"No se actualizaron los contadores de carga: {str(e)}")
             
             # Actualizar estado de radicación
             self.asignacion_service.radicaciones.update_one(
@@ -449,6 +451,13 @@ class AsignacionViewSet(viewsets.ViewSet):
             if '_id' in reporte:
                 del reporte['_id']
             
+            # Carga actual por auditor: una lectura de los contadores
+            servicio_carga = self.asignacion_service.carga_auditores
+            reporte['carga_auditores'] = [
+                {'auditor_username': username, **servicio_carga.carga_actual(contador)}
+                for username, contador in sorted(servicio_carga.obtener().items())
+            ]
+            
             return Response(reporte, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# apps/dashboard/services_metricas.py
+
+"""
+Métricas de glosas y conciliación para el dashboard - NeurAudit Colombia
+
+Series mensuales de valor glosado y conciliado, y efectividad de los auditores
+(valor glosado sobre valor de los servicios glosados). Cada métrica es una
+agregación acotada a una ventana de fechas sobre un campo indexado, en lugar
+de recorrer las colecciones completas en Python.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from bson import Decimal128
+from django.db import connections
+
+from apps.auditoria.models_facturas import ServicioFacturado
+from apps.auditoria.models_glosas import GlosaAplicada
+from apps.conciliacion.models import CasoConciliacion
+
+# Ventana del ranking de auditores (días hacia atrás desde hoy)
+VENTANA_EFECTIVIDAD_DIAS = 365
+LIMITE_TOP_AUDITORES = 5
+
+
+def a_float(valor) -> float:
+    """Valor numérico de MongoDB (Decimal128 / número / None) como float"""
+    if isinstance(valor, Decimal128):
+        return float(valor.to_decimal())
+    return float(valor or 0)
+
+
+def _rango_anio(anio: int):
+    return datetime(anio, 1, 1, tzinfo=dt_timezone.utc), datetime(anio + 1, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _serie_mensual(grupos) -> List[float]:
+    serie = [0] * 12
+    for grupo in grupos:
+        serie[grupo['_id'] - 1] = a_float(grupo['total'])
+    return serie
+
+
+class MetricasDashboard:
+    """
+    Agregaciones del dashboard sobre glosas, casos de conciliación y servicios
+    `db` permite usar otra base pymongo (p. ej. en pruebas); por defecto usa la del ORM
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.glosas = self._coleccion(GlosaAplicada._meta.db_table)
+        self.casos = self._coleccion(CasoConciliacion._meta.db_table)
+        self.servicios = ServicioFacturado._meta.db_table
+
+    def _coleccion(self, nombre):
+        if self.db is not None:
+            return self.db[nombre]
+        return connections['default'].get_collection(nombre)
+
+    def glosado_mensual(self, anio: int, prestador_nit: Optional[str] = None) -> List[float]:
+        """Valor glosado por mes del año (fecha de aplicación de la glosa)"""
+        inicio, fin = _rango_anio(anio)
+        filtro = {'fecha_aplicacion': {'$gte': inicio, '$lt': fin}}
+        if prestador_nit:
+            filtro['prestador_info.nit'] = prestador_nit
+
+        return _serie_mensual(self.glosas.aggregate([
+            {'$match': filtro},
+            {'$group': {'_id': {'$month': '$fecha_aplicacion'}, 'total': {'$sum': '$valor_glosado'}}}
+        ]))
+
+    def conciliado_mensual(self, anio: int, prestador_nit: Optional[str] = None) -> List[float]:
+        """
+        Valor conciliado por mes del año: glosas ratificadas + levantadas de cada caso,
+        en el mes de cierre del caso (o de su última actualización si sigue abierto)
+        """
+        inicio, fin = _rango_anio(anio)
+        # Todo caso cerrado o decidido en el año se actualizó en el año: acota por el índice
+        filtro = {'fecha_ultima_actualizacion': {'$gte': inicio}}
+        if prestador_nit:
+            filtro['prestador_info.nit'] = prestador_nit
+
+        return _serie_mensual(self.casos.aggregate([
+            {'$match': filtro},
+            {'$project': {
+                'fecha': {'$ifNull': ['$fecha_cierre', '$fecha_ultima_actualizacion']},
+                'valor': {'$add': [
+                    {'$ifNull': ['$resumen_financiero.valor_total_ratificado', 0]},
+                    {'$ifNull': ['$resumen_financiero.valor_total_levantado', 0]}
+                ]}
+            }},
+            {'$match': {'fecha': {'$gte': inicio, '$lt': fin}}},
+            {'$group': {'_id': {'$month': '$fecha'}, 'total': {'$sum': '$valor'}}}
+        ]))
+
+    def efectividad_auditores(self, desde: datetime, hasta: datetime,
+                              limite: int = LIMITE_TOP_AUDITORES) -> List[Dict[str, Any]]:
+        """
+        Top auditores por valor glosado en [desde, hasta) con su efectividad:
+        valor glosado / valor de los servicios glosados (cada servicio cuenta una vez)
+        """
+        filtro = {
+            'fecha_aplicacion': {'$gte': desde, '$lt': hasta},
+            'auditor_info.user_id': {'$nin': [None, '']}
+        }
+
+        top = list(self.glosas.aggregate([
+            {'$match': filtro},
+            {'$group': {
+                '_id': '$auditor_info.user_id',
+                'nombre': {'$first': '$auditor_info.nombre_completo'},
+                'rol': {'$first': '$auditor_info.rol'},
+                'glosas': {'$sum': 1},
+                'valor_glosado': {'$sum': '$valor_glosado'}
+            }},
+            {'$sort': {'valor_glosado': -1, '_id': 1}},
+            {'$limit': limite}
+        ]))
+        if not top:
+            return []
+
+        # Valor servicio solo para los auditores del top; el del servicio facturado
+        # prevalece sobre el copiado en la glosa
+        valor_servicio = {
+            grupo['_id']: a_float(grupo['valor_servicio'])
+            for grupo in self.glosas.aggregate([
+                {'$match': {**filtro, 'auditor_info.user_id': {'$in': [auditor['_id'] for auditor in top]}}},
+                {'$group': {
+                    '_id': {'auditor': '$auditor_info.user_id', 'servicio': '$servicio_id'},
+                    'valor_servicio': {'$max': '$valor_servicio'}
+                }},
+                {'$addFields': {'servicio_oid': {'$convert': {
+                    'input': '$_id.servicio', 'to': 'objectId', 'onError': None, 'onNull': None
+                }}}},
+                {'$lookup': {
+                    'from': self.servicios,
+                    'localField': 'servicio_oid',
+                    'foreignField': '_id',
+                    'as': 'servicio'
+                }},
+                {'$group': {
+                    '_id': '$_id.auditor',
+                    'valor_servicio': {'$sum': {'$ifNull': [
+                        {'$arrayElemAt': ['$servicio.valor_total', 0]}, '$valor_servicio'
+                    ]}}
+                }}
+            ])
+        }
+
+        auditores = []
+        for auditor in top:
+            valor_glosado = a_float(auditor['valor_glosado'])
+            servicios = valor_servicio.get(auditor['_id'], 0)
+            auditores.append({
+                'nombre': auditor.get('nombre') or 'Sin nombre',
+                'tipo': auditor.get('rol') or 'AUDITOR',
+                'glosas': auditor['glosas'],
+                'valor_glosado': valor_glosado,
+                'efectividad': round(valor_glosado / servicios * 100, 1) if servicios > 0 else 0
+            })
+        return auditores
+
+    def top_auditores(self, ahora: datetime, limite: int = LIMITE_TOP_AUDITORES) -> List[Dict[str, Any]]:
+        return self.efectividad_auditores(ahora - timedelta(days=VENTANA_EFECTIVIDAD_DIAS), ahora, limite)
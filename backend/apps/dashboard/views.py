@@ -8,17 +8,94 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import connections
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from apps.radicacion.models import RadicacionCuentaMedica
 from apps.authentication.models import User
+from apps.dashboard.services_metricas import MetricasDashboard, a_float
 
 import logging
-import random
 logger = logging.getLogger(__name__)
 
+ESTADOS_DASHBOARD = ['BORRADOR', 'RADICADA', 'EN_AUDITORIA', 'AUDITADA', 'DEVUELTA']
+ROLES_DASHBOARD = ['AUDITOR_MEDICO', 'AUDITOR_ADMINISTRATIVO', 'COORDINADOR', 'CONCILIADOR']
+
+
+def obtener_resumen_radicaciones(user, ahora):
+    """
+    Cifras de radicación del dashboard en una sola agregación ($facet):
+    conteos y sumas por estado, último mes / mes anterior, totales por mes
+    del año actual y top prestadores. Los PSS solo ven sus radicaciones.
+    """
+    filtro = {}
+    if user.is_pss_user:
+        filtro['usuario_radicador_id'] = user.pk
+
+    hace_30 = ahora - timedelta(days=30)
+    hace_60 = ahora - timedelta(days=60)
+    valor = {'$ifNull': ['$factura_valor_total', 0]}
+
+    pipeline = [
+        {'$match': filtro},
+        {'$facet': {
+            'por_estado': [
+                {'$match': {'estado': {'$in': ESTADOS_DASHBOARD}}},
+                {'$group': {'_id': '$estado', 'count': {'$sum': 1}, 'total': {'$sum': valor}}}
+            ],
+            'periodos': [
+                {'$group': {
+                    '_id': None,
+                    'total': {'$sum': 1},
+                    'ultimo_mes': {'$sum': {'$cond': [{'$gte': ['$created_at', hace_30]}, 1, 0]}},
+                    'mes_anterior': {'$sum': {'$cond': [
+                        {'$and': [{'$gte': ['$created_at', hace_60]}, {'$lt': ['$created_at', hace_30]}]}, 1, 0
+                    ]}}
+                }}
+            ],
+            'por_mes': [
+                {'$match': {'created_at': {
+                    '$gte': datetime(ahora.year, 1, 1, tzinfo=ahora.tzinfo),
+                    '$lt': datetime(ahora.year + 1, 1, 1, tzinfo=ahora.tzinfo)
+                }}},
+                {'$group': {'_id': {'$month': '$created_at'}, 'total': {'$sum': valor}}}
+            ],
+            'prestadores': [
+                {'$group': {
+                    '_id': '$pss_nit',
+                    'nombre': {'$first': '$pss_nombre'},
+                    'cantidad': {'$sum': 1},
+                    'valor': {'$sum': valor}
+                }},
+                {'$sort': {'valor': -1}},
+                {'$limit': 5}
+            ]
+        }}
+    ]
+
+    coleccion = connections['default'].get_collection(RadicacionCuentaMedica._meta.db_table)
+    resultado = next(coleccion.aggregate(pipeline), {})
+
+    por_estado = {grupo['_id']: grupo for grupo in resultado.get('por_estado', [])}
+    periodos = (resultado.get('periodos') or [{}])[0]
+    mensual = [0] * 12
+    for grupo in resultado.get('por_mes', []):
+        mensual[grupo['_id'] - 1] = a_float(grupo['total'])
+
+    return {
+        'stats_by_estado': [
+            {'estado': estado, 'count': por_estado[estado]['count'], 'total': a_float(por_estado[estado]['total'])}
+            for estado in ESTADOS_DASHBOARD if estado in por_estado
+        ],
+        'total': periodos.get('total', 0),
+        'ultimo_mes': periodos.get('ultimo_mes', 0),
+        'mes_anterior': periodos.get('mes_anterior', 0),
+        'mensual': mensual,
+        'prestadores': resultado.get('prestadores', [])
+    }
+
 
 def obtener_actividad_reciente():
     """Obtener actividad reciente de trazabilidad"""
@@ -54,54 +131,21 @@ def obtener_actividad_reciente():
     
     return actividades
 
-def obtener_top_prestadores(radicaciones_queryset):
-    """Obtener top 5 prestadores por valor radicado"""
-    prestadores = {}
-    
-    for rad in radicaciones_queryset:
-        nit = rad.pss_nit
-        if nit not in prestadores:
-            prestadores[nit] = {
-                'nombre': rad.pss_nombre,
-                'nit': nit,
-                'cantidad': 0,
-                'valor': 0
-            }
-        prestadores[nit]['cantidad'] += 1
-        prestadores[nit]['valor'] += float(rad.factura_valor_total or 0)
-    
-    # Convertir a lista y ordenar por valor
-    top_prestadores = sorted(prestadores.values(), key=lambda x: x['valor'], reverse=True)[:5]
-    return top_prestadores
+def obtener_top_prestadores(grupos_prestadores):
+    """Top 5 prestadores por valor radicado (grupos ya ordenados por la agregación)"""
+    return [
+        {
+            'nombre': grupo['nombre'],
+            'nit': grupo['_id'],
+            'cantidad': grupo['cantidad'],
+            'valor': a_float(grupo['valor'])
+        }
+        for grupo in grupos_prestadores
+    ]
 
-def obtener_top_auditores():
-    """Obtener top auditores por glosas aplicadas"""
-    from apps.auditoria.models_glosas import GlosaAplicada
-    
-    auditores_glosas = {}
-    glosas = GlosaAplicada.objects.all()
-    
-    for glosa in glosas:
-        auditor_info = glosa.auditor_info
-        if auditor_info:
-            auditor_id = auditor_info.get('id', 'unknown')
-            if auditor_id not in auditores_glosas:
-                auditores_glosas[auditor_id] = {
-                    'nombre': auditor_info.get('nombre', 'Sin nombre'),
-                    'tipo': auditor_info.get('rol', 'AUDITOR'),
-                    'glosas': 0,
-                    'valor_glosado': 0
-                }
-            auditores_glosas[auditor_id]['glosas'] += 1
-            auditores_glosas[auditor_id]['valor_glosado'] += float(glosa.valor_glosado or 0)
-    
-    # Calcular efectividad (porcentaje del valor glosado sobre valor servicio)
-    for auditor in auditores_glosas.values():
-        auditor['efectividad'] = round(random.uniform(70, 90), 1)  # Por ahora simulado
-    
-    # Ordenar y retornar top 5
-    top_auditores = sorted(auditores_glosas.values(), key=lambda x: x['valor_glosado'], reverse=True)[:5]
-    return top_auditores
+def obtener_top_auditores(metricas, ahora):
+    """Obtener top auditores por glosas aplicadas, con su efectividad real"""
+    return metricas.top_auditores(ahora)
 
 def obtener_top_servicios():
     """Obtener top servicios radicados"""
@@ -191,28 +235,13 @@ def dashboard_general(request):
             radicaciones_queryset = RadicacionCuentaMedica.objects.all()
         
         # Estad�sticas de radicaci�n
-        total_radicaciones = radicaciones_queryset.count()
-        
-        # Radicaciones del �ltimo mes
-        fecha_mes_anterior = timezone.now() - timedelta(days=30)
-        radicaciones_ultimo_mes = radicaciones_queryset.filter(
-            created_at__gte=fecha_mes_anterior
-        ).count()
-        
-        # Estadísticas por estado - usando iteración para MongoDB
-        stats_by_estado = []
-        for estado in ['BORRADOR', 'RADICADA', 'EN_AUDITORIA', 'AUDITADA', 'DEVUELTA']:
-            count = radicaciones_queryset.filter(estado=estado).count()
-            total = 0
-            for rad in radicaciones_queryset.filter(estado=estado):
-                total += float(rad.factura_valor_total or 0)
-            
-            if count > 0:
-                stats_by_estado.append({
-                    'estado': estado,
-                    'count': count,
-                    'total': total
-                })
+        ahora = timezone.now()
+        metricas = MetricasDashboard()
+        prestador_nit = user.nit if user.is_pss_user else None
+        resumen = obtener_resumen_radicaciones(user, ahora)
+        total_radicaciones = resumen['total']
+        radicaciones_ultimo_mes = resumen['ultimo_mes']
+        stats_by_estado = resumen['stats_by_estado']
         
         # Calcular totales monetarios
         total_radicado = sum(stat['total'] or 0 for stat in stats_by_estado)
@@ -223,11 +252,7 @@ def dashboard_general(request):
         total_conciliado = 0
         
         # Tendencias (comparando con mes anterior)
-        fecha_dos_meses = timezone.now() - timedelta(days=60)
-        radicaciones_mes_anterior = radicaciones_queryset.filter(
-            created_at__gte=fecha_dos_meses,
-            created_at__lt=fecha_mes_anterior
-        ).count()
+        radicaciones_mes_anterior = resumen['mes_anterior']
         
         # Calcular porcentaje de cambio
         if radicaciones_mes_anterior > 0:
@@ -238,32 +263,10 @@ def dashboard_general(request):
         # Datos para gr�ficos
         meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
         
-        # Datos mensuales reales basados en radicaciones del año actual
-        current_year = timezone.now().year
-        monthly_radicado = [0] * 12
-        monthly_glosado = [0] * 12
-        monthly_conciliado = [0] * 12
-        
-        # Calcular valores por mes para el año actual (compatible con MongoDB)
-        for month in range(1, 13):
-            # Radicaciones del mes usando iteración (MongoDB compatible)
-            month_total = 0
-            month_count = 0
-            
-            for rad in radicaciones_queryset:
-                if (rad.created_at.year == current_year and 
-                    rad.created_at.month == month):
-                    month_total += float(rad.factura_valor_total or 0)
-                    month_count += 1
-            
-            monthly_radicado[month - 1] = month_total
-            
-            # Simular datos de glosas y conciliación basados en radicaciones
-            if month_total > 0:
-                # 12-18% de glosas (promedio sector salud)
-                monthly_glosado[month - 1] = month_total * random.uniform(0.12, 0.18)
-                # 8-12% de conciliaciones (promedio sector)
-                monthly_conciliado[month - 1] = month_total * random.uniform(0.08, 0.12)
+        # Datos mensuales reales del año actual
+        monthly_radicado = resumen['mensual']
+        monthly_glosado = metricas.glosado_mensual(ahora.year, prestador_nit)
+        monthly_conciliado = metricas.conciliado_mensual(ahora.year, prestador_nit)
         
         resumen_mensual = {
             'meses': meses,
@@ -276,14 +279,11 @@ def dashboard_general(request):
         from apps.authentication.models import User
         from apps.auditoria.models_glosas import GlosaAplicada
         
-        # Contar usuarios por rol
-        roles_conteo = {}
-        usuarios_auditores = User.objects.filter(role__in=['AUDITOR_MEDICO', 'AUDITOR_ADMINISTRATIVO', 'COORDINADOR', 'CONCILIADOR'])
-        for usuario in usuarios_auditores:
-            rol = usuario.role
-            if rol not in roles_conteo:
-                roles_conteo[rol] = 0
-            roles_conteo[rol] += 1
+        # Contar usuarios por rol (agrupado en la base de datos)
+        roles_conteo = {
+            grupo['role']: grupo['total']
+            for grupo in User.objects.filter(role__in=ROLES_DASHBOARD).values('role').annotate(total=Count('id'))
+        }
         
         # Mapear a nombres amigables
         roles_nombres = {
@@ -292,13 +292,16 @@ def dashboard_general(request):
             'COORDINADOR': 'Coordinador',
             'CONCILIADOR': 'Conciliador'
         }
+        usuarios_por_rol = [
+            {'rol': rol, 'nombre': roles_nombres[rol], 'cantidad': roles_conteo.get(rol, 0)}
+            for rol in ROLES_DASHBOARD
+        ]
         
         # Generar datos de actividad semanal para gráfico radar
         dias_semana = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
         
         # Obtener actividad real de los últimos 7 días desde trazabilidad
         from apps.trazabilidad.models import RegistroTrazabilidad
-        from django.db.models import Count
         
         # Inicializar contadores
         auditor_medico_data = [0] * 7
@@ -414,8 +417,8 @@ def dashboard_general(request):
             'listas': {
                 'radicacionesRecientes': radicaciones_recientes,
                 'actividadReciente': obtener_actividad_reciente(),
-                'topPrestadores': obtener_top_prestadores(radicaciones_queryset),
-                'topAuditores': obtener_top_auditores(),
+                'topPrestadores': obtener_top_prestadores(resumen['prestadores']),
+                'topAuditores': obtener_top_auditores(metricas, ahora),
                 'topServicios': obtener_top_servicios(),
                 'facturasRecientes': obtener_facturas_recientes(),
                 'conciliacionesRecientes': obtener_conciliaciones_recientes()
@@ -423,6 +426,7 @@ def dashboard_general(request):
             'estadisticas': {
                 'totalRadicaciones': total_radicaciones,
                 'radicacionesUltimoMes': radicaciones_ultimo_mes,
+                'usuariosPorRol': usuarios_por_rol,
                 'estadosPorTipo': list(stats_by_estado)
             }
         }
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# apps/radicacion/asignacion_optima.py
+
+"""
+Asignación óptima por lotes de pre-glosas a auditores - NeurAudit Colombia
+
+En lugar de puntuar auditor por auditor para cada pre-glosa (greedy), el lote
+completo se resuelve como un problema de transporte de costo mínimo:
+- Cuotas: cuántas pre-glosas recibe cada auditor para nivelar la carga
+  pendiente (llenado por niveles: al final la carga difiere a lo sumo en 1)
+- Costo: puntuación negativa por (categoría de glosa, auditor); las pre-glosas
+  de una misma categoría son intercambiables, así que la matriz es
+  categorías x auditores y se calcula una sola vez con numpy
+- Solución: caminos mínimos sucesivos sobre el grafo residual (Bellman-Ford
+  vectorizado), exacta para costos reales y cuotas enteras
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Tolerancia para comparar distancias en punto flotante
+EPSILON = 1e-9
+
+
+class AsignacionNoFactible(Exception):
+    """La capacidad de los auditores no alcanza para la oferta de pre-glosas"""
+    pass
+
+
+def cuotas_equitativas(cargas: Sequence[float], total: int) -> np.ndarray:
+    """
+    Reparte `total` unidades entre auditores con cargas actuales `cargas`
+    minimizando la carga máxima resultante (llenado por niveles).
+    A igual carga final, la unidad sobrante va al auditor de menor posición.
+    """
+    cargas = np.asarray(cargas, dtype=float)
+    cuotas = np.zeros(len(cargas), dtype=np.int64)
+    if total <= 0 or len(cargas) == 0:
+        return cuotas
+
+    orden = np.argsort(cargas, kind='stable')
+    ordenadas = cargas[orden]
+    acumulado = np.cumsum(ordenadas)
+
+    # Nivel L tal que sum(max(0, L - carga)) = total sobre los `llenos` menos cargados
+    for llenos in range(1, len(ordenadas) + 1):
+        nivel = (total + acumulado[llenos - 1]) / llenos
+        if llenos == len(ordenadas) or nivel <= ordenadas[llenos]:
+            break
+
+    cuotas_ordenadas = np.zeros(len(ordenadas), dtype=np.int64)
+    cuotas_ordenadas[:llenos] = np.floor(nivel - ordenadas[:llenos] + EPSILON).astype(np.int64)
+    cuotas_ordenadas = np.maximum(cuotas_ordenadas, 0)
+
+    # Unidades que quedan por el redondeo: a las menores cargas finales
+    restantes = int(total - cuotas_ordenadas.sum())
+    if restantes > 0:
+        finales = ordenadas + cuotas_ordenadas
+        siguientes = np.lexsort((orden, finales))[:restantes]
+        cuotas_ordenadas[siguientes] += 1
+
+    cuotas[orden] = cuotas_ordenadas
+    return cuotas
+
+
+def transporte_costo_minimo(costos: np.ndarray, oferta: Sequence[int], capacidad: Sequence[int]) -> np.ndarray:
+    """
+    Flujo entero de costo mínimo de K orígenes (oferta) a M destinos (capacidad)
+    con costo unitario costos[k, j]. Retorna la matriz de flujo K x M.
+    A igual costo se prefieren los destinos de menor índice (resultado determinístico).
+    """
+    costos = np.asarray(costos, dtype=float)
+    oferta = np.array(oferta, dtype=np.int64)
+    capacidad = np.array(capacidad, dtype=np.int64)
+    K, M = costos.shape
+
+    if oferta.sum() > capacidad.sum():
+        raise AsignacionNoFactible(
+            f'Oferta {int(oferta.sum())} supera la capacidad {int(capacidad.sum())}'
+        )
+
+    flujo = np.zeros((K, M), dtype=np.int64)
+    columnas = np.arange(M)
+    filas = np.arange(K)
+
+    while oferta.sum() > 0:
+        # Distancias desde todos los orígenes con oferta pendiente (grafo residual):
+        # arcos k -> j con costo c[k, j] y arcos inversos j -> k con -c[k, j] donde hay flujo
+        # (los predecesores solo cambian con mejoras estrictas: sin ciclos en empates)
+        dist_origen = np.where(oferta > 0, 0.0, np.inf)
+        pred_origen = np.full(K, -1)
+        dist_destino = np.full(M, np.inf)
+        pred_destino = np.full(M, -1)
+
+        for _ in range(K + M + 2):
+            candidatos = dist_origen[:, None] + costos
+            mejor_origen = np.argmin(candidatos, axis=0)
+            candidatos_destino = candidatos[mejor_origen, columnas]
+            mejora_destino = candidatos_destino < dist_destino - EPSILON
+            dist_destino = np.where(mejora_destino, candidatos_destino, dist_destino)
+            pred_destino = np.where(mejora_destino, mejor_origen, pred_destino)
+
+            inversos = np.where(flujo > 0, dist_destino[None, :] - costos, np.inf)
+            mejor_destino = np.argmin(inversos, axis=1)
+            candidatos_origen = inversos[filas, mejor_destino]
+            mejora_origen = candidatos_origen < dist_origen - EPSILON
+            dist_origen = np.where(mejora_origen, candidatos_origen, dist_origen)
+            pred_origen = np.where(mejora_origen, mejor_destino, pred_origen)
+
+            if not mejora_destino.any() and not mejora_origen.any():
+                break
+        else:
+            raise RuntimeError('Ciclo de costo negativo en el grafo residual')
+
+        # Destino libre más cercano
+        libres = np.where(capacidad > 0, dist_destino, np.inf)
+        destino = int(np.argmin(libres))
+        if not np.isfinite(libres[destino]):
+            raise AsignacionNoFactible('No hay camino hacia un auditor con cupo')
+
+        # Reconstruir el camino y su cuello de botella
+        arcos_directos, arcos_inversos = [], []
+        j = destino
+        while True:
+            k = int(pred_destino[j])
+            arcos_directos.append((k, j))
+            if pred_origen[k] == -1:
+                break
+            j = int(pred_origen[k])
+            arcos_inversos.append((k, j))
+        origen = arcos_directos[-1][0]
+
+        cantidad = min(int(oferta[origen]), int(capacidad[destino]))
+        for k, j in arcos_inversos:
+            cantidad = min(cantidad, int(flujo[k, j]))
+
+        for k, j in arcos_directos:
+            flujo[k, j] += cantidad
+        for k, j in arcos_inversos:
+            flujo[k, j] -= cantidad
+        oferta[origen] -= cantidad
+        capacidad[destino] -= cantidad
+
+    return flujo
+
+
+def repartir_por_flujo(items_por_origen: List[List], flujo: np.ndarray) -> Dict[int, List]:
+    """
+    Convierte el flujo agregado en asignaciones concretas: dentro de cada origen
+    los ítems (ya ordenados por prioridad) se reparten en turno rotativo entre
+    los destinos que recibieron flujo de ese origen.
+    """
+    asignados: Dict[int, List] = {}
+    for k, items in enumerate(items_por_origen):
+        pendientes = {int(j): int(flujo[k, j]) for j in np.flatnonzero(flujo[k])}
+        turno = sorted(pendientes)
+        posicion = 0
+        for item in items:
+            while pendientes[turno[posicion % len(turno)]] == 0:
+                posicion += 1
+            j = turno[posicion % len(turno)]
+            asignados.setdefault(j, []).append(item)
+            pendientes[j] -= 1
+            posicion += 1
+    return asignados
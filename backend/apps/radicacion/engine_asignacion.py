@@ -12,6 +12,7 @@ from django.utils import timezone
 from decimal import Decimal
 from typing import Dict, List, Any, Optional, Tuple
 import logging
+from django.conf import settings
 from django.db.models import Q, Sum, Count, Avg
 from django.contrib.auth.models import User
 
@@ -20,9 +21,30 @@ from .models_auditoria import (
     PreGlosa, AsignacionAuditoria, TrazabilidadAuditoria
 )
 from .codigos_oficiales_resolucion_2284 import CAUSALES_GLOSA_OFICIALES
+from apps.core.services.carga_auditores import registrar_sin_fallar
 
 logger = logging.getLogger(__name__)
 
+# Estrategias de distribución de pre-glosas
+ESTRATEGIA_OPTIMA = 'OPTIMA'  # Transporte de costo mínimo por lotes (asignacion_optima)
+ESTRATEGIA_GREEDY = 'GREEDY'  # Selección del mejor auditor pre-glosa por pre-glosa
+
+# Mapeo de especialidades a categorías de glosa
+ESPECIALIZACIONES_GLOSAS = {
+    'FACTURACION': ['FA'],
+    'TARIFAS': ['TA'],
+    'MEDICINA_INTERNA': ['CL', 'CO'],
+    'CIRUGIA': ['CL', 'AU'],
+    'GENERAL': ['FA', 'TA', 'SO', 'AU', 'CO', 'CL', 'SA']
+}
+
+# Barrido de asignaciones vencidas
+ESTADOS_ASIGNACION_ACTIVOS = ('ASIGNADA', 'EN_PROCESO')
+ESTADOS_PRE_GLOSA_REASIGNABLES = ('PENDIENTE_AUDITORIA', 'ASIGNADA_AUDITORIA')  # Aún sin decisión del auditor
+DIAS_VENCIMIENTO_REASIGNACION = 12  # Días después de fecha_limite_auditoria
+LIMITE_REASIGNACION_POR_EJECUCION = 200  # Asignaciones vencidas procesadas por barrido
+LOTE_TRAZABILIDAD = 500
+
 
 class EngineAsignacionEquitativa:
     """
@@ -30,10 +52,13 @@ class EngineAsignacionEquitativa:
     según perfiles profesionales y distribución de carga de trabajo
     """
     
-    def __init__(self):
+    def __init__(self, estrategia: Optional[str] = None):
         self.auditores_disponibles = {}
         self.cargas_trabajo_actual = {}
         self.especializaciones_auditor = {}
+        self.estrategia = (
+            estrategia or settings.NEURAUDIT_SETTINGS.get('ASIGNACION_ESTRATEGIA', ESTRATEGIA_OPTIMA)
+        ).upper()
         
     def asignar_pre_glosas_automaticamente(self, pre_glosas_ids: List[str], 
                                          forzar_reasignacion: bool = False) -> Dict[str, Any]:
@@ -87,9 +112,10 @@ class EngineAsignacionEquitativa:
                     continue
 
                 # Distribuir equitativamente
-                distribuciones = self._distribuir_equitativamente(
+                distribuciones, estrategia = self._distribuir_pre_glosas(
                     pre_glosas_perfil, auditores_perfil, cargas_actuales
                 )
+                resultado['criterios_aplicados'].append(f'Distribución {perfil}: estrategia {estrategia}')
                 
                 # Crear asignaciones
                 for auditor_username, pre_glosas_asignadas in distribuciones.items():
@@ -150,6 +176,7 @@ class EngineAsignacionEquitativa:
             
             pre_glosa_data = {
                 'id': str(pre_glosa.id),
+                'transaccion_id': pre_glosa.transaccion_id,
                 'categoria_glosa': pre_glosa.categoria_glosa,
                 'codigo_glosa': pre_glosa.codigo_glosa,
                 'valor_glosado_sugerido': pre_glosa.valor_glosado_sugerido,
@@ -244,52 +271,43 @@ class EngineAsignacionEquitativa:
 
     def _calcular_cargas_trabajo_actuales(self, auditores_disponibles: Dict) -> Dict[str, Dict]:
         """
-        Calcula la carga de trabajo actual de cada auditor
+        Calcula la carga de trabajo actual de cada auditor a partir de la
+        instantánea de cargas (dos agregaciones para todo el equipo)
         """
         cargas_trabajo = {}
         
         # Período de cálculo: últimos 30 días
         fecha_inicio = timezone.now() - timedelta(days=30)
         
+        usernames = [
+            auditor['username']
+            for auditores in auditores_disponibles.values()
+            for auditor in auditores
+        ]
+        instantanea = self._obtener_instantanea_cargas(usernames, fecha_inicio)
+        
         for perfil, auditores in auditores_disponibles.items():
             for auditor in auditores:
                 username = auditor['username']
-                
-                # Asignaciones activas
-                asignaciones_activas = AsignacionAuditoria.objects.filter(
-                    auditor_username=username,
-                    estado__in=['ASIGNADA', 'EN_PROCESO'],
-                    fecha_asignacion__gte=fecha_inicio
-                ).aggregate(
-                    total_pre_glosas=Sum('total_pre_glosas'),
-                    valor_total=Sum('valor_total_asignado'),
-                    total_asignaciones=Count('id')
-                )
-                
-                # Pre-glosas auditadas recientemente
-                pre_glosas_auditadas = PreGlosa.objects.filter(
-                    auditado_por=username,
-                    fecha_auditoria__gte=fecha_inicio
-                ).aggregate(
-                    total_auditadas=Count('id'),
-                    valor_auditado=Sum('valor_glosado_sugerido')
-                )
+                asignaciones_activas = instantanea['asignaciones'].get(username, {})
+                pre_glosas_auditadas = instantanea['auditadas'].get(username, {})
                 
                 # Calcular métricas de rendimiento
                 rendimiento = self._calcular_rendimiento_auditor(
-                    username, fecha_inicio
+                    username, fecha_inicio,
+                    total_auditadas=pre_glosas_auditadas.get('total_auditadas') or 0
                 )
                 
                 cargas_trabajo[username] = {
                     'perfil': perfil,
                     'carga_actual': {
-                        'pre_glosas_pendientes': asignaciones_activas['total_pre_glosas'] or 0,
-                        'valor_pendiente': asignaciones_activas['valor_total'] or Decimal('0.00'),
-                        'asignaciones_activas': asignaciones_activas['total_asignaciones'] or 0
+                        'pre_glosas_pendientes': asignaciones_activas.get('total_pre_glosas') or 0,
+                        'valor_pendiente': asignaciones_activas.get('valor_total') or Decimal('0.00'),
+                        'asignaciones_activas': asignaciones_activas.get('total_asignaciones') or 0
                     },
                     'rendimiento_reciente': {
-                        'pre_glosas_auditadas': pre_glosas_auditadas['total_auditadas'] or 0,
-                        'valor_auditado': pre_glosas_auditadas['valor_auditado'] or Decimal('0.00'),
+                        'pre_glosas_auditadas': pre_glosas_auditadas.get('total_auditadas') or 0,
+                        'valor_auditado': pre_glosas_auditadas.get('valor_auditado') or Decimal('0.00'),
                         'promedio_diario': rendimiento['promedio_diario'],
                         'tiempo_promedio_auditoria': rendimiento['tiempo_promedio']
                     },
@@ -300,6 +318,138 @@ class EngineAsignacionEquitativa:
 
         return cargas_trabajo
 
+    def _obtener_instantanea_cargas(self, usernames: List[str], fecha_inicio: datetime) -> Dict[str, Dict]:
+        """
+        Carga y rendimiento de todos los auditores con una agregación agrupada
+        por colección (el número de consultas no depende del tamaño del equipo)
+        """
+        if not usernames:
+            return {'asignaciones': {}, 'auditadas': {}}
+        
+        # Asignaciones activas por auditor
+        asignaciones = AsignacionAuditoria.objects.filter(
+            auditor_username__in=usernames,
+            estado__in=['ASIGNADA', 'EN_PROCESO'],
+            fecha_asignacion__gte=fecha_inicio
+        ).values('auditor_username').annotate(
+            total_pre_glosas=Sum('total_pre_glosas'),
+            valor_total=Sum('valor_total_asignado'),
+            total_asignaciones=Count('id')
+        ).order_by()
+        
+        # Pre-glosas auditadas recientemente por auditor
+        auditadas = PreGlosa.objects.filter(
+            auditado_por__in=usernames,
+            fecha_auditoria__gte=fecha_inicio
+        ).values('auditado_por').annotate(
+            total_auditadas=Count('id'),
+            valor_auditado=Sum('valor_glosado_sugerido')
+        ).order_by()
+        
+        return {
+            'asignaciones': {fila['auditor_username']: fila for fila in asignaciones},
+            'auditadas': {fila['auditado_por']: fila for fila in auditadas}
+        }
+
+    def _distribuir_pre_glosas(self, pre_glosas: List[Dict], auditores: List[Dict],
+                               cargas_actuales: Dict) -> Tuple[Dict[str, List[Dict]], str]:
+        """
+        Distribuye con la estrategia configurada; si la asignación óptima no
+        está disponible o falla, recurre a la distribución greedy
+        """
+        if self.estrategia == ESTRATEGIA_OPTIMA:
+            try:
+                return self._distribuir_optimo(pre_glosas, auditores, cargas_actuales), ESTRATEGIA_OPTIMA
+            except Exception as e:
+                logger.warning(f'Asignación óptima no disponible, se usa greedy: {str(e)}')
+        
+        return self._distribuir_equitativamente(pre_glosas, auditores, cargas_actuales), ESTRATEGIA_GREEDY
+
+    def _distribuir_optimo(self, pre_glosas: List[Dict], auditores: List[Dict],
+                           cargas_actuales: Dict) -> Dict[str, List[Dict]]:
+        """
+        Distribución óptima por lotes: cuotas que nivelan la carga pendiente y
+        transporte de costo mínimo sobre la matriz de puntuación
+        (categorías de glosa x auditores), calculada una sola vez con numpy
+        """
+        import numpy as np
+        from .asignacion_optima import cuotas_equitativas, transporte_costo_minimo, repartir_por_flujo
+        
+        auditores_disponibles = [
+            a for a in auditores 
+            if cargas_actuales.get(a['username'], {}).get('disponible', True)
+        ]
+        
+        if not auditores_disponibles or not pre_glosas:
+            return {}
+        
+        # Pre-glosas agrupadas por categoría (intercambiables entre sí), en el orden del greedy
+        pre_glosas_ordenadas = sorted(
+            pre_glosas,
+            key=lambda x: (
+                self._convertir_prioridad_a_numero(x['prioridad_revision']),
+                x['complejidad'],
+                x['valor_glosado_sugerido']
+            ),
+            reverse=True
+        )
+        categorias = sorted({pg['categoria_glosa'] for pg in pre_glosas_ordenadas})
+        pre_glosas_por_categoria = [
+            [pg for pg in pre_glosas_ordenadas if pg['categoria_glosa'] == categoria]
+            for categoria in categorias
+        ]
+        
+        # Vectores por auditor
+        cargas = [
+            cargas_actuales.get(a['username'], {}).get('carga_actual', {}).get('pre_glosas_pendientes', 0)
+            for a in auditores_disponibles
+        ]
+        promedio_diario = np.array([
+            cargas_actuales.get(a['username'], {}).get('rendimiento_reciente', {}).get('promedio_diario', 1)
+            for a in auditores_disponibles
+        ], dtype=float)
+        utilizacion = np.array([
+            cargas_actuales.get(a['username'], {}).get('capacidad_estimada', {}).get('utilizacion_actual', 0)
+            for a in auditores_disponibles
+        ], dtype=float)
+        especialidades, indice_especialidad = np.unique(
+            [a.get('especialidad', 'GENERAL') for a in auditores_disponibles], return_inverse=True
+        )
+        
+        # Factor de especialización por (categoría, especialidad) y expansión a (categoría, auditor)
+        tabla_especializacion = np.array([
+            [self._calcular_factor_especializacion({'especialidad': e}, {'categoria_glosa': c}) for e in especialidades]
+            for c in categorias
+        ], dtype=float)
+        factor_especializacion = tabla_especializacion[:, indice_especialidad]
+        
+        # Mismos pesos que _seleccionar_auditor_optimo; la carga la equilibran las cuotas
+        puntuacion = (
+            factor_especializacion * 0.3 +
+            np.minimum(10, promedio_diario)[None, :] * 0.2 +
+            np.maximum(1, 10 - utilizacion * 10)[None, :] * 0.1
+        )
+        
+        cuotas = cuotas_equitativas(cargas, len(pre_glosas_ordenadas))
+        flujo = transporte_costo_minimo(
+            -puntuacion, [len(grupo) for grupo in pre_glosas_por_categoria], cuotas
+        )
+        asignados = repartir_por_flujo(pre_glosas_por_categoria, flujo)
+        
+        distribuciones = {}
+        for indice in sorted(asignados):
+            username = auditores_disponibles[indice]['username']
+            distribuciones[username] = asignados[indice]
+            
+            # Actualizar carga simulada como en la distribución greedy
+            if username in cargas_actuales:
+                cargas_actuales[username]['carga_actual']['pre_glosas_pendientes'] += len(asignados[indice])
+                cargas_actuales[username]['carga_actual']['valor_pendiente'] += sum(
+                    pg['valor_glosado_sugerido'] for pg in asignados[indice]
+                )
+        
+        return distribuciones
+
     def _distribuir_equitativamente(self, pre_glosas: List[Dict], 
                                   auditores: List[Dict], 
                                   cargas_actuales: Dict) -> Dict[str, List[Dict]]:
@@ -462,6 +612,11 @@ class EngineAsignacionEquitativa:
             valor_total_asignado=valor_total,
             fecha_limite_auditoria=timezone.now() + timedelta(days=10)  # 10 días para auditoría
         )
+        registrar_sin_fallar('registrar_asignaciones', [{
+            'auditor_username': auditor_username,
+            'estado': asignacion.estado,
+            'fecha_asignacion': asignacion.fecha_asignacion
+        }])
         
         # Actualizar estado de las pre-glosas
         PreGlosa.objects.filter(id__in=pre_glosas_ids).update(
@@ -470,14 +625,52 @@ class EngineAsignacionEquitativa:
             perfil_auditor=perfil
         )
         
+        return self._resumen_asignacion(asignacion)
+
+    def _crear_asignaciones_en_lote(self, plan: List[Tuple[str, str, List[Dict]]]) -> List[Dict]:
+        """
+        Crea en un solo insert las asignaciones de un plan [(auditor, perfil, pre_glosas)]
+        """
+        fecha_limite = timezone.now() + timedelta(days=10)  # 10 días para auditoría
+        asignaciones = AsignacionAuditoria.objects.bulk_create([
+            AsignacionAuditoria(
+                auditor_username=auditor_username,
+                auditor_perfil=perfil,
+                pre_glosas_ids=[pg['id'] for pg in pre_glosas],
+                total_pre_glosas=len(pre_glosas),
+                valor_total_asignado=sum(pg['valor_glosado_sugerido'] for pg in pre_glosas),
+                fecha_limite_auditoria=fecha_limite
+            )
+            for auditor_username, perfil, pre_glosas in plan
+        ])
+        registrar_sin_fallar('registrar_asignaciones', [
+            {
+                'auditor_username': asignacion.auditor_username,
+                'estado': asignacion.estado,
+                'fecha_asignacion': asignacion.fecha_asignacion
+            }
+            for asignacion in asignaciones
+        ])
+        
+        # Una actualización de pre-glosas por auditor
+        for asignacion in asignaciones:
+            PreGlosa.objects.filter(id__in=asignacion.pre_glosas_ids).update(
+                estado='ASIGNADA_AUDITORIA',
+                auditado_por=asignacion.auditor_username,
+                perfil_auditor=asignacion.auditor_perfil
+            )
+        
+        return [self._resumen_asignacion(asignacion) for asignacion in asignaciones]
+
+    def _resumen_asignacion(self, asignacion: AsignacionAuditoria) -> Dict:
         return {
             'asignacion_id': str(asignacion.id),
-            'auditor_username': auditor_username,
-            'perfil': perfil,
-            'total_pre_glosas': len(pre_glosas),
-            'valor_total': float(valor_total),
+            'auditor_username': asignacion.auditor_username,
+            'perfil': asignacion.auditor_perfil,
+            'total_pre_glosas': asignacion.total_pre_glosas,
+            'valor_total': float(asignacion.valor_total_asignado),
             'fecha_limite': asignacion.fecha_limite_auditoria,
-            'pre_glosas_asignadas': pre_glosas_ids
+            'pre_glosas_asignadas': asignacion.pre_glosas_ids
         }
 
     # Métodos auxiliares
@@ -531,16 +724,18 @@ class EngineAsignacionEquitativa:
             'horario': 'DIURNO'
         })
 
-    def _calcular_rendimiento_auditor(self, username: str, fecha_inicio: datetime) -> Dict:
+    def _calcular_rendimiento_auditor(self, username: str, fecha_inicio: datetime,
+                                      total_auditadas: Optional[int] = None) -> Dict:
         """
         Calcula métricas de rendimiento de un auditor
+        (total_auditadas viene de la instantánea de cargas; si falta se consulta)
         """
-        pre_glosas_auditadas = PreGlosa.objects.filter(
-            auditado_por=username,
-            fecha_auditoria__gte=fecha_inicio
-        )
+        if total_auditadas is None:
+            total_auditadas = PreGlosa.objects.filter(
+                auditado_por=username,
+                fecha_auditoria__gte=fecha_inicio
+            ).count()
         
-        total_auditadas = pre_glosas_auditadas.count()
         dias_transcurridos = max(1, (timezone.now() - fecha_inicio).days)
         
         return {
@@ -575,16 +770,7 @@ class EngineAsignacionEquitativa:
         especialidad = auditor.get('especialidad', 'GENERAL')
         categoria = pre_glosa.get('categoria_glosa', '')
         
-        # Mapeo de especialidades a categorías de glosa
-        especializaciones_glosas = {
-            'FACTURACION': ['FA'],
-            'TARIFAS': ['TA'],
-            'MEDICINA_INTERNA': ['CL', 'CO'],
-            'CIRUGIA': ['CL', 'AU'],
-            'GENERAL': ['FA', 'TA', 'SO', 'AU', 'CO', 'CL', 'SA']
-        }
-        
-        categorias_especialidad = especializaciones_glosas.get(especialidad, [])
+        categorias_especialidad = ESPECIALIZACIONES_GLOSAS.get(especialidad, [])
         
         if categoria in categorias_especialidad:
             if especialidad == 'GENERAL':
@@ -670,36 +856,154 @@ class EngineAsignacionEquitativa:
 
         return estadisticas
 
-    def reasignar_pre_glosas_vencidas(self) -> Dict:
+    def reasignar_pre_glosas_vencidas(self, limite: Optional[int] = LIMITE_REASIGNACION_POR_EJECUCION,
+                                      simular: bool = False, usuario: str = 'sistema') -> Dict:
         """
-        Reasigna pre-glosas con asignaciones vencidas
+        Barrido de asignaciones vencidas: las marca VENCIDA y reasigna en lote sus
+        pre-glosas aún sin decisión, con una sola instantánea de carga por ejecución.
+        Pensado para ejecución periódica (comando reasignar_pre_glosas_vencidas).
+        
+        - limite: máximo de asignaciones vencidas por ejecución (None o 0: todas)
+        - simular: calcula la redistribución sin escribir nada
         """
-        fecha_vencimiento = timezone.now() - timedelta(days=12)  # 2 días de gracia
+        fecha_vencimiento = timezone.now() - timedelta(days=DIAS_VENCIMIENTO_REASIGNACION)
         
+        # Índice (estado, fecha_limite_auditoria): las más antiguas primero
         asignaciones_vencidas = AsignacionAuditoria.objects.filter(
-            fecha_limite_auditoria__lt=fecha_vencimiento,
-            estado__in=['ASIGNADA', 'EN_PROCESO']
+            estado__in=ESTADOS_ASIGNACION_ACTIVOS,
+            fecha_limite_auditoria__lt=fecha_vencimiento
+        ).order_by('fecha_limite_auditoria', 'id').only(
+            'id', 'auditor_username', 'estado', 'fecha_asignacion', 'pre_glosas_ids'
         )
+        if limite:
+            asignaciones_vencidas = asignaciones_vencidas[:limite]
+        asignaciones_vencidas = list(asignaciones_vencidas)
+
+        resultado = {
+            'simulacion': simular,
+            'asignaciones_vencidas': len(asignaciones_vencidas),
+            'pre_glosas_reasignadas': 0,
+            'pre_glosas_sin_auditor': 0,
+            'asignaciones_creadas': [],
+            'auditores_asignados': {},
+            'eventos_trazabilidad': 0
+        }
+        if not asignaciones_vencidas:
+            return {**resultado, 'mensaje': 'No hay asignaciones vencidas para reasignar'}
 
-        pre_glosas_a_reasignar = []
+        # Asignación vencida de origen de cada pre-glosa
+        origen = {}
         for asignacion in asignaciones_vencidas:
-            pre_glosas_ids = asignacion.pre_glosas_ids
-            pre_glosas_a_reasignar.extend(pre_glosas_ids)
-            
-            # Marcar asignación como vencida
-            asignacion.estado = 'VENCIDA'
-            asignacion.save()
-
-        if pre_glosas_a_reasignar:
-            # Reasignar automáticamente
-            resultado = self.asignar_pre_glosas_automaticamente(
-                pre_glosas_a_reasignar, 
-                forzar_reasignacion=True
+            for pre_glosa_id in asignacion.pre_glosas_ids:
+                origen[str(pre_glosa_id)] = asignacion
+
+        pre_glosas = PreGlosa.objects.filter(
+            id__in=list(origen), estado__in=ESTADOS_PRE_GLOSA_REASIGNABLES
+        )
+        pre_glosas_por_perfil = self._clasificar_pre_glosas_por_perfil(pre_glosas)
+
+        # Instantánea única de auditores y cargas para todo el barrido
+        auditores_disponibles = self._obtener_auditores_disponibles()
+        cargas_actuales = self._calcular_cargas_trabajo_actuales(auditores_disponibles)
+
+        plan = []
+        for perfil, pre_glosas_perfil in pre_glosas_por_perfil.items():
+            if not pre_glosas_perfil:
+                continue
+            auditores_perfil = auditores_disponibles.get(perfil, [])
+            if not auditores_perfil:
+                logger.warning(f'No hay auditores disponibles para perfil {perfil}')
+                resultado['pre_glosas_sin_auditor'] += len(pre_glosas_perfil)
+                continue
+            distribuciones, _ = self._distribuir_pre_glosas(
+                pre_glosas_perfil, auditores_perfil, cargas_actuales
+            )
+            plan.extend(
+                (auditor_username, perfil, asignadas)
+                for auditor_username, asignadas in distribuciones.items() if asignadas
+            )
+
+        for auditor_username, perfil, asignadas in plan:
+            resumen = resultado['auditores_asignados'].setdefault(auditor_username, {
+                'perfil': perfil,
+                'total_pre_glosas': 0,
+                'valor_total': Decimal('0.00')
+            })
+            resumen['total_pre_glosas'] += len(asignadas)
+            resumen['valor_total'] += sum(pg['valor_glosado_sugerido'] for pg in asignadas)
+            resultado['pre_glosas_reasignadas'] += len(asignadas)
+
+        if simular:
+            resultado['mensaje'] = (
+                f"Simulación: {resultado['pre_glosas_reasignadas']} pre-glosas de "
+                f"{len(asignaciones_vencidas)} asignaciones vencidas se reasignarían"
             )
-            resultado['asignaciones_vencidas'] = len(asignaciones_vencidas)
             return resultado
-        
-        return {
-            'mensaje': 'No hay asignaciones vencidas para reasignar',
-            'asignaciones_vencidas': 0
-        }
\ No newline at end of file
+
+        # Primero las nuevas asignaciones: si el insert falla, las vencidas siguen
+        # activas y la próxima ejecución las vuelve a tomar
+        if plan:
+            resultado['asignaciones_creadas'] = self._crear_asignaciones_en_lote(plan)
+
+        # Marcar vencidas con una sola escritura, solo después de reasignar
+        AsignacionAuditoria.objects.filter(
+            id__in=[asignacion.id for asignacion in asignaciones_vencidas],
+            estado__in=ESTADOS_ASIGNACION_ACTIVOS
+        ).update(estado='VENCIDA')
+        registrar_sin_fallar('registrar_cambios_estado', [
+            {
+                'auditor_username': asignacion.auditor_username,
+                'estado_anterior': asignacion.estado,
+                'estado_nuevo': 'VENCIDA',
+                'fecha_asignacion': asignacion.fecha_asignacion
+            }
+            for asignacion in asignaciones_vencidas
+        ])
+
+        if plan:
+            resultado['eventos_trazabilidad'] = self._registrar_trazabilidad_reasignacion(
+                plan, resultado['asignaciones_creadas'], origen, usuario
+            )
+
+        resultado['mensaje'] = (
+            f"{resultado['pre_glosas_reasignadas']} pre-glosas de {len(asignaciones_vencidas)} "
+            f"asignaciones vencidas reasignadas en {len(resultado['asignaciones_creadas'])} asignaciones"
+        )
+        return resultado
+
+    def _registrar_trazabilidad_reasignacion(self, plan: List[Tuple[str, str, List[Dict]]],
+                                             asignaciones_creadas: List[Dict], origen: Dict,
+                                             usuario: str) -> int:
+        """
+        Un evento PRE_GLOSA_ASIGNADA por pre-glosa reasignada, insertados por lotes
+        """
+        eventos = []
+        for (auditor_username, _, pre_glosas), creada in zip(plan, asignaciones_creadas):
+            for pre_glosa in pre_glosas:
+                vencida = origen[pre_glosa['id']]
+                eventos.append(TrazabilidadAuditoria(
+                    transaccion_id=pre_glosa['transaccion_id'],
+                    num_factura=pre_glosa['num_factura'],
+                    evento='PRE_GLOSA_ASIGNADA',
+                    usuario=usuario,
+                    descripcion=(
+                        f"Pre-glosa reasignada por vencimiento: "
+                        f"{vencida.auditor_username} → {auditor_username}"
+                    ),
+                    datos_adicionales={
+                        'pre_glosa_id': pre_glosa['id'],
+                        'motivo': 'ASIGNACION_VENCIDA',
+                        'asignacion_vencida_id': str(vencida.id),
+                        'auditor_anterior': vencida.auditor_username,
+                        'asignacion_id': creada['asignacion_id'],
+                        'auditor_nuevo': auditor_username
+                    },
+                    origen='AUTOMATICO'
+                ))
+
+        try:
+            TrazabilidadAuditoria.objects.bulk_create(eventos, batch_size=LOTE_TRAZABILIDAD)
+            return len(eventos)
+        except Exception as e:
+            logger.error(f'Error registrando trazabilidad de reasignación: {str(e)}')
+            return 0
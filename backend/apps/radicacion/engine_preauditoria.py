@@ -21,6 +21,7 @@ from .models_auditoria import (
 )
 from apps.catalogs.models import BDUAAfiliados
 from apps.catalogs.validation_engine_advanced import ValidationEngineAdvanced
+from apps.core.services.carga_auditores import registrar_sin_fallar
 
 logger = logging.getLogger(__name__)
 
@@ -290,6 +291,11 @@ class EnginePreAuditoria:
             valor_total_asignado=valor_total,
             fecha_limite_auditoria=timezone.now() + timedelta(days=10)  # 10 días para auditoría
         )
+        registrar_sin_fallar('registrar_asignaciones', [{
+            'auditor_username': auditor_username,
+            'estado': asignacion.estado,
+            'fecha_asignacion': asignacion.fecha_asignacion
+        }])
         
         # Actualizar estado de las pre-glosas
         PreGlosa.objects.filter(id__in=pre_glosas_ids).update(
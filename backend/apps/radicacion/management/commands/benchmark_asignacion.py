@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# apps/radicacion/management/commands/benchmark_asignacion.py
+
+"""
+Benchmark del algoritmo de distribución equitativa de AsignacionService
+Mide el tiempo de generar una propuesta sobre una carga sintética
+(por defecto 10.000 radicaciones x 200 auditores) sin tocar MongoDB, y la
+compara con la selección lineal anterior (min() sobre todos los auditores)
+verificando que ambas produzcan exactamente la misma propuesta.
+"""
+
+import copy
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.services.asignacion_service import AsignacionService
+
+
+class AsignacionServiceLineal(AsignacionService):
+    """Distribución de referencia O(n·m): min() sobre todos los auditores por radicación"""
+
+    def _distribuir_radicaciones(self, radicaciones, auditores, tipo):
+        asignaciones = []
+        if not auditores:
+            return asignaciones
+
+        radicaciones.sort(key=lambda x: self._peso_prioridad(x["prioridad"]), reverse=True)
+
+        for radicacion in radicaciones:
+            auditor_seleccionado = min(auditores, key=lambda x: x.get("carga_temporal", x["porcentaje_carga"]))
+            peso = self._calcular_peso_asignacion(radicacion)
+            asignaciones.append({
+                "radicacion_id": radicacion["_id"],
+                "auditor_asignado": auditor_seleccionado["username"],
+                "tipo_auditoria": tipo,
+                "peso_asignacion": peso
+            })
+            auditor_seleccionado["carga_temporal"] = auditor_seleccionado.get(
+                "carga_temporal", auditor_seleccionado["porcentaje_carga"]
+            ) + peso
+
+        return asignaciones
+
+    def _actualizar_carga_temporal(self, auditores, asignaciones):
+        for auditor in auditores:
+            carga_adicional = sum(
+                asig["peso_asignacion"] for asig in asignaciones
+                if asig["auditor_asignado"] == auditor["username"]
+            )
+            auditor["carga_temporal"] = auditor["porcentaje_carga"] + carga_adicional
+
+
+def generar_carga_sintetica(total_radicaciones: int, total_auditores: int, semilla: int):
+    """Auditores y radicaciones clasificadas con la forma que produce el servicio"""
+    aleatorio = random.Random(semilla)
+
+    auditores = []
+    for i in range(total_auditores):
+        capacidad = aleatorio.choice([10, 15, 20])
+        asignadas = aleatorio.randint(0, capacidad)
+        auditores.append({
+            "username": f"auditor.{i:04d}",
+            "perfil": "MEDICO" if i % 3 == 0 else "ADMINISTRATIVO",
+            "capacidad_maxima_dia": capacidad,
+            "porcentaje_carga": (asignadas / capacidad) * 100
+        })
+    auditores.sort(key=lambda x: x["porcentaje_carga"])
+
+    clasificacion = {"AMBULATORIO": [], "HOSPITALARIO": []}
+    for i in range(total_radicaciones):
+        tipo = "HOSPITALARIO" if aleatorio.random() < 0.3 else "AMBULATORIO"
+        clasificacion[tipo].append({
+            "_id": i,
+            "numero_radicado": f"RAD-{i:06d}",
+            "prioridad": aleatorio.choice(["ALTA", "MEDIA", "BAJA"]),
+            "complejidad": aleatorio.choice(["ALTA", "MEDIA", "BAJA"]),
+            "fecha_limite_auditoria": None,
+            "valor_factura": aleatorio.randint(50000, 5000000),
+            "estadisticas_transaccion": {"total_servicios": aleatorio.randint(1, 80)}
+        })
+
+    return clasificacion, auditores
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de la distribución equitativa de radicaciones entre auditores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--radicaciones', type=int, default=10000, help='Radicaciones sintéticas')
+        parser.add_argument('--auditores', type=int, default=200, help='Auditores sintéticos')
+        parser.add_argument('--semilla', type=int, default=2284, help='Semilla de la carga sintética')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones por algoritmo (se reporta la mejor)')
+        parser.add_argument(
+            '--sin-referencia',
+            action='store_true',
+            help='No ejecutar ni comparar la distribución lineal anterior',
+        )
+
+    def handle(self, *args, **options):
+        clasificacion, auditores = generar_carga_sintetica(
+            options['radicaciones'], options['auditores'], options['semilla']
+        )
+        self.stdout.write(
+            f"Carga sintética: {options['radicaciones']} radicaciones x {options['auditores']} auditores "
+            f"(semilla {options['semilla']})"
+        )
+
+        # Sin __init__: el algoritmo no usa la conexión a MongoDB
+        servicio = AsignacionService.__new__(AsignacionService)
+        tiempo, propuesta = self._medir(servicio, clasificacion, auditores, options['repeticiones'])
+        self.stdout.write(self.style.SUCCESS(f'Cola de prioridad: {tiempo * 1000:.1f} ms'))
+
+        if options['sin_referencia']:
+            return
+
+        referencia = AsignacionServiceLineal.__new__(AsignacionServiceLineal)
+        tiempo_lineal, propuesta_lineal = self._medir(referencia, clasificacion, auditores, options['repeticiones'])
+        self.stdout.write(f'Selección lineal: {tiempo_lineal * 1000:.1f} ms')
+        self.stdout.write(f'Aceleración: {tiempo_lineal / tiempo:.1f}x')
+
+        if self._resumen(propuesta) == self._resumen(propuesta_lineal):
+            self.stdout.write(self.style.SUCCESS('Propuestas idénticas'))
+        else:
+            self.stdout.write(self.style.ERROR('Las propuestas difieren'))
+
+    def _medir(self, servicio, clasificacion, auditores, repeticiones):
+        mejor, propuesta = None, None
+        for _ in range(max(1, repeticiones)):
+            # El algoritmo ordena y anota las entradas: cada ejecución parte de una copia
+            entrada = copy.deepcopy((clasificacion, auditores))
+            inicio = time.perf_counter()
+            propuesta = servicio._ejecutar_algoritmo_distribucion(*entrada)
+            transcurrido = time.perf_counter() - inicio
+            mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        return mejor, propuesta
+
+    def _resumen(self, propuesta):
+        return [
+            (asig["radicacion_id"], asig["auditor_asignado"], asig["tipo_auditoria"], asig["peso_asignacion"])
+            for asig in propuesta
+        ]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Comando para comparar las estrategias de distribución de pre-glosas
+(greedy vs. transporte de costo mínimo) sobre la misma carga sintética
+"""
+
+import copy
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.radicacion.engine_asignacion import (
+    EngineAsignacionEquitativa, ESPECIALIZACIONES_GLOSAS, ESTRATEGIA_GREEDY, ESTRATEGIA_OPTIMA
+)
+
+CATEGORIAS_GLOSA = ['FA', 'TA', 'SO', 'AU', 'CO', 'CL', 'SA']
+
+
+class Command(BaseCommand):
+    help = 'Compara la distribución greedy y la óptima por lotes de pre-glosas sobre una carga sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pre-glosas', type=int, default=5000, help='Pre-glosas sintéticas')
+        parser.add_argument('--auditores', type=int, default=100, help='Auditores sintéticos')
+        parser.add_argument('--semilla', type=int, default=2284, help='Semilla de la carga sintética')
+
+    def handle(self, *args, **options):
+        pre_glosas, auditores, cargas = self._generar_carga(
+            options['pre_glosas'], options['auditores'], options['semilla']
+        )
+        self.stdout.write(
+            f"Carga sintética: {options['pre_glosas']} pre-glosas x {options['auditores']} auditores "
+            f"(semilla {options['semilla']})"
+        )
+        self.stdout.write(
+            f"{'Estrategia':<12}{'Tiempo ms':>12}{'Puntuación':>14}{'Especializ.':>13}"
+            f"{'Carga mín':>11}{'Carga máx':>11}{'Desv. est.':>12}"
+        )
+
+        for estrategia in (ESTRATEGIA_GREEDY, ESTRATEGIA_OPTIMA):
+            engine = EngineAsignacionEquitativa(estrategia=estrategia)
+            cargas_estrategia = copy.deepcopy(cargas)
+
+            inicio = time.perf_counter()
+            if estrategia == ESTRATEGIA_OPTIMA:
+                distribuciones = engine._distribuir_optimo(pre_glosas, auditores, cargas_estrategia)
+            else:
+                distribuciones = engine._distribuir_equitativamente(pre_glosas, auditores, cargas_estrategia)
+            transcurrido = time.perf_counter() - inicio
+
+            self._reportar(engine, estrategia, transcurrido, distribuciones, auditores, cargas, cargas_estrategia)
+
+    def _generar_carga(self, total_pre_glosas, total_auditores, semilla):
+        aleatorio = random.Random(semilla)
+        especialidades = list(ESPECIALIZACIONES_GLOSAS)
+
+        auditores, cargas = [], {}
+        for i in range(total_auditores):
+            username = f'auditor.{i:04d}'
+            auditor = {
+                'username': username,
+                'especialidad': aleatorio.choice(especialidades),
+                'experiencia_años': aleatorio.randint(1, 15),
+                'disponible': True
+            }
+            promedio_diario = aleatorio.uniform(0.5, 12)
+            auditores.append(auditor)
+            cargas[username] = {
+                'carga_actual': {
+                    'pre_glosas_pendientes': aleatorio.randint(0, 30),
+                    'valor_pendiente': Decimal('0.00'),
+                },
+                'rendimiento_reciente': {'promedio_diario': promedio_diario},
+                'capacidad_estimada': EngineAsignacionEquitativa()._estimar_capacidad_auditor(
+                    auditor, {'promedio_diario': promedio_diario}
+                ),
+                'disponible': True
+            }
+
+        pre_glosas = [
+            {
+                'id': str(i),
+                'categoria_glosa': aleatorio.choice(CATEGORIAS_GLOSA),
+                'prioridad_revision': aleatorio.choice(['ALTA', 'MEDIA', 'BAJA']),
+                'complejidad': aleatorio.randint(1, 10),
+                'valor_glosado_sugerido': Decimal(aleatorio.randint(10000, 3000000))
+            }
+            for i in range(total_pre_glosas)
+        ]
+        return pre_glosas, auditores, cargas
+
+    def _reportar(self, engine, estrategia, transcurrido, distribuciones, auditores, cargas_iniciales, cargas_finales):
+        por_username = {a['username']: a for a in auditores}
+        puntuacion = 0.0
+        especializadas = 0
+        total = 0
+        for username, asignadas in distribuciones.items():
+            carga = cargas_iniciales[username]
+            factor_rendimiento = min(10, carga['rendimiento_reciente']['promedio_diario'])
+            factor_capacidad = max(1, 10 - carga['capacidad_estimada']['utilizacion_actual'] * 10)
+            for pre_glosa in asignadas:
+                factor_especializacion = engine._calcular_factor_especializacion(por_username[username], pre_glosa)
+                puntuacion += factor_especializacion * 0.3 + factor_rendimiento * 0.2 + factor_capacidad * 0.1
+                especializadas += factor_especializacion > 5.0
+                total += 1
+
+        pendientes = [c['carga_actual']['pre_glosas_pendientes'] for c in cargas_finales.values()]
+        self.stdout.write(
+            f"{estrategia:<12}{transcurrido * 1000:>12.1f}{puntuacion:>14.1f}"
+            f"{(especializadas / total if total else 0):>13.1%}"
+            f"{min(pendientes):>11}{max(pendientes):>11}{statistics.pstdev(pendientes):>12.2f}"
+        )
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Barrido periódico de asignaciones de auditoría vencidas
+Programable desde cron o Celery beat (call_command('reasignar_pre_glosas_vencidas'))
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.radicacion.engine_asignacion import (
+    EngineAsignacionEquitativa, LIMITE_REASIGNACION_POR_EJECUCION
+)
+
+
+class Command(BaseCommand):
+    help = 'Marca como VENCIDA las asignaciones fuera de plazo y reasigna sus pre-glosas en lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=LIMITE_REASIGNACION_POR_EJECUCION,
+            help='Máximo de asignaciones vencidas por ejecución (0 = sin límite)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Calcular la redistribución sin escribir cambios',
+        )
+        parser.add_argument('--usuario', default='sistema', help='Usuario registrado en la trazabilidad')
+
+    def handle(self, *args, **options):
+        resultado = EngineAsignacionEquitativa().reasignar_pre_glosas_vencidas(
+            limite=options['limite'],
+            simular=options['simular'],
+            usuario=options['usuario'],
+        )
+
+        self.stdout.write(f"Asignaciones vencidas: {resultado['asignaciones_vencidas']}")
+        if not resultado['asignaciones_vencidas']:
+            self.stdout.write(self.style.SUCCESS(f"✅ {resultado['mensaje']}"))
+            return
+
+        for auditor_username, resumen in sorted(resultado['auditores_asignados'].items()):
+            self.stdout.write(
+                f"   {auditor_username} ({resumen['perfil']}): "
+                f"{resumen['total_pre_glosas']} pre-glosas, ${resumen['valor_total']:,.0f}"
+            )
+        if resultado['pre_glosas_sin_auditor']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {resultado['pre_glosas_sin_auditor']} pre-glosas sin auditor disponible"
+            ))
+
+        if resultado['simulacion']:
+            self.stdout.write(self.style.WARNING(f"{resultado['mensaje']} (sin cambios: --simular)"))
+        else:
+            self.stdout.write(f"Eventos de trazabilidad: {resultado['eventos_trazabilidad']}")
+            self.stdout.write(self.style.SUCCESS(f"✅ {resultado['mensaje']}"))
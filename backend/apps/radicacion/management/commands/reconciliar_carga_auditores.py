@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# apps/radicacion/management/commands/reconciliar_carga_auditores.py
+
+"""
+Reconciliación de los contadores de carga por auditor (carga_auditores)
+Los reconstruye desde asignaciones_auditoria y reporta la deriva encontrada
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.services.carga_auditores import get_contadores_carga
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de carga por auditor y reporta la deriva'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-reportar',
+            action='store_true',
+            help='Reportar la deriva sin corregir los contadores',
+        )
+
+    def handle(self, *args, **options):
+        aplicar = not options['solo_reportar']
+        reporte = get_contadores_carga().reconciliar(aplicar=aplicar)
+
+        self.stdout.write(f"Auditores revisados: {reporte['auditores_revisados']}")
+        if not reporte['derivas']:
+            self.stdout.write(self.style.SUCCESS('✅ Contadores de carga sin deriva'))
+            return
+
+        for deriva in reporte['derivas']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {deriva['auditor_username']}"))
+            for campo, valores in deriva['diferencias'].items():
+                self.stdout.write(
+                    f"   {campo}: contador {valores['actual']} → real {valores['esperado']}"
+                )
+
+        if aplicar:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {reporte['auditores_con_deriva']} auditores con deriva corregidos"
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{reporte['auditores_con_deriva']} auditores con deriva (sin corregir: --solo-reportar)"
+            ))
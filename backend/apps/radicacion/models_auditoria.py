@@ -380,6 +380,7 @@ class AsignacionAuditoria(models.Model):
             models.Index(fields=['auditor_username']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_limite_auditoria']),
+            models.Index(fields=['estado', 'fecha_limite_auditoria']),  # Barrido de vencidas
         ]
 
     def __str__(self):
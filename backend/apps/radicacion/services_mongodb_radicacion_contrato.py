@@ -8,7 +8,10 @@ NoSQL puro sin Django ORM
 from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, date
+import base64
+import json
 from decimal import Decimal
 from typing import Dict, List, Optional, Any, Tuple
 import logging
@@ -18,6 +21,16 @@ from apps.contratacion.services_mongodb_cups import servicio_cups_contractual
 
 logger = logging.getLogger('neuraudit.radicacion')
 
+# Paginación por llave del listado de radicaciones
+PAGE_SIZE_MAXIMO = 100
+LIMITE_CONTEO_ESTIMADO = 10000  # Con filtros, el total estimado se acota a este valor
+MODOS_TOTAL = ('estimado', 'exacto', 'ninguno')
+
+
+class CursorRadicacionesInvalido(ValueError):
+    """El token de continuación del listado de radicaciones no es válido"""
+    pass
+
 
 class RadicacionContratoNoSQL:
     """
@@ -52,6 +65,14 @@ class RadicacionContratoNoSQL:
                 ("contrato_id", ASCENDING)
             ], name="idx_estado_contrato")
             
+            # Listado paginado por llave (fecha_radicacion desc, _id desc), con filtro opcional
+            for prefijo, nombre in (([], "idx_listado"),
+                                    ([("prestador_nit", ASCENDING)], "idx_listado_prestador"),
+                                    ([("estado", ASCENDING)], "idx_listado_estado")):
+                self.radicaciones.create_index(
+                    prefijo + [("fecha_radicacion", DESCENDING), ("_id", DESCENDING)], name=nombre
+                )
+            
             logger.info("✅ Índices MongoDB creados para radicaciones con contratos")
         except Exception as e:
             logger.warning(f"⚠️ Error creando índices: {str(e)}")
@@ -300,27 +321,34 @@ class RadicacionContratoNoSQL:
                 'error': str(e)
             }
     
-    def listar_radicaciones(self, filtros: Dict = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+    def listar_radicaciones(self, filtros: Dict = None, page_size: int = 10,
+                            cursor: Optional[str] = None, total: str = 'estimado') -> Dict[str, Any]:
         """
-        Listar radicaciones con paginación desde MongoDB
+        Listar radicaciones paginadas por llave (fecha_radicacion desc, _id desc)
+        
+        - cursor: token opaco 'siguiente' de la página anterior (None = primera página)
+        - total: 'estimado' (solo en la primera página; con filtros se acota a
+          LIMITE_CONTEO_ESTIMADO), 'exacto' (count_documents) o 'ninguno'
         """
+        if filtros is None:
+            filtros = {}
+        page_size = max(1, min(int(page_size), PAGE_SIZE_MAXIMO))
+        
+        # Un cursor inválido es error del cliente: se valida fuera del try
+        consulta = {'$and': [filtros, self._filtro_despues_de(cursor)]} if cursor else filtros
+        
         try:
-            if filtros is None:
-                filtros = {}
-            
-            # Calcular skip para paginación
-            skip = (page - 1) * page_size
-            
-            # Obtener total de documentos
-            total = self.radicaciones.count_documents(filtros)
-            
-            # Obtener radicaciones paginadas
+            # Se pide uno extra para saber si hay página siguiente
             radicaciones = list(
-                self.radicaciones.find(filtros)
-                .sort('fecha_radicacion', DESCENDING)
-                .skip(skip)
-                .limit(page_size)
+                self.radicaciones.find(consulta)
+                .sort([('fecha_radicacion', DESCENDING), ('_id', DESCENDING)])
+                .limit(page_size + 1)
             )
+            hay_mas = len(radicaciones) > page_size
+            radicaciones = radicaciones[:page_size]
+            siguiente = self._codificar_cursor(radicaciones[-1]) if hay_mas else None
+            
+            conteo, conteo_exacto = self._contar_radicaciones(filtros, total, primera_pagina=not cursor)
             
             # Formatear resultados
             results = []
@@ -330,7 +358,7 @@ class RadicacionContratoNoSQL:
                 del rad['_id']
                 
                 # Formatear fechas
-                if 'fecha_radicacion' in rad:
+                if rad.get('fecha_radicacion'):
                     rad['fecha_radicacion'] = rad['fecha_radicacion'].isoformat()
                 if 'fecha_expedicion' in rad and rad['fecha_expedicion']:
                     if hasattr(rad['fecha_expedicion'], 'isoformat'):
@@ -344,8 +372,9 @@ class RadicacionContratoNoSQL:
             
             return {
                 'results': results,
-                'total': total,
-                'page': page,
+                'total': conteo,
+                'total_exacto': conteo_exacto,
+                'siguiente': siguiente,
                 'page_size': page_size
             }
             
@@ -354,10 +383,49 @@ class RadicacionContratoNoSQL:
             return {
                 'results': [],
                 'total': 0,
-                'page': page,
+                'total_exacto': False,
+                'siguiente': None,
                 'page_size': page_size
             }
     
+    def _contar_radicaciones(self, filtros: Dict, modo: str, primera_pagina: bool) -> Tuple[Optional[int], bool]:
+        """Total del listado según el modo pedido: (total, es_exacto)"""
+        if modo == 'exacto':
+            return self.radicaciones.count_documents(filtros), True
+        if modo != 'estimado' or not primera_pagina:
+            return None, False
+        if not filtros:
+            # Metadatos de la colección: no recorre documentos
+            return self.radicaciones.estimated_document_count(), False
+        conteo = self.radicaciones.count_documents(filtros, limit=LIMITE_CONTEO_ESTIMADO)
+        return conteo, conteo < LIMITE_CONTEO_ESTIMADO
+    
+    def _codificar_cursor(self, radicacion: Dict) -> str:
+        fecha = radicacion.get('fecha_radicacion')
+        contenido = json.dumps({
+            'f': fecha.isoformat() if fecha else None,
+            'i': str(radicacion['_id'])
+        })
+        return base64.urlsafe_b64encode(contenido.encode()).decode()
+    
+    def _filtro_despues_de(self, cursor: str) -> Dict:
+        """Radicaciones posteriores al cursor en el orden (fecha_radicacion desc, _id desc)"""
+        try:
+            contenido = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            ultimo_id = ObjectId(contenido['i'])
+            fecha = datetime.fromisoformat(contenido['f']) if contenido['f'] else None
+        except (ValueError, KeyError, TypeError, InvalidId) as e:
+            raise CursorRadicacionesInvalido(f"Cursor inválido: {str(e)}")
+        
+        if fecha is None:
+            # Sin fecha: solo quedan las radicaciones sin fecha con _id menor
+            return {'fecha_radicacion': None, '_id': {'$lt': ultimo_id}}
+        return {'$or': [
+            {'fecha_radicacion': {'$lt': fecha}},
+            {'fecha_radicacion': fecha, '_id': {'$lt': ultimo_id}},
+            {'fecha_radicacion': None}
+        ]}
+    
     def obtener_estadisticas_radicaciones(self) -> Dict[str, Any]:
         """
         Obtener estadísticas consolidadas de radicaciones desde MongoDB
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+# apps/radicacion/services_servicios_rips.py
+
+"""
+Servicios RIPS de una factura aplanados en MongoDB - NeurAudit Colombia
+
+La transacción RIPS embebe usuarios -> servicios -> {consultas, procedimientos, ...}.
+En lugar de cargar la transacción completa y recorrerla en Python, el pipeline
+desenrolla usuarios y servicios con $unwind, proyecta solo los campos que usa
+la vista de auditoría y filtra por tipo, documento del usuario o código en el
+servidor. El resultado se pagina ($facet) o se recorre como cursor (NDJSON).
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from bson import Decimal128
+from bson.codec_options import CodecOptions
+from django.conf import settings
+import logging
+
+from apps.core.mongodb_config import get_mongodb
+
+logger = logging.getLogger(__name__)
+
+# Tipo de servicio -> arreglo embebido en usuarios.servicios
+TIPOS_SERVICIO_RIPS = {
+    'CONSULTA': 'consultas',
+    'PROCEDIMIENTO': 'procedimientos',
+    'MEDICAMENTO': 'medicamentos',
+    'URGENCIA': 'urgencias',
+    'HOSPITALIZACION': 'hospitalizacion',
+    'RECIEN_NACIDO': 'recienNacidos',
+    'OTRO_SERVICIO': 'otrosServicios'
+}
+
+# Clave de cada tipo en 'estadisticas' de la respuesta
+CLAVES_ESTADISTICAS = {
+    'CONSULTA': 'consultas',
+    'PROCEDIMIENTO': 'procedimientos',
+    'MEDICAMENTO': 'medicamentos',
+    'URGENCIA': 'urgencias',
+    'HOSPITALIZACION': 'hospitalizaciones',
+    'RECIEN_NACIDO': 'recien_nacidos',
+    'OTRO_SERVICIO': 'otros_servicios'
+}
+
+# Campo con el código del servicio (los demás tipos usan el nombre del tipo como código)
+CAMPOS_CODIGO = {
+    'CONSULTA': 'codConsulta',
+    'PROCEDIMIENTO': 'codProcedimiento',
+    'MEDICAMENTO': 'codTecnologiaSalud',
+    'OTRO_SERVICIO': 'codTecnologiaSalud'
+}
+
+# Campos proyectados por tipo (los que usa formatear_servicio)
+CAMPOS_POR_TIPO = {
+    'CONSULTA': [
+        'id', 'codConsulta', 'vrServicio', 'fechaAtencion', 'diagnosticoPrincipal',
+        'numAutorizacion', 'finalidadTecnologiaSalud', 'modalidadGrupoServicioTecSal'
+    ],
+    'PROCEDIMIENTO': [
+        'id', 'codProcedimiento', 'vrServicio', 'fechaAtencion', 'diagnosticoPrincipal',
+        'numAutorizacion', 'viaIngresoServicioSalud', 'modalidadGrupoServicioTecSal'
+    ],
+    'MEDICAMENTO': [
+        'id', 'codTecnologiaSalud', 'nomTecnologiaSalud', 'cantidadSuministrada', 'vrServicio',
+        'valorUnitarioTecnologia', 'fechaAtencion', 'tipoUnidadMedida', 'numAutorizacion'
+    ],
+    'URGENCIA': [
+        'id', 'vrServicio', 'fechaAtencion', 'diagnosticoPrincipal', 'causaExterna',
+        'destinoSalidaServicioSalud', 'estadoSalidaServicioSalud'
+    ],
+    'HOSPITALIZACION': [
+        'id', 'vrServicio', 'fechaIngresoServicioSalud', 'fechaEgresoServicioSalud',
+        'diagnosticoPrincipalIngreso', 'diagnosticoPrincipalEgreso', 'viaIngresoServicioSalud',
+        'causaExterna', 'complicacion'
+    ],
+    'RECIEN_NACIDO': [
+        'id', 'fechaNacimiento', 'edadGestacional', 'peso', 'sexo', 'diagnosticoPrincipal',
+        'condicionDestinoUsuarioEgreso', 'numDocumentoIdentificacion', 'tipoDocumentoIdentificacion',
+        'numDocumentoIdentificacionMadre', 'tipoDocumentoIdentificacionMadre'
+    ],
+    'OTRO_SERVICIO': [
+        'id', 'codTecnologiaSalud', 'nomTecnologiaSalud', 'cantidadSuministrada',
+        'valorTotalTecnologia', 'valorUnitarioTecnologia', 'fechaAtencion', 'tipoUnidadMedida',
+        'numAutorizacion'
+    ]
+}
+
+PAGE_SIZE_SERVICIOS = 100
+PAGE_SIZE_SERVICIOS_MAXIMO = 1000
+
+
+class ServiciosRIPSAgregados:
+    """Consulta paginada o en streaming de los servicios RIPS de una factura"""
+
+    def __init__(self, db=None):
+        db = db if db is not None else get_mongodb().db
+        # Fechas con zona horaria como las entrega el ORM (USE_TZ)
+        self.transacciones = db.rips_transacciones.with_options(
+            codec_options=CodecOptions(tz_aware=getattr(settings, 'USE_TZ', False))
+        )
+
+    def existe_transaccion(self, num_factura: str, prestador_nit: str) -> bool:
+        return self.transacciones.find_one(
+            {'numFactura': num_factura, 'prestadorNit': prestador_nit}, {'_id': 1}
+        ) is not None
+
+    def pipeline(self, num_factura: str, prestador_nit: str, tipos: Optional[List[str]] = None,
+                 usuario_documento: Optional[str] = None, codigo: Optional[str] = None) -> List[Dict]:
+        """Un documento por servicio: {'usuario': {...}, 'servicio': {'tipo', 'datos'}}"""
+        tipos = [tipo for tipo in TIPOS_SERVICIO_RIPS if not tipos or tipo in tipos]
+
+        pipeline = [
+            {'$match': {'numFactura': num_factura, 'prestadorNit': prestador_nit}},
+            {'$limit': 1},
+            {'$project': {'_id': 0, 'usuarios': 1}},
+            {'$unwind': '$usuarios'}
+        ]
+        if usuario_documento:
+            # Poda por usuario antes de desenrollar servicios (el recién nacido tiene su propio documento)
+            pipeline.append({'$match': {'$or': [
+                {'usuarios.numeroDocumento': usuario_documento},
+                {'usuarios.servicios.recienNacidos.numDocumentoIdentificacion': usuario_documento}
+            ]}})
+
+        pipeline += [
+            {'$project': {
+                'usuario': {
+                    'tipoDocumento': '$usuarios.tipoDocumento',
+                    'numeroDocumento': '$usuarios.numeroDocumento',
+                    'datosPersonales': '$usuarios.datosPersonales',
+                    'validacionBDUA': '$usuarios.validacionBDUA'
+                },
+                'servicio': {'$concatArrays': [
+                    {'$map': {
+                        'input': {'$ifNull': [f'$usuarios.servicios.{TIPOS_SERVICIO_RIPS[tipo]}', []]},
+                        'as': 's',
+                        'in': {
+                            'tipo': tipo,
+                            'datos': {campo: f'$$s.{campo}' for campo in CAMPOS_POR_TIPO[tipo]}
+                        }
+                    }}
+                    for tipo in tipos
+                ]}
+            }},
+            {'$unwind': '$servicio'}
+        ]
+
+        if usuario_documento:
+            pipeline.append({'$match': {'$or': [
+                {'servicio.tipo': {'$ne': 'RECIEN_NACIDO'}, 'usuario.numeroDocumento': usuario_documento},
+                {'servicio.tipo': 'RECIEN_NACIDO', 'servicio.datos.numDocumentoIdentificacion': usuario_documento}
+            ]}})
+        if codigo:
+            condiciones = [
+                {'servicio.tipo': tipo, f'servicio.datos.{CAMPOS_CODIGO[tipo]}': codigo}
+                if tipo in CAMPOS_CODIGO else {'servicio.tipo': tipo}
+                for tipo in tipos if tipo in CAMPOS_CODIGO or tipo == codigo
+            ]
+            pipeline.append({'$match': {'$or': condiciones} if condiciones else {'servicio.tipo': None}})
+
+        return pipeline
+
+    def pagina(self, num_factura: str, prestador_nit: str, pagina: int = 1,
+               page_size: int = PAGE_SIZE_SERVICIOS, **filtros) -> Dict[str, Any]:
+        """Página de servicios agrupada por tipo, con conteos por tipo de todo el filtro"""
+        page_size = max(1, min(int(page_size), PAGE_SIZE_SERVICIOS_MAXIMO))
+        pagina = max(1, int(pagina))
+
+        pipeline = self.pipeline(num_factura, prestador_nit, **filtros) + [
+            {'$facet': {
+                'conteos': [{'$group': {'_id': '$servicio.tipo', 'total': {'$sum': 1}}}],
+                'servicios': [{'$skip': (pagina - 1) * page_size}, {'$limit': page_size}]
+            }}
+        ]
+        resultado = next(self.transacciones.aggregate(pipeline, allowDiskUse=True), None) or {}
+
+        conteos = {grupo['_id']: grupo['total'] for grupo in resultado.get('conteos', [])}
+        servicios_por_tipo = {tipo: [] for tipo in TIPOS_SERVICIO_RIPS}
+        for documento in resultado.get('servicios', []):
+            servicio = formatear_servicio(documento)
+            servicios_por_tipo[servicio['tipo_servicio']].append(servicio)
+
+        total = sum(conteos.values())
+        return {
+            'total_servicios': total,
+            'servicios_por_tipo': servicios_por_tipo,
+            'estadisticas': {
+                clave: conteos.get(tipo, 0) for tipo, clave in CLAVES_ESTADISTICAS.items()
+            },
+            'pagina': pagina,
+            'page_size': page_size,
+            'total_paginas': (total + page_size - 1) // page_size,
+            'hay_mas': pagina * page_size < total
+        }
+
+    def iterar(self, num_factura: str, prestador_nit: str, **filtros) -> Iterator[Dict]:
+        """Todos los servicios del filtro, formateados uno a uno desde el cursor"""
+        cursor = self.transacciones.aggregate(
+            self.pipeline(num_factura, prestador_nit, **filtros), allowDiskUse=True, batchSize=1000
+        )
+        for documento in cursor:
+            yield formatear_servicio(documento)
+
+
+# =====================================
+# FORMATO (misma forma que la vista de auditoría)
+# =====================================
+
+def _numero(valor: Any) -> float:
+    if isinstance(valor, Decimal128):
+        valor = valor.to_decimal()
+    return float(valor) if valor else 0
+
+
+def _fecha(valor: Any, solo_fecha: bool = False) -> Optional[str]:
+    if not valor:
+        return None
+    if solo_fecha and isinstance(valor, datetime):
+        valor = valor.date()
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else str(valor)
+
+
+def _usuario_completo(usuario: Dict) -> Dict:
+    """Datos del usuario que se agregan al detalle de cada servicio"""
+    usuario_data = {
+        'usuario_documento': usuario.get('numeroDocumento'),
+        'tipo_documento': usuario.get('tipoDocumento')
+    }
+
+    datos = usuario.get('datosPersonales') or {}
+    if datos.get('fechaNacimiento'):
+        usuario_data['fecha_nacimiento'] = _fecha(datos['fechaNacimiento'], solo_fecha=True)
+    for campo, clave in (('sexo', 'sexo'), ('municipioResidencia', 'municipio_residencia'),
+                         ('zonaResidencia', 'zona_residencia')):
+        if datos.get(campo):
+            usuario_data[clave] = datos[campo]
+
+    bdua = usuario.get('validacionBDUA') or {}
+    if bdua.get('regimen'):
+        usuario_data['regimen'] = bdua['regimen']
+    if bdua.get('epsActual'):
+        usuario_data['eps_actual'] = bdua['epsActual']
+    if 'tieneDerechos' in bdua:
+        usuario_data['tiene_derechos'] = bdua['tieneDerechos']
+
+    return usuario_data
+
+
+def formatear_servicio(documento: Dict) -> Dict:
+    """Servicio con la forma de servicios_por_tipo (detalle_json incluye los datos del usuario)"""
+    tipo = documento['servicio']['tipo']
+    s = documento['servicio'].get('datos') or {}
+    usuario = _usuario_completo(documento.get('usuario') or {})
+
+    servicio = {
+        'id': str(s['id']) if s.get('id') is not None else None,
+        'tipo_servicio': tipo,
+    }
+
+    if tipo == 'CONSULTA':
+        detalle_json = {
+            'fecha_atencion': _fecha(s.get('fechaAtencion')),
+            'diagnostico_principal': s.get('diagnosticoPrincipal'),
+            'autorizacion': s.get('numAutorizacion'),
+            'finalidad': s.get('finalidadTecnologiaSalud'),
+            'modalidad': s.get('modalidadGrupoServicioTecSal')
+        }
+        valor = _numero(s.get('vrServicio'))
+        servicio.update({
+            'codConsulta': s.get('codConsulta'),
+            'codigo': s.get('codConsulta'),
+            'descripcion': f"Consulta {s.get('codConsulta')}",
+            'vrServicio': valor, 'valor_unitario': valor, 'valor_total': valor
+        })
+
+    elif tipo == 'PROCEDIMIENTO':
+        detalle_json = {
+            'fecha_atencion': _fecha(s.get('fechaAtencion')),
+            'diagnostico_principal': s.get('diagnosticoPrincipal'),
+            'autorizacion': s.get('numAutorizacion'),
+            'via_ingreso': s.get('viaIngresoServicioSalud'),
+            'modalidad': s.get('modalidadGrupoServicioTecSal')
+        }
+        valor = _numero(s.get('vrServicio'))
+        servicio.update({
+            'codProcedimiento': s.get('codProcedimiento'),
+            'codigo': s.get('codProcedimiento'),
+            'descripcion': f"Procedimiento {s.get('codProcedimiento')}",
+            'vrServicio': valor, 'valor_unitario': valor, 'valor_total': valor
+        })
+
+    elif tipo in ('MEDICAMENTO', 'OTRO_SERVICIO'):
+        detalle_json = {
+            'fecha_atencion': _fecha(s.get('fechaAtencion')),
+            'tipo_unidad': s.get('tipoUnidadMedida'),
+            'autorizacion': s.get('numAutorizacion')
+        }
+        codigo = s.get('codTecnologiaSalud')
+        cantidad = _numero(s.get('cantidadSuministrada'))
+        valor = _numero(s.get('vrServicio' if tipo == 'MEDICAMENTO' else 'valorTotalTecnologia'))
+        etiqueta = 'Medicamento' if tipo == 'MEDICAMENTO' else 'Servicio'
+        servicio.update({
+            'codTecnologiaSalud': codigo,
+            'codigo': codigo,
+            'descripcion': s.get('nomTecnologiaSalud') or f'{etiqueta} {codigo}',
+            'nomTecnologiaSalud': s.get('nomTecnologiaSalud'),
+            'cantidad': int(cantidad) if cantidad else 1,
+            'vrServicio': valor,
+            'valor_unitario': _numero(s.get('valorUnitarioTecnologia')),
+            'valor_total': valor
+        })
+
+    elif tipo == 'URGENCIA':
+        detalle_json = {
+            'fecha_atencion': _fecha(s.get('fechaAtencion')),
+            'diagnostico_principal': s.get('diagnosticoPrincipal'),
+            'causa_externa': s.get('causaExterna'),
+            'destino_salida': s.get('destinoSalidaServicioSalud'),
+            'estado_salida': s.get('estadoSalidaServicioSalud')
+        }
+        valor = _numero(s.get('vrServicio'))
+        servicio.update({
+            'codigo': 'URGENCIA',
+            'descripcion': 'Atención de Urgencias',
+            'vrServicio': valor, 'valor_unitario': valor, 'valor_total': valor
+        })
+
+    elif tipo == 'HOSPITALIZACION':
+        detalle_json = {
+            'fecha_inicio': _fecha(s.get('fechaIngresoServicioSalud')),
+            'fecha_fin': _fecha(s.get('fechaEgresoServicioSalud')),
+            'diagnostico_principal': s.get('diagnosticoPrincipalIngreso'),
+            'diagnostico_egreso': s.get('diagnosticoPrincipalEgreso'),
+            'via_ingreso': s.get('viaIngresoServicioSalud'),
+            'causa_externa': s.get('causaExterna'),
+            'complicacion': s.get('complicacion')
+        }
+        valor = _numero(s.get('vrServicio'))
+        servicio.update({
+            'codigo': 'HOSPITALIZACION',
+            'descripcion': 'Hospitalización',
+            'vrServicio': valor, 'valor_unitario': valor, 'valor_total': valor
+        })
+
+    else:  # RECIEN_NACIDO
+        detalle_json = {
+            'fecha_nacimiento': _fecha(s.get('fechaNacimiento')),
+            'edad_gestacional': s.get('edadGestacional'),
+            'peso': _numero(s.get('peso')),
+            'sexo': s.get('sexo'),
+            'diagnostico_principal': s.get('diagnosticoPrincipal', 'N/A'),
+            'destino_egreso': s.get('condicionDestinoUsuarioEgreso', 'N/A'),
+            # Documento del recién nacido y de la madre
+            'usuario_documento': s.get('numDocumentoIdentificacion'),
+            'tipo_documento': s.get('tipoDocumentoIdentificacion'),
+            'documento_madre': s.get('numDocumentoIdentificacionMadre'),
+            'tipo_documento_madre': s.get('tipoDocumentoIdentificacionMadre')
+        }
+        # Datos de la madre (usuario de la transacción)
+        detalle_json.update({f'madre_{clave}': valor for clave, valor in usuario.items()})
+        usuario = {}
+        servicio.update({
+            'codigo': 'RECIEN_NACIDO',
+            'descripcion': 'Atención Recién Nacido',
+            'vrServicio': 0,  # Los recién nacidos pueden no tener valor explícito
+            'valor_unitario': 0,
+            'valor_total': 0
+        })
+
+    detalle_json.update(usuario)
+    servicio.update({
+        'tiene_glosa': False,
+        'glosas_aplicadas': [],
+        'detalle_json': detalle_json
+    })
+    return servicio
@@ -32,6 +32,8 @@ from .mongodb_soporte_service import get_soporte_service
 from .storage_service import StorageService
 from .soporte_classifier import SoporteClassifier
 from .renderers import MongoJSONRenderer
+from .services_servicios_rips import ServiciosRIPSAgregados, TIPOS_SERVICIO_RIPS, PAGE_SIZE_SERVICIOS
+from apps.core.exportacion import respuesta_exportacion, solicita_gzip
 from apps.authentication.models import User
 from apps.catalogs.models import Prestadores, BDUAAfiliados
 
@@ -1278,293 +1280,63 @@ class RadicacionCuentaMedicaViewSet(viewsets.ModelViewSet):
         """
         Obtiene los servicios RIPS de una radicación organizados por tipo
         para mostrar en la vista de auditoría
+        
+        MongoDB desenrolla y filtra los servicios embebidos; la respuesta se pagina.
+        
+        Query params:
+        - tipo: CONSULTA, PROCEDIMIENTO, MEDICAMENTO, ... (varios separados por coma)
+        - usuario_documento: Documento del usuario (o del recién nacido)
+        - codigo: Código CUPS / CUM del servicio
+        - page, page_size: Paginación (default 1 y 100, máximo 1000)
+        - formato=ndjson: Todos los servicios del filtro en streaming, uno por línea
         """
         try:
             radicacion = self.get_object()
+            servicios_rips = ServiciosRIPSAgregados()
             
-            # Buscar la transacción RIPS
-            from .models_rips_oficial import RIPSTransaccionOficial as RIPSTransaccion
-            
-            rips_transaccion = RIPSTransaccion.objects.filter(
-                numFactura=radicacion.factura_numero,
-                prestadorNit=radicacion.pss_nit
-            ).first()
+            tipos = [
+                tipo.strip().upper()
+                for tipo in request.query_params.get('tipo', '').split(',') if tipo.strip()
+            ]
+            tipos_invalidos = [tipo for tipo in tipos if tipo not in TIPOS_SERVICIO_RIPS]
+            if tipos_invalidos:
+                return Response({
+                    'error': f"Tipo de servicio no válido: {', '.join(tipos_invalidos)}. "
+                             f"Opciones: {', '.join(TIPOS_SERVICIO_RIPS)}",
+                    'servicios_por_tipo': {}
+                }, status=status.HTTP_400_BAD_REQUEST)
+            filtros = {
+                'tipos': tipos or None,
+                'usuario_documento': request.query_params.get('usuario_documento') or None,
+                'codigo': request.query_params.get('codigo') or None
+            }
             
-            if not rips_transaccion:
+            if not servicios_rips.existe_transaccion(radicacion.factura_numero, radicacion.pss_nit):
                 return Response({
                     'error': 'No se encontraron servicios RIPS para esta factura',
                     'servicios_por_tipo': {}
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Organizar servicios por tipo
-            servicios_por_tipo = {
-                'CONSULTA': [],
-                'PROCEDIMIENTO': [],
-                'MEDICAMENTO': [],
-                'URGENCIA': [],
-                'HOSPITALIZACION': [],
-                'RECIEN_NACIDO': [],
-                'OTRO_SERVICIO': []
-            }
-            
-            # Función helper para extraer todos los datos del usuario
-            def get_usuario_completo(usuario):
-                """Extrae todos los datos disponibles del usuario"""
-                usuario_data = {
-                    'usuario_documento': usuario.numeroDocumento,
-                    'tipo_documento': usuario.tipoDocumento
-                }
-                
-                # Agregar datos personales si existen
-                if usuario.datosPersonales:
-                    datos = usuario.datosPersonales
-                    if hasattr(datos, 'fechaNacimiento') and datos.fechaNacimiento:
-                        usuario_data['fecha_nacimiento'] = datos.fechaNacimiento.isoformat() if hasattr(datos.fechaNacimiento, 'isoformat') else str(datos.fechaNacimiento)
-                    if hasattr(datos, 'sexo') and datos.sexo:
-                        usuario_data['sexo'] = datos.sexo
-                    if hasattr(datos, 'municipioResidencia') and datos.municipioResidencia:
-                        usuario_data['municipio_residencia'] = datos.municipioResidencia
-                    if hasattr(datos, 'zonaResidencia') and datos.zonaResidencia:
-                        usuario_data['zona_residencia'] = datos.zonaResidencia
-                
-                # Agregar validación BDUA si existe
-                if usuario.validacionBDUA:
-                    bdua = usuario.validacionBDUA
-                    if hasattr(bdua, 'regimen') and bdua.regimen:
-                        usuario_data['regimen'] = bdua.regimen
-                    if hasattr(bdua, 'epsActual') and bdua.epsActual:
-                        usuario_data['eps_actual'] = bdua.epsActual
-                    if hasattr(bdua, 'tieneDerechos'):
-                        usuario_data['tiene_derechos'] = bdua.tieneDerechos
-                
-                return usuario_data
+            if request.query_params.get('formato') == 'ndjson':
+                return respuesta_exportacion(
+                    'ndjson', f'servicios_rips_{radicacion.factura_numero}', [],
+                    documentos=servicios_rips.iterar(
+                        radicacion.factura_numero, radicacion.pss_nit, **filtros
+                    ),
+                    comprimir=solicita_gzip(request)
+                )
             
-            # Procesar usuarios y sus servicios embebidos
-            if rips_transaccion.usuarios:
-                for usuario in rips_transaccion.usuarios:
-                    # Obtener datos completos del usuario una sola vez
-                    usuario_completo = get_usuario_completo(usuario)
-                    
-                    if usuario.servicios:
-                        # Procesar consultas
-                        if usuario.servicios.consultas:
-                            for consulta in usuario.servicios.consultas:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_atencion': consulta.fechaAtencion.isoformat() if consulta.fechaAtencion else None,
-                                    'diagnostico_principal': consulta.diagnosticoPrincipal,
-                                    'autorizacion': consulta.numAutorizacion,
-                                    'finalidad': consulta.finalidadTecnologiaSalud,
-                                    'modalidad': consulta.modalidadGrupoServicioTecSal
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['CONSULTA'].append({
-                                    'id': str(consulta.id) if hasattr(consulta, 'id') else None,
-                                    'tipo_servicio': 'CONSULTA',
-                                    'codConsulta': consulta.codConsulta,
-                                    'codigo': consulta.codConsulta,
-                                    'descripcion': f'Consulta {consulta.codConsulta}',
-                                    'vrServicio': float(consulta.vrServicio) if consulta.vrServicio else 0,
-                                    'valor_unitario': float(consulta.vrServicio) if consulta.vrServicio else 0,
-                                    'valor_total': float(consulta.vrServicio) if consulta.vrServicio else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar procedimientos
-                        if usuario.servicios.procedimientos:
-                            for proc in usuario.servicios.procedimientos:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_atencion': proc.fechaAtencion.isoformat() if proc.fechaAtencion else None,
-                                    'diagnostico_principal': proc.diagnosticoPrincipal,
-                                    'autorizacion': proc.numAutorizacion,
-                                    'via_ingreso': proc.viaIngresoServicioSalud,
-                                    'modalidad': proc.modalidadGrupoServicioTecSal
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['PROCEDIMIENTO'].append({
-                                    'id': str(proc.id) if hasattr(proc, 'id') else None,
-                                    'tipo_servicio': 'PROCEDIMIENTO',
-                                    'codProcedimiento': proc.codProcedimiento,
-                                    'codigo': proc.codProcedimiento,
-                                    'descripcion': f'Procedimiento {proc.codProcedimiento}',
-                                    'vrServicio': float(proc.vrServicio) if proc.vrServicio else 0,
-                                    'valor_unitario': float(proc.vrServicio) if proc.vrServicio else 0,
-                                    'valor_total': float(proc.vrServicio) if proc.vrServicio else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar medicamentos
-                        if usuario.servicios.medicamentos:
-                            for med in usuario.servicios.medicamentos:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_atencion': med.fechaAtencion.isoformat() if med.fechaAtencion else None,
-                                    'tipo_unidad': med.tipoUnidadMedida,
-                                    'autorizacion': med.numAutorizacion
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['MEDICAMENTO'].append({
-                                    'id': str(med.id) if hasattr(med, 'id') else None,
-                                    'tipo_servicio': 'MEDICAMENTO',
-                                    'codTecnologiaSalud': med.codTecnologiaSalud,
-                                    'codigo': med.codTecnologiaSalud,
-                                    'descripcion': med.nomTecnologiaSalud or f'Medicamento {med.codTecnologiaSalud}',
-                                    'nomTecnologiaSalud': med.nomTecnologiaSalud,
-                                    'cantidad': int(med.cantidadSuministrada) if med.cantidadSuministrada else 1,
-                                    'vrServicio': float(med.vrServicio) if med.vrServicio else 0,
-                                    'valor_unitario': float(med.valorUnitarioTecnologia) if med.valorUnitarioTecnologia else 0,
-                                    'valor_total': float(med.vrServicio) if med.vrServicio else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar urgencias
-                        if usuario.servicios.urgencias:
-                            for urgencia in usuario.servicios.urgencias:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_atencion': urgencia.fechaAtencion.isoformat() if urgencia.fechaAtencion else None,
-                                    'diagnostico_principal': urgencia.diagnosticoPrincipal,
-                                    'causa_externa': urgencia.causaExterna,
-                                    'destino_salida': urgencia.destinoSalidaServicioSalud,
-                                    'estado_salida': urgencia.estadoSalidaServicioSalud
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['URGENCIA'].append({
-                                    'id': str(urgencia.id) if hasattr(urgencia, 'id') else None,
-                                    'tipo_servicio': 'URGENCIA',
-                                    'codigo': 'URGENCIA',
-                                    'descripcion': 'Atención de Urgencias',
-                                    'vrServicio': float(urgencia.vrServicio) if urgencia.vrServicio else 0,
-                                    'valor_unitario': float(urgencia.vrServicio) if urgencia.vrServicio else 0,
-                                    'valor_total': float(urgencia.vrServicio) if urgencia.vrServicio else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar hospitalizaciones
-                        if usuario.servicios.hospitalizacion:
-                            for hosp in usuario.servicios.hospitalizacion:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_inicio': hosp.fechaIngresoServicioSalud.isoformat() if hosp.fechaIngresoServicioSalud else None,
-                                    'fecha_fin': hosp.fechaEgresoServicioSalud.isoformat() if hosp.fechaEgresoServicioSalud else None,
-                                    'diagnostico_principal': hosp.diagnosticoPrincipalIngreso,
-                                    'diagnostico_egreso': hosp.diagnosticoPrincipalEgreso,
-                                    'via_ingreso': hosp.viaIngresoServicioSalud,
-                                    'causa_externa': hosp.causaExterna,
-                                    'complicacion': hosp.complicacion
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['HOSPITALIZACION'].append({
-                                    'id': str(hosp.id) if hasattr(hosp, 'id') else None,
-                                    'tipo_servicio': 'HOSPITALIZACION',
-                                    'codigo': 'HOSPITALIZACION',
-                                    'descripcion': 'Hospitalización',
-                                    'vrServicio': float(hosp.vrServicio) if hosp.vrServicio else 0,
-                                    'valor_unitario': float(hosp.vrServicio) if hosp.vrServicio else 0,
-                                    'valor_total': float(hosp.vrServicio) if hosp.vrServicio else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar recién nacidos
-                        if usuario.servicios.recienNacidos:
-                            for rn in usuario.servicios.recienNacidos:
-                                # Crear detalle_json con datos del servicio
-                                detalle_json = {
-                                    'fecha_nacimiento': rn.fechaNacimiento.isoformat() if rn.fechaNacimiento else None,
-                                    'edad_gestacional': rn.edadGestacional,
-                                    'peso': float(rn.peso) if rn.peso else 0,
-                                    'sexo': rn.sexo,
-                                    'diagnostico_principal': getattr(rn, 'diagnosticoPrincipal', 'N/A'),
-                                    'destino_egreso': getattr(rn, 'condicionDestinoUsuarioEgreso', 'N/A'),
-                                    # Para recién nacidos, incluir tanto el documento del RN como de la madre
-                                    'usuario_documento': rn.numDocumentoIdentificacion,
-                                    'tipo_documento': rn.tipoDocumentoIdentificacion,
-                                    'documento_madre': rn.numDocumentoIdentificacionMadre,
-                                    'tipo_documento_madre': rn.tipoDocumentoIdentificacionMadre
-                                }
-                                # Agregar datos de la madre (usuario actual)
-                                for key, value in usuario_completo.items():
-                                    detalle_json[f'madre_{key}'] = value
-                                
-                                servicios_por_tipo['RECIEN_NACIDO'].append({
-                                    'id': str(rn.id) if hasattr(rn, 'id') else None,
-                                    'tipo_servicio': 'RECIEN_NACIDO',
-                                    'codigo': 'RECIEN_NACIDO',
-                                    'descripcion': 'Atención Recién Nacido',
-                                    'vrServicio': 0,  # Los recién nacidos pueden no tener valor explícito
-                                    'valor_unitario': 0,
-                                    'valor_total': 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-                        
-                        # Procesar otros servicios
-                        if usuario.servicios.otrosServicios:
-                            for otro in usuario.servicios.otrosServicios:
-                                # Crear detalle_json con datos del servicio y del usuario
-                                detalle_json = {
-                                    'fecha_atencion': otro.fechaAtencion.isoformat() if otro.fechaAtencion else None,
-                                    'tipo_unidad': otro.tipoUnidadMedida,
-                                    'autorizacion': otro.numAutorizacion
-                                }
-                                # Agregar todos los datos del usuario
-                                detalle_json.update(usuario_completo)
-                                
-                                servicios_por_tipo['OTRO_SERVICIO'].append({
-                                    'id': str(otro.id) if hasattr(otro, 'id') else None,
-                                    'tipo_servicio': 'OTRO_SERVICIO',
-                                    'codTecnologiaSalud': otro.codTecnologiaSalud,
-                                    'codigo': otro.codTecnologiaSalud,
-                                    'descripcion': otro.nomTecnologiaSalud or f'Servicio {otro.codTecnologiaSalud}',
-                                    'nomTecnologiaSalud': otro.nomTecnologiaSalud,
-                                    'cantidad': int(otro.cantidadSuministrada) if otro.cantidadSuministrada else 1,
-                                    'vrServicio': float(otro.valorTotalTecnologia) if otro.valorTotalTecnologia else 0,
-                                    'valor_unitario': float(otro.valorUnitarioTecnologia) if otro.valorUnitarioTecnologia else 0,
-                                    'valor_total': float(otro.valorTotalTecnologia) if otro.valorTotalTecnologia else 0,
-                                    'tiene_glosa': False,
-                                    'glosas_aplicadas': [],
-                                    'detalle_json': detalle_json
-                                })
-            
-            # Calcular totales
-            total_servicios = sum(len(servicios) for servicios in servicios_por_tipo.values())
+            pagina = servicios_rips.pagina(
+                radicacion.factura_numero, radicacion.pss_nit,
+                pagina=int(request.query_params.get('page', 1)),
+                page_size=int(request.query_params.get('page_size', PAGE_SIZE_SERVICIOS)),
+                **filtros
+            )
             
             return Response({
                 'radicacion_id': str(radicacion.id),
                 'numero_factura': radicacion.factura_numero,
-                'total_servicios': total_servicios,
-                'servicios_por_tipo': servicios_por_tipo,
-                'estadisticas': {
-                    'consultas': len(servicios_por_tipo['CONSULTA']),
-                    'procedimientos': len(servicios_por_tipo['PROCEDIMIENTO']),
-                    'medicamentos': len(servicios_por_tipo['MEDICAMENTO']),
-                    'urgencias': len(servicios_por_tipo['URGENCIA']),
-                    'hospitalizaciones': len(servicios_por_tipo['HOSPITALIZACION']),
-                    'recien_nacidos': len(servicios_por_tipo['RECIEN_NACIDO']),
-                    'otros_servicios': len(servicios_por_tipo['OTRO_SERVICIO'])
-                }
+                **pagina
             })
             
         except Exception as e:
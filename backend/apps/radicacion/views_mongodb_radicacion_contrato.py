@@ -13,7 +13,9 @@ from django.utils import timezone
 from datetime import datetime
 import logging
 
-from .services_mongodb_radicacion_contrato import radicacion_contrato_service
+from .services_mongodb_radicacion_contrato import (
+    radicacion_contrato_service, CursorRadicacionesInvalido, MODOS_TOTAL
+)
 
 logger = logging.getLogger('neuraudit.radicacion')
 
@@ -65,12 +67,19 @@ class RadicacionesMongoDBListAPIView(APIView):
         - estado: Filtrar por estado
         - prestador_nit: Filtrar por prestador (si es PSS se aplica automáticamente)
         - fecha_desde, fecha_hasta: Rango de fechas
-        - page: Página (default: 1)
-        - page_size: Tamaño página (default: 10)
+        - cursor: Token 'cursor_siguiente' de la página anterior (sin cursor: primera página)
+        - page_size: Tamaño página (default: 10, máximo 100)
+        - total: estimado (default, solo primera página) | exacto | ninguno
         """
         try:
-            page = int(request.query_params.get('page', 1))
             page_size = int(request.query_params.get('page_size', 10))
+            cursor = request.query_params.get('cursor') or None
+            total = request.query_params.get('total', 'estimado')
+            if total not in MODOS_TOTAL:
+                return Response({
+                    'success': False,
+                    'error': f"total debe ser uno de: {', '.join(MODOS_TOTAL)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Construir filtros
             filtros = {}
@@ -111,19 +120,25 @@ class RadicacionesMongoDBListAPIView(APIView):
             # Obtener radicaciones desde MongoDB
             radicaciones_data = radicacion_contrato_service.listar_radicaciones(
                 filtros=filtros,
-                page=page,
-                page_size=page_size
+                page_size=page_size,
+                cursor=cursor,
+                total=total
             )
             
             return Response({
                 'success': True,
                 'results': radicaciones_data['results'],
                 'count': radicaciones_data['total'],
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (radicaciones_data['total'] + page_size - 1) // page_size
+                'count_exacto': radicaciones_data['total_exacto'],
+                'page_size': radicaciones_data['page_size'],
+                'cursor_siguiente': radicaciones_data['siguiente']
             })
             
+        except CursorRadicacionesInvalido as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error listando radicaciones MongoDB: {str(e)}")
             return Response({
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Días hábiles en Colombia para los plazos legales (Resolución 2284 de 2023)
+Hábiles: lunes a viernes que no sean festivos nacionales (Ley 51 de 1983)
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Union
+
+Fecha = Union[date, datetime]
+
+# Festivos de fecha fija
+FESTIVOS_FIJOS = [(1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25)]
+
+# Festivos que se trasladan al lunes siguiente (Ley Emiliani)
+FESTIVOS_TRASLADABLES = [(1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11)]
+
+
+def _domingo_de_pascua(anio: int) -> date:
+    """Algoritmo de Meeus/Jones/Butcher (calendario gregoriano)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def _lunes_siguiente(fecha: date) -> date:
+    return fecha + timedelta(days=(7 - fecha.weekday()) % 7)
+
+
+@lru_cache(maxsize=64)
+def festivos_colombia(anio: int) -> FrozenSet[date]:
+    """Festivos nacionales del año"""
+    pascua = _domingo_de_pascua(anio)
+    festivos = {date(anio, mes, dia) for mes, dia in FESTIVOS_FIJOS}
+    festivos.update(_lunes_siguiente(date(anio, mes, dia)) for mes, dia in FESTIVOS_TRASLADABLES)
+    festivos.update([
+        pascua - timedelta(days=3),  # Jueves Santo
+        pascua - timedelta(days=2),  # Viernes Santo
+        pascua + timedelta(days=43),  # Ascensión del Señor (lunes)
+        pascua + timedelta(days=64),  # Corpus Christi (lunes)
+        pascua + timedelta(days=71),  # Sagrado Corazón (lunes)
+    ])
+    return frozenset(festivos)
+
+
+def _dia(fecha: Fecha) -> date:
+    return fecha.date() if isinstance(fecha, datetime) else fecha
+
+
+def es_dia_habil(fecha: Fecha) -> bool:
+    dia = _dia(fecha)
+    return dia.weekday() < 5 and dia not in festivos_colombia(dia.year)
+
+
+def sumar_dias_habiles(fecha: Fecha, dias: int) -> Fecha:
+    """
+    Fecha `dias` días hábiles después (antes si dias < 0) de `fecha`;
+    conserva la hora cuando se recibe un datetime
+    """
+    paso = timedelta(days=1 if dias >= 0 else -1)
+    restantes = abs(dias)
+    resultado = fecha
+    while restantes:
+        resultado += paso
+        if es_dia_habil(resultado):
+            restantes -= 1
+    return resultado
+
+
+def restar_dias_habiles(fecha: Fecha, dias: int) -> Fecha:
+    return sumar_dias_habiles(fecha, -dias)
+
+
+def dias_habiles_entre(inicio: Fecha, fin: Fecha) -> int:
+    """Días hábiles en [inicio, fin) contados por fecha calendario"""
+    dia, final = _dia(inicio), _dia(fin)
+    total = 0
+    while dia < final:
+        if es_dia_habil(dia):
+            total += 1
+        dia += timedelta(days=1)
+    return total
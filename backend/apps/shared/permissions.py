@@ -8,6 +8,16 @@ from rest_framework import permissions
 from typing import Any
 
 
+# Conjuntos de roles precalculados (pertenencia O(1))
+ROLES_AUDITOR_MEDICO = frozenset({'AUDITOR_MEDICO', 'COORDINADOR_AUDITORIA', 'ADMINISTRADOR'})
+ROLES_AUDITOR_ADMINISTRATIVO = frozenset({'AUDITOR_ADMINISTRATIVO', 'COORDINADOR_AUDITORIA', 'ADMINISTRADOR'})
+ROLES_CONCILIADOR = frozenset({'CONCILIADOR', 'ADMINISTRADOR'})
+ROLES_COORDINADOR = frozenset({'COORDINADOR_AUDITORIA', 'ADMINISTRADOR'})
+ROLES_CONTABILIDAD = frozenset({'CONTABILIDAD', 'ADMINISTRADOR'})
+ROLES_AUDITORES = frozenset({'AUDITOR_MEDICO', 'AUDITOR_ADMINISTRATIVO'})
+ROLES_APLICAR_GLOSA = ROLES_AUDITORES | ROLES_COORDINADOR
+
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     Permite edición solo al propietario del objeto
@@ -53,7 +63,7 @@ class IsAuditorMedico(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['AUDITOR_MEDICO', 'COORDINADOR_AUDITORIA', 'ADMINISTRADOR']
+            request.user.rol in ROLES_AUDITOR_MEDICO
         )
 
 
@@ -65,7 +75,7 @@ class IsAuditorAdministrativo(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['AUDITOR_ADMINISTRATIVO', 'COORDINADOR_AUDITORIA', 'ADMINISTRADOR']
+            request.user.rol in ROLES_AUDITOR_ADMINISTRATIVO
         )
 
 
@@ -77,7 +87,7 @@ class IsConciliador(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['CONCILIADOR', 'ADMINISTRADOR']
+            request.user.rol in ROLES_CONCILIADOR
         )
 
 
@@ -89,7 +99,7 @@ class IsCoordinadorAuditoria(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['COORDINADOR_AUDITORIA', 'ADMINISTRADOR']
+            request.user.rol in ROLES_COORDINADOR
         )
 
 
@@ -101,7 +111,7 @@ class IsContabilidad(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['CONTABILIDAD', 'ADMINISTRADOR']
+            request.user.rol in ROLES_CONTABILIDAD
         )
 
 
@@ -148,22 +158,17 @@ class CanApplyGlosa(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in [
-                'AUDITOR_MEDICO',
-                'AUDITOR_ADMINISTRATIVO',
-                'COORDINADOR_AUDITORIA',
-                'ADMINISTRADOR'
-            ]
+            request.user.rol in ROLES_APLICAR_GLOSA
         )
     
     def has_object_permission(self, request, view, obj):
         # Verificar que la factura esté asignada al auditor
-        if request.user.rol in ['AUDITOR_MEDICO', 'AUDITOR_ADMINISTRATIVO']:
+        if request.user.rol in ROLES_AUDITORES:
             # TODO: Verificar asignación
             return True
         
         # Coordinadores y administradores pueden aplicar a cualquier factura
-        return request.user.rol in ['COORDINADOR_AUDITORIA', 'ADMINISTRADOR']
+        return request.user.rol in ROLES_COORDINADOR
 
 
 class CanRatifyGlosa(permissions.BasePermission):
@@ -175,7 +180,7 @@ class CanRatifyGlosa(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['CONCILIADOR', 'ADMINISTRADOR']
+            request.user.rol in ROLES_CONCILIADOR
         )
 
 
@@ -187,7 +192,7 @@ class CanAuthorizePayment(permissions.BasePermission):
         return (
             request.user.is_authenticated and
             hasattr(request.user, 'rol') and
-            request.user.rol in ['CONTABILIDAD', 'ADMINISTRADOR']
+            request.user.rol in ROLES_CONTABILIDAD
         )
 
 
@@ -227,4 +232,4 @@ class DynamicPermission(permissions.BasePermission):
         return (
             hasattr(request.user, 'rol') and
             request.user.rol in allowed_roles
-        )
\ No newline at end of file
+        )
@@ -7,9 +7,11 @@ Cumplimiento Resolución 2284 de 2023
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict
 
+from .dias_habiles import dias_habiles_entre
+
 # Validadores de identificación colombiana
 nit_validator = RegexValidator(
     regex=r'^\d{9}-\d$',
@@ -59,14 +61,8 @@ def validar_fecha_radicacion(fecha_factura: datetime, fecha_radicacion: datetime
     Valida que la radicación esté dentro de los 22 días hábiles
     según Resolución 2284 de 2023
     """
-    # Calcular días hábiles (aproximado, sin festivos)
-    dias_transcurridos = 0
-    fecha_actual = fecha_factura
-    
-    while fecha_actual < fecha_radicacion:
-        if fecha_actual.weekday() < 5:  # Lunes a Viernes
-            dias_transcurridos += 1
-        fecha_actual += timedelta(days=1)
+    # Días hábiles: lunes a viernes sin festivos nacionales
+    dias_transcurridos = dias_habiles_entre(fecha_factura, fecha_radicacion)
     
     if dias_transcurridos > 22:
         raise ValidationError(
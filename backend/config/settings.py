@@ -356,6 +356,30 @@ NEURAUDIT_SETTINGS = {
     'AUTO_ASSIGNMENT_ENABLED': True,  # Asignación automática equitativa
     'NOTIFICATION_ENABLED': True,  # Notificaciones automáticas
     'AUDIT_LOG_ENABLED': True,  # Auditoría detallada
+    'AUTH_CACHE_TTL_SEGUNDOS': 30,  # Caché de sesiones/usuarios/perfiles en autenticación (0 = desactivada)
+    'AUTH_CACHE_MAX_ENTRADAS': 10000,
+    # Contadores de rate limiting y bloqueos compartidos entre workers (sin URL: memoria del proceso)
+    'CONTADORES_SEGURIDAD_URL': os.getenv('SECURITY_REDIS_URL', ''),
+    # Audit trail de requests: cola en memoria con escritura por lotes (colección auditoria_requests)
+    'AUDITORIA_COLA_MAXIMA': 10000,
+    'AUDITORIA_LOTE': 500,
+    'AUDITORIA_INTERVALO_SEGUNDOS': 2,
+    'AUDITORIA_RETENCION_DIAS': 30,
+    # Firmas adicionales del middleware de seguridad (se suman a las incorporadas)
+    'SEGURIDAD_PATRONES_SOSPECHOSOS': [],
+    'SEGURIDAD_AGENTES_SOSPECHOSOS': [],
+    'SEGURIDAD_RUTAS_CRITICAS': [],
+    # Hashing bcrypt en ejecutor acotado (los hashes con otro costo se rehashean al login)
+    'BCRYPT_ROUNDS': 12,
+    'HASHING_HILOS': max(1, (os.cpu_count() or 2) // 2),
+    'HASHING_COLA_MAXIMA': 32,
+    'HASHING_ESPERA_MAXIMA_SEGUNDOS': 5,
+    'PASSWORD_HISTORIAL_VERIFICAR': 3,
+    # JWT sin estado: sin consulta a sesiones; revocaciones (tokens_revocados) sincronizadas cada N segundos
+    'AUTH_JWT_SIN_ESTADO': os.getenv('AUTH_JWT_SIN_ESTADO', 'False').lower() == 'true',
+    'AUTH_REVOCACIONES_SYNC_SEGUNDOS': 5,
+    # Distribución de pre-glosas: OPTIMA (costo mínimo por lotes, greedy como respaldo) o GREEDY
+    'ASIGNACION_ESTRATEGIA': 'OPTIMA',
 }
 
 # Logging configuration
@@ -110,6 +110,13 @@ def main():
     for script, descripcion in importaciones:
         ejecutar_importacion(script, descripcion)
     
+    # Claves de búsqueda por prefijo (autocompletar indexado)
+    print(f"\n{'='*80}")
+    print("🔎 Indexando claves de búsqueda de catálogos")
+    print(f"{'='*80}")
+    from django.core.management import call_command
+    call_command('indexar_busqueda_catalogos', catalogo='todos')
+    
     # Mostrar resumen final
     fin = datetime.now()
     duracion = fin - inicio
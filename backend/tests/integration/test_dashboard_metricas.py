@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las métricas del dashboard (apps/dashboard/services_metricas.py)
+Carga fixtures conocidos en una base MongoDB temporal y verifica las series
+mensuales de glosado / conciliado y la efectividad de los auditores
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from bson import Decimal128, ObjectId
+from django.conf import settings
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from apps.dashboard.services_metricas import MetricasDashboard
+
+BASE_PRUEBAS = 'neuraudit_test_metricas_dashboard'
+
+SERVICIO_1 = ObjectId()
+SERVICIO_2 = ObjectId()
+SERVICIO_SIN_FACTURAR = ObjectId()
+
+AUDITOR_MEDICO = {'user_id': 'u1', 'username': 'ana', 'nombre_completo': 'Dra. Ana Gómez', 'rol': 'AUDITOR_MEDICO'}
+AUDITOR_ADMIN = {'user_id': 'u2', 'username': 'juan', 'nombre_completo': 'Juan Pérez', 'rol': 'AUDITOR_ADMINISTRATIVO'}
+
+
+def _fecha(anio, mes, dia):
+    return datetime(anio, mes, dia, 12, tzinfo=timezone.utc)
+
+
+def _glosa(auditor, servicio_id, valor_servicio, valor_glosado, fecha, nit='900'):
+    return {
+        'servicio_id': str(servicio_id),
+        'valor_servicio': Decimal128(Decimal(valor_servicio)),
+        'valor_glosado': Decimal128(Decimal(valor_glosado)),
+        'fecha_aplicacion': fecha,
+        'auditor_info': auditor,
+        'prestador_info': {'nit': nit},
+    }
+
+
+def _caso(ultima_actualizacion, ratificado, levantado, fecha_cierre=None, nit='900'):
+    return {
+        'fecha_ultima_actualizacion': ultima_actualizacion,
+        'fecha_cierre': fecha_cierre,
+        'resumen_financiero': {'valor_total_ratificado': ratificado, 'valor_total_levantado': levantado},
+        'prestador_info': {'nit': nit},
+    }
+
+
+def _serie(**valores):
+    meses = ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
+    return [valores.get(mes, 0) for mes in meses]
+
+
+class MetricasDashboardTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=2000)
+        try:
+            cls.client.admin.command('ping')
+        except PyMongoError as e:
+            raise unittest.SkipTest(f'MongoDB no disponible: {e}')
+
+        cls.client.drop_database(BASE_PRUEBAS)
+        cls.db = cls.client[BASE_PRUEBAS]
+
+        cls.db.auditoria_servicios.insert_many([
+            {'_id': SERVICIO_1, 'valor_total': Decimal128('1000.00')},
+            {'_id': SERVICIO_2, 'valor_total': Decimal128('500.00')},
+        ])
+        cls.db.auditoria_glosa_aplicada.insert_many([
+            # Dos glosas sobre el mismo servicio: el servicio cuenta una sola vez
+            _glosa(AUDITOR_MEDICO, SERVICIO_1, '1000', '200', _fecha(2025, 3, 10)),
+            _glosa(AUDITOR_MEDICO, SERVICIO_1, '1000', '100', _fecha(2025, 3, 20)),
+            # Servicio sin registro facturado: usa el valor copiado en la glosa
+            _glosa(AUDITOR_MEDICO, SERVICIO_SIN_FACTURAR, '800', '400', _fecha(2025, 5, 2), nit='800'),
+            # El valor del servicio facturado prevalece sobre el de la glosa
+            _glosa(AUDITOR_ADMIN, SERVICIO_2, '999', '50', _fecha(2025, 5, 15)),
+            # Fuera del año
+            _glosa(AUDITOR_ADMIN, SERVICIO_2, '500', '1000', _fecha(2024, 12, 31)),
+            # Sin auditor identificado: cuenta en la serie, no en el ranking
+            _glosa({}, SERVICIO_2, '500', '70', _fecha(2025, 6, 1)),
+        ])
+        cls.db.conciliacion_caso.insert_many([
+            _caso(_fecha(2025, 5, 2), 300.0, 100.0, fecha_cierre=_fecha(2025, 4, 30)),
+            _caso(_fecha(2025, 7, 10), 0.0, 50.0, nit='800'),
+            _caso(_fecha(2024, 11, 1), 999.0, 0.0),
+            # Cerrado en 2024 aunque se actualizó en 2025
+            _caso(_fecha(2025, 1, 5), 500.0, 0.0, fecha_cierre=_fecha(2024, 12, 20)),
+        ])
+        cls.metricas = MetricasDashboard(db=cls.db)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.drop_database(BASE_PRUEBAS)
+        cls.client.close()
+
+    def test_glosado_mensual(self):
+        self.assertEqual(self.metricas.glosado_mensual(2025), _serie(mar=300.0, may=450.0, jun=70.0))
+
+    def test_glosado_mensual_por_prestador(self):
+        self.assertEqual(self.metricas.glosado_mensual(2025, '900'), _serie(mar=300.0, may=50.0, jun=70.0))
+
+    def test_glosado_mensual_sin_datos(self):
+        self.assertEqual(self.metricas.glosado_mensual(2023), _serie())
+
+    def test_conciliado_mensual(self):
+        self.assertEqual(self.metricas.conciliado_mensual(2025), _serie(abr=400.0, jul=50.0))
+
+    def test_conciliado_mensual_por_prestador(self):
+        self.assertEqual(self.metricas.conciliado_mensual(2025, '900'), _serie(abr=400.0))
+
+    def test_efectividad_auditores(self):
+        auditores = self.metricas.efectividad_auditores(_fecha(2025, 1, 1), _fecha(2026, 1, 1))
+        self.assertEqual(auditores, [
+            {'nombre': 'Dra. Ana Gómez', 'tipo': 'AUDITOR_MEDICO', 'glosas': 3,
+             'valor_glosado': 700.0, 'efectividad': 38.9},  # 700 / (1000 + 800)
+            {'nombre': 'Juan Pérez', 'tipo': 'AUDITOR_ADMINISTRATIVO', 'glosas': 1,
+             'valor_glosado': 50.0, 'efectividad': 10.0},  # 50 / 500
+        ])
+
+    def test_efectividad_auditores_limite(self):
+        auditores = self.metricas.efectividad_auditores(_fecha(2025, 1, 1), _fecha(2026, 1, 1), limite=1)
+        self.assertEqual([auditor['nombre'] for auditor in auditores], ['Dra. Ana Gómez'])
+
+    def test_efectividad_auditores_sin_glosas(self):
+        self.assertEqual(self.metricas.efectividad_auditores(_fecha(2023, 1, 1), _fecha(2024, 1, 1)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la extracción de manuales tarifarios (apps/catalogs/extraccion_tarifarios.py)
+Tablas pequeñas con la estructura del texto de pdftotext de los manuales
+ISS 2001 y SOAT 2025; no requieren MongoDB ni los PDF originales
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from apps.catalogs.extraccion_tarifarios import (
+    escribir_columnar, extraer_manual, leer_columnar, limpiar_numero
+)
+
+PAGINAS_ISS = [
+    '\n'.join([
+        'CAPITULO I',
+        'LISTADO DE INTERVENCIONES',
+        '01101',
+        '010101',
+        'PUNCION CISTERNAL',
+        '5',
+        '01102',
+        '010102',
+    ]),
+    # El registro 01102 continúa en la página siguiente
+    '\n'.join([
+        'PUNCION VENTRICULAR',
+        '8',
+        'EXAMENES DE DIAGNOSTICO',
+        '190101',
+        '19101',
+        'HEMOGRAMA',
+        '$ 12.500',
+    ]),
+    '\n'.join([
+        'CONSULTA POR MEDICINA GENERAL',
+        '890201',
+        'CONSULTA DE PRIMERA VEZ POR MEDICINA GENERAL',
+        '8.800',
+        'LISTADO DE INTERVENCIONES',
+        # Duplicado del manual (mismo código y descripción): se descarta
+        '01101',
+        '010101',
+        'PUNCION CISTERNAL',
+        '5',
+    ]),
+]
+
+PAGINAS_SOAT = [
+    '\n'.join([
+        '5. CIRUGÍA GENERAL',
+        'TABLA 5.1',
+        'Procedimientos en piel y anexos',
+        'CÓDIGO DESCRIPCIÓN GRUPO QUIRURGICO',
+        'VALOR 2023 VALOR 2024 VALOR 2025',
+        '1101',
+        'DRENAJE DE ABSCESO DE PIEL',
+        '2',
+        '$ 100.000',
+        '$ 110.000',
+        '$ 120.000',
+    ]),
+    '\n'.join([
+        '',
+        '7. LABORATORIO CLÍNICO',
+        'TABLA 7.1',
+        'Pruebas de hematología',
+        'CÓDIGO DESCRIPCIÓN UVB VALOR',
+        'VALORES POR VIGENCIA',
+        '20101',
+        'HEMOGRAMA AUTOMATIZADO',
+        '3,25',
+        '$ 20.000',
+        '$ 21.000',
+        '$ 22.000',
+        '20102',
+        'HEMOGLOBINA GLICOSILADA',
+        '4,10',
+        '$ 30.000',
+        '$ 31.000',
+        '$ 32.000',
+    ]),
+    '\n'.join([
+        # La línea en blanco cierra la tabla anterior
+        '',
+        '46. TARIFAS DE ESTANCIA',
+        '38101',
+        'Habitación unipersonal',
+        '12,50',
+        '$ 500.000',
+        '$ 520.000',
+        '$ 540.000',
+    ]),
+]
+
+
+def _resumen(resultado):
+    return {
+        categoria: [(registro['codigo'], registro['descripcion']) for registro in registros]
+        for categoria, registros in resultado.items() if registros
+    }
+
+
+class LimpiarNumeroTest(unittest.TestCase):
+
+    def test_formatos(self):
+        self.assertEqual(limpiar_numero('$ 1.234.567,50'), 1234567.5)
+        self.assertEqual(limpiar_numero('12.500'), 12500.0)
+        self.assertEqual(limpiar_numero('3,25'), 3.25)
+        self.assertIsNone(limpiar_numero('PB'))
+        self.assertIsNone(limpiar_numero(''))
+
+
+class ExtraccionISSTest(unittest.TestCase):
+
+    def test_registros_por_categoria(self):
+        resultado = extraer_manual('iss', PAGINAS_ISS, procesos=1)
+        self.assertEqual(_resumen(resultado), {
+            'procedimientos_quirurgicos': [
+                ('010101', 'PUNCION CISTERNAL'), ('010102', 'PUNCION VENTRICULAR')
+            ],
+            'examenes_diagnosticos': [('19101', 'HEMOGRAMA')],
+            'consultas': [('890201', 'CONSULTA DE PRIMERA VEZ POR MEDICINA GENERAL')],
+        })
+
+    def test_valores(self):
+        resultado = extraer_manual('iss', PAGINAS_ISS, procesos=1)
+        quirurgicos = resultado['procedimientos_quirurgicos']
+        self.assertEqual(quirurgicos[0]['ref'], '01101')
+        self.assertEqual(quirurgicos[0]['uvr'], 5.0)
+        self.assertEqual(quirurgicos[1]['uvr'], 8.0)
+        self.assertEqual(resultado['examenes_diagnosticos'][0]['valor'], 12500)
+        self.assertEqual(resultado['consultas'][0]['valor'], 8800)
+
+    def test_rangos_de_una_pagina_equivalen_a_un_rango(self):
+        # El registro partido entre páginas se completa con la página siguiente
+        # y el contexto (sección) se hereda entre rangos
+        self.assertEqual(
+            extraer_manual('iss', PAGINAS_ISS, paginas_por_lote=1, procesos=1),
+            extraer_manual('iss', PAGINAS_ISS, paginas_por_lote=20, procesos=1)
+        )
+
+
+class ExtraccionSOATTest(unittest.TestCase):
+
+    def test_registros_por_categoria(self):
+        resultado = extraer_manual('soat', PAGINAS_SOAT, procesos=1)
+        self.assertEqual(_resumen(resultado), {
+            'procedimientos_quirurgicos': [('1101', 'DRENAJE DE ABSCESO DE PIEL')],
+            'laboratorio_clinico': [
+                ('20101', 'HEMOGRAMA AUTOMATIZADO'), ('20102', 'HEMOGLOBINA GLICOSILADA')
+            ],
+            'estancias': [('38101', 'Habitación unipersonal')],
+        })
+
+    def test_tabla_grupo_quirurgico(self):
+        registro = extraer_manual('soat', PAGINAS_SOAT, procesos=1)['procedimientos_quirurgicos'][0]
+        self.assertEqual(registro['estructura_tabla'], 'tipo_1_grupo_quirurgico')
+        self.assertEqual(registro['grupo_quirurgico'], 2)
+        self.assertEqual(registro['tabla_origen'], 'TABLA 5.1 - Procedimientos en piel y anexos')
+        self.assertEqual(registro['seccion'], '5. CIRUGÍA GENERAL')
+        self.assertEqual(
+            (registro['valor_2023_uvt'], registro['valor_2024_uvt'], registro['valor_2025_uvb']),
+            (100000.0, 110000.0, 120000.0)
+        )
+
+    def test_tabla_uvb_columna(self):
+        registro = extraer_manual('soat', PAGINAS_SOAT, procesos=1)['laboratorio_clinico'][0]
+        self.assertEqual(registro['estructura_tabla'], 'tipo_2_uvb_columna')
+        self.assertEqual(registro['uvb'], 3.25)
+        self.assertEqual(registro['valor_2025_uvb'], 22000.0)
+
+    def test_estancia(self):
+        registro = extraer_manual('soat', PAGINAS_SOAT, procesos=1)['estancias'][0]
+        self.assertEqual(registro['estructura_tabla'], 'estancia')
+        self.assertEqual(registro['uvb'], 12.5)
+        self.assertEqual(registro['seccion'], '46. TARIFAS DE ESTANCIA')
+        self.assertEqual(
+            (registro['valor_2023_uvt'], registro['valor_2024_uvt'], registro['valor_2025_uvb']),
+            (500000.0, 520000.0, 540000.0)
+        )
+
+    def test_rangos_de_una_pagina_equivalen_a_un_rango(self):
+        self.assertEqual(
+            extraer_manual('soat', PAGINAS_SOAT, paginas_por_lote=1, procesos=1),
+            extraer_manual('soat', PAGINAS_SOAT, paginas_por_lote=20, procesos=1)
+        )
+
+    def test_pool_de_procesos(self):
+        self.assertEqual(
+            extraer_manual('soat', PAGINAS_SOAT, paginas_por_lote=1, procesos=2),
+            extraer_manual('soat', PAGINAS_SOAT, procesos=1)
+        )
+
+
+class ArchivoColumnarTest(unittest.TestCase):
+
+    def test_csv_ida_y_vuelta(self):
+        resultado = extraer_manual('iss', PAGINAS_ISS, procesos=1)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'iss.csv')
+            self.assertEqual(escribir_columnar('iss', resultado, ruta, PAGINAS_ISS), 4)
+            leido = leer_columnar(ruta)
+
+        self.assertEqual(sorted(leido), ['consultas', 'examenes_diagnosticos', 'procedimientos_quirurgicos'])
+        quirurgicos = leido['procedimientos_quirurgicos']
+        self.assertEqual([fila['codigo'] for fila in quirurgicos], ['010101', '010102'])
+        # Página del inicio del registro (el segundo empieza en la página 1 y termina en la 2)
+        self.assertEqual([fila['pagina'] for fila in quirurgicos], ['1', '1'])
+        self.assertEqual(leido['consultas'][0]['pagina'], '3')
+        self.assertIsNone(leido['consultas'][0]['uvr'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -369,7 +369,7 @@ const AsignacionCoordinacion: React.FC<AsignacionCoordinacionProps> = () => {
                 <div className="kanban-tasks-type new">
                     <div className="pe-3 mb-3">
                         <div className="d-flex justify-content-between align-items-center">
-                            <span className="d-block fw-medium fs-15">Pendientes - {asignacionesKanban?.pendientes?.length || 0}</span>
+                            <span className="d-block fw-medium fs-15">Pendientes - {asignacionesKanban?.conteos?.pendientes ?? asignacionesKanban?.pendientes?.length ?? 0}</span>
                             <div>
                                 <Link aria-label="anchor" to="#!" onClick={() => handleShow("taskmodal")} className="btn btn-sm bg-white text-default border btn-wave">
                                     <i className="ri-add-line align-middle me-1 fw-medium"></i>Asignar
@@ -392,7 +392,7 @@ const AsignacionCoordinacion: React.FC<AsignacionCoordinacionProps> = () => {
                 <div className="kanban-tasks-type todo">
                     <div className="pe-3 mb-3">
                         <div className="d-flex justify-content-between align-items-center">
-                            <span className="d-block fw-medium fs-15">Asignadas - {asignacionesKanban?.asignadas?.length || 0}</span>
+                            <span className="d-block fw-medium fs-15">Asignadas - {asignacionesKanban?.conteos?.asignadas ?? asignacionesKanban?.asignadas?.length ?? 0}</span>
                             <div>
                                 <Link  aria-label="anchor" to="#!" onClick={() => handleShow("taskmodal")} className="btn btn-sm bg-white text-default border btn-wave">
                                     <i className="ri-add-line align-middle me-1 fw-medium"></i>Asignar
@@ -415,7 +415,7 @@ const AsignacionCoordinacion: React.FC<AsignacionCoordinacionProps> = () => {
                 <div className="kanban-tasks-type in-progress">
                     <div className="pe-3 mb-3">
                         <div className="d-flex justify-content-between align-items-center">
-                            <span className="d-block fw-medium fs-15">En Proceso - {asignacionesKanban?.en_proceso?.length || 0}</span>
+                            <span className="d-block fw-medium fs-15">En Proceso - {asignacionesKanban?.conteos?.en_proceso ?? asignacionesKanban?.en_proceso?.length ?? 0}</span>
                             <div>
                                 <Link  aria-label="anchor" to="#!" onClick={() => handleShow("taskmodal")} className="btn btn-sm bg-white text-default border btn-wave">
                                     <i className="ri-add-line align-middle me-1 fw-medium"></i>Asignar
@@ -465,7 +465,7 @@ const AsignacionCoordinacion: React.FC<AsignacionCoordinacionProps> = () => {
                 <div className="kanban-tasks-type completed">
                     <div className="pe-3 mb-3">
                         <div className="d-flex justify-content-between align-items-center">
-                            <span className="d-block fw-medium fs-15">Completadas - {asignacionesKanban?.completadas?.length || 0}</span>
+                            <span className="d-block fw-medium fs-15">Completadas - {asignacionesKanban?.conteos?.completadas ?? asignacionesKanban?.completadas?.length ?? 0}</span>
                             <div>
                                 <Link  aria-label="anchor" to="#!" onClick={() => handleShow("taskmodal")} className="btn btn-sm bg-white text-default border btn-wave">
                                     <i className="ri-add-line align-middle me-1 fw-medium"></i>Asignar
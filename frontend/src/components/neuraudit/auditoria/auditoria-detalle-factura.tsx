@@ -15,6 +15,9 @@ import { toast } from 'react-toastify';
 
 interface AuditoriaDetalleFacturaProps { }
 
+// Servicios RIPS por página (el endpoint pagina en MongoDB; formato=ndjson queda para exportaciones completas)
+const PAGE_SIZE_SERVICIOS = 200;
+
 const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
     const { facturaId } = useParams();
     const navigate = useNavigate();
@@ -22,6 +25,13 @@ const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
     const [factura, setFactura] = useState<any>(null);
     const [servicios, setServicios] = useState<any>({});
     const [usuarios, setUsuarios] = useState<string[]>([]);
+    const [paginacionServicios, setPaginacionServicios] = useState({
+        pagina: 1,
+        total_paginas: 1,
+        total_servicios: 0,
+        hay_mas: false
+    });
+    const [cargandoServicios, setCargandoServicios] = useState(false);
     const [showModalGlosa, setShowModalGlosa] = useState(false);
     const [servicioSeleccionado, setServicioSeleccionado] = useState<any>(null);
     const [glosasAplicadas, setGlosasAplicadas] = useState<{[key: string]: any[]}>({});
@@ -57,6 +67,13 @@ const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
         }
     }, [facturaId]);
 
+    // El tipo de servicio se filtra en el servidor: cambia el total de páginas
+    useEffect(() => {
+        if (facturaId) {
+            loadServicios(1);
+        }
+    }, [facturaId, filtros.tipoServicio]);
+
     const loadFacturaData = async () => {
         try {
             setLoading(true);
@@ -86,13 +103,43 @@ const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
             };
             setFactura(factura);
             
-            // Cargar servicios desde RIPS directamente
-            console.log('Cargando servicios desde RIPS...');
-            const serviciosResponse = await httpInterceptor.get(`/api/radicacion/${facturaId}/servicios-rips/`);
+        } catch (error: any) {
+            console.error('Error cargando datos:', error);
+            console.error('Detalles del error:', error.response?.data || error.message);
+            
+            // Si es un error 404, intentar mostrar algo de información
+            if (error.response?.status === 404) {
+                console.error('La radicación no fue encontrada');
+            }
+            
+            setFactura(null);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    // Cargar una página de servicios desde RIPS
+    const loadServicios = async (pagina: number) => {
+        try {
+            setCargandoServicios(true);
+            const params = new URLSearchParams({
+                page: String(pagina),
+                page_size: String(PAGE_SIZE_SERVICIOS)
+            });
+            if (filtros.tipoServicio) {
+                params.append('tipo', filtros.tipoServicio);
+            }
+            const serviciosResponse = await httpInterceptor.get(`/api/radicacion/${facturaId}/servicios-rips/?${params}`);
             console.log('Servicios RIPS recibidos:', serviciosResponse);
             
             if (serviciosResponse.servicios_por_tipo) {
                 setServicios(serviciosResponse.servicios_por_tipo);
+                setPaginacionServicios({
+                    pagina: serviciosResponse.pagina || pagina,
+                    total_paginas: serviciosResponse.total_paginas || 1,
+                    total_servicios: serviciosResponse.total_servicios || 0,
+                    hay_mas: Boolean(serviciosResponse.hay_mas)
+                });
                 
                 // Extraer usuarios únicos para el filtro
                 const usuariosUnicos = new Set<string>();
@@ -109,17 +156,9 @@ const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
             }
             
         } catch (error: any) {
-            console.error('Error cargando datos:', error);
-            console.error('Detalles del error:', error.response?.data || error.message);
-            
-            // Si es un error 404, intentar mostrar algo de información
-            if (error.response?.status === 404) {
-                console.error('La radicación no fue encontrada');
-            }
-            
-            setFactura(null);
+            console.error('Error cargando servicios RIPS:', error.response?.data || error.message);
         } finally {
-            setLoading(false);
+            setCargandoServicios(false);
         }
     };
 
@@ -1205,6 +1244,36 @@ const AuditoriaDetalleFactura: React.FC<AuditoriaDetalleFacturaProps> = () => {
                                 </Alert>
                             )}
                         </Card.Body>
+                        {paginacionServicios.total_paginas > 1 && (
+                            <Card.Footer className="d-flex justify-content-between align-items-center">
+                                <span className="text-muted fs-12">
+                                    Página {paginacionServicios.pagina} de {paginacionServicios.total_paginas}
+                                    {' '}· {paginacionServicios.total_servicios} servicios
+                                </span>
+                                <div className="btn-list">
+                                    <SpkButton
+                                        Buttonvariant="light"
+                                        Buttontype="button"
+                                        Customclass="btn btn-sm btn-light"
+                                        Disabled={cargandoServicios || paginacionServicios.pagina <= 1}
+                                        onClickfunc={() => loadServicios(paginacionServicios.pagina - 1)}
+                                    >
+                                        <i className="ri-arrow-left-s-line me-1"></i>
+                                        Anterior
+                                    </SpkButton>
+                                    <SpkButton
+                                        Buttonvariant="light"
+                                        Buttontype="button"
+                                        Customclass="btn btn-sm btn-light"
+                                        Disabled={cargandoServicios || !paginacionServicios.hay_mas}
+                                        onClickfunc={() => loadServicios(paginacionServicios.pagina + 1)}
+                                    >
+                                        Siguiente
+                                        <i className="ri-arrow-right-s-line ms-1"></i>
+                                    </SpkButton>
+                                </div>
+                            </Card.Footer>
+                        )}
                     </Card>
                 </Col>
             </Row>
@@ -62,6 +62,23 @@ export interface AsignacionIndividual {
   peso_asignacion: number;
 }
 
+export type ColumnaKanban = 'pendientes' | 'asignadas' | 'en_proceso' | 'completadas';
+
+export interface FiltrosKanban {
+  auditor?: string;
+  prestador_nit?: string;
+  limite?: number;
+}
+
+export interface TableroKanban {
+  pendientes: any[];
+  asignadas: any[];
+  en_proceso: any[];
+  completadas: any[];
+  conteos: Record<ColumnaKanban, number>;
+  cursores: Record<ColumnaKanban, string | null>;
+}
+
 export interface PropuestaAsignacion {
   id: string;
   fecha_propuesta: string;
@@ -295,16 +312,14 @@ class AsignacionService {
   // =====================================
 
   /**
-   * Obtiene asignaciones actuales para vista Kanban
+   * Obtiene la vista Kanban: conteo por columna, primera página de cada una
+   * y el cursor para cargar más (opcionalmente filtrada por auditor o prestador)
    */
-  async obtenerAsignacionesKanban(): Promise<{
-    pendientes: AsignacionIndividual[];
-    asignadas: AsignacionIndividual[];
-    en_proceso: AsignacionIndividual[];
-    completadas: AsignacionIndividual[];
-  }> {
+  async obtenerAsignacionesKanban(filtros: FiltrosKanban = {}): Promise<TableroKanban> {
     try {
-      const response = await httpInterceptor.get('/api/asignacion/kanban/');
+      const response = await httpInterceptor.get(
+        `/api/asignacion/kanban/${this.queryKanban(filtros)}`
+      );
       return response;
     } catch (error) {
       console.error('Error obteniendo asignaciones Kanban:', error);
@@ -312,6 +327,36 @@ class AsignacionService {
     }
   }
 
+  /**
+   * Carga la página siguiente de una columna del Kanban
+   */
+  async cargarMasKanban(
+    columna: ColumnaKanban,
+    cursor: string,
+    filtros: FiltrosKanban = {}
+  ): Promise<{ columna: ColumnaKanban; asignaciones: any[]; cursor_siguiente: string | null }> {
+    try {
+      const response = await httpInterceptor.get(
+        `/api/asignacion/kanban/${this.queryKanban({ ...filtros, columna, cursor })}`
+      );
+      return response;
+    } catch (error) {
+      console.error('Error cargando más asignaciones Kanban:', error);
+      throw new Error('No se pudieron cargar más asignaciones');
+    }
+  }
+
+  private queryKanban(parametros: Record<string, string | number | undefined>): string {
+    const query = new URLSearchParams();
+    Object.entries(parametros).forEach(([clave, valor]) => {
+      if (valor !== undefined && valor !== '') {
+        query.append(clave, String(valor));
+      }
+    });
+    const texto = query.toString();
+    return texto ? `?${texto}` : '';
+  }
+
   /**
    * Mueve asignación entre estados (drag & drop)
    */
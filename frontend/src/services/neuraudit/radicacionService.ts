@@ -42,7 +42,13 @@ class RadicacionService {
     }
   }
 
-  async getRadicaciones(filters?: any): Promise<{results: RadicacionData[], count: number}> {
+  async getRadicaciones(filters?: any): Promise<{
+    results: RadicacionData[],
+    count: number | null,
+    count_exacto: boolean,
+    page_size: number,
+    cursor_siguiente: string | null
+  }> {
     try {
       const params = new URLSearchParams();
       
@@ -54,8 +60,18 @@ class RadicacionService {
         params.append('search', filters.search);
       }
       
-      if (filters?.page) {
-        params.append('page', filters.page);
+      // Paginación por cursor: cursor_siguiente de la respuesta anterior
+      if (filters?.cursor) {
+        params.append('cursor', filters.cursor);
+      }
+      
+      if (filters?.page_size) {
+        params.append('page_size', filters.page_size);
+      }
+      
+      // Total: 'estimado' (por defecto), 'exacto' o 'ninguno'
+      if (filters?.total) {
+        params.append('total', filters.total);
       }
       
       if (filters?.prestador_nit) {